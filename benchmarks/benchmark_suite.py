@@ -0,0 +1,314 @@
+import contextlib
+import datetime
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import click
+
+from tests.fake_zoltar import FakeZoltarServer
+from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file
+from zoltpy.connection import ZoltarConnection
+from zoltpy.covid19 import COVID_ADDL_REQ_COLS, COVID_TARGETS, covid19_row_validator
+from zoltpy.csv_io import csv_rows_from_json_io_dict
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, quantile_csv_rows_from_json_io_dict, \
+    summarized_error_messages
+from zoltpy.synthetic import LOCATION_SCOPE_ALL, LOCATION_SCOPE_STATE, synthetic_json_io_dict, \
+    write_synthetic_cdc_csv, write_synthetic_quantile_csv
+from zoltpy.util import dataframe_from_json_io_dict, delete_forecast, download_forecast, upload_forecast, \
+    upload_forecast_batch
+
+
+#
+# A benchmark suite that times (best and mean of `repeat` runs) and measures the peak traced memory (one extra run under
+# `tracemalloc`) of zoltpy's parsing, validation, conversion, and `util` network workflows at several input scales.
+# Inputs are generated by `synthetic.py`, and the network workflows run against a local `FakeZoltarServer`, whose
+# allocations are included in their peak memory. Results are saved as JSON, and `compare` flags regressions vs. a
+# baseline results file. Run from the repo root, e.g.,
+#
+#   PYTHONPATH=. python benchmarks/benchmark_suite.py run --output baseline.json
+#   ... make changes ...
+#   PYTHONPATH=. python benchmarks/benchmark_suite.py run --output results.json
+#   PYTHONPATH=. python benchmarks/benchmark_suite.py compare baseline.json results.json
+#
+
+# scale name -> synthetic.py args for the quantile CSV file (and the JSON IO dict with the same predictions), and the
+# number of locations in the CDC CSV file. each scale's name is the approximate number of rows in both files
+SCALES = {
+    '10k': {'quantile': {'location_scope': LOCATION_SCOPE_STATE, 'num_locations': 2}, 'cdc_num_locations': 14},
+    '100k': {'quantile': {'location_scope': LOCATION_SCOPE_STATE, 'num_locations': 25}, 'cdc_num_locations': 137},
+    '450k': {'quantile': {'location_scope': LOCATION_SCOPE_ALL}, 'cdc_num_locations': 607},
+}
+DEFAULT_SCALES = ['10k', '100k']
+
+UPLOAD_BATCH_SIZE = 3
+RESULTS_FORMAT_VERSION = 1
+
+
+class _Inputs:
+    """
+    One scale's inputs, each generated on first use.
+    """
+
+
+    def __init__(self, scale, temp_dir):
+        self.scale = scale
+        self.temp_dir = Path(temp_dir)
+        self._cache = {}
+
+
+    def _cached(self, key, fcn):
+        if key not in self._cache:
+            self._cache[key] = fcn()
+        return self._cache[key]
+
+
+    def quantile_csv_file(self, error_rate=0.0):
+        def write_file():
+            csv_file = self.temp_dir / f'{self.scale}-{error_rate}.csv'
+            with open(csv_file, 'w', newline='') as csv_fp:
+                num_rows = write_synthetic_quantile_csv(csv_fp, error_rate=error_rate, **SCALES[self.scale]['quantile'])
+            return csv_file, num_rows
+
+
+        return self._cached(('quantile', error_rate), write_file)
+
+
+    def cdc_csv_file(self):
+        def write_file():
+            cdc_csv_file = self.temp_dir / f'{self.scale}.cdc.csv'
+            with open(cdc_csv_file, 'w', newline='') as cdc_csv_fp:
+                num_rows = write_synthetic_cdc_csv(cdc_csv_fp, num_locations=SCALES[self.scale]['cdc_num_locations'])
+            return cdc_csv_file, num_rows
+
+
+        return self._cached('cdc', write_file)
+
+
+    def json_io_dict(self):
+        return self._cached('json', lambda: synthetic_json_io_dict(**SCALES[self.scale]['quantile']))
+
+
+#
+# benchmarks. each is a function of a scale's _Inputs and an optional FakeZoltarServer that returns a 3-tuple:
+# (run_fcn, setup_fcn, num_rows), where run_fcn is the no-arg function to time, setup_fcn is an optional no-arg
+# function that's called (untimed) before each run, and num_rows is the input's number of CSV rows
+#
+
+def _quantile_csv_benchmark(row_validator):
+    def benchmark(inputs, server):
+        csv_file, num_rows = inputs.quantile_csv_file()
+
+
+        def run():
+            with open(csv_file) as csv_fp:
+                json_io_dict_from_quantile_csv_file(csv_fp, COVID_TARGETS, row_validator, COVID_ADDL_REQ_COLS)
+
+
+        return run, None, num_rows
+
+
+    return benchmark
+
+
+def _cdc_csv_benchmark(inputs, server):
+    cdc_csv_file, num_rows = inputs.cdc_csv_file()
+
+
+    def run():
+        with open(cdc_csv_file) as cdc_csv_fp:
+            json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+
+
+    return run, None, num_rows
+
+
+def _json_io_dict_benchmark(fcn):
+    def benchmark(inputs, server):
+        json_io_dict = inputs.json_io_dict()
+        return lambda: fcn(json_io_dict), None, inputs.quantile_csv_file()[1]
+
+
+    return benchmark
+
+
+def _summarized_error_messages_benchmark(inputs, server):
+    csv_file, num_rows = inputs.quantile_csv_file(error_rate=0.2)
+    with open(csv_file) as csv_fp:
+        _, error_messages = json_io_dict_from_quantile_csv_file(csv_fp, COVID_TARGETS, covid19_row_validator,
+                                                                COVID_ADDL_REQ_COLS)
+    return lambda: summarized_error_messages(error_messages), None, num_rows
+
+
+def _util_benchmark(workflow_name):
+    def benchmark(inputs, server):
+        json_io_dict = inputs.json_io_dict()
+        project_name = f'project {inputs.scale} {workflow_name}'
+        project_json = server.add_project(project_name)
+        model_json = server.add_model(project_json, 'model')
+        conn = ZoltarConnection(server.host)
+        conn.authenticate('username', 'password')
+        setup_fcn = None
+        if workflow_name == 'upload_forecast':
+            run = lambda: upload_forecast(conn, json_io_dict, 'forecast.json', project_name, 'model', '2020-04-13')
+        elif workflow_name == 'upload_forecast_batch':
+            run = lambda: upload_forecast_batch(conn, [json_io_dict] * UPLOAD_BATCH_SIZE,
+                                                [f'forecast{_}.json' for _ in range(UPLOAD_BATCH_SIZE)], project_name,
+                                                'model', [f'2020-04-{13 + _:02}' for _ in range(UPLOAD_BATCH_SIZE)])
+        elif workflow_name == 'download_forecast':
+            server.add_forecast(model_json, '2020-04-13', json_io_dict)
+            run = lambda: download_forecast(conn, project_name, 'model', '2020-04-13')
+        else:  # 'delete_forecast'. the forecast's data doesn't affect deletion, so it's small
+            setup_fcn = lambda: server.add_forecast(model_json, '2020-04-13', {'meta': {}, 'predictions': []})
+            run = lambda: delete_forecast(conn, project_name, 'model', '2020-04-13')
+        return run, setup_fcn, inputs.quantile_csv_file()[1]
+
+
+    return benchmark
+
+
+# benchmark name -> function as documented above. names starting with 'util.' need a FakeZoltarServer
+BENCHMARKS = {
+    'json_io_dict_from_quantile_csv_file': _quantile_csv_benchmark(None),
+    'json_io_dict_from_quantile_csv_file+covid19_row_validator': _quantile_csv_benchmark(covid19_row_validator),
+    'json_io_dict_from_cdc_csv_file': _cdc_csv_benchmark,
+    'csv_rows_from_json_io_dict': _json_io_dict_benchmark(csv_rows_from_json_io_dict),
+    'quantile_csv_rows_from_json_io_dict': _json_io_dict_benchmark(quantile_csv_rows_from_json_io_dict),
+    'dataframe_from_json_io_dict': _json_io_dict_benchmark(dataframe_from_json_io_dict),
+    'summarized_error_messages': _summarized_error_messages_benchmark,
+    'util.upload_forecast': _util_benchmark('upload_forecast'),
+    'util.upload_forecast_batch': _util_benchmark('upload_forecast_batch'),
+    'util.download_forecast': _util_benchmark('download_forecast'),
+    'util.delete_forecast': _util_benchmark('delete_forecast'),
+}
+
+
+def run_benchmark(run_fcn, setup_fcn, repeat):
+    """
+    :return: a 3-tuple: (best_seconds, mean_seconds, peak_memory_mb) of `repeat` timed runs of run_fcn plus one run
+        under `tracemalloc`. setup_fcn (if not None) is called before each run. stdout is discarded, e.g., from
+        `busy_poll_job()`
+    """
+    elapseds = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            if setup_fcn:
+                setup_fcn()
+            start_time = time.perf_counter()
+            run_fcn()
+            elapseds.append(time.perf_counter() - start_time)
+
+        if setup_fcn:
+            setup_fcn()
+        tracemalloc.start()
+        try:
+            run_fcn()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return min(elapseds), sum(elapseds) / len(elapseds), peak_bytes / 1e6
+
+
+def compare_results(baseline_dict, results_dict, time_threshold, memory_threshold):
+    """
+    :param baseline_dict: a results dict as saved by `run`
+    :param results_dict: ""
+    :param time_threshold: the fractional increase in best_seconds that's a regression, e.g., 0.1 for 10%
+    :param memory_threshold: "" peak_memory_mb
+    :return: a list of comparison dicts, one per result in results_dict, in its order: {'name', 'scale',
+        'time_ratio', 'memory_ratio', 'is_regression'}. the ratios are result / baseline, and are None if
+        results_dict's result is not in baseline_dict
+    """
+    key_to_baseline = {(result['name'], result['scale']): result for result in baseline_dict['results']}
+    comparisons = []
+    for result in results_dict['results']:
+        baseline = key_to_baseline.get((result['name'], result['scale']))
+        time_ratio = result['best_seconds'] / baseline['best_seconds'] if baseline else None
+        memory_ratio = result['peak_memory_mb'] / baseline['peak_memory_mb'] \
+            if baseline and baseline['peak_memory_mb'] else None
+        is_regression = ((time_ratio is not None) and (time_ratio > 1 + time_threshold)) or \
+                        ((memory_ratio is not None) and (memory_ratio > 1 + memory_threshold))
+        comparisons.append({'name': result['name'], 'scale': result['scale'], 'time_ratio': time_ratio,
+                            'memory_ratio': memory_ratio, 'is_regression': is_regression})
+    return comparisons
+
+
+@click.group()
+def benchmark_suite_app():
+    pass
+
+
+@benchmark_suite_app.command()
+@click.option('--scale', 'scales', type=click.Choice(list(SCALES)), multiple=True,
+              help=f"input scale to run. can be repeated. default: {', '.join(DEFAULT_SCALES)}")
+@click.option('--benchmark', 'benchmark_names', type=click.Choice(list(BENCHMARKS)), multiple=True,
+              help="benchmark to run. can be repeated. default: all")
+@click.option('--repeat', type=int, default=3, show_default=True, help="number of timing runs per benchmark")
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help="JSON file to save the results to")
+def run(scales, benchmark_names, repeat, output):
+    """
+    Runs the benchmarks at each scale, printing and optionally saving the results.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir, FakeZoltarServer() as server:
+        for scale in scales or DEFAULT_SCALES:
+            inputs = _Inputs(scale, temp_dir)
+            for benchmark_name in benchmark_names or BENCHMARKS:
+                run_fcn, setup_fcn, num_rows = BENCHMARKS[benchmark_name](inputs, server)
+                best_seconds, mean_seconds, peak_memory_mb = run_benchmark(run_fcn, setup_fcn, repeat)
+                results.append({'name': benchmark_name, 'scale': scale, 'rows': num_rows,
+                                'best_seconds': best_seconds, 'mean_seconds': mean_seconds,
+                                'peak_memory_mb': peak_memory_mb})
+                click.echo(f"* {benchmark_name} @ {scale} ({num_rows} rows): best={best_seconds:.3f}s, "
+                           f"mean={mean_seconds:.3f}s, peak={peak_memory_mb:.1f}MB")
+
+    if output:
+        results_dict = {'version': RESULTS_FORMAT_VERSION,
+                        'meta': {'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                                 'python': sys.version.split()[0], 'platform': platform.platform(), 'repeat': repeat},
+                        'results': results}
+        with open(output, 'w') as fp:
+            json.dump(results_dict, fp, indent=2)
+        click.echo(f"* saved {len(results)} results to {output}")
+
+
+@benchmark_suite_app.command()
+@click.argument('baseline_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('results_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', type=float, default=0.1, show_default=True,
+              help="fractional increase in best time that's a regression")
+@click.option('--memory-threshold', type=float, default=0.1, show_default=True,
+              help="fractional increase in peak memory that's a regression")
+def compare(baseline_file, results_file, threshold, memory_threshold):
+    """
+    Compares results_file to baseline_file, listing each result's time and memory ratios (result / baseline). Exits
+    with status 1 if any are regressions.
+    """
+    with open(baseline_file) as fp:
+        baseline_dict = json.load(fp)
+    with open(results_file) as fp:
+        results_dict = json.load(fp)
+    comparisons = compare_results(baseline_dict, results_dict, threshold, memory_threshold)
+    for comparison in comparisons:
+        if comparison['time_ratio'] is None:
+            click.echo(f"  {comparison['name']} @ {comparison['scale']}: not in baseline")
+            continue
+
+        memory_ratio_str = 'n/a' if comparison['memory_ratio'] is None else f"{comparison['memory_ratio']:.2f}x"
+        click.echo(f"{'!' if comparison['is_regression'] else ' '} {comparison['name']} @ {comparison['scale']}: "
+                   f"time={comparison['time_ratio']:.2f}x, memory={memory_ratio_str}")
+
+    num_regressions = sum(1 for comparison in comparisons if comparison['is_regression'])
+    click.echo(f"* {num_regressions} regression(s) of {len(comparisons)} result(s). thresholds: time={threshold:.0%}, "
+               f"memory={memory_threshold:.0%}")
+    if num_regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    benchmark_suite_app()
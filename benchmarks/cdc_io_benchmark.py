@@ -0,0 +1,77 @@
+import os
+import time
+import tracemalloc
+
+import click
+
+from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file, _cleaned_rows_from_cdc_csv_file, _epiweek_calendar, \
+    _monday_date_from_ew_and_season_start_year, _monday_date_str_from_ew_and_season_start_year, \
+    YYYY_MM_DD_DATE_FORMAT, iter_prediction_dicts_from_cdc_csv_file, write_cdc_csv
+
+
+@click.command()
+@click.argument('cdc_csv_file', type=click.Path(file_okay=True, exists=True), default='tests/EW01-2011-ReichLab_kde.csv')
+@click.option('--season-start-year', type=int, default=2011, show_default=True)
+@click.option('--repeat', type=int, default=5, show_default=True, help="number of timing runs. the fastest is reported")
+def cdc_io_benchmark_app(cdc_csv_file, season_start_year, repeat):
+    """
+    Times `json_io_dict_from_cdc_csv_file()` and the streaming `iter_prediction_dicts_from_cdc_csv_file()` on
+    cdc_csv_file (and their peak traced memory), exporting the result back to CDC CSV via `write_cdc_csv()`, and
+    separately its EW -> Monday date conversions for the
+    'Season onset' and 'Season peak week' bin rows: one `pymmwr` call per row vs. the precomputed `_epiweek_calendar()`.
+
+    :param cdc_csv_file: a CDC CSV file. defaults to a national + regional file from the tests
+    """
+    iter_count_fcn = lambda season_start_year, cdc_csv_fp: \
+        sum(1 for _ in iter_prediction_dicts_from_cdc_csv_file(season_start_year, cdc_csv_fp))
+    for name, convert_fcn in [('json_io_dict_from_cdc_csv_file()', json_io_dict_from_cdc_csv_file),
+                              ('iter_prediction_dicts_from_cdc_csv_file()', iter_count_fcn)]:
+        best_elapsed = None
+        for _ in range(repeat):
+            with open(cdc_csv_file) as cdc_csv_fp:
+                start_time = time.perf_counter()
+                convert_fcn(season_start_year, cdc_csv_fp)
+                elapsed = time.perf_counter() - start_time
+            best_elapsed = elapsed if best_elapsed is None else min(best_elapsed, elapsed)
+        with open(cdc_csv_file) as cdc_csv_fp:
+            tracemalloc.start()
+            convert_fcn(season_start_year, cdc_csv_fp)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        click.echo(f"* {name}: {best_elapsed * 1000:.1f}ms, peak {peak_bytes / 1e6:.1f}MB")
+
+    with open(cdc_csv_file) as cdc_csv_fp:
+        json_io_dict = json_io_dict_from_cdc_csv_file(season_start_year, cdc_csv_fp)
+    with open(os.devnull, 'w', newline='') as devnull_fp:
+        start_time = time.perf_counter()
+        write_cdc_csv(season_start_year, json_io_dict, devnull_fp)
+        elapsed = time.perf_counter() - start_time
+        tracemalloc.start()  # a separate run b/c tracing slows it down
+        write_cdc_csv(season_start_year, json_io_dict, devnull_fp)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    click.echo(f"* write_cdc_csv(): {elapsed * 1000:.1f}ms, peak {peak_bytes / 1e6:.2f}MB (beyond json_io_dict)")
+
+    with open(cdc_csv_file) as cdc_csv_fp:
+        ew_weeks = [bin_start_incl for _, target_name, is_point_row, bin_start_incl, _, _
+                    in _cleaned_rows_from_cdc_csv_file(cdc_csv_fp)
+                    if (not is_point_row) and (target_name in ['Season onset', 'Season peak week'])
+                    and (bin_start_incl is not None)]
+    for name, date_str_fcn in [('pymmwr per row', lambda ew_week: _monday_date_from_ew_and_season_start_year(
+            ew_week, season_start_year).strftime(YYYY_MM_DD_DATE_FORMAT)),
+                               ('epiweek calendar', lambda ew_week: _monday_date_str_from_ew_and_season_start_year(
+                                   ew_week, season_start_year))]:
+        best_elapsed = None
+        for _ in range(repeat):
+            _epiweek_calendar.cache_clear()  # include building the calendar
+            start_time = time.perf_counter()
+            for ew_week in ew_weeks:
+                date_str_fcn(ew_week)
+            elapsed = time.perf_counter() - start_time
+            best_elapsed = elapsed if best_elapsed is None else min(best_elapsed, elapsed)
+        click.echo(f"* EW dates, {name}: {len(ew_weeks)} rows, {best_elapsed * 1000:.2f}ms, "
+                   f"{1e6 * best_elapsed / len(ew_weeks):.2f}us/row")
+
+
+if __name__ == '__main__':
+    cdc_io_benchmark_app()
@@ -0,0 +1,41 @@
+import csv
+import time
+
+import click
+
+from zoltpy.covid19 import covid19_row_validator, clear_date_alignment_cache, date_alignment_cache_info
+
+
+@click.command()
+@click.argument('quantile_csv_files', type=click.Path(file_okay=True, exists=True), nargs=-1, required=True)
+@click.option('--repeat', type=int, default=3, show_default=True, help="number of timing runs. the fastest is reported")
+def covid19_row_validator_benchmark_app(quantile_csv_files, repeat):
+    """
+    Times `covid19_row_validator()` alone on all rows of quantile_csv_files, which are loaded into memory first so that
+    CSV parsing is not included.
+
+    :param quantile_csv_files: one or more COVID-19 quantile CSV files, ideally large (e.g., county-level) ones
+    """
+    for quantile_csv_file in quantile_csv_files:
+        with open(quantile_csv_file) as quantile_fp:
+            csv_reader = csv.reader(quantile_fp, delimiter=',')
+            header = next(csv_reader)
+            column_index_dict = {column: idx for idx, column in enumerate(header)}
+            rows = list(csv_reader)
+
+        best_elapsed, num_errors = None, 0
+        for _ in range(repeat):
+            clear_date_alignment_cache()  # time a cold cache
+            start_time = time.perf_counter()
+            num_errors = sum(len(covid19_row_validator(column_index_dict, row)) for row in rows)
+            elapsed = time.perf_counter() - start_time
+            best_elapsed = elapsed if best_elapsed is None else min(best_elapsed, elapsed)
+        cache_info = date_alignment_cache_info()
+        hit_rate = cache_info.hits / (cache_info.hits + cache_info.misses) if rows else 0
+        click.echo(f"* {quantile_csv_file}: rows={len(rows)}, errors={num_errors}, {best_elapsed:.2f}s, "
+                   f"{1e6 * best_elapsed / len(rows):.2f}us/row. date cache: hits={cache_info.hits}, "
+                   f"misses={cache_info.misses}, hit rate={hit_rate:.1%}")
+
+
+if __name__ == '__main__':
+    covid19_row_validator_benchmark_app()
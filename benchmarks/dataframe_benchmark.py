@@ -0,0 +1,42 @@
+import time
+
+import click
+
+from zoltpy.covid19 import COVID_TARGETS, COVID_ADDL_REQ_COLS
+from zoltpy.forecast_frame import ForecastFrame
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file
+from zoltpy.util import dataframe_from_json_io_dict, typed_dataframe_from_json_io_dict
+
+
+@click.command()
+@click.argument('quantile_csv_file', type=click.Path(file_okay=True, exists=True))
+@click.option('--repeat', type=int, default=3, show_default=True, help="number of timing runs. the fastest is reported")
+def dataframe_benchmark_app(quantile_csv_file, repeat):
+    """
+    Compares the time and DataFrame memory of converting quantile_csv_file's "JSON IO dict" to a DataFrame via the CSV
+    round trip of `dataframe_from_json_io_dict()` vs. `typed_dataframe_from_json_io_dict()`, the latter from both a
+    JSON IO dict and a ForecastFrame.
+
+    :param quantile_csv_file: a COVID-19 quantile CSV file, ideally a large (e.g., county-level) one
+    """
+    with open(quantile_csv_file) as quantile_fp:
+        json_io_dict, _ = json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS,
+                                                              addl_req_cols=COVID_ADDL_REQ_COLS)
+    forecast_frame = ForecastFrame.from_json_io_dict(json_io_dict)
+    for name, dataframe_fcn, arg in [('dataframe_from_json_io_dict()', dataframe_from_json_io_dict, json_io_dict),
+                                     ('typed_dataframe_from_json_io_dict()', typed_dataframe_from_json_io_dict,
+                                      json_io_dict),
+                                     ('typed_dataframe_from_json_io_dict(ForecastFrame)',
+                                      typed_dataframe_from_json_io_dict, forecast_frame)]:
+        best_elapsed = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            dataframe = dataframe_fcn(arg)
+            elapsed = time.perf_counter() - start_time
+            best_elapsed = elapsed if best_elapsed is None else min(best_elapsed, elapsed)
+        click.echo(f"* {name}: {len(dataframe)} rows, {best_elapsed:.2f}s, "
+                   f"{dataframe.memory_usage(deep=True).sum() / 1e6:.1f}MB")
+
+
+if __name__ == '__main__':
+    dataframe_benchmark_app()
@@ -0,0 +1,33 @@
+import time
+import tracemalloc
+
+import click
+
+from zoltpy.covid19 import COVID_TARGETS, COVID_ADDL_REQ_COLS
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, forecast_frame_from_quantile_csv_file
+
+
+@click.command()
+@click.argument('quantile_csv_file', type=click.Path(file_okay=True, exists=True))
+def forecast_frame_benchmark_app(quantile_csv_file):
+    """
+    Compares the time and peak memory of loading quantile_csv_file as a "JSON IO dict" vs. as a ForecastFrame. Row
+    validation is not done so that only the representations are compared.
+
+    :param quantile_csv_file: a COVID-19 quantile CSV file, ideally a large (e.g., county-level) one
+    """
+    for reader in [json_io_dict_from_quantile_csv_file, forecast_frame_from_quantile_csv_file]:
+        with open(quantile_csv_file) as quantile_fp:
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            result, error_messages = reader(quantile_fp, COVID_TARGETS, addl_req_cols=COVID_ADDL_REQ_COLS)
+            elapsed = time.perf_counter() - start_time
+            current_size, peak_size = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        click.echo(f"* {reader.__name__}(): {elapsed:.2f}s, retained={current_size / 1e6:.1f}MB, "
+                   f"peak={peak_size / 1e6:.1f}MB, errors={len(error_messages)}")
+        del result
+
+
+if __name__ == '__main__':
+    forecast_frame_benchmark_app()
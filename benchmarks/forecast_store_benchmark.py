@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from zoltpy.covid19 import COVID_TARGETS, COVID_ADDL_REQ_COLS
+from zoltpy.forecast_store import write_forecast_frame, read_forecast_frame
+from zoltpy.quantile_io import forecast_frame_from_quantile_csv_file
+
+
+@click.command()
+@click.argument('quantile_csv_file', type=click.Path(file_okay=True, exists=True))
+def forecast_store_benchmark_app(quantile_csv_file):
+    """
+    Compares the file size and load time of quantile_csv_file's predictions stored as "JSON IO dict" JSON (loaded via
+    `json.load()`, as a cached `Forecast.data()` result would be) vs. `forecast_store` files, both uncompressed
+    (opened via mmap, and read into memory) and compressed. Loading a store file includes touching all of its arrays.
+
+    :param quantile_csv_file: a COVID-19 quantile CSV file, ideally a large (e.g., county-level) one
+    """
+    with open(quantile_csv_file) as quantile_fp:
+        forecast_frame, _ = forecast_frame_from_quantile_csv_file(quantile_fp, COVID_TARGETS,
+                                                                  addl_req_cols=COVID_ADDL_REQ_COLS)
+    click.echo(f"* {len(forecast_frame)} predictions, {len(forecast_frame.value)} elements")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_file = Path(temp_dir) / 'forecast.json'
+        with open(json_file, 'w') as json_fp:
+            json.dump(forecast_frame.to_json_io_dict(), json_fp)
+        with open(json_file) as json_fp:
+            start_time = time.perf_counter()
+            json.load(json_fp)
+            elapsed = time.perf_counter() - start_time
+        click.echo(f"* json: {os.path.getsize(json_file) / 1e6:.1f}MB, load={elapsed * 1000:.1f}ms")
+
+        store_file = Path(temp_dir) / 'forecast.zff'
+        for compress, use_mmap in [(False, True), (False, False), (True, False)]:
+            start_time = time.perf_counter()
+            write_forecast_frame(forecast_frame, store_file, compress=compress)
+            write_elapsed = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            stored_forecast_frame = read_forecast_frame(store_file, use_mmap=use_mmap)
+            open_elapsed = time.perf_counter() - start_time
+            stored_forecast_frame.value.sum(), stored_forecast_frame.quantile.sum(), stored_forecast_frame.nbytes
+            load_elapsed = time.perf_counter() - start_time
+            click.echo(f"* forecast_store compress={compress}, use_mmap={use_mmap}: "
+                       f"{os.path.getsize(store_file) / 1e6:.1f}MB, write={write_elapsed * 1000:.1f}ms, "
+                       f"open={open_elapsed * 1000:.1f}ms, load={load_elapsed * 1000:.1f}ms")
+            del stored_forecast_frame
+
+
+if __name__ == '__main__':
+    forecast_store_benchmark_app()
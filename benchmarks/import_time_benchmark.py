@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+import click
+
+
+PUBLIC_MODULES = ['zoltpy.cdc_io', 'zoltpy.connection', 'zoltpy.covid19', 'zoltpy.covid19_columnar', 'zoltpy.csv_io',
+                  'zoltpy.forecast_frame', 'zoltpy.quantile_io', 'zoltpy.util', 'zoltpy.validation_cache']
+
+
+def import_times(module_name):
+    """
+    Imports module_name in a fresh interpreter via `python -X importtime`. `-X importtime` is python 3.7+, so on
+    earlier versions only module_name's wall-clock import time is measured.
+
+    :return: a list of 3-tuples, one per imported module, in `-X importtime` order:
+        (self_us, cumulative_us, imported_module_name). the list has only module_name's tuple if `-X importtime` is not
+        available, with its self_us equal to cumulative_us
+    """
+    if sys.version_info < (3, 7):
+        code = f"import time; start = time.perf_counter(); import {module_name}; " \
+               f"print(int((time.perf_counter() - start) * 1e6))"
+        total_us = int(_run_python('-c', code).stdout)
+        return [(total_us, total_us, module_name)]
+
+    times = []
+    for line in _run_python('-X', 'importtime', '-c', f'import {module_name}').stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:  # skip the header line
+            continue
+
+        self_us, cumulative_us, imported_module_name = line[len('import time:'):].split('|')
+        times.append((int(self_us), int(cumulative_us), imported_module_name.strip()))
+    return times
+
+
+def _run_python(*args):
+    return subprocess.run([sys.executable, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+
+
+@click.command()
+@click.argument('module_names', nargs=-1)
+@click.option('--repeat', type=int, default=5, show_default=True, help="number of timing runs. the fastest is reported")
+@click.option('--top', type=int, default=5, show_default=True, help="number of slowest imports (by self time) to list")
+def import_time_benchmark_app(module_names, repeat, top):
+    """
+    Reports each module's cold import time, i.e., in a fresh interpreter, along with its slowest (by self time)
+    transitive imports.
+
+    :param module_names: zero or more modules to time. defaults to PUBLIC_MODULES
+    """
+    for module_name in module_names or PUBLIC_MODULES:
+        best_times = min((import_times(module_name) for _ in range(repeat)), key=lambda times: times[-1][1])
+        click.echo(f"* {module_name}: {best_times[-1][1] / 1000:.1f}ms, {len(best_times)} modules imported")
+        for self_us, _, imported_module_name in sorted(best_times, reverse=True)[:top]:
+            click.echo(f"  - {imported_module_name}: {self_us / 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    import_time_benchmark_app()
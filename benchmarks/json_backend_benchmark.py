@@ -0,0 +1,66 @@
+import io
+import random
+import time
+
+import click
+
+from zoltpy import json_backend
+from zoltpy.covid19 import COVID_QUANTILES_NON_CASE
+from zoltpy.json_backend import BACKEND_ORJSON, BACKEND_STDLIB
+
+
+@click.command()
+@click.option('--num-units', type=int, default=3200, show_default=True, help="number of units, e.g., US counties")
+@click.option('--num-targets', type=int, default=8, show_default=True)
+@click.option('--repeat', type=int, default=3, show_default=True, help="number of timing runs. the fastest is reported")
+def json_backend_benchmark_app(num_units, num_targets, repeat):
+    """
+    Times each available `json_backend` backend's encoding (as in `Model.upload_forecast()`) and decoding (as in
+    `Forecast.data()`) of a synthetic county-scale JSON IO dict: a point and a quantile prediction for every unit and
+    target, with COVID-19 quantiles and random values.
+    """
+    json_io_dict = _synthetic_json_io_dict(num_units, num_targets)
+    click.echo(f"* json_io_dict: {len(json_io_dict['predictions'])} predictions")
+
+    backend_names = [BACKEND_STDLIB]
+    try:
+        json_backend.set_backend(BACKEND_ORJSON)
+        backend_names.append(BACKEND_ORJSON)
+    except ImportError:
+        click.echo(f"* {BACKEND_ORJSON} is not installed")
+    for backend_name in backend_names:
+        json_backend.set_backend(backend_name)
+        best_dumps_elapsed, best_loads_elapsed = None, None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            fp = io.BytesIO()
+            json_backend.dump(json_io_dict, fp)
+            dumps_elapsed = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            json_backend.loads(fp.getvalue())
+            loads_elapsed = time.perf_counter() - start_time
+            best_dumps_elapsed = dumps_elapsed if best_dumps_elapsed is None else min(best_dumps_elapsed, dumps_elapsed)
+            best_loads_elapsed = loads_elapsed if best_loads_elapsed is None else min(best_loads_elapsed, loads_elapsed)
+        click.echo(f"* {backend_name}: {len(fp.getvalue()) / 1e6:.1f}MB. encode={best_dumps_elapsed:.2f}s, "
+                   f"decode={best_loads_elapsed:.2f}s")
+    json_backend.set_backend(None)
+
+
+def _synthetic_json_io_dict(num_units, num_targets):
+    rng = random.Random(0)
+    predictions = []
+    for unit_idx in range(num_units):
+        unit = f'{unit_idx + 1001:05d}'  # FIPS-like
+        for target_idx in range(num_targets):
+            target = f'{target_idx + 1} wk ahead inc death'
+            median = rng.lognormvariate(2, 2)
+            values = sorted(rng.gauss(median, median / 4) for _ in COVID_QUANTILES_NON_CASE)
+            predictions.append({'unit': unit, 'target': target, 'class': 'point', 'prediction': {'value': median}})
+            predictions.append({'unit': unit, 'target': target, 'class': 'quantile',
+                                'prediction': {'quantile': list(COVID_QUANTILES_NON_CASE), 'value': values}})
+    return {'meta': {}, 'predictions': predictions}
+
+
+if __name__ == '__main__':
+    json_backend_benchmark_app()
@@ -0,0 +1,61 @@
+import json
+import time
+import tracemalloc
+
+import click
+
+from zoltpy.covid19 import COVID_TARGETS, COVID_ADDL_REQ_COLS
+from zoltpy.forecast_frame import ForecastFrameBuilder
+from zoltpy.json_stream import DEFAULT_CHUNK_SIZE, iter_prediction_dicts_from_json_chunks
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file
+
+
+@click.command()
+@click.argument('quantile_csv_file', type=click.Path(file_okay=True, exists=True))
+def json_stream_benchmark_app(quantile_csv_file):
+    """
+    Compares the time and peak memory of parsing a `Forecast.data()`-style response for quantile_csv_file's predictions
+    all at once (`json.loads()` as in `Forecast.data()`) vs. incrementally from chunks, both counting the predictions
+    and building a ForecastFrame. The response is simulated by chunks of the encoded JSON, which aren't counted.
+
+    :param quantile_csv_file: a COVID-19 quantile CSV file, ideally a large (e.g., county-level) one
+    """
+    with open(quantile_csv_file) as quantile_fp:
+        json_io_dict, _ = json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS,
+                                                              addl_req_cols=COVID_ADDL_REQ_COLS)
+    json_bytes = json.dumps(json_io_dict).encode('utf-8')
+    del json_io_dict
+    click.echo(f"* response: {len(json_bytes) / 1e6:.1f}MB")
+
+
+    def loads_predictions(chunks):  # as in `Forecast.data()`
+        return json.loads(b''.join(chunks).decode('utf-8'))['predictions']
+
+
+    def build_forecast_frame(prediction_dicts):
+        builder = ForecastFrameBuilder()
+        for prediction_dict in prediction_dicts:
+            builder.append(prediction_dict)
+        return builder.build()
+
+
+    for name, parse_fcn in [('json.loads()', lambda chunks: len(loads_predictions(chunks))),
+                            ('iter_prediction_dicts_from_json_chunks()',
+                             lambda chunks: sum(1 for _ in iter_prediction_dicts_from_json_chunks(chunks))),
+                            ('json.loads() -> ForecastFrame',
+                             lambda chunks: build_forecast_frame(loads_predictions(chunks))),
+                            ('iter_prediction_dicts_from_json_chunks() -> ForecastFrame',
+                             lambda chunks: build_forecast_frame(iter_prediction_dicts_from_json_chunks(chunks)))]:
+        chunks = (json_bytes[idx:idx + DEFAULT_CHUNK_SIZE] for idx in range(0, len(json_bytes), DEFAULT_CHUNK_SIZE))
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        result = parse_fcn(chunks)
+        elapsed = time.perf_counter() - start_time
+        peak_size = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        click.echo(f"* {name}: {elapsed:.2f}s, peak={peak_size / 1e6:.1f}MB")
+        del result
+
+
+if __name__ == '__main__':
+    json_stream_benchmark_app()
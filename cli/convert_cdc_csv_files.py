@@ -0,0 +1,41 @@
+import click
+
+from zoltpy.cdc_bulk import UP_TO_DATE_MODES, UP_TO_DATE_MTIME, bulk_convert_cdc_csv_files, \
+    season_start_year_from_file_name
+
+
+@click.command()
+@click.argument('source_dir', type=click.Path(file_okay=False, exists=True))
+@click.argument('target_dir', type=click.Path(file_okay=False))
+@click.option('--season-start-year', type=int, default=None,
+              help="season start year for all files. default: parsed from each file name, e.g., 'EW01-2011-*.csv'")
+@click.option('--compress', is_flag=True, default=False, help="gzip the output files")
+@click.option('--up-to-date', type=click.Choice(UP_TO_DATE_MODES), default=UP_TO_DATE_MTIME, show_default=True,
+              help="how to decide that a file's output is up-to-date and can be skipped")
+@click.option('--workers', type=int, default=None, help="number of worker processes. default: the number of CPUs")
+@click.option('--pattern', default='**/*.csv', show_default=True, help="glob pattern selecting the files to convert")
+def convert_cdc_csv_files_app(source_dir, target_dir, season_start_year, compress, up_to_date, workers, pattern):
+    """
+    Simple CLI wrapper of `bulk_convert_cdc_csv_files()`
+
+    :param source_dir: directory tree of CDC CSV files to convert
+    :param target_dir: directory to write JSON IO dict files to
+    :param season_start_year: optional season start year for all files
+    :param compress: True if output files should be gzipped
+    :param up_to_date: one of UP_TO_DATE_MODES
+    :param workers: optional number of worker processes
+    :param pattern: glob pattern relative to source_dir
+    """
+    season_start_year_fcn = season_start_year_from_file_name if season_start_year is None \
+        else lambda _: season_start_year
+    summary = bulk_convert_cdc_csv_files(source_dir, target_dir, season_start_year_fcn, compress, up_to_date, workers,
+                                         pattern)
+    click.echo(f"* converted {summary['converted']}, skipped {summary['skipped']}, failed {len(summary['failed'])} "
+               f"in {summary['elapsed']:.1f}s ({summary['files_per_second']:.1f} files/s, "
+               f"{summary['mb_per_second']:.1f} MB/s)")
+    for rel_path, error in summary['failed']:
+        click.echo(f"- failed: {rel_path}: {error}")
+
+
+if __name__ == '__main__':
+    convert_cdc_csv_files_app()
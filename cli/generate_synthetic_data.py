@@ -0,0 +1,79 @@
+import click
+
+from zoltpy import json_backend
+from zoltpy.covid19 import COVID_TARGETS, COVID_TARGETS_CASE
+from zoltpy.synthetic import CDC_ERROR_KINDS, CDC_LOCATIONS, LOCATION_SCOPES, LOCATION_SCOPE_STATE, \
+    QUANTILE_ERROR_KINDS, synthetic_json_io_dict, write_synthetic_cdc_csv, write_synthetic_hub, \
+    write_synthetic_quantile_csv
+
+
+KIND_QUANTILE_CSV = 'quantile-csv'
+KIND_CDC_CSV = 'cdc-csv'
+KIND_JSON = 'json'
+KIND_HUB = 'hub'
+
+
+@click.command()
+@click.argument('kind', type=click.Choice([KIND_QUANTILE_CSV, KIND_CDC_CSV, KIND_JSON, KIND_HUB]))
+@click.argument('output_path', type=click.Path())
+@click.option('--location-scope', type=click.Choice(LOCATION_SCOPES), default=LOCATION_SCOPE_STATE,
+              show_default=True, help="quantile-csv, json, hub: which FIPS codes to use")
+@click.option('--num-locations', type=int, default=None,
+              help="number of locations. default: all in --location-scope, or the 11 real ones for cdc-csv")
+@click.option('--case-targets-only', is_flag=True, default=False,
+              help="quantile-csv, json, hub: only use the 'N wk ahead inc case' targets, not all COVID targets")
+@click.option('--quantiles', default=None, help="quantile-csv, json, hub: comma-separated quantiles for all targets. "
+                                                "default: each target's valid ones")
+@click.option('--num-samples', type=int, default=0, show_default=True,
+              help="json: number of samples per (location, target)")
+@click.option('--num-models', type=int, default=1, show_default=True, help="hub: number of model directories")
+@click.option('--num-forecast-dates', type=int, default=1, show_default=True,
+              help="hub: number of weekly files per model")
+@click.option('--forecast-date', default='2020-04-13', show_default=True, help="forecast date, or the first for hub")
+@click.option('--error-rate', type=float, default=0.0, show_default=True,
+              help="fraction of (location, target) predictions to make invalid")
+@click.option('--error-kind', 'error_kinds', multiple=True, help="error kind to inject. can be repeated. default: all. "
+                                                                 f"quantile: {', '.join(QUANTILE_ERROR_KINDS)}. "
+                                                                 f"cdc: {', '.join(CDC_ERROR_KINDS)}")
+@click.option('--seed', type=int, default=0, show_default=True, help="random seed")
+def generate_synthetic_data_app(kind, output_path, location_scope, num_locations, case_targets_only, quantiles,
+                                num_samples, num_models, num_forecast_dates, forecast_date, error_rate, error_kinds,
+                                seed):
+    """
+    Simple CLI wrapper of the synthetic.py generators. Writes a quantile CSV file, CDC CSV file, JSON IO dict file, or
+    hub directory to output_path.
+
+    :param kind: the kind of output
+    :param output_path: the file (or directory for hub) to write
+    """
+    targets = COVID_TARGETS_CASE if case_targets_only else COVID_TARGETS
+    quantiles = [float(quantile) for quantile in quantiles.split(',')] if quantiles else None
+    error_counts = {}
+    if kind == KIND_CDC_CSV:
+        with open(output_path, 'w', newline='') as cdc_csv_fp:
+            num_rows = write_synthetic_cdc_csv(cdc_csv_fp, num_locations=num_locations or len(CDC_LOCATIONS),
+                                               error_rate=error_rate, error_kinds=error_kinds or CDC_ERROR_KINDS,
+                                               seed=seed, error_counts=error_counts)
+        click.echo(f"* wrote {num_rows} rows to {output_path}. injected errors: {error_counts}")
+    elif kind == KIND_JSON:
+        json_io_dict = synthetic_json_io_dict(location_scope, num_locations, targets, quantiles, num_samples,
+                                              forecast_date, seed)
+        with open(output_path, 'wb') as json_fp:
+            json_backend.dump(json_io_dict, json_fp)
+        click.echo(f"* wrote {len(json_io_dict['predictions'])} predictions to {output_path}")
+    else:
+        kwargs = dict(location_scope=location_scope, num_locations=num_locations, targets=targets,
+                      quantiles=quantiles, error_rate=error_rate, error_kinds=error_kinds or QUANTILE_ERROR_KINDS,
+                      error_counts=error_counts)
+        if kind == KIND_QUANTILE_CSV:
+            with open(output_path, 'w', newline='') as csv_fp:
+                num_rows = write_synthetic_quantile_csv(csv_fp, forecast_date=forecast_date, seed=seed, **kwargs)
+            click.echo(f"* wrote {num_rows} rows to {output_path}. injected errors: {error_counts}")
+        else:  # KIND_HUB
+            summary = write_synthetic_hub(output_path, num_models, num_forecast_dates, forecast_date, seed, **kwargs)
+            click.echo(f"* wrote {summary['rows']} rows in {len(summary['files'])} files to {output_path}. injected "
+                       f"errors: {error_counts}")
+
+
+if __name__ == '__main__':
+    generate_synthetic_data_app()
@@ -1,18 +1,100 @@
+import os
+import time
+
 import click
 
-from zoltpy.covid19 import validate_quantile_csv_file
+from zoltpy.covid19 import COVID_HUB_VALIDATOR
+from zoltpy.hub_spec import ENGINES, ENGINE_ROW, HubValidator, load_hub_spec
+from zoltpy.profiling import profile_readers
+from zoltpy.validation_cache import ValidationCache
+from zoltpy.validation_worker import DEFAULT_WATCH_INTERVAL, ValidationWorker
 
 
 @click.command()
-@click.argument('quantile_csv_file', type=click.Path(file_okay=True, exists=True))
-def validate_quantile_csv_file_app(quantile_csv_file):
+@click.argument('quantile_csv_file', type=click.Path(file_okay=True, dir_okay=True, exists=True))
+@click.option('--max-errors', type=int, default=None, help="stop validating after this many errors")
+@click.option('--no-cache', is_flag=True, default=False, help="always validate, bypassing the validation cache")
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=None,
+              help="validation cache directory. default: $ZOLTPY_CACHE_DIR/validation or ~/.cache/zoltpy/validation")
+@click.option('--engine', type=click.Choice(ENGINES), default=ENGINE_ROW, show_default=True,
+              help="validation engine. 'columnar' is much faster for large files")
+@click.option('--hub-spec', type=click.Path(file_okay=True, exists=True), default=None,
+              help="JSON hub spec file to validate against. default: the COVID-19 hub's rules")
+@click.option('--watch', is_flag=True, default=False,
+              help="keep running, re-validating quantile_csv_file (a file or a directory of csv files) when it changes")
+@click.option('--interval', type=float, default=DEFAULT_WATCH_INTERVAL, show_default=True,
+              help="--watch: seconds between checks for changes")
+@click.option('--socket', 'socket_path', type=click.Path(), default=None,
+              help="--watch: also serve validation requests on this Unix socket, e.g., for editor integrations")
+@click.option('--profile', is_flag=True, default=False,
+              help="print a per-stage breakdown of the reader's time. implies --no-cache. not with --watch")
+@click.option('--profile-allocations', is_flag=True, default=False,
+              help="--profile: also measure each stage's allocations. much slower")
+def validate_quantile_csv_file_app(quantile_csv_file, max_errors, no_cache, cache_dir, engine, hub_spec, watch,
+                                   interval, socket_path, profile, profile_allocations):
     """
     Simple CLI wrapper of `validate_quantile_csv_file()`
 
     :param csv_fp: as passed to `json_io_dict_from_quantile_csv_file()`
+    :param max_errors: as passed to `json_io_dict_from_quantile_csv_file()`
+    :param no_cache: True if the validation cache should not be used
+    :param cache_dir: optional `ValidationCache` directory
+    :param engine: one of ENGINES
+    :param hub_spec: optional JSON hub spec file as loaded by `load_hub_spec()`
+    :param watch: True if quantile_csv_file should be watched for changes. see `ValidationWorker.watch()`
+    :param interval: seconds between checks for changes
+    :param socket_path: optional Unix socket to serve requests on. see `ValidationWorker.serve()`
+    :param profile: True if a per-stage breakdown should be printed. see `profile_readers()`
+    :param profile_allocations: True if the breakdown should include allocations
     :return:
     """
-    validate_quantile_csv_file(quantile_csv_file)
+    profile = profile or profile_allocations
+    if profile and watch:
+        raise click.UsageError("--profile cannot be used with --watch")
+    elif os.path.isdir(quantile_csv_file) and not watch:
+        raise click.UsageError("a directory requires --watch")
+
+    cache = None if (no_cache or profile) else ValidationCache(cache_dir)  # profile: cache hits would skip reading
+    validator = HubValidator(load_hub_spec(hub_spec)) if hub_spec else COVID_HUB_VALIDATOR
+    if profile:
+        with profile_readers(profile_allocations) as reader_stats:
+            validator.validate_quantile_csv_file(quantile_csv_file, max_errors, cache, engine)
+        if engine != ENGINE_ROW:
+            click.echo(f"* note: only the '{ENGINE_ROW}' engine has reader stages. engine={engine!r}")
+        click.echo('\n'.join(reader_stats.format_lines()))
+        click.echo(f"* {validator.date_cache_summary()}")
+        return
+    elif not watch:
+        start_time = time.perf_counter()
+        validator.validate_quantile_csv_file(quantile_csv_file, max_errors, cache, engine)
+        click.echo(f"* done ({(time.perf_counter() - start_time) * 1000:.0f}ms). {validator.date_cache_summary()}")
+        return
+
+    worker = ValidationWorker(validator, max_errors, cache, engine)
+    worker.warm_up()
+    server = worker.serve(socket_path) if socket_path else None
+    click.echo(f"* watching '{quantile_csv_file}'" + (f", serving on '{socket_path}'" if server else '') +
+               ". press Ctrl-C to stop")
+    try:
+        worker.watch([quantile_csv_file], _echo_result, interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+            os.unlink(socket_path)
+
+
+def _echo_result(result_dict):
+    result = result_dict['result']  # "no errors" or a list of error message strings
+    timing = f"{result_dict['elapsed'] * 1000:.0f}ms, {result_dict['date_cache']}"
+    if isinstance(result, str):
+        click.echo(f"* {result_dict['path']} ({timing}): {result}")
+    else:
+        click.echo(f"* {result_dict['path']} ({timing}): {len(result)} error(s)")
+        for error_message in result:
+            click.echo(f"  - {error_message}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,292 @@
+import base64
+import contextlib
+import itertools
+import json
+import re
+import socketserver
+import threading
+import time
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+#
+# This file defines FakeZoltarServer, a minimal in-memory Zoltar server that runs on a local port so that `util`
+# workflows can be run end-to-end (benchmarked, and their requests counted) without a real server. It implements only
+# the endpoints that `ZoltarConnection` and `util` use, with Zoltar's URL structure and JSON shapes. Jobs (uploads and
+# deletes) finish immediately, i.e., they are returned with SUCCESS status. Tokens are unsigned JWTs that expire after
+# TOKEN_LIFETIME seconds.
+#
+
+JOB_STATUS_SUCCESS = 4
+TOKEN_LIFETIME = 3600
+
+
+class FakeZoltarServer:
+    """
+    Use as a context manager, which starts the server in a background thread and stops it on exit:
+
+        with FakeZoltarServer() as server:
+            project_json = server.add_project('my project')
+            conn = ZoltarConnection(server.host)
+            conn.authenticate('user', 'pass')
+            ...
+
+    `request_counts` counts the requests to each endpoint, keyed by method and URL pattern, e.g.,
+    'GET /api/project/{id}/models/'. Use `request_budget()` to assert upper bounds on the requests a workflow makes.
+    """
+
+
+    def __init__(self):
+        self.projects = {}  # id -> project json. ditto for the rest
+        self.models = {}
+        self.forecasts = {}
+        self.timezeros = {}
+        self.jobs = {}
+        self.forecast_data = {}  # forecast id -> its JSON IO dict as bytes
+        self.request_counts = Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._http_server = None
+        self._routes = [(method, endpoint, re.compile('^' + endpoint.replace('{id}', r'(\d+)') + '$'), handler)
+                        for method, endpoint, handler in [
+                            ('POST', '/api-token-auth/', self._post_token),
+                            ('GET', '/api/projects/', lambda: list(self.projects.values())),
+                            ('GET', '/api/project/{id}/', lambda _id: self.projects[_id]),
+                            ('GET', '/api/project/{id}/models/', self._get_models),
+                            ('GET', '/api/model/{id}/', lambda _id: self.models[_id]),
+                            ('GET', '/api/model/{id}/forecasts/', self._get_forecasts),
+                            ('POST', '/api/model/{id}/forecasts/', self._post_forecast),
+                            ('GET', '/api/forecast/{id}/', lambda _id: self.forecasts[_id]),
+                            ('DELETE', '/api/forecast/{id}/', self._delete_forecast),
+                            ('GET', '/api/forecast/{id}/data/', lambda _id: self.forecast_data[_id]),
+                            ('GET', '/api/timezero/{id}/', lambda _id: self.timezeros[_id]),
+                            ('GET', '/api/job/{id}/', lambda _id: self.jobs[_id]),
+                        ]]
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+    @property
+    def host(self):
+        """
+        :return: the host to pass to `ZoltarConnection()`, e.g., 'http://127.0.0.1:54321'
+        """
+        host, port = self._http_server.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+    def start(self):
+        self._http_server = _ThreadingHTTPServer(('127.0.0.1', 0), _request_handler_class(self))
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+
+
+    def stop(self):
+        self._http_server.shutdown()
+        self._http_server.server_close()
+
+
+    def total_requests(self):
+        """
+        :return: the total number of requests made, over all endpoints
+        """
+        return sum(self.request_counts.values())
+
+
+    @contextlib.contextmanager
+    def request_budget(self, max_requests=None, max_endpoint_requests=None):
+        """
+        A context manager that counts the requests made in its block, and raises AssertionError on exit if they exceed
+        the passed budget. Use it to guard workflows against N+1 request patterns:
+
+            with server.request_budget(len(json_io_dicts) + 3) as block_counts:
+                util.upload_forecast_batch(conn, json_io_dicts, ...)
+
+        :param max_requests: optional maximum total number of requests
+        :param max_endpoint_requests: optional dict that maps `request_counts` keys to their maximum number of
+            requests. endpoints not in it are not limited, except by max_requests
+        :return: a Counter that's filled on exit with the block's requests, keyed like `request_counts`
+        """
+        start_counts = Counter(self.request_counts)
+        block_counts = Counter()
+        yield block_counts
+
+        block_counts.update(self.request_counts - start_counts)
+        over_budget = []  # (endpoint or 'total', count, maximum)
+        if (max_requests is not None) and (sum(block_counts.values()) > max_requests):
+            over_budget.append(('total', sum(block_counts.values()), max_requests))
+        for endpoint, max_count in (max_endpoint_requests or {}).items():
+            if block_counts[endpoint] > max_count:
+                over_budget.append((endpoint, block_counts[endpoint], max_count))
+        if over_budget:
+            raise AssertionError(f"request budget exceeded: over_budget={over_budget}, "
+                                 f"block_counts={dict(block_counts)}")
+
+
+    #
+    # data setup. these return the new object's json
+    #
+
+    def add_project(self, name):
+        project_id = next(self._ids)
+        self.projects[project_id] = {'id': project_id, 'url': self._url('project', project_id), 'name': name,
+                                     'is_public': True}
+        return self.projects[project_id]
+
+
+    def add_model(self, project_json, name, abbreviation=None):
+        model_id = next(self._ids)
+        self.models[model_id] = {'id': model_id, 'url': self._url('model', model_id), 'project': project_json['url'],
+                                 'name': name, 'abbreviation': abbreviation or name, 'team_name': '',
+                                 'description': '', 'home_url': '', 'aux_data_url': None}
+        return self.models[model_id]
+
+
+    def add_forecast(self, model_json, timezero_date, json_io_dict, source='', notes=''):
+        return self._add_forecast(model_json['id'], timezero_date, json.dumps(json_io_dict).encode(), source, notes)
+
+
+    #
+    # endpoint handlers. each returns a json-able object, or bytes to return as-is
+    #
+
+    def _post_token(self):
+        payload = {'user_id': 1, 'username': 'fake', 'exp': int(time.time()) + TOKEN_LIFETIME}
+        return {'token': '.'.join(base64.urlsafe_b64encode(json.dumps(part).encode()).decode().rstrip('=')
+                                  for part in [{'typ': 'JWT', 'alg': 'none'}, payload, ''])}
+
+
+    def _get_models(self, project_id):
+        project_url = self.projects[project_id]['url']
+        return [model_json for model_json in self.models.values() if model_json['project'] == project_url]
+
+
+    def _get_forecasts(self, model_id):
+        model_url = self.models[model_id]['url']
+        return [forecast_json for forecast_json in self.forecasts.values()
+                if forecast_json['forecast_model'] == model_url]
+
+
+    def _post_forecast(self, model_id, form):
+        source, data = form['data_file']
+        forecast_json = self._add_forecast(model_id, form['timezero_date'][1].decode(), data, source,
+                                           form.get('notes', ('', b''))[1].decode())
+        return self._add_job({'forecast_pk': forecast_json['id']})
+
+
+    def _delete_forecast(self, forecast_id):
+        del self.forecasts[forecast_id]
+        del self.forecast_data[forecast_id]
+        return self._add_job({})
+
+
+    #
+    # helpers
+    #
+
+    def _url(self, resource_name, resource_id):
+        return f'{self.host}/api/{resource_name}/{resource_id}/'
+
+
+    def _add_forecast(self, model_id, timezero_date, data, source, notes):
+        timezero_json = [timezero_json for timezero_json in self.timezeros.values()
+                         if timezero_json['timezero_date'] == timezero_date]
+        if timezero_json:
+            timezero_json = timezero_json[0]
+        else:
+            timezero_id = next(self._ids)
+            timezero_json = {'id': timezero_id, 'url': self._url('timezero', timezero_id),
+                             'timezero_date': timezero_date, 'data_version_date': None, 'is_season_start': False}
+            self.timezeros[timezero_id] = timezero_json
+        forecast_id = next(self._ids)
+        forecast_url = self._url('forecast', forecast_id)
+        self.forecasts[forecast_id] = {'id': forecast_id, 'url': forecast_url,
+                                       'forecast_model': self.models[model_id]['url'], 'source': source,
+                                       'time_zero': timezero_json, 'created_at': '2020-01-01T00:00:00.000000-05:00',
+                                       'notes': notes, 'forecast_data': f'{forecast_url}data/'}
+        self.forecast_data[forecast_id] = data
+        return self.forecasts[forecast_id]
+
+
+    def _add_job(self, output_json):
+        job_id = next(self._ids)
+        self.jobs[job_id] = {'id': job_id, 'url': self._url('job', job_id), 'status': JOB_STATUS_SUCCESS,
+                             'failure_message': '', 'input_json': {}, 'output_json': output_json}
+        return self.jobs[job_id]
+
+
+    def _dispatch(self, method, path, content_type, body):
+        """
+        :return: a 2-tuple: (status_code, response body bytes)
+        """
+        for route_method, endpoint, pattern, handler in self._routes:
+            match = pattern.match(path) if route_method == method else None
+            if not match:
+                continue
+
+            with self._lock:
+                self.request_counts[f'{method} {endpoint}'] += 1
+                args = [int(group) for group in match.groups()]
+                if content_type.startswith('multipart/form-data'):
+                    args.append(_parse_form(content_type, body))
+                try:
+                    response = handler(*args)
+                except KeyError as ke:
+                    return 404, f'not found: {ke}'.encode()
+
+            return 200, response if isinstance(response, bytes) else json.dumps(response).encode()
+
+        with self._lock:
+            self.request_counts[f'{method} <unknown>'] += 1
+        return 404, f'no route: {method} {path}'.encode()
+
+
+def _parse_form(content_type, body):
+    """
+    :return: a multipart/form-data body as a dict that maps each field name to a 2-tuple: (filename or '', bytes)
+    """
+    message = BytesParser(policy=HTTP).parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+    return {part.get_param('name', header='content-disposition'): (part.get_filename() or '',
+                                                                   part.get_payload(decode=True))
+            for part in message.iter_parts()}
+
+
+def _request_handler_class(fake_server):
+    class FakeZoltarRequestHandler(BaseHTTPRequestHandler):
+
+        def _handle(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            status_code, response_body = fake_server._dispatch(self.command, self.path.split('?')[0],
+                                                               self.headers.get('Content-Type', ''), body)
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(response_body)))
+            self.end_headers()
+            self.wfile.write(response_body)
+
+
+        do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+        def log_message(self, format, *args):  # quiet
+            pass
+
+
+    return FakeZoltarRequestHandler
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    An HTTPServer that handles each request in a daemon thread, i.e., `http.server.ThreadingHTTPServer`, which is
+    python 3.7+.
+    """
+    daemon_threads = True
@@ -0,0 +1,96 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from zoltpy.cdc_bulk import bulk_convert_cdc_csv_files, season_start_year_from_file_name, UP_TO_DATE_HASH
+from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file
+
+
+class CdcBulkTestCase(TestCase):
+    """
+    """
+
+
+    def setUp(self):
+        # a FluSight-style archive: one directory per model
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.source_dir = self.temp_dir / 'source'
+        self.target_dir = self.temp_dir / 'target'
+        for model_dir, file_name in [('model-a', 'EW01-2011-ReichLab_kde.csv'),
+                                     ('model-a', 'EW40-2011-ReichLab_kde.csv'),
+                                     ('model-b', 'EW01-2011-ReichLab_kde_US_National.csv')]:
+            (self.source_dir / model_dir).mkdir(parents=True, exist_ok=True)
+            shutil.copy(f"tests/{file_name.replace('EW40', 'EW01')}", self.source_dir / model_dir / file_name)
+        (self.source_dir / 'model-b' / 'EW02-2011-bad.csv').write_text('bad header\n')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+
+    def test_season_start_year_from_file_name(self):
+        self.assertEqual(2010, season_start_year_from_file_name(Path('EW01-2011-ReichLab_kde.csv')))
+        self.assertEqual(2010, season_start_year_from_file_name('dir/EW29-2011-ReichLab_kde.csv'))
+        self.assertEqual(2011, season_start_year_from_file_name('EW30-2011-ReichLab_kde.csv'))
+        with self.assertRaises(RuntimeError):
+            season_start_year_from_file_name('2011-ReichLab_kde.csv')
+
+
+    def test_bulk_convert(self):
+        summary = bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, max_workers=2)
+        self.assertEqual((3, 0), (summary['converted'], summary['skipped']))
+        self.assertEqual(['model-b/EW02-2011-bad.csv'], [rel_path for rel_path, _ in summary['failed']])
+        self.assertIn('invalid header', summary['failed'][0][1])
+        with open('tests/EW01-2011-ReichLab_kde.csv') as cdc_csv_fp, \
+                open(self.target_dir / 'model-a' / 'EW01-2011-ReichLab_kde.csv.json') as json_fp:
+            self.assertEqual(json_io_dict_from_cdc_csv_file(2010, cdc_csv_fp), json.load(json_fp))
+
+        # only the failed and changed files are re-converted
+        source_file = self.source_dir / 'model-a' / 'EW40-2011-ReichLab_kde.csv'
+        output_mtime_ns = (self.target_dir / 'model-a' / 'EW40-2011-ReichLab_kde.csv.json').stat().st_mtime_ns
+        os.utime(source_file, ns=(output_mtime_ns + 1, output_mtime_ns + 1))
+        summary = bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, max_workers=1)
+        self.assertEqual((1, 2, 1), (summary['converted'], summary['skipped'], len(summary['failed'])))
+
+        # compressed, with a fixed season start year
+        summary = bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, lambda _: 2011, compress=True,
+                                             max_workers=1, pattern='model-b/*.csv')
+        self.assertEqual((1, 0, 1), (summary['converted'], summary['skipped'], len(summary['failed'])))
+        with open('tests/EW01-2011-ReichLab_kde_US_National.json') as exp_json_fp, \
+                gzip.open(self.target_dir / 'model-b' / 'EW01-2011-ReichLab_kde_US_National.csv.json.gz') as json_fp:
+            self.assertEqual(json.load(exp_json_fp), json.load(json_fp))
+
+
+    def test_bulk_convert_up_to_date_hash(self):
+        summary = bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, up_to_date=UP_TO_DATE_HASH,
+                                             max_workers=1)
+        self.assertEqual((3, 0), (summary['converted'], summary['skipped']))
+
+        # touching a file doesn't change its hash, but changing the season start year re-converts
+        os.utime(self.source_dir / 'model-a' / 'EW40-2011-ReichLab_kde.csv')
+        summary = bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, up_to_date=UP_TO_DATE_HASH,
+                                             max_workers=1)
+        self.assertEqual((0, 3), (summary['converted'], summary['skipped']))
+        summary = bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, lambda _: 2011,
+                                             up_to_date=UP_TO_DATE_HASH, max_workers=1)
+        self.assertEqual((2, 1), (summary['converted'], summary['skipped']))  # EW40-2011's season already was 2011
+
+        with self.assertRaises(RuntimeError):
+            bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, up_to_date='bad')
+
+
+    def test_bulk_convert_failure_leaves_no_temp_files(self):
+        # a bad input (the invalid header file), and outputs that fail while being written
+        summary = bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, max_workers=1)
+        self.assertEqual(1, len(summary['failed']))
+        with patch('zoltpy.cdc_bulk.json_backend.dumps', side_effect=ValueError('dumps failed')):
+            summary = bulk_convert_cdc_csv_files(self.source_dir, self.target_dir, up_to_date=UP_TO_DATE_HASH,
+                                                 max_workers=1)
+        self.assertEqual((0, 4), (summary['converted'], len(summary['failed'])))
+        self.assertIn('ValueError: dumps failed', summary['failed'][0][1])
+        self.assertEqual([], list(self.target_dir.rglob('*.tmp')))
@@ -1,8 +1,15 @@
 import datetime
+import io
 import json
 from unittest import TestCase
+from unittest.mock import patch
 
-from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file, _monday_date_from_ew_and_season_start_year
+import pymmwr
+
+from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file, _monday_date_from_ew_and_season_start_year, \
+    _epiweek_calendar, _monday_date_str_from_ew_and_season_start_year, iter_prediction_dicts_from_cdc_csv_file, \
+    iter_cdc_csv_rows_from_json_io_dict, write_cdc_csv, _ew_from_monday_date_str_and_season_start_year
+from zoltpy.connection import Forecast
 
 
 class CdcIOTestCase(TestCase):
@@ -25,6 +32,26 @@ class CdcIOTestCase(TestCase):
             self.assertEqual(exp_monday_date, _monday_date_from_ew_and_season_start_year(ew_week, season_start_year))
 
 
+    def test_epiweek_calendar(self):
+        for season_start_year in range(2008, 2022):  # includes 53-week years 2008, 2014, and 2020
+            weeks_in_year, ew_to_monday_date_str = _epiweek_calendar(season_start_year)
+            self.assertEqual(pymmwr.mmwr_weeks_in_year(season_start_year), weeks_in_year)
+            self.assertEqual(list(range(1, 54)), list(ew_to_monday_date_str))
+            for ew_week in list(range(54)) + [40.0, 40.5]:  # 0 and 40.5 aren't in the table
+                self.assertEqual(_monday_date_from_ew_and_season_start_year(ew_week, season_start_year)
+                                 .strftime('%Y-%m-%d'),
+                                 _monday_date_str_from_ew_and_season_start_year(ew_week, season_start_year))
+
+        # the calendar is built once per season, after which rows don't call pymmwr
+        with open('tests/EW01-2011-ReichLab_kde.csv') as cdc_csv_fp:
+            _epiweek_calendar(2011)
+            with patch('pymmwr.mmwr_week_to_date') as mmwr_week_to_date_mock, \
+                    patch('pymmwr.mmwr_weeks_in_year') as mmwr_weeks_in_year_mock:
+                json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+                mmwr_week_to_date_mock.assert_not_called()
+                mmwr_weeks_in_year_mock.assert_not_called()
+
+
     def test_json_io_dict_from_cdc_csv_file(self):
         with open('tests/EW01-2011-ReichLab_kde_US_National.csv') as cdc_csv_fp, \
                 open('tests/EW01-2011-ReichLab_kde_US_National.json') as exp_json_fp:
@@ -38,3 +65,101 @@ class CdcIOTestCase(TestCase):
             # each unit/target pair has 2 prediction dicts: one point and one bin
             # there are 11 units and 7 targets = 77 * 2 = 154 dicts total
             self.assertEqual(154, len(act_json_io_dict['predictions']))
+
+
+    def test_streaming_and_ungrouped_rows(self):
+        with open('tests/EW01-2011-ReichLab_kde.csv') as cdc_csv_fp:
+            exp_json_io_dict = json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+            cdc_csv_fp.seek(0)
+            header, *lines = cdc_csv_fp.read().splitlines()
+
+        # the streaming version yields the same dicts in file order: point then bin for each location/target pair
+        with open('tests/EW01-2011-ReichLab_kde.csv') as cdc_csv_fp:
+            prediction_dicts = list(iter_prediction_dicts_from_cdc_csv_file(2011, cdc_csv_fp))
+        self.assertEqual([('US National', 'Season onset', 'point'), ('US National', 'Season onset', 'bin')],
+                         [(_['unit'], _['target'], _['class']) for _ in prediction_dicts[:2]])
+        sort_key = lambda _: (_['unit'], _['target'], _['class'])
+        self.assertEqual(sorted(exp_json_io_dict['predictions'], key=sort_key), sorted(prediction_dicts, key=sort_key))
+
+        # ungrouped rows: the same output (including bin order) when bin rows are moved to the end
+        ungrouped_lines = [line for line in lines if ',Point,' in line] + \
+                          [line for line in lines if ',Point,' not in line][::2] + \
+                          [line for line in lines if ',Point,' not in line][1::2]
+        self.assertEqual(len(lines), len(ungrouped_lines))
+        ungrouped_fp = io.StringIO('\n'.join([header] + ungrouped_lines))
+        act_json_io_dict = json_io_dict_from_cdc_csv_file(2011, ungrouped_fp)
+        self.assertEqual(len(exp_json_io_dict['predictions']), len(act_json_io_dict['predictions']))
+        for exp_prediction_dict, act_prediction_dict in zip(exp_json_io_dict['predictions'],
+                                                            act_json_io_dict['predictions']):
+            self.assertEqual(sort_key(exp_prediction_dict), sort_key(act_prediction_dict))
+            if exp_prediction_dict['class'] == 'bin':
+                self.assertEqual(sorted(zip(exp_prediction_dict['prediction']['cat'],
+                                            exp_prediction_dict['prediction']['prob'])),
+                                 sorted(zip(act_prediction_dict['prediction']['cat'],
+                                            act_prediction_dict['prediction']['prob'])))
+
+        # ungrouped rows: the streaming version falls back to accumulating them, yielding the same dicts as above. one
+        # 'US National'/'Season onset' bin row is moved to the middle of the file, whether seekable or not
+        bin_row_idx = [idx for idx, line in enumerate(lines) if line.startswith('US National,Season onset,Bin,')][0]
+        moved_lines = lines[:bin_row_idx] + lines[bin_row_idx + 1:]
+        moved_lines.insert(len(moved_lines) // 2, lines[bin_row_idx])
+        moved_csv = '\n'.join([header] + moved_lines)
+        exp_prediction_dicts = json_io_dict_from_cdc_csv_file(2011, io.StringIO(moved_csv))['predictions']
+        for cdc_csv_fp in [io.StringIO(moved_csv), iter(moved_csv.splitlines())]:
+            act_prediction_dicts = list(iter_prediction_dicts_from_cdc_csv_file(2011, cdc_csv_fp))
+            self.assertEqual(exp_prediction_dicts, sorted(act_prediction_dicts, key=sort_key))
+
+        # invalid target
+        with self.assertRaises(RuntimeError) as context:
+            json_io_dict_from_cdc_csv_file(2011, io.StringIO('\n'.join([header, lines[0].replace('Season onset',
+                                                                                                 'bad target')])))
+        self.assertIn('invalid target_name', str(context.exception))
+
+
+    def test_write_cdc_csv(self):
+        # round trip: the same rows as the original file, though in a different order
+        with open('tests/EW01-2011-ReichLab_kde.csv') as cdc_csv_fp:
+            json_io_dict = json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+            cdc_csv_fp.seek(0)
+            exp_header, *exp_lines = cdc_csv_fp.read().splitlines()
+        cdc_csv_fp = io.StringIO()
+        write_cdc_csv(2011, json_io_dict, cdc_csv_fp)
+        act_header, *act_lines = cdc_csv_fp.getvalue().splitlines()
+        self.assertEqual(exp_header, act_header)
+        self.assertEqual(sorted(exp_lines), sorted(act_lines))
+        cdc_csv_fp.seek(0)
+        self.assertEqual(json_io_dict, json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp))
+
+        # 'none' points, non-CDC classes (skipped), and a `Forecast`
+        json_io_dict = {'meta': {}, 'predictions': [
+            {'unit': 'HHS Region 1', 'target': 'Season onset', 'class': 'point', 'prediction': {'value': 'none'}},
+            {'unit': 'HHS Region 1', 'target': 'Season peak week', 'class': 'point',
+             'prediction': {'value': '2015-01-12'}},  # EW02 2015
+            {'unit': 'HHS Region 1', 'target': '1 wk ahead', 'class': 'quantile',
+             'prediction': {'quantile': [0.5], 'value': [1.0]}},
+            {'unit': 'HHS Region 1', 'target': '1 wk ahead', 'class': 'bin',
+             'prediction': {'cat': [0.1, 0.0], 'prob': [0.4, 0.6]}}]}
+        exp_rows = [['Location', 'Target', 'Type', 'Unit', 'Bin_start_incl', 'Bin_end_notincl', 'Value'],
+                    ['HHS Region 1', 'Season onset', 'Point', 'week', 'NA', 'NA', 'none'],
+                    ['HHS Region 1', 'Season peak week', 'Point', 'week', 'NA', 'NA', 2],
+                    ['HHS Region 1', '1 wk ahead', 'Bin', 'percent', 0.1, 100, 0.4],
+                    ['HHS Region 1', '1 wk ahead', 'Bin', 'percent', 0.0, 0.1, 0.6]]
+        with patch.object(Forecast, 'iter_prediction_dicts', return_value=iter(json_io_dict['predictions'])) as mock:
+            self.assertEqual(exp_rows, list(iter_cdc_csv_rows_from_json_io_dict(2014, Forecast(None, 'uri'))))
+            mock.assert_called_once()
+
+        json_io_dict['predictions'][0]['target'] = 'bad target'
+        with self.assertRaises(RuntimeError) as context:
+            list(iter_cdc_csv_rows_from_json_io_dict(2014, json_io_dict))
+        self.assertIn('invalid target_name', str(context.exception))
+
+
+    def test_ew_from_monday_date_str_and_season_start_year(self):
+        for season_start_year in [2014, 2015]:  # 53- and 52-week years
+            weeks_in_year = pymmwr.mmwr_weeks_in_year(season_start_year)
+            for ew_week in range(1, weeks_in_year + 1):
+                monday_date_str = _monday_date_str_from_ew_and_season_start_year(ew_week, season_start_year)
+                self.assertEqual(ew_week, _ew_from_monday_date_str_and_season_start_year(monday_date_str,
+                                                                                          season_start_year))
+        self.assertEqual(1, _ew_from_monday_date_str_and_season_start_year('2016-01-04', 2015))  # EW01 2016
+        self.assertEqual(30, _ew_from_monday_date_str_and_season_start_year('2020-07-20', 2015))  # not in the season
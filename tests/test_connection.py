@@ -48,6 +48,20 @@ class ConnectionTestCase(unittest.TestCase):
             post_mock.assert_called_once_with('/api-token-auth/', {'username': 'Z_USERNAME', 'password': 'Z_PASSWORD'})
 
 
+    def test_is_token_expired(self):
+        conn = mock_authenticate(ZoltarConnection(''))
+        self.assertEqual(1558442805, conn.session.token_expiration)
+        self.assertTrue(conn.session.is_token_expired())
+
+        with patch('time.time', return_value=1558442805 - 3600):
+            self.assertFalse(conn.session.is_token_expired())
+        with patch('time.time', return_value=1558442805 - 30):  # within TOKEN_EXPIRATION_MARGIN
+            self.assertTrue(conn.session.is_token_expired())
+
+        conn.session.token, conn.session.token_expiration = 'not-a-jwt', None  # unknown expiration
+        self.assertTrue(conn.session.is_token_expired())
+
+
     def test_id_for_uri(self):
         self.assertEqual(71, ZoltarResource.id_for_uri('http://example.com/api/forecast/71'))  # no trailing '/'
         self.assertEqual(71, ZoltarResource.id_for_uri('http://example.com/api/forecast/71/'))
@@ -213,6 +227,111 @@ class ConnectionTestCase(unittest.TestCase):
         self.assertIn('season_name not found but is required when is_season_start is passed', str(context.exception))
 
 
+    def test_create_timezeros_and_models(self):
+        def post_mock_side_effect(uri, **kwargs):  # fails the first POST of '2011-10-23' with a transient error
+            response = MagicMock()
+            config = kwargs['json'].get('timezero_config') or kwargs['json']['model_config']
+            key = config.get('timezero_date') or config['abbreviation']
+            response.status_code = 503 if (key == '2011-10-23') and (key not in posted_keys) else 200
+            posted_keys.append(key)
+            response.json = MagicMock(return_value={'url': f'{uri}{len(posted_keys)}/', **config})
+            return response
+
+
+        conn = mock_authenticate(ZoltarConnection('http://example.com'))
+        with patch('zoltpy.connection.ZoltarConnection.json_for_uri', return_value=PROJECTS_LIST_DICTS):
+            project = conn.projects[0]
+        timezero_configs = [{'timezero_date': '2011-10-02'},  # exists
+                            {'timezero_date': '2011-10-23', 'data_version_date': '2011-10-24'},
+                            {'timezero_date': '2011-10-30', 'is_season_start': True, 'season_name': '2011-2012'}]
+        with patch('zoltpy.connection.ZoltarConnection.json_for_uri', return_value=TIMEZEROS_LIST_DICTS), \
+                patch('zoltpy.connection.ZoltarConnection.re_authenticate_if_necessary'), \
+                patch('requests.post') as post_mock, \
+                patch('zoltpy.connection.time.sleep') as sleep_mock:
+            posted_keys = []
+            post_mock.side_effect = post_mock_side_effect
+            date_to_timezero = project.create_timezeros(timezero_configs)
+            self.assertEqual(['2011-10-02', '2011-10-23', '2011-10-30'], list(date_to_timezero))
+            self.assertEqual(['2011-10-23', '2011-10-23', '2011-10-30'], sorted(posted_keys))  # one retry
+            self.assertEqual(1, sleep_mock.call_count)
+            self.assertEqual('http://example.com/api/timezero/5/', date_to_timezero['2011-10-02'].uri)
+            self.assertTrue(date_to_timezero['2011-10-30'].is_season_start)
+
+            # all configs are validated before any are POSTed
+            post_mock.reset_mock()
+            with self.assertRaises(RuntimeError) as context:
+                project.create_timezeros([{'timezero_date': '2011-11-06'}, {'timezero_date': '2011-13-06'}])
+            self.assertIn('invalid timezero_date', str(context.exception))
+            with self.assertRaises(RuntimeError) as context:
+                project.create_timezeros([{'timezero_date': '2011-11-06'}, {'timezero_date': '2011-11-06'}])
+            self.assertIn('duplicate timezero_date', str(context.exception))
+            post_mock.assert_not_called()
+
+            # errors that aren't transient are not retried, and are raised after the other POSTs are done
+            posted_keys = []
+            post_mock.side_effect = None
+            post_mock.return_value.status_code = 400
+            with self.assertRaises(RuntimeError) as context:
+                project.create_timezeros([{'timezero_date': '2011-11-06'}, {'timezero_date': '2011-11-13'}])
+            self.assertIn('could not create 2 of 2', str(context.exception))
+            self.assertEqual(2, post_mock.call_count)
+
+        model_config = {key: MODELS_LIST_DICTS[0].get(key, '') for key in ['name', 'abbreviation', 'team_name',
+                                                                          'description', 'home_url', 'aux_data_url']}
+        with patch('zoltpy.connection.ZoltarConnection.json_for_uri', return_value=MODELS_LIST_DICTS), \
+                patch('zoltpy.connection.ZoltarConnection.re_authenticate_if_necessary'), \
+                patch('requests.post') as post_mock:
+            posted_keys = []
+            post_mock.side_effect = post_mock_side_effect
+            abbrev_to_model = project.create_models([model_config, {**model_config, 'abbreviation': 'new_abbrev'}])
+            self.assertEqual(['doc_model_abbrev', 'new_abbrev'], list(abbrev_to_model))
+            self.assertEqual(['new_abbrev'], posted_keys)
+            self.assertIsInstance(abbrev_to_model['new_abbrev'], Model)
+
+
+    def test_create_timezeros_error_after_commit(self):
+        import requests
+
+
+        def post_mock_side_effect(uri, **kwargs):  # creates the timezero, but then fails per post_errors
+            timezero_config = kwargs['json']['timezero_config']
+            timezero_id = 100 + len(created_timezero_dicts)
+            created_timezero_dicts.append({**timezero_config, 'id': timezero_id,
+                                           'url': f'http://example.com/api/timezero/{timezero_id}/'})
+            post_error = post_errors.pop(0)
+            if isinstance(post_error, Exception):
+                raise post_error
+
+            response = MagicMock()
+            response.status_code = post_error
+            return response
+
+
+        conn = mock_authenticate(ZoltarConnection('http://example.com'))
+        with patch('zoltpy.connection.ZoltarConnection.json_for_uri', return_value=PROJECTS_LIST_DICTS):
+            project = conn.projects[0]
+        with patch('zoltpy.connection.ZoltarConnection.json_for_uri') as json_for_uri_mock, \
+                patch('zoltpy.connection.ZoltarConnection.re_authenticate_if_necessary'), \
+                patch('requests.post') as post_mock, \
+                patch('zoltpy.connection.time.sleep'):
+            json_for_uri_mock.side_effect = lambda uri: TIMEZEROS_LIST_DICTS + created_timezero_dicts
+            post_mock.side_effect = post_mock_side_effect
+
+            # a timeout or 504 after the server created the timezero is not retried, and the created one is returned
+            for post_error in [requests.Timeout('read timed out'), 504]:
+                created_timezero_dicts, post_errors = [], [post_error]
+                date_to_timezero = project.create_timezeros([{'timezero_date': '2011-11-06'}])
+                self.assertEqual(1, len(created_timezero_dicts))  # no duplicate
+                self.assertEqual('http://example.com/api/timezero/100/', date_to_timezero['2011-11-06'].uri)
+
+            # without a way to check for the created object, such errors are not retried
+            post_mock.reset_mock()
+            created_timezero_dicts, post_errors = [], [requests.Timeout('read timed out')]
+            with self.assertRaises(requests.Timeout):
+                conn._post_json(f'{project.uri}timezeros/', {'timezero_config': {'timezero_date': '2011-11-06'}}, 2)
+            self.assertEqual(1, post_mock.call_count)
+
+
     @mock.patch('zoltpy.connection.ZoltarConnection.json_for_uri')
     def test_submit_and_download_query(self, json_for_uri_mock):
         json_for_uri_mock.return_value = PROJECTS_LIST_DICTS
@@ -313,6 +432,33 @@ class ConnectionTestCase(unittest.TestCase):
                                              headers={'Authorization': f'JWT {MOCK_TOKEN}'})
 
 
+
+    def test_forecast_iter_prediction_dicts(self):
+        conn = mock_authenticate(ZoltarConnection('http://example.com'))
+        forecast = Forecast(conn, FORECASTS_LIST_DICTS[0]['url'], FORECASTS_LIST_DICTS[0])
+        with open('tests/docs-predictions.json', 'rb') as fp:
+            json_bytes = fp.read()
+        json_io_dict = json.loads(json_bytes)
+        with patch('requests.get') as get_mock:
+            get_mock.return_value.status_code = 200
+            get_mock.return_value.iter_content = lambda chunk_size: (json_bytes[idx:idx + chunk_size]
+                                                                     for idx in range(0, len(json_bytes), chunk_size))
+            meta = {}
+            self.assertEqual(json_io_dict['predictions'], list(forecast.iter_prediction_dicts(meta, chunk_size=100)))
+            self.assertEqual(json_io_dict['meta'], meta)
+            get_mock.assert_called_once_with('http://example.com/api/forecast/3/data/', stream=True,
+                                             headers={'Authorization': f'JWT {MOCK_TOKEN}'})
+            get_mock.return_value.close.assert_called_once()
+
+            forecast_frame = forecast.forecast_frame()
+            self.assertEqual(json_io_dict, forecast_frame.to_json_io_dict())
+
+            get_mock.return_value.status_code = 404
+            with self.assertRaises(RuntimeError) as context:
+                list(forecast.iter_prediction_dicts())
+            self.assertIn('status code was not 200', str(context.exception))
+
+
 PROJECTS_LIST_DICTS = [
     {
         "id": 3,
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+import warnings
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from zoltpy.covid19 import COVID_ADDL_REQ_COLS, COVID_TARGETS, covid19_row_validator, validate_quantile_csv_file, \
+    ENGINE_COLUMNAR, ENGINE_ROW
+from zoltpy.covid19_columnar import columnar_error_messages
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, ErrorSummarizer, error_code_counts
+
+
+class Covid19ColumnarTestCase(TestCase):
+    """
+    """
+
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        with open('tests/covid19-data-processed-examples/2020-04-13-COVIDhub-ensemble.csv') as fp:
+            self.ensemble_lines = fp.read().splitlines()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+
+    def _write_csv_file(self, lines, line_ending='\n'):
+        csv_file = self.temp_dir / 'forecast.csv'
+        with open(csv_file, 'w', newline='') as fp:
+            fp.write(line_ending.join(lines) + line_ending)
+        return csv_file
+
+
+    def assert_same_errors_as_row_engine(self, csv_file, max_errors=None):
+        with open(csv_file) as quantile_fp:
+            _, exp_error_messages = json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS,
+                                                                        covid19_row_validator, COVID_ADDL_REQ_COLS,
+                                                                        max_errors)
+        act_error_messages = columnar_error_messages(csv_file, max_errors)
+        self.assertEqual([(_.code, _.row_num, _.message) for _ in exp_error_messages],
+                         [(_.code, _.row_num, _.message) for _ in act_error_messages])
+        return act_error_messages
+
+
+    def test_same_errors_as_row_engine_example_files(self):
+        for csv_file in Path('tests/covid19-data-processed-examples').glob('*.csv'):
+            for max_errors in [None, 1, 3]:
+                self.assert_same_errors_as_row_engine(csv_file, max_errors)
+
+
+    def test_same_errors_as_row_engine_modified_rows(self):
+        header, rows = self.ensemble_lines[0], self.ensemble_lines[1:]
+        # forecast_date,target,target_end_date,location,type,quantile,value
+        modified_rows = [rows[0].replace(',US,', ',01001,'),  # invalid location for target
+                         rows[1].replace(',0.5,', ',0.123,'),  # invalid quantile for target
+                         rows[2].replace(',0.975,', ',1.5,'),  # quantile not in range
+                         rows[3].rsplit(',', 1)[0] + ',-1',  # negative value
+                         rows[4].rsplit(',', 1)[0] + ',100000',  # decreasing values
+                         rows[5].replace('2020-04-25', '2020-04-26'),  # not a Saturday
+                         rows[6].replace('3 wk ahead', 'x wk ahead'),  # invalid ahead number and target
+                         rows[7].replace('2020-04-13', '2020-4-13', 1)]  # invalid date format
+        csv_file = self._write_csv_file([header] + modified_rows + rows[8:] + rows[20:22] +  # duplicate rows
+                                        [rows[18].rsplit(',', 1)[0] + ',NA'])  # non-numeric point value
+        error_messages = self.assert_same_errors_as_row_engine(csv_file)
+        self.assertEqual({'covid_location_for_target': 2, 'covid_quantile_for_target': 3, 'quantile_not_in_range': 1,
+                          'covid_negative_value': 1, 'covid_not_saturday': 1, 'covid_ahead_number': 1,
+                          'value_not_numeric': 1, 'invalid_targets': 1, 'values_decreasing': 1,
+                          'duplicate_prediction_elements': 1, 'point_count': 1}, error_code_counts(error_messages))
+        for max_errors in [1, 5, 12]:
+            self.assert_same_errors_as_row_engine(csv_file, max_errors)
+
+        # Windows line endings
+        csv_file = self._write_csv_file([header] + modified_rows, line_ending='\r\n')
+        self.assert_same_errors_as_row_engine(csv_file)
+
+
+    def test_non_finite_values(self):
+        header, rows = self.ensemble_lines[0], self.ensemble_lines[1:]
+        # two adjacent quantile rows of one pair with inf values, and one of another pair with nan
+        modified_rows = [rows[3].rsplit(',', 1)[0] + ',inf', rows[4].rsplit(',', 1)[0] + ',inf'] + rows[5:30] + \
+                        [rows[30].rsplit(',', 1)[0] + ',nan']
+        csv_file = self._write_csv_file([header] + rows[:3] + modified_rows + rows[31:])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')  # e.g., numpy's "RuntimeWarning: invalid value encountered"
+            self.assert_same_errors_as_row_engine(csv_file)
+
+
+    def test_row_engine_fallback(self):
+        header, rows = self.ensemble_lines[0], self.ensemble_lines[1:]
+        for lines in [[header.replace('value', 'val')] + rows,  # invalid header
+                      [header, rows[0].rsplit(',', 1)[0]] + rows[1:],  # short row
+                      [header, rows[0].replace(',US,', ',"US",')] + rows[1:]]:  # quoted field
+            csv_file = self._write_csv_file(lines)
+            with patch('zoltpy.covid19_columnar.json_io_dict_from_quantile_csv_file',
+                       wraps=json_io_dict_from_quantile_csv_file) as mock:
+                self.assert_same_errors_as_row_engine(csv_file)
+                mock.assert_called_once()
+
+
+    def test_validate_quantile_csv_file_engine(self):
+        csv_file = 'tests/covid19-data-processed-examples/2020-04-15-Geneva-DeterministicGrowth.csv'
+        self.assertEqual(validate_quantile_csv_file(csv_file, engine=ENGINE_ROW),
+                         validate_quantile_csv_file(csv_file, engine=ENGINE_COLUMNAR))
+        with patch('zoltpy.covid19_columnar.columnar_error_messages', return_value=ErrorSummarizer()) as mock:
+            self.assertEqual("no errors", validate_quantile_csv_file(csv_file, engine=ENGINE_COLUMNAR))
+            mock.assert_called_once()
+
+        with self.assertRaises(RuntimeError) as context:
+            validate_quantile_csv_file(csv_file, engine='bad engine')
+        self.assertIn('invalid engine', str(context.exception))
@@ -1,7 +1,9 @@
+import csv
+import io
 import json
 from unittest import TestCase
 
-from zoltpy.csv_io import csv_rows_from_json_io_dict
+from zoltpy.csv_io import csv_rows_from_json_io_dict, iter_csv_rows_from_json_io_dict, write_csv, CSV_HEADER
 
 
 class CsvIOTestCase(TestCase):
@@ -90,3 +92,21 @@ class CsvIOTestCase(TestCase):
             json_io_dict = json.load(fp)
             act_rows = csv_rows_from_json_io_dict(json_io_dict)
         self.assertEqual(exp_rows, act_rows)
+
+
+    def test_write_csv(self):
+        with open('tests/docs-predictions.json') as fp:
+            json_io_dict = json.load(fp)
+
+        # the generator validates lazily, i.e., only when reaching the bad prediction
+        rows_iter = iter_csv_rows_from_json_io_dict({'meta': {}, 'predictions': [{'class': 'InvalidClass'}]})
+        self.assertEqual(CSV_HEADER, next(rows_iter))
+        with self.assertRaises(RuntimeError) as context:
+            next(rows_iter)
+        self.assertIn('invalid prediction_dict class', str(context.exception))
+
+        csv_fp = io.StringIO(newline='')
+        write_csv(json_io_dict, csv_fp)
+        csv_fp.seek(0)
+        exp_rows = [[str(cell) for cell in row] for row in csv_rows_from_json_io_dict(json_io_dict)]
+        self.assertEqual(exp_rows, list(csv.reader(csv_fp)))
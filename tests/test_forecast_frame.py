@@ -0,0 +1,79 @@
+import json
+from unittest import TestCase
+
+from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file, forecast_frame_from_cdc_csv_file
+from zoltpy.covid19 import COVID_TARGETS, covid19_row_validator, COVID_ADDL_REQ_COLS
+from zoltpy.csv_io import csv_rows_from_json_io_dict
+from zoltpy.forecast_frame import ForecastFrame, ForecastFrameBuilder
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, forecast_frame_from_quantile_csv_file, \
+    quantile_csv_rows_from_json_io_dict
+
+
+class ForecastFrameTestCase(TestCase):
+    """
+    """
+
+
+    def test_json_io_dict_round_trip(self):
+        # docs-predictions.json has all prediction classes plus ints, strs, bools, and dates
+        with open('tests/docs-predictions.json') as fp:
+            json_io_dict = json.load(fp)
+        forecast_frame = ForecastFrame.from_json_io_dict(json_io_dict)
+        self.assertEqual(len(json_io_dict['predictions']), len(forecast_frame))
+        self.assertEqual(json_io_dict, forecast_frame.to_json_io_dict())
+
+        # check types are preserved, e.g., 5 vs. 5.0 and True vs. 1
+        for exp_pred_dict, act_pred_dict in zip(json_io_dict['predictions'], forecast_frame.iter_prediction_dicts()):
+            self.assertEqual(json.dumps(exp_pred_dict), json.dumps(act_pred_dict))
+
+
+    def test_builder_errors(self):
+        builder = ForecastFrameBuilder()
+        with self.assertRaises(RuntimeError) as context:
+            builder.append({'unit': 'u1', 'target': 't1', 'class': 'InvalidClass', 'prediction': {}})
+        self.assertIn('invalid prediction_dict class', str(context.exception))
+
+        with self.assertRaises(RuntimeError) as context:
+            builder.append({'unit': 'u1', 'target': 't1', 'class': 'quantile',
+                            'prediction': {'quantile': [0.25, 0.5], 'value': [1.0]}})
+        self.assertIn('paired prediction vectors had different lengths', str(context.exception))
+
+        with self.assertRaises(RuntimeError) as context:
+            ForecastFrame.from_json_io_dict({'meta': {}})
+        self.assertIn('no predictions section found in json_io_dict', str(context.exception))
+
+
+    def test_forecast_frame_from_quantile_csv_file(self):
+        quantile_file = 'tests/covid19-data-processed-examples/2020-04-13-COVIDhub-ensemble.csv'
+        with open(quantile_file) as quantile_fp:
+            exp_json_io_dict, exp_error_messages = \
+                json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS, covid19_row_validator,
+                                                    COVID_ADDL_REQ_COLS)
+        with open(quantile_file) as quantile_fp:
+            forecast_frame, act_error_messages = \
+                forecast_frame_from_quantile_csv_file(quantile_fp, COVID_TARGETS, covid19_row_validator,
+                                                      COVID_ADDL_REQ_COLS)
+        self.assertEqual(exp_error_messages, act_error_messages)
+        self.assertEqual(exp_json_io_dict, forecast_frame.to_json_io_dict())
+
+        # the writers accept ForecastFrames
+        self.assertEqual(csv_rows_from_json_io_dict(exp_json_io_dict), csv_rows_from_json_io_dict(forecast_frame))
+        self.assertEqual(quantile_csv_rows_from_json_io_dict(exp_json_io_dict),
+                         quantile_csv_rows_from_json_io_dict(forecast_frame))
+
+
+    def test_forecast_frame_from_cdc_csv_file(self):
+        with open('tests/EW01-2011-ReichLab_kde.csv') as cdc_csv_fp:
+            exp_json_io_dict = json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+        with open('tests/EW01-2011-ReichLab_kde.csv') as cdc_csv_fp:
+            forecast_frame = forecast_frame_from_cdc_csv_file(2011, cdc_csv_fp)
+        self.assertEqual(154, len(forecast_frame))
+        self.assertEqual(11, len(forecast_frame.units))
+        self.assertEqual(7, len(forecast_frame.targets))
+        self.assertEqual(exp_json_io_dict, forecast_frame.to_json_io_dict())
+
+        # with the docs example, only point and quantile predictions are written
+        with open('tests/docs-predictions.json') as fp:
+            json_io_dict = json.load(fp)
+        self.assertEqual(quantile_csv_rows_from_json_io_dict(json_io_dict),
+                         quantile_csv_rows_from_json_io_dict(ForecastFrame.from_json_io_dict(json_io_dict)))
@@ -0,0 +1,70 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from zoltpy.covid19 import COVID_TARGETS, COVID_ADDL_REQ_COLS
+from zoltpy.forecast_store import write_forecast_frame, read_forecast_frame
+from zoltpy.quantile_io import forecast_frame_from_quantile_csv_file, quantile_csv_rows_from_json_io_dict
+
+
+class ForecastStoreTestCase(TestCase):
+    """
+    """
+
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store_file = self.temp_dir / 'forecast.zff'
+
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+
+    def test_json_io_dict_round_trip(self):
+        # docs-predictions.json has all prediction classes plus ints, strs, bools, and dates
+        with open('tests/docs-predictions.json') as fp:
+            json_io_dict = json.load(fp)
+        for compress, use_mmap in [(False, True), (False, False), (True, True)]:
+            write_forecast_frame(json_io_dict, self.store_file, compress=compress)
+            forecast_frame = read_forecast_frame(self.store_file, use_mmap=use_mmap)
+            self.assertEqual(json_io_dict, forecast_frame.to_json_io_dict())
+
+            # check types are preserved, e.g., 5 vs. 5.0 and True vs. 1
+            self.assertEqual([json.dumps(prediction_dict) for prediction_dict in json_io_dict['predictions']],
+                             [json.dumps(prediction_dict) for prediction_dict in forecast_frame.iter_prediction_dicts()])
+        self.assertEqual([], [path.name for path in self.temp_dir.glob('*.tmp')])
+
+
+    def test_write_failure(self):
+        # a failed write leaves the existing file as-is, and no temporary file
+        write_forecast_frame({'meta': {}, 'predictions': []}, self.store_file)
+        exp_bytes = self.store_file.read_bytes()
+        with self.assertRaises(TypeError):
+            write_forecast_frame({'meta': {'not JSON-able': object()}, 'predictions': []}, self.store_file)
+        self.assertEqual(exp_bytes, self.store_file.read_bytes())
+        self.assertEqual(['forecast.zff'], [path.name for path in self.temp_dir.iterdir()])
+
+
+    def test_quantile_csv_round_trip(self):
+        with open('tests/covid19-data-processed-examples/2020-04-13-COVIDhub-ensemble.csv') as quantile_fp:
+            exp_forecast_frame, _ = forecast_frame_from_quantile_csv_file(quantile_fp, COVID_TARGETS,
+                                                                          addl_req_cols=COVID_ADDL_REQ_COLS)
+        for compress in [False, True]:
+            write_forecast_frame(exp_forecast_frame, self.store_file, compress=compress)
+            act_forecast_frame = read_forecast_frame(self.store_file)
+            self.assertEqual(quantile_csv_rows_from_json_io_dict(exp_forecast_frame),
+                             quantile_csv_rows_from_json_io_dict(act_forecast_frame))
+            self.assertEqual(exp_forecast_frame.nbytes, act_forecast_frame.nbytes)
+
+        # mmap-ed arrays are read-only views
+        write_forecast_frame(exp_forecast_frame, self.store_file)
+        self.assertFalse(read_forecast_frame(self.store_file).value.flags.writeable)
+
+    def test_invalid_file(self):
+        self.store_file.write_bytes(b'{"meta": {}, "predictions": []}')
+        with self.assertRaises(RuntimeError) as context:
+            read_forecast_frame(self.store_file)
+        self.assertIn('not a forecast store file', str(context.exception))
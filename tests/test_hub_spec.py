@@ -0,0 +1,134 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from zoltpy.covid19 import COVID_HUB_VALIDATOR, COVID_TARGETS, COVID_ADDL_REQ_COLS, COVID_ERROR_TEMPLATES
+from zoltpy.covid19_columnar import columnar_error_messages
+from zoltpy.hub_spec import HubValidator, ALIGNMENT_DAYS_AHEAD, ALIGNMENT_SATURDAY_WEEKS_AHEAD, ENGINE_COLUMNAR, \
+    ENGINE_ROW, TargetRule, load_hub_spec
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, error_code_counts
+
+
+# a hub with no county locations, 'wk ahead' targets generated from a format, negative values allowed, and different
+# date column names
+FLU_HUB_SPEC = {
+    'name': 'flu',
+    'target_groups': [
+        {'name': 'hosp',
+         'targets': {'format': '{} wk ahead inc flu hosp', 'steps': [1, 4]},
+         'locations': ['state', 'nation'],
+         'quantiles': [0.025, 0.5, 0.975]},
+        {'name': 'peak',
+         'targets': ['season peak'],
+         'locations': ['nation'],
+         'quantiles': [0.5]},
+    ],
+    'location_sets': {'state': ['01', '02'],
+                      'nation': ['US']},
+    'date_columns': {'forecast_date': 'reference_date', 'target_end_date': 'end_date'},
+    'step_units': [{'unit': 'wk', 'marker': 'wk ahead', 'alignment': ALIGNMENT_SATURDAY_WEEKS_AHEAD}],
+}
+
+
+class HubSpecTestCase(TestCase):
+    """
+    """
+
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+
+    def test_compile(self):
+        validator = HubValidator(FLU_HUB_SPEC)
+        self.assertEqual(['1 wk ahead inc flu hosp', '2 wk ahead inc flu hosp', '3 wk ahead inc flu hosp',
+                          '4 wk ahead inc flu hosp', 'season peak'], validator.targets)
+        self.assertEqual(['reference_date', 'end_date'], validator.addl_req_cols)
+        self.assertEqual(TargetRule('hosp', 'wk', 2, frozenset({'01', '02', 'US'}), frozenset({0.025, 0.5, 0.975})),
+                         validator.target_rules['2 wk ahead inc flu hosp'])
+        self.assertEqual(TargetRule('peak', None, None, frozenset({'US'}), frozenset({0.5})),
+                         validator.target_rules['season peak'])
+        self.assertEqual(TargetRule(None, 'wk', None, frozenset(), frozenset()),
+                         validator.target_rule('x wk ahead inc flu hosp'))
+        self.assertEqual('flu_location_for_target', validator.error_codes['location_for_target'])
+
+        # the COVID rules as a spec
+        self.assertEqual(COVID_TARGETS, COVID_HUB_VALIDATOR.targets)
+        self.assertEqual(COVID_ADDL_REQ_COLS, COVID_HUB_VALIDATOR.addl_req_cols)
+        self.assertEqual(COVID_ERROR_TEMPLATES, COVID_HUB_VALIDATOR.error_templates)
+
+
+    def test_location_sets_loaded_on_first_use(self):
+        calls = []
+        hub_spec = dict(FLU_HUB_SPEC, location_sets={'state': lambda: calls.append('state') or ['01', '02'],
+                                                     'nation': ['US']})
+        validator = HubValidator(hub_spec)
+        self.assertEqual([], calls)
+        self.assertEqual(frozenset({'01', '02', 'US'}),
+                         validator.target_rules['1 wk ahead inc flu hosp'].valid_locations)
+        validator.target_rules  # cached
+        self.assertEqual(['state'], calls)
+
+
+    def test_invalid_specs(self):
+        bad_spec_exp_messages = [
+            ({key: value for key, value in FLU_HUB_SPEC.items() if key != 'location_sets'}, 'missing a required key'),
+            (dict(FLU_HUB_SPEC, target_groups=[dict(FLU_HUB_SPEC['target_groups'][0], locations=['county'])]),
+             'unknown location sets'),
+            (dict(FLU_HUB_SPEC, target_groups=FLU_HUB_SPEC['target_groups'] * 2), 'more than one target group'),
+            (dict(FLU_HUB_SPEC, date_columns={'forecast_date': 'reference_date'}), "date_columns must have"),
+            (dict(FLU_HUB_SPEC, step_units=[{'unit': 'wk', 'marker': 'wk ahead', 'alignment': 'bad'}]),
+             'invalid step unit alignment'),
+        ]
+        for bad_spec, exp_message in bad_spec_exp_messages:
+            with self.assertRaises(RuntimeError) as context:
+                HubValidator(bad_spec)
+            self.assertIn(exp_message, str(context.exception))
+
+
+    def test_validate_flu_hub_file(self):
+        lines = ['reference_date,target,end_date,location,type,quantile,value',
+                 '2022-10-17,1 wk ahead inc flu hosp,2022-10-22,01,quantile,0.025,-1',  # negative ok
+                 '2022-10-17,1 wk ahead inc flu hosp,2022-10-22,01,quantile,0.5,2',
+                 '2022-10-17,1 wk ahead inc flu hosp,2022-10-22,01,quantile,0.975,3',
+                 '2022-10-17,1 wk ahead inc flu hosp,2022-10-22,01,point,NA,2',
+                 '2022-10-17,2 wk ahead inc flu hosp,2022-10-30,01,point,NA,2',  # not a Saturday
+                 '2022-10-17,3 wk ahead inc flu hosp,2022-11-05,01001,point,NA,2',  # invalid location
+                 '2022-10-17,season peak,2022-11-05,US,quantile,0.1,2',  # invalid quantile, no point
+                 '2022-10-17,4 wk ahead inc flu hosp,2022-11-19,02,point,NA,2',  # week ahead date
+                 '2022-10-17,5 wk ahead inc flu hosp,2022-11-19,02,point,NA,2']  # invalid target and location
+        csv_file = self.temp_dir / 'flu.csv'
+        with open(csv_file, 'w') as fp:
+            fp.write('\n'.join(lines) + '\n')
+
+        validator = HubValidator(FLU_HUB_SPEC)
+        with open(csv_file) as quantile_fp:
+            _, error_messages = json_io_dict_from_quantile_csv_file(quantile_fp, validator.targets,
+                                                                    validator.row_validator, validator.addl_req_cols)
+        # invalid targets have no valid locations
+        self.assertEqual({'flu_not_saturday': 1, 'flu_location_for_target': 2, 'flu_quantile_for_target': 1,
+                          'flu_week_ahead_date': 1, 'invalid_targets': 1, 'point_count': 1},
+                         error_code_counts(error_messages))
+        self.assertEqual([(_.code, _.row_num, _.message) for _ in error_messages],
+                         [(_.code, _.row_num, _.message) for _ in columnar_error_messages(csv_file,
+                                                                                          validator=validator)])
+        self.assertEqual(validator.validate_quantile_csv_file(csv_file, engine=ENGINE_ROW),
+                         validator.validate_quantile_csv_file(csv_file, engine=ENGINE_COLUMNAR))
+        self.assertNotEqual(validator.rules_fingerprint(), COVID_HUB_VALIDATOR.rules_fingerprint())
+
+
+    def test_load_hub_spec(self):
+        hub_spec = dict(FLU_HUB_SPEC, step_units=[{'unit': 'day', 'marker': 'day ahead',
+                                                   'alignment': ALIGNMENT_DAYS_AHEAD}])
+        json_file = self.temp_dir / 'hub-spec.json'
+        with open(json_file, 'w') as fp:
+            json.dump(hub_spec, fp)
+        validator = HubValidator(load_hub_spec(json_file))
+        self.assertEqual(HubValidator(hub_spec).targets, validator.targets)
+        self.assertEqual(HubValidator(hub_spec).rules_fingerprint(), validator.rules_fingerprint())
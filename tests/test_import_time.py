@@ -0,0 +1,72 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+import zoltpy.covid19
+
+
+# module name -> max cold import time in ms. these are several times the measured times so that slow CI machines pass,
+# but well below the times before heavy dependencies were deferred (e.g., zoltpy.util was ~500ms due to pandas)
+IMPORT_TIME_BUDGETS_MS = {
+    'zoltpy.cdc_bulk': 150,
+    'zoltpy.cdc_io': 150,
+    'zoltpy.connection': 150,
+    'zoltpy.covid19': 150,
+    'zoltpy.csv_io': 150,
+    'zoltpy.json_backend': 150,
+    'zoltpy.quantile_io': 150,
+    'zoltpy.synthetic': 150,
+    'zoltpy.profiling': 150,
+    'zoltpy.util': 150,
+    'zoltpy.validation_cache': 150,
+    'zoltpy.forecast_frame': 1000,  # numpy
+    'zoltpy.forecast_store': 1000,  # numpy
+    'zoltpy.covid19_columnar': 2000,  # numpy and pandas
+}
+
+# modules that are only imported on first use
+DEFERRED_MODULES = ['click', 'numpy', 'orjson', 'pandas', 'pymmwr', 'requests']
+
+
+def _run_python(*args):
+    return subprocess.run([sys.executable, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+
+
+class ImportTimeTestCase(TestCase):
+    """
+    """
+
+
+    def test_import_time_budgets(self):
+        if sys.version_info < (3, 7):
+            self.skipTest("`-X importtime` is python 3.7+")
+
+        for module_name, budget_ms in IMPORT_TIME_BUDGETS_MS.items():
+            # the last `-X importtime` line is the top-level import: "import time: self [us] | cumulative | module"
+            last_line = _run_python('-X', 'importtime', '-c', f'import {module_name}').stderr.splitlines()[-1]
+            _, cumulative_us, imported_module_name = last_line.split('|')
+            self.assertEqual(module_name, imported_module_name.strip())
+            self.assertLess(int(cumulative_us) / 1000, budget_ms, module_name)
+
+
+    def test_deferred_modules(self):
+        for module_name in IMPORT_TIME_BUDGETS_MS:
+            if module_name in ['zoltpy.forecast_frame', 'zoltpy.forecast_store', 'zoltpy.covid19_columnar']:
+                continue
+
+            imported_modules = _run_python('-c', f'import sys, {module_name}; print(" ".join(sys.modules))') \
+                .stdout.split()
+            self.assertEqual([], [_ for _ in DEFERRED_MODULES if _ in imported_modules], module_name)
+
+
+    def test_covid19_lazy_attributes(self):
+        # locations.csv is not read until a FIPS table is accessed
+        code = "import zoltpy.covid19 as covid19; " \
+               "print(covid19._fips_codes.cache_info().currsize, len(covid19.FIPS_CODES_STATE), " \
+               "covid19._fips_codes.cache_info().currsize, 'FIPS_CODES_STATE' in vars(covid19), " \
+               "'COVID_TARGET_RULES' in dir(covid19))"
+        self.assertEqual('0 58 1 True True', _run_python('-c', code).stdout.strip())
+
+        with self.assertRaises(AttributeError):
+            zoltpy.covid19.NO_SUCH_ATTRIBUTE
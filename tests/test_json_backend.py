@@ -0,0 +1,74 @@
+import io
+import json
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from zoltpy import json_backend
+from zoltpy.json_backend import BACKEND_ENV_VAR, BACKEND_ORJSON, BACKEND_STDLIB, BACKENDS
+
+
+try:
+    import orjson
+
+
+    AVAILABLE_BACKENDS = BACKENDS
+except ImportError:
+    AVAILABLE_BACKENDS = (BACKEND_STDLIB,)
+
+
+class JsonBackendTestCase(TestCase):
+    """
+    """
+
+
+    def tearDown(self):
+        json_backend.set_backend(None)
+
+
+    def test_set_backend(self):
+        with patch.dict(os.environ, {BACKEND_ENV_VAR: BACKEND_STDLIB}):
+            json_backend.set_backend(None)
+            self.assertEqual(BACKEND_STDLIB, json_backend.backend_name())
+
+        json_backend.set_backend(None)
+        self.assertEqual(AVAILABLE_BACKENDS[-1], json_backend.backend_name())  # orjson if installed
+
+        with self.assertRaisesRegex(RuntimeError, 'invalid backend'):
+            json_backend.set_backend('bad backend')
+
+
+    def test_dumps_and_loads(self):
+        with open('tests/docs-predictions.json') as fp:
+            json_io_dict = json.load(fp)
+        json_io_dict['meta']['non-ascii'] = 'é中'
+        # numbers that orjson formats differently, and lookalikes in strings that must be left as-is
+        json_io_dict['meta']['numbers'] = [1e-05, -2.5e-07, 1e16, 1.5e+300, 123456789012345678.0, 5e-324, -0.0, 0.0001,
+                                           0.1, 2 ** 63 - 1, -2 ** 63, ['1e16', '0.00001', ',1e16', '"1e16"']]
+        for backend_name in AVAILABLE_BACKENDS:
+            json_backend.set_backend(backend_name)
+            json_bytes = json_backend.dumps(json_io_dict)
+            self.assertIsInstance(json_bytes, bytes)
+            self.assertEqual(json_io_dict, json_backend.loads(json_bytes))
+            self.assertEqual(json_io_dict, json_backend.loads(json_bytes.decode('utf-8')))
+
+            # numbers are byte-compatible with the standard library's
+            self.assertEqual(json.dumps(json_io_dict['meta']['numbers']).replace(', ', ','),
+                             json_backend.dumps(json_io_dict['meta']['numbers']).decode('utf-8').replace(', ', ','))
+            self.assertEqual(b'1e-05', json_backend.dumps(1e-05))
+            self.assertEqual(b'[' + b','.join([b'1e-05'] * 1000) + b']',
+                             json_backend.dumps([1e-05] * 1000).replace(b' ', b''))  # too many to rewrite
+
+            # objects that orjson can't encode (exactly) or decode
+            for obj, exp_json_bytes in [(float('nan'), b'NaN'), ({'a': [float('inf')]}, b'{"a": [Infinity]}'),
+                                        (2 ** 70, b'1180591620717411303424'), ({1: None}, b'{"1": null}')]:
+                self.assertEqual(exp_json_bytes, json_backend.dumps(obj))
+            self.assertEqual({'a': 2 ** 70}, json_backend.loads(b'{"a": 1180591620717411303424}'))
+            self.assertEqual([1, float('-inf')], json_backend.loads(b'[1, -Infinity]'))
+            with self.assertRaises(ValueError):
+                json_backend.loads(b'{"a": ')
+
+            fp = io.BytesIO()
+            json_backend.dump(json_io_dict, fp)
+            fp.seek(0)
+            self.assertEqual(json_io_dict, json_backend.load(fp))
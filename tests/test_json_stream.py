@@ -0,0 +1,58 @@
+import json
+from unittest import TestCase
+
+from zoltpy.json_stream import iter_prediction_dicts_from_json_chunks
+
+
+class JsonStreamTestCase(TestCase):
+    """
+    """
+
+
+    def test_iter_prediction_dicts_from_json_chunks(self):
+        with open('tests/docs-predictions.json') as fp:
+            json_io_dict = json.load(fp)
+        json_io_dict['meta']['non-ascii'] = 'é中'  # multi-byte characters that chunks split
+
+        # any chunk size, formatting, and key order
+        for json_str in [json.dumps(json_io_dict), json.dumps(json_io_dict, indent=4),
+                         json.dumps({'predictions': json_io_dict['predictions'], 'meta': json_io_dict['meta']})]:
+            json_bytes = json_str.encode('utf-8')
+            for chunk_size in [1, 3, 100, len(json_bytes)]:
+                chunks = [json_bytes[idx:idx + chunk_size] for idx in range(0, len(json_bytes), chunk_size)]
+                meta = {}
+                self.assertEqual(json_io_dict['predictions'], list(iter_prediction_dicts_from_json_chunks(chunks, meta)))
+                self.assertEqual(json_io_dict['meta'], meta)
+
+        # str chunks, an ignored key, and numbers split across chunks
+        meta = {}
+        self.assertEqual([56, 78], list(iter_prediction_dicts_from_json_chunks(
+            ['{"other": 12', '34, "meta": {"a": 1}, "predictions": [5', '6, 7', '8]}'], meta)))
+        self.assertEqual({'a': 1}, meta)
+        self.assertEqual([], list(iter_prediction_dicts_from_json_chunks([b'{"meta": {}, "predictions": []}'])))
+
+
+    def test_incremental(self):
+        # the first prediction is yielded before the last chunk is read
+        read_chunks = []
+
+        def chunks():
+            for chunk in [b'{"meta": {}, "predictions": [{"unit": "a"}, ', b'{"unit": "b"}]}']:
+                read_chunks.append(chunk)
+                yield chunk
+
+        prediction_dicts = iter_prediction_dicts_from_json_chunks(chunks())
+        self.assertEqual({'unit': 'a'}, next(prediction_dicts))
+        self.assertEqual(1, len(read_chunks))
+        self.assertEqual([{'unit': 'b'}], list(prediction_dicts))
+
+
+    def test_invalid_json(self):
+        for json_bytes, exp_message in [(b'{"meta": {}}', 'no predictions section found'),
+                                        (b'{"predictions": [1, 2', "expected ','"),
+                                        (b'[]', "expected '{'"),
+                                        (b'{"predictions": [{"a": 1} {"b": 2}]}', "expected ','"),
+                                        (b'{"predictions": [{"a": 1]}', 'invalid JSON')]:
+            with self.assertRaises(RuntimeError) as context:
+                list(iter_prediction_dicts_from_json_chunks([json_bytes]))
+            self.assertIn(exp_message, str(context.exception))
@@ -0,0 +1,75 @@
+import io
+import threading
+from unittest import TestCase
+
+from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file
+from zoltpy.covid19 import COVID_ADDL_REQ_COLS, COVID_TARGETS, covid19_row_validator
+from zoltpy.profiling import STAGE_CSV_READ, STAGE_OTHER, STAGE_PARSE_VALUE, STAGE_PREDICTION_CHECKS, \
+    STAGE_PROCESS_ROW, STAGE_ROW_CHECKS, STAGE_ROW_VALIDATOR, STAGE_SORT, STAGE_SORT_GROUPBY, \
+    STAGE_VALIDATE_PREDICTION, active_reader_stats, profile_readers
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file
+from zoltpy.synthetic import write_synthetic_cdc_csv, write_synthetic_quantile_csv
+
+
+def _quantile_json_io_dict_and_errors():
+    csv_fp = io.StringIO()
+    num_rows = write_synthetic_quantile_csv(csv_fp, num_locations=2, error_rate=0.1)
+    csv_fp.seek(0)
+    return num_rows, json_io_dict_from_quantile_csv_file(csv_fp, COVID_TARGETS, covid19_row_validator,
+                                                         COVID_ADDL_REQ_COLS)
+
+
+class ProfilingTestCase(TestCase):
+    """
+    """
+
+
+    def test_quantile_reader_stages(self):
+        num_rows, exp_json_io_dict_and_errors = _quantile_json_io_dict_and_errors()
+        self.assertIsNone(active_reader_stats())
+        with profile_readers() as reader_stats:
+            self.assertIs(reader_stats, active_reader_stats())
+            thread_reader_stats = []
+            thread = threading.Thread(target=lambda: thread_reader_stats.append(active_reader_stats()))
+            thread.start()
+            thread.join()
+            self.assertEqual([None], thread_reader_stats)  # other threads are not profiled
+            _, act_json_io_dict_and_errors = _quantile_json_io_dict_and_errors()
+        self.assertIsNone(active_reader_stats())
+        self.assertEqual(exp_json_io_dict_and_errors, act_json_io_dict_and_errors)  # profiling doesn't change results
+
+        stats_dict = reader_stats.as_dict()
+        stage_dicts = {stage_dict['name']: stage_dict for stage_dict in stats_dict['stages']}
+        self.assertEqual({STAGE_ROW_CHECKS, STAGE_CSV_READ, STAGE_PARSE_VALUE, STAGE_ROW_VALIDATOR, STAGE_SORT_GROUPBY,
+                          STAGE_VALIDATE_PREDICTION, STAGE_PREDICTION_CHECKS, STAGE_OTHER}, set(stage_dicts))
+        self.assertEqual(num_rows, stage_dicts[STAGE_CSV_READ]['count'])
+        self.assertEqual(num_rows + 1, stage_dicts[STAGE_CSV_READ]['calls'])  # the last call raises StopIteration
+        self.assertEqual(2 * num_rows, stage_dicts[STAGE_PARSE_VALUE]['count'])  # quantile and value
+        self.assertEqual(num_rows, stage_dicts[STAGE_ROW_VALIDATOR]['count'])
+        self.assertEqual(1, stage_dicts[STAGE_PREDICTION_CHECKS]['calls'])
+        self.assertEqual(2 * len(COVID_TARGETS), stage_dicts[STAGE_PREDICTION_CHECKS]['count'])  # (location, target)
+        self.assertTrue(all(stage_dict['seconds'] >= 0 for stage_dict in stats_dict['stages']))
+        self.assertTrue(all(stage_dict['alloc_bytes'] is None for stage_dict in stats_dict['stages']))
+        self.assertAlmostEqual(stats_dict['total_seconds'],
+                               sum(stage_dict['seconds'] for stage_dict in stats_dict['stages']), places=6)
+        self.assertEqual(len(stage_dicts) + 2, len(reader_stats.format_lines()))  # header and total
+
+        # allocations
+        with profile_readers(trace_allocations=True) as reader_stats:
+            _quantile_json_io_dict_and_errors()
+        self.assertTrue(all(isinstance(stage_stats.alloc_bytes, int) for stage_stats in reader_stats.stages.values()))
+
+
+    def test_cdc_reader_stages(self):
+        cdc_csv_fp = io.StringIO()
+        num_rows = write_synthetic_cdc_csv(cdc_csv_fp, num_locations=2)
+        cdc_csv_fp.seek(0)
+        exp_json_io_dict = json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+        cdc_csv_fp.seek(0)
+        with profile_readers() as reader_stats:
+            act_json_io_dict = json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+        self.assertEqual(exp_json_io_dict, act_json_io_dict)
+        self.assertEqual({STAGE_CSV_READ, STAGE_PARSE_VALUE, STAGE_PROCESS_ROW, STAGE_SORT}, set(reader_stats.stages))
+        self.assertEqual(num_rows, reader_stats.stages[STAGE_CSV_READ].count)
+        self.assertEqual(num_rows, reader_stats.stages[STAGE_PROCESS_ROW].count)
+        self.assertEqual(len(act_json_io_dict['predictions']), reader_stats.stages[STAGE_SORT].count)
@@ -1,13 +1,19 @@
+import csv
+import datetime
+import io
 import json
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import patch, PropertyMock
 
 from zoltpy.covid19 import covid19_row_validator, COVID_ADDL_REQ_COLS, FIPS_CODES_STATE, \
-    FIPS_CODES_COUNTY, COVID_TARGETS
-from zoltpy.csv_io import CSV_HEADER
+    FIPS_CODES_COUNTY, COVID_TARGETS, COVID_TARGET_RULES, CovidTargetRule, COVID_LOCATIONS_STATE, \
+    COVID_LOCATIONS_COUNTY, COVID_QUANTILES_CASE, COVID_QUANTILES_NON_CASE, _target_rule, \
+    WEEKDAY_TO_ONE_WK_AHEAD_DAYS, SATURDAY_WEEKDAY, clear_date_alignment_cache, date_alignment_cache_info, \
+    DATE_ALIGNMENT_CACHE_SIZE, validate_quantile_csv_file
 from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, _validate_header, REQUIRED_COLUMNS, \
     quantile_csv_rows_from_json_io_dict, summarized_error_messages, MESSAGE_DATE_ALIGNMENT, MESSAGE_FORECAST_CHECKS, \
-    MESSAGE_QUANTILES_AND_VALUES, MESSAGE_QUANTILES_AS_A_GROUP
+    MESSAGE_QUANTILES_AND_VALUES, MESSAGE_QUANTILES_AS_A_GROUP, ErrorRecord, error_code_counts, ERROR_ROW_LENGTH, \
+    ERROR_MAX_ERRORS, iter_quantile_csv_rows_from_json_io_dict, write_quantile_csv, ErrorSummarizer, error_record
 from zoltpy.util import dataframe_from_json_io_dict
 
 
@@ -152,12 +158,47 @@ class QuantileIOTestCase(TestCase):
         act_error_messages = summarized_error_messages(input_error_messages, max_num_dups=2)
         exp_error_messages = ['The number of elements in the `quantile` and `value` vectors should be identical',
                               'The number of elements in the `quantile` and `value` vectors should be identical',
-                              'The number of elemen...',
+                              'The number of elemen... (1 more like this)',
                               'Entries in `value` must be non-decreasing as quantiles increase',
                               'Entries in `value` must be non-decreasing as quantiles increase',
-                              'Entries in `value` m...']
+                              'Entries in `value` m... (1 more like this)']
         self.assertEqual(sorted(exp_error_messages), sorted(act_error_messages))
 
+        # ordered by priority. no "more like this" line when exactly max_num_dups were found
+        act_error_messages = summarized_error_messages(input_error_messages, max_num_dups=3)
+        self.assertEqual(['Entries in `value` must be non-decreasing as quantiles increase'] * 3 +
+                         ['The number of elements in the `quantile` and `value` vectors should be identical'] * 3,
+                         act_error_messages)
+
+
+    def test_error_summarizer(self):
+        error_summarizer = ErrorSummarizer(max_num_dups=2, max_num_categories=2)
+        for idx in range(1000):
+            error_summarizer.append(error_record(ERROR_ROW_LENGTH, MESSAGE_FORECAST_CHECKS, row_num=idx,
+                                                 header_len=5, row_len=4, row=[]))
+            error_summarizer.append((MESSAGE_DATE_ALIGNMENT, f"date error {idx}"))
+            error_summarizer.append((MESSAGE_QUANTILES_AND_VALUES, f"{idx} errors in a new category"))
+        self.assertEqual(3000, len(error_summarizer))
+        self.assertEqual({ERROR_ROW_LENGTH: 1000, 'date error 0': 1}, error_summarizer.category_counts())
+        self.assertEqual(['invalid number of items in row. len(header)=5 but len(row)=4. row=[]',
+                          'invalid number of items in row. len(header)=5 but len(row)=4. row=[]',
+                          'invalid number of it... (998 more like this)',
+                          'date error 0',
+                          '... (1999 more errors of other kinds)'],
+                         error_summarizer.summary())
+
+        # used as an error_sink
+        error_summarizer = ErrorSummarizer(max_num_dups=3)
+        with open('tests/covid19-data-processed-examples/2020-05-17-CovidActNow-SEIR_CAN.csv') as quantile_fp:
+            _, error_messages = json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS, covid19_row_validator,
+                                                                    addl_req_cols=COVID_ADDL_REQ_COLS,
+                                                                    error_sink=error_summarizer)
+        self.assertIs(error_summarizer, error_messages)
+        self.assertEqual(10, len(error_summarizer))
+        self.assertEqual({'covid_negative_value': 10}, error_summarizer.category_counts())
+        self.assertEqual(4, len(summarized_error_messages(error_summarizer)))
+        self.assertEqual('entries in the `valu... (7 more like this)', summarized_error_messages(error_summarizer)[-1])
+
 
     def test_json_io_dict_from_quantile_csv_file_bad_row_count(self):
         with open('tests/quantiles-bad-row-count.csv') as quantile_fp:  # header: 6, row: 5
@@ -168,6 +209,46 @@ class QuantileIOTestCase(TestCase):
             self.assertEqual(exp_errors, error_messages)
 
 
+    def test_error_records(self):
+        with open('tests/quantiles-bad-row-count.csv') as quantile_fp:
+            _, error_messages = json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS)
+        error_record = error_messages[0]
+        self.assertIsInstance(error_record, ErrorRecord)
+        self.assertEqual(ERROR_ROW_LENGTH, error_record.code)
+        self.assertEqual(MESSAGE_FORECAST_CHECKS, error_record.priority)
+        self.assertEqual(1, error_record.row_num)
+        self.assertEqual({'header_len': 5, 'row_len': 4,
+                          'row': ['1 wk ahead cum death', 'point', 'NA', '7.74526423651839']}, error_record.fields)
+
+        # messages are only formatted on demand
+        with patch('zoltpy.quantile_io.ErrorRecord.message', new_callable=PropertyMock) as message_mock:
+            with open('tests/covid19-data-processed-examples/2020-05-17-CovidActNow-SEIR_CAN.csv') as quantile_fp:
+                json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS, covid19_row_validator,
+                                                    addl_req_cols=COVID_ADDL_REQ_COLS)
+            message_mock.assert_not_called()
+
+        # row validators' records get row numbers
+        with open('tests/covid19-data-processed-examples/2020-05-17-CovidActNow-SEIR_CAN.csv') as quantile_fp:
+            _, error_messages = json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS, covid19_row_validator,
+                                                                    addl_req_cols=COVID_ADDL_REQ_COLS)
+        self.assertEqual({'covid_negative_value': 10}, error_code_counts(error_messages))
+        self.assertTrue(all(isinstance(error_message.row_num, int) for error_message in error_messages))
+
+
+    def test_json_io_dict_from_quantile_csv_file_max_errors(self):
+        test_file = 'tests/covid19-data-processed-examples/2020-05-17-CovidActNow-SEIR_CAN.csv'  # 10 errors
+        for max_errors, exp_num_errors in [(None, 10), (20, 10), (10, 11), (3, 4), (1, 2)]:
+            with open(test_file) as quantile_fp:
+                _, error_messages = json_io_dict_from_quantile_csv_file(quantile_fp, COVID_TARGETS,
+                                                                        covid19_row_validator,
+                                                                        addl_req_cols=COVID_ADDL_REQ_COLS,
+                                                                        max_errors=max_errors)
+            self.assertEqual(exp_num_errors, len(error_messages))
+            if exp_num_errors != 10:
+                self.assertEqual(ERROR_MAX_ERRORS, error_messages[-1].code)
+                self.assertIn("stopped processing after reaching max_errors", error_messages[-1][1])
+
+
     def test_json_io_dict_from_quantile_csv_file_dup_points(self):
         with open('tests/quantiles-duplicate-points.csv') as quantile_fp:
             _, act_error_messages = json_io_dict_from_quantile_csv_file(quantile_fp, ['1 day ahead inc hosp'])
@@ -307,6 +388,50 @@ class QuantileIOTestCase(TestCase):
         self.assertIn("target_end_date was not the expected Saturday", error_messages[0][1])
 
 
+    def test_covid_target_rules(self):
+        self.assertEqual(set(COVID_TARGETS), set(COVID_TARGET_RULES))
+        self.assertEqual(CovidTargetRule(True, 'wk', 3, COVID_LOCATIONS_STATE | COVID_LOCATIONS_COUNTY,
+                                         frozenset(COVID_QUANTILES_CASE)),
+                         COVID_TARGET_RULES['3 wk ahead inc case'])
+        self.assertEqual(CovidTargetRule(False, 'day', 0, COVID_LOCATIONS_STATE,
+                                         frozenset(COVID_QUANTILES_CASE + COVID_QUANTILES_NON_CASE)),
+                         COVID_TARGET_RULES['0 day ahead inc hosp'])
+        self.assertEqual((None, 'wk', None), _target_rule('x wk ahead inc death')[:3])  # invalid ahead number
+        self.assertEqual((None, None, None, frozenset(), frozenset()), _target_rule('bad target'))
+
+        # the 1 wk ahead table matches the Sunday-based rules: next Sat for Sun or Mon, o/w the Sat after next
+        for forecast_date in [datetime.date(2020, 4, 12) + datetime.timedelta(days=_) for _ in range(7)]:  # Sun, ...
+            exp_target_end_date = forecast_date + datetime.timedelta(days=(5 - forecast_date.weekday()) % 7)
+            if forecast_date.weekday() not in [0, 6]:  # Mon, Sun
+                exp_target_end_date += datetime.timedelta(days=7)
+            act_target_end_date = forecast_date + \
+                                  datetime.timedelta(days=WEEKDAY_TO_ONE_WK_AHEAD_DAYS[forecast_date.weekday()])
+            self.assertEqual(SATURDAY_WEEKDAY, act_target_end_date.weekday())
+            self.assertEqual(exp_target_end_date, act_target_end_date)
+
+
+    def test_covid_date_alignment_cache(self):
+        column_index_dict = {'forecast_date': 0, 'target': 1, 'target_end_date': 2, 'location': 3, 'type': 4,
+                             'quantile': 5, 'value': 6}
+        clear_date_alignment_cache()
+        for quantile in ['0.025', '0.1', '0.25']:  # three rows, one distinct date triple per target
+            for target_end_date in ['2020-04-18', '2020-04-19']:  # ok, not a Sat
+                row = ['2020-04-13', '1 wk ahead cum death', target_end_date, '01', 'quantile', quantile, '1']
+                error_messages = covid19_row_validator(column_index_dict, row)
+                self.assertEqual(0 if target_end_date == '2020-04-18' else 1, len(error_messages))
+        self.assertEqual(['target_end_date was not a Saturday: 2020-04-19. row=[\'2020-04-13\', \'1 wk ahead cum death\', '
+                          '\'2020-04-19\', \'01\', \'quantile\', \'0.25\', \'1\']'],
+                         [error_message.message for error_message in error_messages])  # row is not memoized
+        cache_info = date_alignment_cache_info()
+        self.assertEqual((4, 2, DATE_ALIGNMENT_CACHE_SIZE, 2),
+                         (cache_info.hits, cache_info.misses, cache_info.maxsize, cache_info.currsize))
+
+        # validate_quantile_csv_file() clears the cache before each file
+        validate_quantile_csv_file('tests/covid19-data-processed-examples/2020-04-20-YYG-ParamSearch-small.csv')
+        cache_info = date_alignment_cache_info()
+        self.assertEqual((23, 1), (cache_info.hits, cache_info.misses))
+
+
     def test_covid_validation_date_format(self):
         # test that `covid19_row_validator()` checks these columns are YYYY-MM-DD format: forecast_date, target_end_date
 
@@ -423,13 +548,16 @@ class QuantileIOTestCase(TestCase):
         act_rows = quantile_csv_rows_from_json_io_dict(json_io_dict)
         self.assertEqual(exp_rows, act_rows)
 
-        # expose a bug where the last row from `csv_rows_from_json_io_dict()` was lost due to pop()
+        # expose a bug where the last row was lost due to pop(). rows are no longer created via
+        # `csv_rows_from_json_io_dict()`
         with patch('zoltpy.csv_io.csv_rows_from_json_io_dict') as mock:
-            mock.return_value = [CSV_HEADER,
-                                 ['location1', 'pct next week', 'point', 2.1, '', '', '', '', '', '', '', ''],
-                                 ['location2', 'pct next week', 'quantile', 1.0, '', '', '', 0.025, '', '', '', '']]
-            act_rows = quantile_csv_rows_from_json_io_dict(json_io_dict)
-            mock.assert_called_once()
+            act_rows = quantile_csv_rows_from_json_io_dict(
+                {'meta': {},
+                 'predictions': [{'unit': 'location1', 'target': 'pct next week', 'class': 'point',
+                                  'prediction': {'value': 2.1}},
+                                 {'unit': 'location2', 'target': 'pct next week', 'class': 'quantile',
+                                  'prediction': {'quantile': [0.025], 'value': [1.0]}}]})
+            mock.assert_not_called()
 
             exp_rows = [['location', 'target', 'type', 'quantile', 'value'],
                         ['location1', 'pct next week', 'point', '', 2.1],
@@ -437,6 +565,22 @@ class QuantileIOTestCase(TestCase):
             self.assertEqual(exp_rows, act_rows)
 
 
+    def test_write_quantile_csv(self):
+        with open('tests/docs-predictions.json') as fp:
+            json_io_dict = json.load(fp)
+
+        # the generator is lazy: it doesn't visit predictions until rows are requested
+        rows_iter = iter_quantile_csv_rows_from_json_io_dict(json_io_dict)
+        self.assertEqual(['location', 'target', 'type', 'quantile', 'value'], next(rows_iter))
+        self.assertEqual(['location1', 'pct next week', 'point', '', 2.1], next(rows_iter))
+
+        csv_fp = io.StringIO(newline='')
+        write_quantile_csv(json_io_dict, csv_fp)
+        csv_fp.seek(0)
+        exp_rows = [[str(cell) for cell in row] for row in quantile_csv_rows_from_json_io_dict(json_io_dict)]
+        self.assertEqual(exp_rows, list(csv.reader(csv_fp)))
+
+
     def test_county_cases(self):
         # test blue sky
         with open('tests/county-examples/correct.csv') as quantile_fp:
@@ -0,0 +1,112 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from tests.fake_zoltar import FakeZoltarServer
+from zoltpy.connection import ZoltarConnection
+from zoltpy.util import delete_forecast, download_forecast, upload_forecast, upload_forecast_batch, \
+    upload_forecast_batch_journaled
+
+
+#
+# These tests run `util` workflows against a FakeZoltarServer and assert upper bounds on the number of requests they
+# make, to catch N+1 patterns like re-fetching projects, models, or forecasts (or re-authenticating) for each item of a
+# batch. No token requests are allowed in the budgets because the connection's token is fresh.
+#
+
+JSON_IO_DICT = {'meta': {}, 'predictions': [{'unit': 'US', 'target': '1 wk ahead inc case', 'class': 'point',
+                                             'prediction': {'value': 1}}]}
+
+NO_AUTH = {'POST /api-token-auth/': 0}
+
+
+def _server_and_conn(num_forecasts):
+    """
+    :return: a 2-tuple: (started FakeZoltarServer, authenticated ZoltarConnection). the server has two projects, the
+        first of which has two models, the first of which ('model1') has num_forecasts forecasts, with timezero dates
+        2020-01-01, 2020-01-02, ...
+    """
+    server = FakeZoltarServer()
+    server.start()
+    project_json = server.add_project('project1')
+    server.add_project('project2')
+    model_json = server.add_model(project_json, 'model1')
+    server.add_model(project_json, 'model2')
+    for day in range(1, num_forecasts + 1):
+        server.add_forecast(model_json, f'2020-01-{day:02}', JSON_IO_DICT)  # matches `_timezero_dates(1, ...)`
+    conn = ZoltarConnection(server.host)
+    conn.authenticate('user', 'pass')
+    return server, conn
+
+
+def _timezero_dates(month, num_dates):
+    return [f'2020-{month:02}-{day:02}' for day in range(1, num_dates + 1)]
+
+
+class RequestBudgetTestCase(TestCase):
+    """
+    """
+
+
+    def test_request_budget(self):
+        server, conn = _server_and_conn(2)
+        try:
+            with server.request_budget(4, NO_AUTH) as block_counts:
+                download_forecast(conn, 'project1', 'model1', '2020-01-02')
+            self.assertEqual({'GET /api/projects/': 1, 'GET /api/project/{id}/models/': 1,
+                              'GET /api/model/{id}/forecasts/': 1, 'GET /api/forecast/{id}/data/': 1},
+                             dict(block_counts))
+
+            with self.assertRaisesRegex(AssertionError, "request budget exceeded.*'total', 4, 3"):
+                with server.request_budget(3):
+                    download_forecast(conn, 'project1', 'model1', '2020-01-02')
+            with self.assertRaisesRegex(AssertionError, r"'GET /api/projects/', 2, 1"):
+                with server.request_budget(max_endpoint_requests={'GET /api/projects/': 1}):
+                    conn.projects
+                    conn.projects
+        finally:
+            server.stop()
+
+
+    def test_single_forecast_workflows(self):
+        server, conn = _server_and_conn(3)
+        try:
+            with server.request_budget(4, NO_AUTH):
+                delete_forecast(conn, 'project1', 'model1', '2020-01-01')
+            with server.request_budget(4, NO_AUTH):
+                download_forecast(conn, 'project1', 'model1', '2020-01-02')
+            with server.request_budget(4, NO_AUTH):  # projects, models, upload, job
+                upload_forecast(conn, JSON_IO_DICT, 'f.json', 'project1', 'model1', '2020-02-01')
+            with server.request_budget(6, NO_AUTH):  # + forecasts, delete
+                upload_forecast(conn, JSON_IO_DICT, 'f.json', 'project1', 'model1', '2020-01-02', overwrite=True)
+            self.assertEqual(['2020-01-02', '2020-01-03', '2020-02-01'],
+                             sorted(forecast_json['time_zero']['timezero_date']
+                                    for forecast_json in server.forecasts.values()))
+        finally:
+            server.stop()
+
+
+    def test_batch_workflows(self):
+        for num_items in [1, 5]:
+            server, conn = _server_and_conn(num_items)
+            try:
+                # N uploads + projects + models, i.e., no per-item lookups
+                with server.request_budget(num_items + 2, NO_AUTH):
+                    upload_forecast_batch(conn, [JSON_IO_DICT] * num_items, ['f.json'] * num_items, 'project1',
+                                          'model1', _timezero_dates(2, num_items))
+
+                # + forecasts (once, not per item) and N deletes
+                with server.request_budget(2 * num_items + 3, {'GET /api/model/{id}/forecasts/': 1, **NO_AUTH}):
+                    upload_forecast_batch(conn, [JSON_IO_DICT] * num_items, ['f.json'] * num_items, 'project1',
+                                          'model1', _timezero_dates(1, num_items), overwrite=True)
+
+                # N uploads + N job polls + projects + models. none when re-run because all are done
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    journal_file = Path(temp_dir) / 'journal.json'
+                    for max_requests in [2 * num_items + 2, 0]:
+                        with server.request_budget(max_requests, NO_AUTH):
+                            upload_forecast_batch_journaled(conn, journal_file, [JSON_IO_DICT] * num_items,
+                                                            ['g.json'] * num_items, 'project1', 'model1',
+                                                            _timezero_dates(3, num_items), poll_interval=0)
+            finally:
+                server.stop()
@@ -0,0 +1,120 @@
+import io
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file
+from zoltpy.covid19 import COVID_ADDL_REQ_COLS, COVID_TARGETS, COVID_TARGETS_CASE, covid19_row_validator, \
+    ERROR_DAY_AHEAD_DATE, ERROR_LOCATION_FOR_TARGET, ERROR_NEGATIVE_VALUE, ERROR_NOT_SATURDAY
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, error_code_counts, ERROR_POINT_COUNT, \
+    ERROR_QUANTILE_NOT_IN_RANGE, ERROR_VALUE_NOT_NUMERIC, ERROR_VALUES_DECREASING
+from zoltpy.synthetic import CDC_ERROR_KINDS, CDC_TARGETS, LOCATION_SCOPE_ALL, QUANTILE_ERROR_DUPLICATE_POINT, \
+    QUANTILE_ERROR_LOCATION, QUANTILE_ERROR_NEGATIVE_VALUE, QUANTILE_ERROR_QUANTILE_NOT_IN_RANGE, \
+    QUANTILE_ERROR_TARGET_END_DATE, QUANTILE_ERROR_VALUE_NOT_NUMERIC, QUANTILE_ERROR_VALUES_DECREASING, \
+    iter_synthetic_quantile_csv_rows, synthetic_json_io_dict, write_synthetic_cdc_csv, write_synthetic_hub, \
+    write_synthetic_quantile_csv
+
+
+def _quantile_csv_error_code_counts(**kwargs):
+    csv_fp = io.StringIO()
+    write_synthetic_quantile_csv(csv_fp, **kwargs)
+    csv_fp.seek(0)
+    _, error_messages = json_io_dict_from_quantile_csv_file(csv_fp, COVID_TARGETS, covid19_row_validator,
+                                                            COVID_ADDL_REQ_COLS)
+    return error_code_counts(error_messages)
+
+
+def _sorted_prediction_dicts(prediction_dicts):
+    return sorted(prediction_dicts, key=lambda _: (_['unit'], _['target'], _['class']))
+
+
+class SyntheticTestCase(TestCase):
+    """
+    """
+
+
+    def test_valid_quantile_csv(self):
+        # all states and targets, plus county case targets. Tuesday forecast dates have different week-ahead dates
+        for kwargs in [{'num_locations': 3},
+                       {'location_scope': LOCATION_SCOPE_ALL, 'num_locations': 70, 'targets': COVID_TARGETS_CASE},
+                       {'num_locations': 2, 'forecast_date': '2020-04-14'}]:
+            self.assertEqual({}, _quantile_csv_error_code_counts(**kwargs))
+
+        # deterministic per seed
+        rows = list(iter_synthetic_quantile_csv_rows(num_locations=2))
+        self.assertEqual(rows, list(iter_synthetic_quantile_csv_rows(num_locations=2)))
+        self.assertNotEqual(rows, list(iter_synthetic_quantile_csv_rows(num_locations=2, seed=1)))
+        self.assertEqual(1 + 2 * len(COVID_TARGETS) + 2 * (171 * 23 + 8 * 7), len(rows))  # header + points + quantiles
+
+        # the JSON IO dict has the same point and quantile predictions
+        csv_fp = io.StringIO()
+        write_synthetic_quantile_csv(csv_fp, num_locations=2)
+        csv_fp.seek(0)
+        exp_json_io_dict, _ = json_io_dict_from_quantile_csv_file(csv_fp, COVID_TARGETS, covid19_row_validator,
+                                                                  COVID_ADDL_REQ_COLS)
+        act_json_io_dict = synthetic_json_io_dict(num_locations=2, num_samples=10)
+        act_sample_dicts = [prediction_dict for prediction_dict in act_json_io_dict['predictions']
+                            if prediction_dict['class'] == 'sample']
+        self.assertEqual(2 * len(COVID_TARGETS), len(act_sample_dicts))
+        self.assertEqual({10}, {len(prediction_dict['prediction']['sample']) for prediction_dict in act_sample_dicts})
+        act_prediction_dicts = [prediction_dict for prediction_dict in act_json_io_dict['predictions']
+                                if prediction_dict['class'] != 'sample']
+        self.assertEqual(_sorted_prediction_dicts(exp_json_io_dict['predictions']),
+                         _sorted_prediction_dicts(act_prediction_dicts))
+
+
+    def test_quantile_csv_error_injection(self):
+        error_kind_to_exp_codes = {
+            QUANTILE_ERROR_NEGATIVE_VALUE: {ERROR_NEGATIVE_VALUE},
+            QUANTILE_ERROR_VALUES_DECREASING: {ERROR_VALUES_DECREASING},
+            QUANTILE_ERROR_QUANTILE_NOT_IN_RANGE: {ERROR_QUANTILE_NOT_IN_RANGE, 'covid_quantile_for_target'},
+            QUANTILE_ERROR_VALUE_NOT_NUMERIC: {ERROR_VALUE_NOT_NUMERIC},
+            QUANTILE_ERROR_DUPLICATE_POINT: {ERROR_POINT_COUNT, 'duplicate_prediction_elements'},
+            QUANTILE_ERROR_LOCATION: {ERROR_LOCATION_FOR_TARGET},
+            QUANTILE_ERROR_TARGET_END_DATE: {ERROR_DAY_AHEAD_DATE, ERROR_NOT_SATURDAY},
+        }
+        for error_kind, exp_codes in error_kind_to_exp_codes.items():
+            error_counts = {}
+            act_codes = _quantile_csv_error_code_counts(num_locations=2, error_rate=0.1, error_kinds=[error_kind],
+                                                        error_counts=error_counts)
+            self.assertEqual([error_kind], list(error_counts), error_kind)
+            self.assertEqual(exp_codes, set(act_codes), error_kind)
+
+        with self.assertRaises(RuntimeError) as context:
+            list(iter_synthetic_quantile_csv_rows(error_rate=0.1, error_kinds=['bad kind']))
+        self.assertIn('error_kinds must be', str(context.exception))
+
+
+    def test_cdc_csv(self):
+        # more locations than the 11 real ones
+        cdc_csv_fp = io.StringIO()
+        self.assertEqual(12 * (7 + 34 + 33 + 5 * 131), write_synthetic_cdc_csv(cdc_csv_fp, num_locations=12))
+        cdc_csv_fp.seek(0)
+        json_io_dict = json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+        self.assertEqual(12 * 2 * len(CDC_TARGETS), len(json_io_dict['predictions']))  # point and bin per target
+
+        # every error kind fails for every target
+        for error_kind in CDC_ERROR_KINDS:
+            for target in CDC_TARGETS:
+                cdc_csv_fp = io.StringIO()
+                write_synthetic_cdc_csv(cdc_csv_fp, num_locations=1, targets=[target], error_rate=1,
+                                        error_kinds=[error_kind])
+                cdc_csv_fp.seek(0)
+                with self.assertRaises(RuntimeError, msg=(error_kind, target)):
+                    json_io_dict_from_cdc_csv_file(2011, cdc_csv_fp)
+
+
+    def test_write_synthetic_hub(self):
+        hub_dir = Path(tempfile.mkdtemp())
+        try:
+            summary = write_synthetic_hub(hub_dir, num_models=2, num_forecast_dates=2, num_locations=1,
+                                          targets=COVID_TARGETS_CASE)
+            self.assertEqual(['team1-model/2020-04-13-team1-model.csv', 'team1-model/2020-04-20-team1-model.csv',
+                              'team2-model/2020-04-13-team2-model.csv', 'team2-model/2020-04-20-team2-model.csv'],
+                             [path.relative_to(hub_dir).as_posix() for path in summary['files']])
+            self.assertEqual(4 * 8 * 8, summary['rows'])
+            file_contents = [path.read_text() for path in summary['files']]
+            self.assertEqual(4, len(set(file_contents)))  # each file has its own seed
+        finally:
+            shutil.rmtree(hub_dir)
@@ -1,9 +1,19 @@
+import datetime
+import json
+import tempfile
+from pathlib import Path
 from unittest import TestCase
 from unittest.mock import patch
 
+import pandas as pd
+
 from tests.test_connection import PROJECTS_LIST_DICTS, mock_authenticate
-from zoltpy.connection import ZoltarConnection
-from zoltpy.util import delete_forecast
+from zoltpy.connection import ZoltarConnection, Job
+from zoltpy.forecast_frame import ForecastFrame
+from zoltpy.upload_journal import ITEM_FAILED, ITEM_PENDING, ITEM_SUCCEEDED, ITEM_UPLOADED, UploadJournal, \
+    upload_item_key
+from zoltpy.util import delete_forecast, dataframe_from_json_io_dict, typed_dataframe_from_json_io_dict, \
+    upload_forecast_batch_journaled
 
 
 class UtilTestCase(TestCase):
@@ -67,6 +77,115 @@ class UtilTestCase(TestCase):
             self.assertEqual(0, delete_forecast_mock.call_count)
 
 
+    def test_upload_forecast_batch_journaled(self):
+        job_uri_to_json = {}  # set below as jobs are created
+
+
+        def json_for_uri_mock_side_effect(*args, **kwargs):
+            return {'http://example.com/api/projects/': PROJECTS_LIST_DICTS,
+                    'http://example.com/api/project/3/models/': [MODEL_DICT], **job_uri_to_json}[args[0]]
+
+
+        def upload_forecast_mock_side_effect(json_io_dict, forecast_filename, timezero_date):
+            if forecast_filename == 'interrupt.csv':
+                raise KeyboardInterrupt
+
+            job_id = len(job_uri_to_json) + 1
+            job_uri = f'http://example.com/api/job/{job_id}/'
+            job_uri_to_json[job_uri] = {'status': 5, 'failure_message': 'bad forecast', 'output_json': {}} \
+                if forecast_filename == 'bad.csv' \
+                else {'status': 4, 'failure_message': '', 'output_json': {'forecast_pk': job_id + 100}}
+            return Job(conn, job_uri)
+
+
+        conn = mock_authenticate(ZoltarConnection('http://example.com'))
+        project_name, model_name = PROJECTS_LIST_DICTS[0]['name'], MODEL_DICT['name']
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch('zoltpy.connection.ZoltarConnection.json_for_uri') as json_for_uri_mock, \
+                patch('zoltpy.connection.ZoltarConnection.re_authenticate_if_necessary'), \
+                patch('zoltpy.connection.Model.upload_forecast') as upload_forecast_mock:
+            json_for_uri_mock.side_effect = json_for_uri_mock_side_effect
+            upload_forecast_mock.side_effect = upload_forecast_mock_side_effect
+            journal_file = Path(temp_dir) / 'journal.jsonl'
+            json_io_dict = {'meta': {}, 'predictions': []}
+            timezero_date_batch = ['2020-04-12', '2020-04-19', '2020-04-26']
+
+            # case: interrupted after the first upload, before its job was polled
+            with self.assertRaises(KeyboardInterrupt):
+                upload_forecast_batch_journaled(conn, journal_file, [json_io_dict] * 3,
+                                                ['ok.csv', 'interrupt.csv', 'bad.csv'], project_name, model_name,
+                                                timezero_date_batch, poll_interval=0)
+            journal = UploadJournal(journal_file)
+            self.assertEqual({ITEM_PENDING: 2, ITEM_UPLOADED: 1, ITEM_SUCCEEDED: 0, ITEM_FAILED: 0}, journal.counts())
+
+            # case: resumed. the first item's job is polled rather than re-uploaded
+            upload_forecast_mock.reset_mock()
+            summary = upload_forecast_batch_journaled(conn, journal_file, [json_io_dict] * 3,
+                                                      ['ok.csv', 'ok2.csv', 'bad.csv'], project_name, model_name,
+                                                      timezero_date_batch, poll_interval=0)
+            self.assertEqual(['ok2.csv', 'bad.csv'], [call[0][1] for call in upload_forecast_mock.call_args_list])
+            self.assertEqual({'uploaded': 2, 'skipped': 0, 'succeeded': 2,
+                              'failed': [(upload_item_key('2020-04-26', 'bad.csv'), 'bad forecast')]}, summary)
+            self.assertEqual({'state': ITEM_SUCCEEDED, 'forecast_id': 101},
+                             UploadJournal(journal_file).items[upload_item_key('2020-04-12', 'ok.csv')])
+
+            # case: nothing remains, so no requests are made
+            upload_forecast_mock.reset_mock()
+            json_for_uri_mock.reset_mock()
+            summary = upload_forecast_batch_journaled(conn, journal_file, [json_io_dict] * 3,
+                                                      ['ok.csv', 'ok2.csv', 'bad.csv'], project_name, model_name,
+                                                      timezero_date_batch, retry_failed=False)
+            self.assertEqual((0, 3), (summary['uploaded'], summary['skipped']))
+            json_for_uri_mock.assert_not_called()
+            upload_forecast_mock.assert_not_called()
+
+
+
+    def test_typed_dataframe_from_json_io_dict(self):
+        with open('tests/docs-predictions.json') as fp:
+            json_io_dict = json.load(fp)
+
+        # the same cells as the CSV round trip, but typed
+        exp_df = dataframe_from_json_io_dict(json_io_dict)
+        for act_df in [typed_dataframe_from_json_io_dict(json_io_dict),
+                       typed_dataframe_from_json_io_dict(ForecastFrame.from_json_io_dict(json_io_dict))]:
+            self.assertEqual(list(exp_df.columns), list(act_df.columns))
+            self.assertEqual(exp_df.shape, act_df.shape)
+            for column in ['unit', 'target', 'class']:
+                self.assertIsInstance(act_df[column].dtype, pd.CategoricalDtype)
+                self.assertEqual(list(exp_df[column]), list(act_df[column]))
+            for column in ['prob', 'quantile', 'param1', 'param2', 'param3']:
+                self.assertEqual('float64', act_df[column].dtype)
+            for column in exp_df.columns[3:]:
+                exp_cells = [None if pd.isna(cell) else cell for cell in exp_df[column]]
+                act_cells = [None if pd.isna(cell) else str(cell) for cell in act_df[column]]
+                act_cells = [cell[:-2] if (cell is not None) and cell.endswith('.0') and (exp_cell is not None)
+                                          and not exp_cell.endswith('.0') else cell  # ints are stored as floats
+                             for exp_cell, cell in zip(exp_cells, act_cells)]
+                self.assertEqual(exp_cells, act_cells)
+
+        # target-type-aware casting. dates and numbers are in the value column, so it's only cast for one target
+        act_df = typed_dataframe_from_json_io_dict(json_io_dict, {'pct next week': 'continuous',
+                                                                  'cases next week': 'discrete',
+                                                                  'season severity': 'nominal',
+                                                                  'above baseline': 'binary',
+                                                                  'Season peak week': 'date'})
+        self.assertEqual(object, act_df['value'].dtype)
+        date_predictions = [prediction_dict for prediction_dict in json_io_dict['predictions']
+                            if prediction_dict['target'] == 'Season peak week']
+        act_df = typed_dataframe_from_json_io_dict({'meta': {}, 'predictions': date_predictions},
+                                                   {'Season peak week': 'date'})
+        for column in ['value', 'cat', 'sample']:
+            self.assertEqual('datetime64[ns]', act_df[column].dtype)
+        self.assertEqual(pd.Timestamp(datetime.date(2019, 12, 22)), act_df['value'].iloc[0])
+        discrete_predictions = [prediction_dict for prediction_dict in json_io_dict['predictions']
+                                if prediction_dict['target'] == 'cases next week']
+        act_df = typed_dataframe_from_json_io_dict({'meta': {}, 'predictions': discrete_predictions},
+                                                   {'cases next week': 'discrete'})
+        self.assertEqual('Int64', act_df['value'].dtype)
+        self.assertEqual('float64', act_df['prob'].dtype)
+
+
 FORECAST_DICT = {
     "id": 9921,
     "url": "https://example.com/api/forecast/9921/",
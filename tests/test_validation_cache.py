@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from zoltpy.covid19 import validate_quantile_csv_file, covid_rules_fingerprint
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file
+from zoltpy.validation_cache import ValidationCache, file_content_hash, rules_fingerprint
+
+
+class ValidationCacheTestCase(TestCase):
+    """
+    """
+
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache = ValidationCache(self.temp_dir / 'cache')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+
+    def test_get_put(self):
+        fingerprint = rules_fingerprint(['1 wk ahead inc case'], [0.5])
+        self.assertEqual(fingerprint, rules_fingerprint(['1 wk ahead inc case'], [0.5]))
+        self.assertNotEqual(fingerprint, rules_fingerprint(['1 wk ahead inc case'], [0.25]))
+
+        self.assertIsNone(self.cache.get('abc', fingerprint))  # cache_dir doesn't exist yet
+        self.cache.put('abc', fingerprint, ['error 1', 'error 2'])
+        self.assertEqual(['error 1', 'error 2'], self.cache.get('abc', fingerprint))
+        self.assertIsNone(self.cache.get('abc', rules_fingerprint(['1 wk ahead inc case'], [0.25])))
+        self.assertIsNone(self.cache.get('def', fingerprint))
+
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('abc', fingerprint))
+
+        # a failed put leaves neither an entry nor a temporary file
+        with self.assertRaises(TypeError):
+            self.cache.put('abc', fingerprint, [object()])  # not JSON-serializable
+        self.assertIsNone(self.cache.get('abc', fingerprint))
+        self.assertEqual([], list(self.cache.cache_dir.iterdir()))
+
+
+    def test_validate_quantile_csv_file_cache(self):
+        csv_file = self.temp_dir / 'forecast.csv'
+        shutil.copy('tests/covid19-data-processed-examples/2020-06-21-USC-SI_kJalpha.csv', csv_file)
+        exp_result = validate_quantile_csv_file(csv_file)
+        self.assertEqual(1, len(exp_result))
+
+        # first call validates and caches, the second uses the cache
+        with patch('zoltpy.hub_spec.json_io_dict_from_quantile_csv_file',
+                   wraps=json_io_dict_from_quantile_csv_file) as mock:
+            self.assertEqual(exp_result, validate_quantile_csv_file(csv_file, cache=self.cache))
+            self.assertEqual(exp_result, validate_quantile_csv_file(csv_file, cache=self.cache))
+            self.assertEqual(1, mock.call_count)
+
+            # changing max_errors changes the fingerprint
+            self.assertNotEqual(covid_rules_fingerprint(), covid_rules_fingerprint(1))
+            validate_quantile_csv_file(csv_file, max_errors=1, cache=self.cache)
+            self.assertEqual(2, mock.call_count)
+
+            # changing the file's content is a cache miss
+            old_content_hash = file_content_hash(csv_file)
+            with open('tests/covid19-data-processed-examples/2020-04-15-Geneva-DeterministicGrowth.csv') as in_fp, \
+                    open(csv_file, 'w') as out_fp:
+                out_fp.write(in_fp.read())
+            self.assertNotEqual(old_content_hash, file_content_hash(csv_file))
+            self.assertEqual(9, len(validate_quantile_csv_file(csv_file, cache=self.cache)))
+            self.assertEqual(3, mock.call_count)
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from zoltpy.covid19 import COVID_HUB_VALIDATOR
+from zoltpy.validation_worker import ValidationWorker, request_validation
+
+
+class ValidationWorkerTestCase(TestCase):
+    """
+    """
+
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.csv_file = self.temp_dir / 'forecast.csv'
+        shutil.copy('tests/covid19-data-processed-examples/2020-04-13-COVIDhub-ensemble.csv', self.csv_file)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+
+    def _break_csv_file(self):
+        # duplicates the last row, and changes the file's stat signature even if its mtime is unchanged
+        with open(self.csv_file) as fp:
+            last_line = fp.read().splitlines()[-1]
+        with open(self.csv_file, 'a') as fp:
+            fp.write(last_line + '\n')
+
+
+    def test_validate_only_changed(self):
+        worker = ValidationWorker()
+        with patch.object(COVID_HUB_VALIDATOR, 'validate_quantile_csv_file',
+                          wraps=COVID_HUB_VALIDATOR.validate_quantile_csv_file) as mock:
+            result_dict = worker.validate(self.csv_file)
+            self.assertEqual(('no errors', True), (result_dict['result'], result_dict['changed']))
+            self.assertEqual(str(self.csv_file.absolute()), result_dict['path'])
+            self.assertRegex(result_dict['date_cache'], r'^date cache: hits=\d+, misses=[1-9]\d*, hit rate=')
+
+            result_dict = worker.validate(self.csv_file)  # unchanged
+            self.assertEqual(('no errors', False, 0), (result_dict['result'], result_dict['changed'],
+                                                       result_dict['elapsed']))
+            self.assertEqual(1, mock.call_count)
+
+            worker.validate(self.csv_file, force=True)
+            self.assertEqual(2, mock.call_count)
+
+            self._break_csv_file()
+            result_dict = worker.validate(self.csv_file)
+            self.assertEqual(2, len(result_dict['result']))  # duplicate prediction elements and point count
+            self.assertEqual(3, mock.call_count)
+
+
+    def test_changed_files_and_watch(self):
+        worker = ValidationWorker()
+        other_csv_file = self.temp_dir / 'other.csv'
+        shutil.copy(self.csv_file, other_csv_file)
+        self.assertEqual([self.csv_file.absolute(), other_csv_file.absolute()], worker.changed_files([self.temp_dir]))
+
+        result_dicts = []
+        worker.watch([self.temp_dir], result_dicts.append, interval=0, max_polls=2)  # second poll finds no changes
+        self.assertEqual(['no errors', 'no errors'], [result_dict['result'] for result_dict in result_dicts])
+        self.assertEqual([], worker.changed_files([self.temp_dir]))
+
+        self._break_csv_file()
+        os.remove(other_csv_file)
+        self.assertEqual([self.csv_file.absolute()], worker.changed_files([self.temp_dir]))
+        self.assertEqual([self.csv_file.absolute()], list(worker.file_states))  # other_csv_file was forgotten
+
+
+    def test_serve(self):
+        worker = ValidationWorker()
+        worker.warm_up()
+        socket_path = self.temp_dir / 'worker.sock'
+        server = worker.serve(socket_path)
+        try:
+            result_dict = request_validation(socket_path, self.csv_file, timeout=10)
+            self.assertEqual(('no errors', True), (result_dict['result'], result_dict['changed']))
+            self.assertFalse(request_validation(socket_path, self.csv_file, timeout=10)['changed'])
+
+            result_dict = request_validation(socket_path, self.temp_dir / 'no-such-file.csv', timeout=10)
+            self.assertIn('FileNotFoundError', result_dict['error'])
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,166 @@
+import gzip
+import json
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from zoltpy import json_backend
+from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file, SEASON_START_EW_NUMBER
+from zoltpy.validation_cache import file_content_hash, write_file_atomically
+
+
+logger = logging.getLogger(__name__)
+
+#
+# This file defines a bulk converter of CDC CSV archives (e.g., a multi-season FluSight repository with a directory
+# per model) to JSON IO dict files. Files are converted in parallel across a process pool, and files whose output is
+# up-to-date are skipped so that re-running a backfill only converts what's new or changed. Each source file's output
+# goes to the same relative path under the target directory, with a '.json' (or '.json.gz') suffix.
+#
+
+UP_TO_DATE_MTIME = 'mtime'  # skip if the output file is newer than the source file
+UP_TO_DATE_HASH = 'hash'  # skip if the source file's content hash and season start year match the manifest's
+UP_TO_DATE_MODES = (UP_TO_DATE_MTIME, UP_TO_DATE_HASH)
+
+MANIFEST_FILE_NAME = '.cdc_bulk_manifest.json'  # in the target directory. used by UP_TO_DATE_HASH
+
+EW_FILE_NAME_RE = re.compile(r'^EW(\d{1,2})-(\d{4})-')  # e.g., 'EW01-2011-ReichLab_kde.csv'
+
+
+def season_start_year_from_file_name(cdc_csv_file):
+    """
+    The default season start year resolver, which parses FluSight-style file names like 'EW01-2011-ReichLab_kde.csv'.
+    Seasons start at SEASON_START_EW_NUMBER, so e.g. EW01-2011 is in the season that started in 2010.
+
+    :param cdc_csv_file: a Path
+    :return: the season start year for cdc_csv_file
+    """
+    match = EW_FILE_NAME_RE.match(Path(cdc_csv_file).name)
+    if not match:
+        raise RuntimeError(f"could not get an EW and year from the file name. cdc_csv_file={cdc_csv_file}")
+
+    ew_week, year = int(match.group(1)), int(match.group(2))
+    return year - 1 if ew_week < SEASON_START_EW_NUMBER else year
+
+
+def bulk_convert_cdc_csv_files(source_dir, target_dir, season_start_year_fcn=season_start_year_from_file_name,
+                               compress=False, up_to_date=UP_TO_DATE_MTIME, max_workers=None, pattern='**/*.csv'):
+    """
+    Converts every CDC CSV file under source_dir to a JSON IO dict file under target_dir, skipping up-to-date ones.
+
+    :param source_dir: a str or Path to search for CDC CSV files
+    :param target_dir: a str or Path to write outputs to. created if necessary
+    :param season_start_year_fcn: a function of one arg - a source file Path - that returns the file's season start
+        year (an int). called in this process, so it need not be picklable
+    :param compress: True if outputs should be gzipped ('.json.gz')
+    :param up_to_date: one of UP_TO_DATE_MODES
+    :param max_workers: number of worker processes. None means the number of CPUs. 1 converts in this process, which
+        is useful for debugging
+    :param pattern: a glob pattern relative to source_dir that selects the files to convert
+    :return: a summary dict: {'converted': int, 'skipped': int, 'failed': list of (relative path str, error str),
+        'elapsed': seconds, 'files_per_second': converted files per second, 'mb_per_second': converted source MB per
+        second}
+    """
+    if up_to_date not in UP_TO_DATE_MODES:
+        raise RuntimeError(f"invalid up_to_date: {up_to_date!r}. must be one of {UP_TO_DATE_MODES}")
+
+    start_time = time.perf_counter()
+    source_dir, target_dir = Path(source_dir), Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(target_dir) if up_to_date == UP_TO_DATE_HASH else {}
+
+    # collect the tasks to run, skipping up-to-date files
+    tasks = []  # (source file, relative path str, season_start_year, output file, content hash or None)
+    failed = []
+    num_skipped = 0
+    for source_file in sorted(source_dir.glob(pattern)):
+        rel_path = source_file.relative_to(source_dir).as_posix()
+        output_file = target_dir / (rel_path + ('.json.gz' if compress else '.json'))
+        try:
+            season_start_year = season_start_year_fcn(source_file)
+            content_hash = file_content_hash(source_file) if up_to_date == UP_TO_DATE_HASH else None
+        except Exception as ex:
+            failed.append((rel_path, f"{ex.__class__.__name__}: {ex}"))
+            continue
+
+        if up_to_date == UP_TO_DATE_MTIME:
+            is_up_to_date = output_file.exists() and (output_file.stat().st_mtime_ns >= source_file.stat().st_mtime_ns)
+        else:
+            is_up_to_date = output_file.exists() and (manifest.get(rel_path) == [content_hash, season_start_year])
+        if is_up_to_date:
+            num_skipped += 1
+        else:
+            tasks.append((source_file, rel_path, season_start_year, output_file, content_hash))
+
+    # convert, in this process or across a pool. each result is an error str, or None if the conversion succeeded
+    task_args = [(source_file, season_start_year, output_file) for source_file, _, season_start_year, output_file, _
+                 in tasks]
+    if max_workers == 1:
+        errors = [_convert_cdc_csv_file(task_arg) for task_arg in task_args]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            errors = list(executor.map(_convert_cdc_csv_file, task_args, chunksize=4))
+
+    # summarize, and save hashes of successful conversions
+    num_converted, num_converted_bytes = 0, 0
+    for (source_file, rel_path, season_start_year, _, content_hash), error in zip(tasks, errors):
+        if error:
+            failed.append((rel_path, error))
+            manifest.pop(rel_path, None)
+        else:
+            num_converted += 1
+            num_converted_bytes += source_file.stat().st_size
+            manifest[rel_path] = [content_hash, season_start_year]
+    if up_to_date == UP_TO_DATE_HASH:
+        _save_manifest(target_dir, manifest)
+    elapsed = time.perf_counter() - start_time
+    summary = {'converted': num_converted, 'skipped': num_skipped, 'failed': failed, 'elapsed': elapsed,
+               'files_per_second': num_converted / elapsed if elapsed else 0,
+               'mb_per_second': num_converted_bytes / 1e6 / elapsed if elapsed else 0}
+    logger.info(f"bulk_convert_cdc_csv_files(): done. converted={num_converted}, skipped={num_skipped}, "
+                f"failed={len(failed)}, elapsed={elapsed:.1f}")
+    return summary
+
+
+def _convert_cdc_csv_file(task_arg):
+    """
+    `bulk_convert_cdc_csv_files()` worker that converts one file. top-level so that it can be pickled. the output is
+    written atomically so that an interrupted run never leaves a partial file that looks up-to-date.
+
+    :param task_arg: a 3-tuple: (source file, season_start_year, output file)
+    :return: None if the conversion succeeded, or an error str o/w
+    """
+    source_file, season_start_year, output_file = task_arg
+    try:
+        with open(source_file) as cdc_csv_fp:
+            json_io_dict = json_io_dict_from_cdc_csv_file(season_start_year, cdc_csv_fp)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+
+        def write_output(fp):
+            json_bytes = json_backend.dumps(json_io_dict)
+            fp.write(gzip.compress(json_bytes) if output_file.suffix == '.gz' else json_bytes)
+
+
+        write_file_atomically(output_file, 'wb', write_output)
+        return None
+    except Exception as ex:
+        return f"{ex.__class__.__name__}: {ex}"
+
+
+def _load_manifest(target_dir):
+    """
+    :return: target_dir's manifest: a dict that maps relative path strs to [content hash, season_start_year] lists of
+        their last successful conversion. empty if there is no (readable) manifest
+    """
+    try:
+        with open(target_dir / MANIFEST_FILE_NAME) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(target_dir, manifest):
+    write_file_atomically(target_dir / MANIFEST_FILE_NAME, 'w', lambda fp: json.dump(manifest, fp, sort_keys=True))
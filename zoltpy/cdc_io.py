@@ -1,12 +1,12 @@
 import csv
 import datetime
-from itertools import groupby
-
-import pymmwr
+import functools
 
 #
 # date formats
 #
+from zoltpy.profiling import STAGE_CSV_READ, STAGE_PARSE_VALUE, STAGE_PROCESS_ROW, STAGE_SORT, active_reader_stats, \
+    reader_stage
 from zoltpy.quantile_io import POINT_PREDICTION_CLASS, BIN_DISTRIBUTION_CLASS
 
 
@@ -32,6 +32,11 @@ CDC_CSV_HEADER = ['location', 'target', 'type', 'unit', 'bin_start_incl', 'bin_e
 # EW30-2016 and ends with EW29-2017."
 SEASON_START_EW_NUMBER = 30
 
+THAI_TARGET_NAMES = frozenset(['1_biweek_ahead', '2_biweek_ahead', '3_biweek_ahead', '4_biweek_ahead',
+                               '5_biweek_ahead'])
+CDC_TARGET_NAMES = frozenset(['Season onset', 'Season peak week', 'Season peak percentage', '1 wk ahead', '2 wk ahead',
+                              '3 wk ahead', '4 wk ahead']) | THAI_TARGET_NAMES  # all CDC and Thai targets
+
 
 #
 # json_io_dict_from_cdc_csv_file()
@@ -51,17 +56,94 @@ def json_io_dict_from_cdc_csv_file(season_start_year, cdc_csv_file_fp):
     """
     return {'meta': {},
             'predictions': _prediction_dicts_for_csv_rows(season_start_year,
-                                                          _cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp))}
+                                                          _iter_cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp))}
+
+
+def forecast_frame_from_cdc_csv_file(season_start_year, cdc_csv_file_fp):
+    """
+    The same as `json_io_dict_from_cdc_csv_file()`, but returns the predictions as a `ForecastFrame` rather than a
+    "JSON IO dict".
+
+    :return a ForecastFrame that contains the two types of predictions
+    """
+    from zoltpy.forecast_frame import ForecastFrameBuilder  # avoid circular imports
+
+
+    builder = ForecastFrameBuilder()
+    _prediction_dicts_for_csv_rows(season_start_year, _iter_cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp), builder)
+    return builder.build()
+
+
+def iter_prediction_dicts_from_cdc_csv_file(season_start_year, cdc_csv_file_fp):
+    """
+    A streaming version of `json_io_dict_from_cdc_csv_file()` that yields each location/target/type's prediction dict
+    as soon as the next one starts, rather than building them all in memory first. This relies on the file's rows being
+    grouped by location, target, and type, which CDC files almost always are, and so that a partial prediction dict is
+    never yielded, the grouping is checked first: seekable files are scanned for it (reading just the location, target,
+    and type columns) and then rewound. Files that are not grouped or not seekable fall back to accumulating every
+    prediction dict until the end of the file, i.e., correct output but without the memory savings. Prediction dicts
+    are yielded in the order they first appear in the file, which differs from `json_io_dict_from_cdc_csv_file()`'s
+    sorted order.
+
+    :param season_start_year
+    :param cdc_csv_file_fp: as passed to `json_io_dict_from_cdc_csv_file()`
+    :return: a generator of PointPrediction or BinDistribution prediction dicts
+    """
+    try:
+        start_position = cdc_csv_file_fp.tell() if cdc_csv_file_fp.seekable() else None
+    except (AttributeError, OSError):  # not a file, or `tell()` is disabled b/c the caller iterated over it
+        start_position = None
+    if start_position is not None:
+        is_grouped = _are_cdc_csv_rows_grouped(cdc_csv_file_fp)
+        cdc_csv_file_fp.seek(start_position)
+    else:
+        is_grouped = False
+    try:
+        yield from _iter_prediction_dicts_for_csv_rows(season_start_year,
+                                                       _iter_cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp),
+                                                       is_grouped)
+    except _UngroupedRowsError as ure:  # the file changed after it was scanned
+        raise RuntimeError(f"rows were not grouped by location, target, and type. {ure}")
+
+
+def _are_cdc_csv_rows_grouped(cdc_csv_file_fp):
+    """
+    `iter_prediction_dicts_from_cdc_csv_file()` helper that reads the rest of cdc_csv_file_fp, checking only the
+    location, target, and type columns. Other validation is left to `_iter_cleaned_rows_from_cdc_csv_file()`.
+
+    :return: True if cdc_csv_file_fp's rows (after the header) are grouped by location, target, and type, i.e., if no
+        group recurs after the next one has started. False o/w
+    """
+    csv_reader = csv.reader(cdc_csv_file_fp, delimiter=',')
+    next(csv_reader, None)  # header
+    seen_keys = set()
+    group_key = None
+    for row in csv_reader:
+        key = (row[0], row[1], row[2].lower()) if len(row) >= 3 else tuple(row)
+        if key != group_key:
+            if key in seen_keys:
+                return False
+
+            seen_keys.add(key)
+            group_key = key
+    return True
 
 
 def _cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp):
     """
-    Loads the rows from cdc_csv_file_fp, cleans them, and then returns them as a list. Does some basic validation,
+    :return: a list of the rows yielded by `_iter_cleaned_rows_from_cdc_csv_file()`
+    """
+    return list(_iter_cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp))
+
+
+def _iter_cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp):
+    """
+    Loads the rows from cdc_csv_file_fp, cleans them, and then yields them one at a time. Does some basic validation,
     but does not check units and targets. This is b/c Units and Targets might not yet exist (if they're
     dynamically created by this method's callers). Does *not* skip bin rows where the value is 0.
 
     :param cdc_csv_file_fp: the *.cdc.csv data file to load
-    :return: a list of rows: location_name, target_name, is_point_row, bin_start_incl, bin_end_notincl, value
+    :return: a generator of rows: location_name, target_name, is_point_row, bin_start_incl, bin_end_notincl, value
     """
     csv_reader = csv.reader(cdc_csv_file_fp, delimiter=',')
 
@@ -80,8 +162,16 @@ def _cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp):
     if header != CDC_CSV_HEADER:
         raise RuntimeError(f"invalid header. header={header!r}, orig_header={orig_header!r}")
 
-    # collect the rows. first we load them all into memory (processing and validating them as we go)
-    rows = []
+    # profiling is checked once here rather than per row so that it costs nothing when disabled
+    parse_value = _parse_value
+    reader_stats = active_reader_stats()
+    if reader_stats is not None:
+        csv_reader = reader_stats.timed_iter(STAGE_CSV_READ, csv_reader)
+        parse_value = reader_stats.timed(STAGE_PARSE_VALUE, _parse_value)
+
+    # process and validate the rows as we go
+    point_row_type, bin_row_type = CDC_POINT_ROW_TYPE.lower(), CDC_BIN_ROW_TYPE.lower()
+    bin_str_to_value = {}  # memoizes `_parse_value()` for the bin columns, which have few distinct values
     for row in csv_reader:  # might have 7 or 8 columns, depending on whether there's a trailing ',' in file
         if (len(row) == 8) and (row[7] == ''):
             row = row[:7]
@@ -96,20 +186,21 @@ def _cleaned_rows_from_cdc_csv_file(cdc_csv_file_fp):
 
         # validate row_type
         row_type = row_type.lower()
-        if (row_type != CDC_POINT_ROW_TYPE.lower()) and (row_type != CDC_BIN_ROW_TYPE.lower()):
+        if (row_type != point_row_type) and (row_type != bin_row_type):
             raise RuntimeError(f"row_type was neither '{CDC_POINT_ROW_TYPE}' nor '{CDC_BIN_ROW_TYPE}': {row_type!r}")
-        is_point_row = (row_type == CDC_POINT_ROW_TYPE.lower())
+        is_point_row = (row_type == point_row_type)
 
         # _parse_value() handles non-numeric cases like 'NA' and 'none', which it turns into None. o/w it's a number
-        bin_start_incl = _parse_value(bin_start_incl)
-        bin_end_notincl = _parse_value(bin_end_notincl)
-        value = _parse_value(value)
-        rows.append([location_name, target_name, is_point_row, bin_start_incl, bin_end_notincl, value])
+        for bin_str in (bin_start_incl, bin_end_notincl):
+            if bin_str not in bin_str_to_value:
+                bin_str_to_value[bin_str] = parse_value(bin_str)
+        bin_start_incl = bin_str_to_value[bin_start_incl]
+        bin_end_notincl = bin_str_to_value[bin_end_notincl]
+        value = parse_value(value)
+        yield location_name, target_name, is_point_row, bin_start_incl, bin_end_notincl, value
 
-    return rows
 
-
-def _prediction_dicts_for_csv_rows(season_start_year, rows):
+def _prediction_dicts_for_csv_rows(season_start_year, rows, prediction_dicts=None):
     """
     json_io_dict_from_cdc_csv_file() helper that returns a list of prediction dicts for the 'predictions' section of the
     exported json. Each dict corresponds to either a PointPrediction or BinDistribution depending on each row in rows.
@@ -137,52 +228,113 @@ def _prediction_dicts_for_csv_rows(season_start_year, rows):
     But we dropped that idea and stayed with the original single nominal target.
 
     :param season_start_year
-    :param rows: as returned by _cleaned_rows_from_cdc_csv_file():
-        location_name, target_name, is_point_row, bin_start_incl, bin_end_notincl, value
-    :return: a list of PointPrediction or BinDistribution prediction dicts
-    """
-    prediction_dicts = []  # return value
-    rows.sort(key=lambda _: (_[0], _[1], _[2]))  # sorted for groupby()
-    for (location_name, target_name, is_point_row), bin_start_end_val_grouper in \
-            groupby(rows, key=lambda _: (_[0], _[1], _[2])):
-        if target_name not in ['Season onset', 'Season peak week', 'Season peak percentage', '1 wk ahead', '2 wk ahead',
-                               '3 wk ahead', '4 wk ahead', '1_biweek_ahead', '2_biweek_ahead', '3_biweek_ahead',
-                               '4_biweek_ahead', '5_biweek_ahead']:  # all CDC and Thai targets
-            raise RuntimeError(f"invalid target_name: {target_name!r}")
+    :param rows: as returned by _iter_cleaned_rows_from_cdc_csv_file():
+        location_name, target_name, is_point_row, bin_start_incl, bin_end_notincl, value. need not be grouped or sorted
+    :param prediction_dicts: optional list or `ForecastFrameBuilder` to append the prediction dicts to. a new list is
+        used if None
+    :return: prediction_dicts, filled with PointPrediction or BinDistribution prediction dicts, sorted by unit, target,
+        and class (bin before point)
+    """
+    prediction_dicts = [] if prediction_dicts is None else prediction_dicts  # return value
+    # sorting the (relatively few) prediction dicts rather than the rows keeps the output order we've always had
+    unsorted_prediction_dicts = _iter_prediction_dicts_for_csv_rows(season_start_year, rows, is_grouped=False)
+    reader_stats = active_reader_stats()
+    if reader_stats is not None:  # read first so that STAGE_SORT times only the sort
+        unsorted_prediction_dicts = list(unsorted_prediction_dicts)
+    with reader_stage(reader_stats, STAGE_SORT, len(unsorted_prediction_dicts) if reader_stats else 0):
+        sorted_prediction_dicts = sorted(unsorted_prediction_dicts,
+                                         key=lambda _: (_['unit'], _['target'], _['class'] == POINT_PREDICTION_CLASS))
+    for prediction_dict in sorted_prediction_dicts:
+        prediction_dicts.append(prediction_dict)
+    return prediction_dicts
+
+
+class _UngroupedRowsError(Exception):
+    """
+    Raised by `_iter_prediction_dicts_for_csv_rows()` when it's told rows are grouped but they're not.
+    """
+    pass
+
+
+def _iter_prediction_dicts_for_csv_rows(season_start_year, rows, is_grouped=True):
+    """
+    Helper that does a single pass over rows, accumulating each location/target/type's values in a dict, i.e., without
+    sorting rows.
+
+    :param season_start_year
+    :param rows: as passed to `_prediction_dicts_for_csv_rows()`
+    :param is_grouped: True if rows are grouped by location, target, and type, in which case each group's prediction
+        dict is yielded as soon as the next group starts, and `_UngroupedRowsError` is raised if an earlier group
+        recurs. False if rows might be in any order, in which case all groups are accumulated and then yielded at the
+        end
+    :return: a generator of PointPrediction or BinDistribution prediction dicts, in the order their groups first
+        appear in rows
+    """
+    # profiling is checked once here rather than per row so that it costs nothing when disabled
+    process_csv_point_row, process_csv_bin_row = _process_csv_point_row, _process_csv_bin_row
+    reader_stats = active_reader_stats()
+    if reader_stats is not None:
+        process_csv_point_row = reader_stats.timed(STAGE_PROCESS_ROW, _process_csv_point_row)
+        process_csv_bin_row = reader_stats.timed(STAGE_PROCESS_ROW, _process_csv_bin_row)
+
+    groups = {}  # (location_name, target_name, is_point_row) -> 2-tuple: (point values or bin cats, bin probs)
+    yielded_keys = set()  # is_grouped only
+    group_key, group = None, None
+    for location_name, target_name, is_point_row, bin_start_incl, bin_end_notincl, value in rows:
+        key = (location_name, target_name, is_point_row)
+        if key != group_key:  # a new group or, if not is_grouped, possibly a recurring one
+            if is_grouped and (group_key is not None):
+                yield _prediction_dict_for_group(group_key, groups.pop(group_key))
+                yielded_keys.add(group_key)
+                if key in yielded_keys:
+                    raise _UngroupedRowsError(f"location_name={location_name!r}, target_name={target_name!r}, "
+                                              f"is_point_row={is_point_row}")
+
+            group_key, group = key, groups.get(key)
+            if group is None:
+                if target_name not in CDC_TARGET_NAMES:
+                    raise RuntimeError(f"invalid target_name: {target_name!r}")
+
+                group = groups[key] = ([], [])
 
         # fill values for points and bins. NB: should only be one point row per location/target pair, but collect all
         # (i.e., don't validate here)
-        point_values = []
-        bin_cats, bin_probs = [], []
-        for _, _, _, bin_start_incl, bin_end_notincl, value in bin_start_end_val_grouper:  # all 3 are numbers or None
-            if is_point_row:
-                point_value = _process_csv_point_row(season_start_year, target_name, value)
-                point_values.append(point_value)
-            else:
-                bin_cat, bin_prob = _process_csv_bin_row(season_start_year, target_name, value,
-                                                         bin_start_incl, bin_end_notincl)
-                bin_cats.append(bin_cat)
-                bin_probs.append(bin_prob)
-
-        # add the actual prediction dicts
-        if point_values:
-            if len(point_values) > 1:
-                raise RuntimeError(f"len(point_values) > 1: {point_values}")
-
-            point_value = point_values[0]
-            prediction_dicts.append({"unit": location_name,
-                                     "target": target_name,
-                                     'class': POINT_PREDICTION_CLASS,  # PointPrediction
-                                     'prediction': {
-                                         'value': point_value}})
-        if bin_cats:
-            prediction_dicts.append({"unit": location_name,
-                                     "target": target_name,
-                                     'class': BIN_DISTRIBUTION_CLASS,  # BinDistribution
-                                     'prediction': {
-                                         "cat": bin_cats,
-                                         "prob": bin_probs}})
-    return prediction_dicts
+        if is_point_row:
+            group[0].append(process_csv_point_row(season_start_year, target_name, value))
+        else:
+            bin_cat, bin_prob = process_csv_bin_row(season_start_year, target_name, value, bin_start_incl,
+                                                    bin_end_notincl)
+            group[0].append(bin_cat)
+            group[1].append(bin_prob)
+
+    for key, group in groups.items():  # just the last group if is_grouped
+        yield _prediction_dict_for_group(key, group)
+
+
+def _prediction_dict_for_group(key, group):
+    """
+    :param key: a group's 3-tuple: (location_name, target_name, is_point_row)
+    :param group: the group's 2-tuple of lists: (point values or bin cats, bin probs)
+    :return: a PointPrediction or BinDistribution prediction dict for the args
+    """
+    location_name, target_name, is_point_row = key
+    if is_point_row:
+        point_values = group[0]
+        if len(point_values) > 1:
+            raise RuntimeError(f"len(point_values) > 1: {point_values}")
+
+        return {"unit": location_name,
+                "target": target_name,
+                'class': POINT_PREDICTION_CLASS,  # PointPrediction
+                'prediction': {
+                    'value': point_values[0]}}
+    else:
+        return {"unit": location_name,
+                "target": target_name,
+                'class': BIN_DISTRIBUTION_CLASS,  # BinDistribution
+                'prediction': {
+                    "cat": group[0],
+                    "prob": group[1]}}
 
 
 def _process_csv_point_row(season_start_year, target_name, value):
@@ -197,14 +349,13 @@ def _process_csv_point_row(season_start_year, target_name, value):
             #   1) < 1 (so use last EW in season_start_year), or:
             #   2) > the last EW in season_start_year (so use EW01 of season_start_year + 1)
             ew_week = round(value)
+            weeks_in_year = _epiweek_calendar(season_start_year)[0]
             if ew_week < 1:
-                ew_week = pymmwr.mmwr_weeks_in_year(season_start_year)  # wrap back to previous EW
-            elif ew_week > pymmwr.mmwr_weeks_in_year(season_start_year):  # wrap forward to next EW
+                ew_week = weeks_in_year  # wrap back to previous EW
+            elif ew_week > weeks_in_year:  # wrap forward to next EW
                 ew_week = 1
-            monday_date = _monday_date_from_ew_and_season_start_year(ew_week, season_start_year)
-            return monday_date.strftime(YYYY_MM_DD_DATE_FORMAT)
-    elif target_name in ['1_biweek_ahead', '2_biweek_ahead', '3_biweek_ahead', '4_biweek_ahead',
-                         '5_biweek_ahead']:  # thai
+            return _monday_date_str_from_ew_and_season_start_year(ew_week, season_start_year)
+    elif target_name in THAI_TARGET_NAMES:
         return round(value)  # some point predictions are floats
     elif value is None:
         raise RuntimeError(f"None point values are only valid for 'Season onset' targets. "
@@ -212,12 +363,12 @@ def _process_csv_point_row(season_start_year, target_name, value):
     elif target_name == 'Season peak week':  # date target. value: an EW Monday date
         # same 'wrapping' logic as above to handle rounding boundaries
         ew_week = round(value)
+        weeks_in_year = _epiweek_calendar(season_start_year)[0]
         if ew_week < 1:
-            ew_week = pymmwr.mmwr_weeks_in_year(season_start_year)  # wrap back to previous EW
-        elif ew_week > pymmwr.mmwr_weeks_in_year(season_start_year):  # wrap forward to next EW
+            ew_week = weeks_in_year  # wrap back to previous EW
+        elif ew_week > weeks_in_year:  # wrap forward to next EW
             ew_week = 1
-        monday_date = _monday_date_from_ew_and_season_start_year(ew_week, season_start_year)
-        return monday_date.strftime(YYYY_MM_DD_DATE_FORMAT)
+        return _monday_date_str_from_ew_and_season_start_year(ew_week, season_start_year)
     else:  # 'Season peak percentage', '1 wk ahead', '2 wk ahead', '3 wk ahead', '4 wk ahead', '1_biweek_ahead', '2_biweek_ahead', '3_biweek_ahead', '4_biweek_ahead',  # thai '5_biweek_ahead'
         return value
 
@@ -228,8 +379,7 @@ def _process_csv_bin_row(season_start_year, target_name, value, bin_start_incl,
         if (bin_start_incl is None) and (bin_end_notincl is None):  # "none" bin (probability of no onset)
             return 'none', value  # convert back from None to original 'none' input
         elif (bin_start_incl is not None) and (bin_end_notincl is not None):  # regular (non-"none") bin
-            monday_date = _monday_date_from_ew_and_season_start_year(bin_start_incl, season_start_year)
-            return monday_date.strftime(YYYY_MM_DD_DATE_FORMAT), value
+            return _monday_date_str_from_ew_and_season_start_year(bin_start_incl, season_start_year), value
         else:
             raise RuntimeError(f"got 'Season onset' row but not both start and end were None. "
                                f"bin_start_incl={bin_start_incl}, bin_end_notincl={bin_end_notincl}")
@@ -238,12 +388,90 @@ def _process_csv_bin_row(season_start_year, target_name, value, bin_start_incl,
                            f"target_name={target_name}. bin_start_incl, bin_end_notincl: "
                            f"{bin_start_incl}, {bin_end_notincl}")
     elif target_name == 'Season peak week':  # date target. start: an EW Monday date
-        monday_date = _monday_date_from_ew_and_season_start_year(bin_start_incl, season_start_year)
-        return monday_date.strftime(YYYY_MM_DD_DATE_FORMAT), value
+        return _monday_date_str_from_ew_and_season_start_year(bin_start_incl, season_start_year), value
     else:  # 'Season peak percentage', '1 wk ahead', '2 wk ahead', '3 wk ahead', '4 wk ahead', '1_biweek_ahead', '2_biweek_ahead', '3_biweek_ahead', '4_biweek_ahead',  # thai '5_biweek_ahead'
         return bin_start_incl, value
 
 
+#
+# iter_cdc_csv_rows_from_json_io_dict()
+#
+
+# the 'unit' column of exported rows. it's ignored by `json_io_dict_from_cdc_csv_file()`
+CDC_TARGET_NAME_TO_UNIT = {'Season onset': 'week', 'Season peak week': 'week', 'Season peak percentage': 'percent',
+                           '1 wk ahead': 'percent', '2 wk ahead': 'percent', '3 wk ahead': 'percent',
+                           '4 wk ahead': 'percent'}
+
+CDC_LAST_BIN_END_NOTINCL = 100  # the end of the last (open-ended) bin of non-EW targets, e.g., the "13,100" ILI% bin
+
+
+def iter_cdc_csv_rows_from_json_io_dict(season_start_year, json_io_dict, last_bin_end_notincl=CDC_LAST_BIN_END_NOTINCL):
+    """
+    The inverse of `json_io_dict_from_cdc_csv_file()`: a generator that yields CDC CSV rows (including the header) for
+    the PointPredictions and BinDistributions in json_io_dict, one at a time. Monday dates are converted back to EWs
+    using a precomputed calendar. Other prediction classes can't be represented in CDC CSV files and are skipped. Rows
+    are yielded in prediction dict order.
+
+    :param season_start_year
+    :param json_io_dict: a "JSON IO dict", `ForecastFrame`, or `Forecast` (whose data is streamed via
+        `Forecast.iter_prediction_dicts()`) to export
+    :param last_bin_end_notincl: the Bin_end_notincl of each non-EW target's last bin. CDC files don't store bin ends in
+        JSON IO dicts, so the others are the next bin's start
+    :return: a generator of CDC CSV rows as lists. the header is CDC_CSV_HEADER in the capitalization used by CDC files
+    """
+    from zoltpy.connection import Forecast  # avoid circular imports
+    from zoltpy.csv_io import prediction_dicts_for_json_io_dict  # ""
+
+
+    if isinstance(json_io_dict, Forecast):  # streamed as it's downloaded
+        prediction_dicts = (prediction_dict for prediction_dict in json_io_dict.iter_prediction_dicts()
+                            if prediction_dict['class'] in [POINT_PREDICTION_CLASS, BIN_DISTRIBUTION_CLASS])
+    else:
+        prediction_dicts = prediction_dicts_for_json_io_dict(json_io_dict,
+                                                             [POINT_PREDICTION_CLASS, BIN_DISTRIBUTION_CLASS])
+    yield [column.capitalize() for column in CDC_CSV_HEADER]  # e.g., 'Bin_start_incl'
+    for prediction_dict in prediction_dicts:
+        location_name, target_name, prediction = \
+            prediction_dict['unit'], prediction_dict['target'], prediction_dict['prediction']
+        if target_name not in CDC_TARGET_NAMES:
+            raise RuntimeError(f"invalid target_name: {target_name!r}")
+
+        unit = CDC_TARGET_NAME_TO_UNIT.get(target_name, '')
+        is_ew_target = target_name in ['Season onset', 'Season peak week']
+        if prediction_dict['class'] == POINT_PREDICTION_CLASS:
+            value = prediction['value']
+            if is_ew_target and (value != 'none'):
+                value = _ew_from_monday_date_str_and_season_start_year(value, season_start_year)
+            yield [location_name, target_name, CDC_POINT_ROW_TYPE, unit, 'NA', 'NA', value]
+        elif is_ew_target:  # BinDistribution with Monday date cats, plus 'none' for 'Season onset'
+            for cat, prob in zip(prediction['cat'], prediction['prob']):
+                if cat == 'none':
+                    yield [location_name, target_name, CDC_BIN_ROW_TYPE, unit, 'none', 'none', prob]
+                else:
+                    ew_week = _ew_from_monday_date_str_and_season_start_year(cat, season_start_year)
+                    yield [location_name, target_name, CDC_BIN_ROW_TYPE, unit, ew_week, ew_week + 1, prob]
+        else:  # BinDistribution with numeric cats
+            sorted_cats = sorted(prediction['cat'])
+            cat_to_next_cat = dict(zip(sorted_cats, sorted_cats[1:]))
+            for cat, prob in zip(prediction['cat'], prediction['prob']):
+                yield [location_name, target_name, CDC_BIN_ROW_TYPE, unit, cat,
+                       cat_to_next_cat.get(cat, last_bin_end_notincl), prob]
+
+
+def write_cdc_csv(season_start_year, json_io_dict, cdc_csv_fp, last_bin_end_notincl=CDC_LAST_BIN_END_NOTINCL):
+    """
+    Streams the rows of `iter_cdc_csv_rows_from_json_io_dict()` to cdc_csv_fp, using constant memory beyond
+    json_io_dict itself (none for a `Forecast`).
+
+    :param season_start_year
+    :param json_io_dict: as passed to `iter_cdc_csv_rows_from_json_io_dict()`
+    :param cdc_csv_fp: an open text file-like object to write to. should be opened with `newline=''` per the csv module
+    :param last_bin_end_notincl: as passed to `iter_cdc_csv_rows_from_json_io_dict()`
+    """
+    csv.writer(cdc_csv_fp, delimiter=',').writerows(iter_cdc_csv_rows_from_json_io_dict(season_start_year, json_io_dict,
+                                                                                        last_bin_end_notincl))
+
+
 #
 # utility functions
 #
@@ -262,10 +490,11 @@ def _parse_value(value_str):
     """
     Tries to parse value_str (a string) in this order: int, float, or date in YYYY_MM_DD_DATE_FORMAT. Returns None o/w.
     """
-    try:
-        return int(value_str)
-    except ValueError:
-        pass
+    if '.' not in value_str:  # int() never accepts a '.', and its ValueError is slow. most values are floats
+        try:
+            return int(value_str)
+        except ValueError:
+            pass
 
     try:
         return float(value_str)
@@ -285,8 +514,71 @@ def _monday_date_from_ew_and_season_start_year(ew_week, season_start_year):
     :param season_start_year
     :return: a datetime.date that is the Monday of the EW corresponding to the args
     """
+    import pymmwr  # deferred for import speed
+
+
     if ew_week < SEASON_START_EW_NUMBER:
         sunday_date = pymmwr.mmwr_week_to_date(season_start_year + 1, ew_week)
     else:
         sunday_date = pymmwr.mmwr_week_to_date(season_start_year, ew_week)
     return sunday_date + datetime.timedelta(days=1)
+
+
+@functools.lru_cache(maxsize=None)
+def _epiweek_calendar(season_start_year):
+    """
+    Precomputes the EW dates for a season so that converting a CDC CSV file's rows does no `pymmwr` calls. There are
+    only ~53 distinct EWs per season, but thousands of rows that use them.
+
+    :param season_start_year
+    :return: a 2-tuple: (weeks_in_year, ew_to_monday_date_str). weeks_in_year is the number of MMWR weeks in
+        season_start_year (52 or 53), and ew_to_monday_date_str is a dict that maps each EW number 1 through 53 to the
+        `_monday_date_from_ew_and_season_start_year()` date formatted as YYYY_MM_DD_DATE_FORMAT
+    """
+    import pymmwr  # deferred for import speed
+
+
+    ew_to_monday_date_str = {ew_week: _monday_date_from_ew_and_season_start_year(ew_week, season_start_year)
+                             .strftime(YYYY_MM_DD_DATE_FORMAT) for ew_week in range(1, 54)}
+    return pymmwr.mmwr_weeks_in_year(season_start_year), ew_to_monday_date_str
+
+
+@functools.lru_cache(maxsize=None)
+def _monday_date_str_to_ew(season_start_year):
+    """
+    :return: the inverse of `_epiweek_calendar()`'s ew_to_monday_date_str, limited to the season's weeks_in_year EWs.
+        (in 52-week years EW 53's date is EW 1's)
+    """
+    weeks_in_year, ew_to_monday_date_str = _epiweek_calendar(season_start_year)
+    return {monday_date_str: ew_week for ew_week, monday_date_str in ew_to_monday_date_str.items()
+            if ew_week <= weeks_in_year}
+
+
+def _ew_from_monday_date_str_and_season_start_year(monday_date_str, season_start_year):
+    """
+    The inverse of `_monday_date_str_from_ew_and_season_start_year()`.
+
+    :param monday_date_str: a Monday date formatted as YYYY_MM_DD_DATE_FORMAT
+    :param season_start_year
+    :return: the EW number of monday_date_str. a table lookup for dates in the season
+    """
+    ew_week = _monday_date_str_to_ew(season_start_year).get(monday_date_str)
+    if ew_week is None:  # not in the season
+        import pymmwr  # deferred for import speed
+
+
+        monday_date = datetime.datetime.strptime(monday_date_str, YYYY_MM_DD_DATE_FORMAT).date()
+        ew_week = pymmwr.date_to_mmwr_week(monday_date - datetime.timedelta(days=1))['week']
+    return ew_week
+
+
+def _monday_date_str_from_ew_and_season_start_year(ew_week, season_start_year):
+    """
+    The same as `_monday_date_from_ew_and_season_start_year()`, but returns the date formatted as
+    YYYY_MM_DD_DATE_FORMAT, and is a table lookup for EWs 1 through 53.
+    """
+    monday_date_str = _epiweek_calendar(season_start_year)[1].get(ew_week)
+    if monday_date_str is None:  # an unusual EW, e.g., 0 or 40.5
+        monday_date_str = _monday_date_from_ew_and_season_start_year(ew_week, season_start_year) \
+            .strftime(YYYY_MM_DD_DATE_FORMAT)
+    return monday_date_str
@@ -1,17 +1,26 @@
+import base64
+import binascii
 import csv
 import datetime
-import json
 import logging
 import tempfile
+import time
 from abc import ABC
 
-import requests
-
+from zoltpy import json_backend
 from zoltpy.cdc_io import YYYY_MM_DD_DATE_FORMAT, _parse_value
+from zoltpy.json_stream import DEFAULT_CHUNK_SIZE, iter_prediction_dicts_from_json_chunks
 
 
 logger = logging.getLogger(__name__)
 
+BULK_MAX_WORKERS = 8  # default number of concurrent POSTs made by `Project.create_timezeros()` and `create_models()`
+RETRY_STATUS_CODES = (429, 503)  # transient errors where the server did not process the POST. always retried
+AMBIGUOUS_STATUS_CODES = (500, 502, 504)  # transient errors where the server might have processed the POST
+TOKEN_EXPIRATION_MARGIN = 60  # seconds before a token's expiration that `ZoltarSession.is_token_expired()` says it is
+
+MODEL_CONFIG_KEYS = {'name', 'abbreviation', 'team_name', 'description', 'home_url', 'aux_data_url'}
+
 
 def _basic_str(obj):
     """
@@ -20,6 +29,53 @@ def _basic_str(obj):
     return obj.__class__.__name__ + ': ' + obj.__repr__()
 
 
+def _validate_model_config(model_config):
+    """
+    `Project.create_model()` and `create_models()` helper that raises RuntimeError if model_config is invalid.
+    """
+    actual_keys = set(model_config.keys())
+    if actual_keys != MODEL_CONFIG_KEYS:
+        raise RuntimeError(f"Wrong keys in 'model_config'. expected={MODEL_CONFIG_KEYS}, actual={actual_keys}")
+
+
+def _timezero_config(timezero_date, data_version_date=None, is_season_start=False, season_name=''):
+    """
+    `Project.create_timezero()` and `create_timezeros()` helper that validates the args.
+
+    :return: the 'timezero_config' dict to POST. raises RuntimeError if the args are invalid
+    """
+    if not isinstance(_parse_value(timezero_date), datetime.date):  # returns a date if valid
+        raise RuntimeError(f"invalid timezero_date={timezero_date}. "
+                           f"was not in the format {YYYY_MM_DD_DATE_FORMAT}")
+    elif data_version_date and (not isinstance(_parse_value(data_version_date), datetime.date)):
+        raise RuntimeError(f"invalid data_version_date={data_version_date}. "
+                           f"was not in the format {YYYY_MM_DD_DATE_FORMAT}")
+    elif is_season_start and not season_name:
+        raise RuntimeError(f"season_name not found but is required when is_season_start is passed")
+    elif not is_season_start and season_name:
+        raise RuntimeError(f"season_name was found but is_season_start was not True")
+
+    # 'timezero_config' args:
+    # - required: 'timezero_date', 'data_version_date', 'is_season_start'
+    # - optional: 'season_name'
+    timezero_config = {'timezero_date': timezero_date,
+                       'data_version_date': data_version_date,
+                       'is_season_start': is_season_start}
+    if is_season_start:
+        timezero_config['season_name'] = season_name
+    return timezero_config
+
+
+def _requests():
+    """
+    :return: the `requests` module. it's imported on first use rather than at import time, for import speed
+    """
+    import requests  # deferred for import speed
+
+
+    return requests
+
+
 class ZoltarConnection:
     """
     Represents a connection to a Zoltar server. This is an object-oriented interface that may be best suited to zoltpy
@@ -78,13 +134,58 @@ class ZoltarConnection:
         if not self.session:
             raise RuntimeError("json_for_uri(): no session. uri={uri}")
 
-        response = requests.get(uri, headers={'Accept': accept,
-                                              'Authorization': 'JWT {}'.format(self.session.token)})
+        response = _requests().get(uri, headers={'Accept': accept,
+                                                 'Authorization': 'JWT {}'.format(self.session.token)})
         if response.status_code != 200:  # HTTP_200_OK
             raise RuntimeError(f"json_for_uri(): status code was not 200. uri={uri},"
                                f"status_code={response.status_code}. text={response.text}")
 
-        return response.json() if is_return_json else response
+        return json_backend.loads(response.content) if is_return_json else response
+
+
+    def _post_json(self, uri, json_data, max_retries=0, retry_wait=1, existing_json_fcn=None):
+        """
+        POSTs json_data to uri, retrying transient errors with exponential backoff. Because POSTs that create objects
+        are not idempotent, only RETRY_STATUS_CODES responses are always retried. Other transient errors - connection
+        errors, timeouts, and AMBIGUOUS_STATUS_CODES responses - might have happened after the server created the
+        object, so they are retried only if existing_json_fcn is passed, and only after it finds that the object does
+        not exist.
+
+        :param max_retries: number of times to retry. 0 means no retries
+        :param retry_wait: seconds to wait before the first retry. doubles for each one after that
+        :param existing_json_fcn: optional function of no args that returns the json of the object json_data creates if
+            it exists, or None o/w
+        :return: the response's json, or existing_json_fcn's if the object was created despite an error
+        """
+        for attempt_idx in range(max_retries + 1):
+            is_last_attempt = attempt_idx == max_retries
+            try:
+                response = _requests().post(uri, headers={'Authorization': f'JWT {self.session.token}'},
+                                            json=json_data)
+            except (_requests().ConnectionError, _requests().Timeout) as ex:
+                if is_last_attempt or (existing_json_fcn is None):
+                    raise
+
+                is_ambiguous = True
+                logger.debug(f"_post_json(): retrying after error. uri={uri}, attempt_idx={attempt_idx}, ex={ex!r}")
+            else:
+                if response.status_code == 200:  # HTTP_200_OK
+                    return response.json()
+
+                is_ambiguous = response.status_code in AMBIGUOUS_STATUS_CODES
+                if is_last_attempt or not ((response.status_code in RETRY_STATUS_CODES)
+                                           or (is_ambiguous and existing_json_fcn)):
+                    raise RuntimeError(f"status_code was not 200. status_code={response.status_code}, "
+                                       f"text={response.text}")
+
+                logger.debug(f"_post_json(): retrying after status_code={response.status_code}. uri={uri}, "
+                             f"attempt_idx={attempt_idx}")
+            time.sleep(retry_wait * 2 ** attempt_idx)
+            if is_ambiguous:
+                existing_json = existing_json_fcn()
+                if existing_json is not None:
+                    logger.debug(f"_post_json(): the object was created despite the error. uri={uri}")
+                    return existing_json
 
 
 class ZoltarSession:  # internal use
@@ -93,12 +194,13 @@ class ZoltarSession:  # internal use
         super().__init__()
         self.zoltar_connection = zoltar_connection
         self.token = self._get_token()
+        self.token_expiration = _token_expiration(self.token)  # None if unknown
 
 
     def _get_token(self):
-        response = requests.post(self.zoltar_connection.host + '/api-token-auth/',
-                                 {'username': self.zoltar_connection.username,
-                                  'password': self.zoltar_connection.password})
+        response = _requests().post(self.zoltar_connection.host + '/api-token-auth/',
+                                    {'username': self.zoltar_connection.username,
+                                     'password': self.zoltar_connection.password})
         if response.status_code != 200:  # HTTP_200_OK
             raise RuntimeError(f"get_token(): status code was not 200. status_code={response.status_code}. "
                                f"text={response.text}")
@@ -108,10 +210,25 @@ class ZoltarSession:  # internal use
 
     def is_token_expired(self):
         """
-        :return: True if my token is expired, and False o/w
+        :return: True if my token is expired (or about to be - see TOKEN_EXPIRATION_MARGIN), and False o/w. tokens whose
+            expiration is unknown are treated as expired so that they're always renewed
         """
         # see zoltr: is_token_expired(), token_expiration_date()
-        return True  # todo fix!
+        return (self.token_expiration is None) or (time.time() >= self.token_expiration - TOKEN_EXPIRATION_MARGIN)
+
+
+def _token_expiration(token):
+    """
+    :param token: a JWT as returned by '/api-token-auth/', i.e., three base64url-encoded parts separated by '.'
+    :return: the token's expiration (its payload's "exp" claim) in seconds since the epoch, or None if token is not a
+        JWT or has no "exp"
+    """
+    try:
+        payload = token.split('.')[1]
+        payload_dict = json_backend.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(payload_dict['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError, binascii.Error):
+        return None
 
 
 class ZoltarResource(ABC):
@@ -180,8 +297,9 @@ class ZoltarResource(ABC):
 
 
     def delete(self):
-        response = requests.delete(self.uri, headers={'Accept': 'application/json; indent=4',
-                                                      'Authorization': f'JWT {self.zoltar_connection.session.token}'})
+        response = _requests().delete(self.uri,
+                                      headers={'Accept': 'application/json; indent=4',
+                                               'Authorization': f'JWT {self.zoltar_connection.session.token}'})
         if (response.status_code != 200) and (response.status_code != 204):  # HTTP_200_OK, HTTP_204_NO_CONTENT
             raise RuntimeError(f'delete_resource(): status code was not 204: {response.status_code}. {response.text}')
 
@@ -282,9 +400,9 @@ class Project(ZoltarResource):
             https://docs.zoltardata.com/
         :return: a Job to use to track the upload
         """
-        response = requests.post(self.uri + 'truth/',
-                                 headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
-                                 files={'data_file': truth_csv_fp})
+        response = _requests().post(self.uri + 'truth/',
+                                    headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
+                                    files={'data_file': truth_csv_fp})
         if response.status_code != 200:  # HTTP_200_OK
             raise RuntimeError(f"upload_truth_data(): status code was not 200. status_code={response.status_code}. "
                                f"text={response.text}")
@@ -314,19 +432,8 @@ class Project(ZoltarResource):
             'home_url', 'aux_data_url']
         :return: a Model
         """
-        # validate model_config
-        actual_keys = set(model_config.keys())
-        expected_keys = {'name', 'abbreviation', 'team_name', 'description', 'home_url', 'aux_data_url'}
-        if actual_keys != expected_keys:
-            raise RuntimeError(f"Wrong keys in 'model_config'. expected={expected_keys}, actual={actual_keys}")
-
-        response = requests.post(f'{self.uri}models/',
-                                 headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
-                                 json={'model_config': model_config})
-        if response.status_code != 200:  # HTTP_200_OK
-            raise RuntimeError(f"status_code was not 200. status_code={response.status_code}, text={response.text}")
-
-        new_model_json = response.json()
+        _validate_model_config(model_config)
+        new_model_json = self.zoltar_connection._post_json(f'{self.uri}models/', {'model_config': model_config})
         return Model(self.zoltar_connection, new_model_json['url'], new_model_json)
 
 
@@ -340,36 +447,113 @@ class Project(ZoltarResource):
         :param season_name: optional season name. required if is_season_start
         :return: the new TimeZero
         """
-        # validate args
-        if not isinstance(_parse_value(timezero_date), datetime.date):  # returns a date if valid
-            raise RuntimeError(f"invalid timezero_date={timezero_date}. "
-                               f"was not in the format {YYYY_MM_DD_DATE_FORMAT}")
-        elif data_version_date and (not isinstance(_parse_value(data_version_date), datetime.date)):
-            raise RuntimeError(f"invalid data_version_date={data_version_date}. "
-                               f"was not in the format {YYYY_MM_DD_DATE_FORMAT}")
-        elif is_season_start and not season_name:
-            raise RuntimeError(f"season_name not found but is required when is_season_start is passed")
-        elif not is_season_start and season_name:
-            raise RuntimeError(f"season_name was found but is_season_start was not True")
-
-        # POST. 'timezero_config' args:
-        # - required: 'timezero_date', 'data_version_date', 'is_season_start'
-        # - optional: 'season_name'
-        timezero_config = {'timezero_date': timezero_date,
-                           'data_version_date': data_version_date,
-                           'is_season_start': is_season_start}
-        if is_season_start:
-            timezero_config['season_name'] = season_name
-        response = requests.post(f'{self.uri}timezeros/',
-                                 headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
-                                 json={'timezero_config': timezero_config})
-        if response.status_code != 200:  # HTTP_200_OK
-            raise RuntimeError(f"status_code was not 200. status_code={response.status_code}, text={response.text}")
-
-        new_timezero_json = response.json()
+        timezero_config = _timezero_config(timezero_date, data_version_date, is_season_start, season_name)
+        new_timezero_json = self.zoltar_connection._post_json(f'{self.uri}timezeros/',
+                                                              {'timezero_config': timezero_config})
         return TimeZero(self.zoltar_connection, new_timezero_json['url'], new_timezero_json)
 
 
+    def create_models(self, model_configs, max_workers=BULK_MAX_WORKERS, max_retries=2):
+        """
+        A bulk version of `create_model()` that creates many models concurrently. All configs are validated before any
+        models are created, and ones whose abbreviation is already in my models are skipped, so re-running after a
+        partial failure only creates the missing ones.
+
+        :param model_configs: a list of `create_model()` model_config dicts
+        :param max_workers: maximum number of concurrent POSTs
+        :param max_retries: number of times to retry each POST after a transient error. see
+            `ZoltarConnection._post_json()`
+        :return: a dict that maps each config's abbreviation to its Model - the new one, or the existing one if skipped.
+            raises RuntimeError (after the others are created) if any could not be created
+        """
+        abbrev_to_config = {}
+        for model_config in model_configs:
+            _validate_model_config(model_config)
+            if model_config['abbreviation'] in abbrev_to_config:
+                raise RuntimeError(f"duplicate model abbreviation: {model_config['abbreviation']!r}")
+
+            abbrev_to_config[model_config['abbreviation']] = model_config
+        return self._create_resources(f'{self.uri}models/', 'model_config', abbrev_to_config,
+                                      lambda: {model.abbreviation: model for model in self.models}, Model, max_workers,
+                                      max_retries)
+
+
+    def create_timezeros(self, timezero_configs, max_workers=BULK_MAX_WORKERS, max_retries=2):
+        """
+        A bulk version of `create_timezero()` that creates many timezeros concurrently. All configs are validated
+        before any timezeros are created, and ones whose timezero_date is already in my timezeros are skipped (even if
+        their other fields differ), so re-running after a partial failure only creates the missing ones.
+
+        :param timezero_configs: a list of dicts containing `create_timezero()`'s args: 'timezero_date', and optionally
+            'data_version_date', 'is_season_start', and 'season_name'
+        :param max_workers: maximum number of concurrent POSTs
+        :param max_retries: number of times to retry each POST after a transient error. see
+            `ZoltarConnection._post_json()`
+        :return: a dict that maps each config's timezero_date to its TimeZero - the new one, or the existing one if
+            skipped. raises RuntimeError (after the others are created) if any could not be created
+        """
+        date_to_config = {}
+        for timezero_config in timezero_configs:
+            try:
+                timezero_config = _timezero_config(**timezero_config)
+            except TypeError as te:  # missing or unexpected keys
+                raise RuntimeError(f"invalid timezero config: {timezero_config}. {te}")
+
+            if timezero_config['timezero_date'] in date_to_config:
+                raise RuntimeError(f"duplicate timezero_date: {timezero_config['timezero_date']!r}")
+
+            date_to_config[timezero_config['timezero_date']] = timezero_config
+        return self._create_resources(f'{self.uri}timezeros/', 'timezero_config', date_to_config,
+                                      lambda: {timezero.timezero_date: timezero for timezero in self.timezeros},
+                                      TimeZero, max_workers, max_retries)
+
+
+    def _create_resources(self, uri, config_name, key_to_config, key_to_existing_fcn, resource_class, max_workers,
+                          max_retries):
+        """
+        `create_models()` and `create_timezeros()` helper that concurrently POSTs the configs whose keys are not in
+        `key_to_existing_fcn()`.
+
+        :param key_to_existing_fcn: a function of no args that lists my existing resources of resource_class, returning
+            a dict that maps their keys to them. also called before retrying a POST that might have succeeded
+        :return: a dict that maps each key in key_to_config to its new or existing resource, in key_to_config's order
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed  # deferred for import speed
+
+
+        def existing_json(key):  # `_post_json()`'s existing_json_fcn for key
+            existing_resource = key_to_existing_fcn().get(key)
+            return existing_resource.json if existing_resource else None
+
+
+        key_to_existing = key_to_existing_fcn()
+        key_to_resource = {key: key_to_existing[key] for key in key_to_config if key in key_to_existing}
+        keys_to_create = [key for key in key_to_config if key not in key_to_existing]
+        logger.info(f"_create_resources(): creating {len(keys_to_create)}, skipping {len(key_to_resource)} existing. "
+                    f"uri={uri}")
+        failures = []  # (key, error str)
+        self.zoltar_connection.re_authenticate_if_necessary()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_key = {executor.submit(self.zoltar_connection._post_json, uri,
+                                             {config_name: key_to_config[key]}, max_retries,
+                                             existing_json_fcn=lambda key=key: existing_json(key)): key
+                             for key in keys_to_create}
+            for future in as_completed(future_to_key):
+                key = future_to_key[future]
+                try:
+                    new_json = future.result()
+                except Exception as ex:
+                    failures.append((key, f"{ex.__class__.__name__}: {ex}"))
+                    continue
+
+                key_to_resource[key] = resource_class(self.zoltar_connection, new_json['url'], new_json)
+        if failures:
+            raise RuntimeError(f"could not create {len(failures)} of {len(keys_to_create)}. re-run to retry them. "
+                               f"failures={sorted(failures)}")
+
+        return {key: key_to_resource[key] for key in key_to_config}
+
+
     def submit_query(self, query):
         """
         Submits a request for the execution of a query of forecasts in this Project.
@@ -378,9 +562,9 @@ class Project(ZoltarResource):
             contains IDs and not strings for objects. use utility methods to convert from strings to IDs
         :return: a Job for the query
         """
-        response = requests.post(self.uri + 'forecast_queries/',
-                                 headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
-                                 json={'query': query})
+        response = _requests().post(self.uri + 'forecast_queries/',
+                                    headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
+                                    json={'query': query})
         job_json = response.json()
         if response.status_code != 200:
             raise RuntimeError(f"error submitting query: {job_json['error']}")
@@ -539,9 +723,9 @@ class Model(ZoltarResource):
             'abbreviation', 'team_name', 'description', 'contributors', 'license', 'notes', 'citation', 'methods',
             'home_url', 'aux_data_url']
         """
-        response = requests.put(self.uri,
-                                headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
-                                json={'model_config': model_config})
+        response = _requests().put(self.uri,
+                                   headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
+                                   json={'model_config': model_config})
         if response.status_code != 200:  # HTTP_200_OK
             raise RuntimeError(f"edit(): status code was not 200. status_code={response.status_code}. "
                                f"text={response.text}")
@@ -558,13 +742,13 @@ class Model(ZoltarResource):
         :return: a Job to use to track the upload
         """
         self.zoltar_connection.re_authenticate_if_necessary()
-        with tempfile.TemporaryFile("r+") as forecast_json_fp:
-            json.dump(forecast_json, forecast_json_fp)
+        with tempfile.TemporaryFile("w+b") as forecast_json_fp:
+            json_backend.dump(forecast_json, forecast_json_fp)
             forecast_json_fp.seek(0)
-            response = requests.post(self.uri + 'forecasts/',
-                                     headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
-                                     data={'timezero_date': timezero_date, 'notes': notes},
-                                     files={'data_file': (source, forecast_json_fp, 'application/json')})
+            response = _requests().post(self.uri + 'forecasts/',
+                                        headers={'Authorization': f'JWT {self.zoltar_connection.session.token}'},
+                                        data={'timezero_date': timezero_date, 'notes': notes},
+                                        files={'data_file': (source, forecast_json_fp, 'application/json')})
             if response.status_code != 200:  # HTTP_200_OK
                 raise RuntimeError(f"upload_forecast(): status code was not 200. status_code={response.status_code}. "
                                    f"text={response.text}")
@@ -616,13 +800,50 @@ class Forecast(ZoltarResource):
             utils.forecast.load_predictions_from_json_io_dict()
         """
         data_uri = self.json['forecast_data']
-        response = requests.get(data_uri,
-                                headers={'Authorization': 'JWT {}'.format(self.zoltar_connection.session.token)})
+        response = _requests().get(data_uri,
+                                   headers={'Authorization': 'JWT {}'.format(self.zoltar_connection.session.token)})
         if response.status_code != 200:  # HTTP_200_OK
             raise RuntimeError(f"data(): status code was not 200. status_code={response.status_code}. "
                                f"text={response.text}")
 
-        return json.loads(response.content.decode('utf-8'))
+        return json_backend.loads(response.content)
+
+
+    def iter_prediction_dicts(self, meta=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        A streaming version of `data()` that parses the response incrementally as it arrives, yielding each prediction
+        dict as soon as it's read. Peak memory is proportional to one prediction rather than the whole forecast.
+
+        :param meta: an optional dict that's updated with the data's "meta" section when it's read
+        :param chunk_size: number of bytes to read from the response at a time
+        :return: a generator of prediction dicts
+        """
+        data_uri = self.json['forecast_data']
+        response = _requests().get(data_uri, stream=True,
+                                   headers={'Authorization': 'JWT {}'.format(self.zoltar_connection.session.token)})
+        try:
+            if response.status_code != 200:  # HTTP_200_OK
+                raise RuntimeError(f"iter_prediction_dicts(): status code was not 200. "
+                                   f"status_code={response.status_code}. text={response.text}")
+
+            yield from iter_prediction_dicts_from_json_chunks(response.iter_content(chunk_size), meta)
+        finally:
+            response.close()
+
+
+    def forecast_frame(self):
+        """
+        :return: this forecast's data as a `ForecastFrame`, built from `iter_prediction_dicts()` so that the whole
+            JSON IO dict is never in memory
+        """
+        from zoltpy.forecast_frame import ForecastFrameBuilder  # deferred for import speed
+
+
+        meta = {}
+        builder = ForecastFrameBuilder(meta)  # meta is filled in as it's read
+        for prediction_dict in self.iter_prediction_dicts(meta):
+            builder.append(prediction_dict)
+        return builder.build()
 
 
 class Unit(ZoltarResource):
@@ -1,12 +1,13 @@
+import collections.abc
 import csv
-import datetime
+import functools
 import os
-from pathlib import Path
+from collections import namedtuple
 
-import click
-
-from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, summarized_error_messages, MESSAGE_FORECAST_CHECKS, \
-    MESSAGE_DATE_ALIGNMENT
+from zoltpy.hub_spec import HubValidator, ALIGNMENT_DAYS_AHEAD, ALIGNMENT_SATURDAY_WEEKS_AHEAD, \
+    DATE_ALIGNMENT_CACHE_SIZE, ENGINES, ENGINE_COLUMNAR, ENGINE_ROW, RULE_AHEAD_NUMBER, RULE_DATE_FORMAT, \
+    RULE_DAY_AHEAD_DATE, RULE_LOCATION_FOR_TARGET, RULE_NEGATIVE_VALUE, RULE_NOT_SATURDAY, RULE_QUANTILE_FOR_TARGET, \
+    RULE_WEEK_AHEAD_DATE, SATURDAY_WEEKDAY, WEEKDAY_TO_ONE_WK_AHEAD_DAYS
 
 
 #
@@ -42,7 +43,17 @@ def load_fips_codes(file):
 # file per https://stackoverflow.com/questions/10174211/how-to-make-an-always-relative-to-current-module-file-path
 # FIPS_CODES_STATE: '01', '02', ..., 'US'
 # FIPS_CODES_COUNTY: '01001', '01003', ..., '56045'
-FIPS_CODES_STATE, FIPS_CODES_COUNTY = load_fips_codes(os.path.join(os.path.dirname(__file__), 'locations.csv'))
+# these and the tables that depend on them are loaded on first use and not at import time. see `_LazyValue`
+LOCATIONS_CSV_FILE = os.path.join(os.path.dirname(__file__), 'locations.csv')
+
+
+@functools.lru_cache(maxsize=None)
+def _fips_codes():
+    """
+    :return: a 2-tuple: (FIPS_CODES_STATE, FIPS_CODES_COUNTY), loaded from LOCATIONS_CSV_FILE on the first call
+    """
+    return load_fips_codes(LOCATIONS_CSV_FILE)
+
 
 #
 # targets
@@ -67,143 +78,208 @@ COVID_TARGETS = COVID_TARGETS_NON_CASE + COVID_TARGETS_CASE
 COVID_QUANTILES_NON_CASE = [0.01, 0.05, 0.15, 0.2, 0.3, 0.35, 0.4, 0.45, 0.55, 0.6, 0.65, 0.7, 0.8, 0.85, 0.95, 0.99]
 COVID_QUANTILES_CASE = [0.025, 0.1, 0.25, 0.5, 0.75, 0.9, 0.975]
 
+#
+# the above expressed as a hub spec (see hub_spec.py), and compiled once. FIPS codes are loaded on first use
+#
+
+COVID_HUB_SPEC = {
+    'name': 'covid',
+    'target_groups': [
+        {'name': 'non_case',
+         'targets': COVID_TARGETS_NON_CASE,
+         'locations': ['state'],
+         'quantiles': COVID_QUANTILES_CASE + COVID_QUANTILES_NON_CASE},
+        {'name': 'case',
+         'targets': COVID_TARGETS_CASE,
+         'locations': ['state', 'county'],
+         'quantiles': COVID_QUANTILES_CASE},
+    ],
+    'location_sets': {'state': lambda: _fips_codes()[0],
+                      'county': lambda: _fips_codes()[1]},
+    'non_negative_values': True,
+    'date_columns': {'forecast_date': 'forecast_date', 'target_end_date': 'target_end_date'},
+    'step_units': [{'unit': 'day', 'marker': 'day ahead', 'alignment': ALIGNMENT_DAYS_AHEAD},
+                   {'unit': 'wk', 'marker': 'wk ahead', 'alignment': ALIGNMENT_SATURDAY_WEEKS_AHEAD}],
+}
+
+COVID_HUB_VALIDATOR = HubValidator(COVID_HUB_SPEC)
+
+# a target's rules. the same as a `hub_spec.TargetRule` except the first field is:
+# - is_case_target: True for COVID_TARGETS_CASE, False for COVID_TARGETS_NON_CASE, and None for other targets
+CovidTargetRule = namedtuple('CovidTargetRule', ['is_case_target', 'step_unit', 'step_ahead_increment',
+                                                 'valid_locations', 'valid_quantiles'])
+
+
+def _target_rule(target):
+    """
+    :return: a CovidTargetRule for target, which need not be a valid target
+    """
+    target_rule = COVID_HUB_VALIDATOR.target_rule(target)
+    is_case_target = None if target_rule.group is None else target_rule.group == 'case'
+    return CovidTargetRule(is_case_target, *target_rule[1:])
+
+
+@functools.lru_cache(maxsize=None)
+def _covid_locations():
+    """
+    :return: a 2-tuple: (COVID_LOCATIONS_STATE, COVID_LOCATIONS_COUNTY), i.e., frozensets of the FIPS codes
+    """
+    return COVID_HUB_VALIDATOR.location_sets['state'], COVID_HUB_VALIDATOR.location_sets['county']
+
+
+@functools.lru_cache(maxsize=None)
+def _covid_target_rules():
+    """
+    :return: COVID_TARGET_RULES: a dict that maps each of COVID_TARGETS to its CovidTargetRule
+    """
+    return {target: _target_rule(target) for target in COVID_TARGETS}
+
+
+#
+# lazily-loaded module attributes. these are real module attributes (so `from zoltpy.covid19 import FIPS_CODES_STATE`
+# works) whose values are read-only proxies that call the underlying function on first use and then delegate to its
+# result. code in this module must call the underlying functions rather than use these names directly
+#
+
+class _LazyValue:
+    """
+    Base class of the lazy proxies. `_value` is the loaded value.
+    """
+
+
+    def __init__(self, load_fcn):
+        self._load_fcn = load_fcn
+
+
+    def __repr__(self):
+        return repr(self._value)
+
+
+    @property
+    def _value(self):
+        return self._load_fcn()  # the functions are lru_cache'd
+
+
+    def __iter__(self):
+        return iter(self._value)
+
+
+    def __len__(self):
+        return len(self._value)
+
+
+    def __contains__(self, item):
+        return item in self._value
+
+
+class _LazyList(_LazyValue, collections.abc.Sequence):
+
+    def __getitem__(self, index):
+        return self._value[index]
+
+
+    def __eq__(self, other):
+        return self._value == (other._value if isinstance(other, _LazyValue) else other)
+
+
+    __hash__ = None  # like list
+
+
+class _LazyFrozenSet(_LazyValue, collections.abc.Set):
+
+    @classmethod
+    def _from_iterable(cls, iterable):  # results of set operations like `|` are plain frozensets
+        return frozenset(iterable)
+
+
+    def __hash__(self):
+        return hash(self._value)
+
+
+class _LazyDict(_LazyValue, collections.abc.Mapping):
+
+    def __getitem__(self, key):
+        return self._value[key]
+
+
+FIPS_CODES_STATE = _LazyList(lambda: _fips_codes()[0])
+FIPS_CODES_COUNTY = _LazyList(lambda: _fips_codes()[1])
+COVID_LOCATIONS_STATE = _LazyFrozenSet(lambda: _covid_locations()[0])
+COVID_LOCATIONS_COUNTY = _LazyFrozenSet(lambda: _covid_locations()[1])
+COVID_TARGET_RULES = _LazyDict(_covid_target_rules)
+
+
+#
+# error codes and message templates for `covid19_row_validator()`'s ErrorRecords
+#
+
+ERROR_LOCATION_FOR_TARGET = COVID_HUB_VALIDATOR.error_codes[RULE_LOCATION_FOR_TARGET]  # 'covid_location_for_target'
+ERROR_NEGATIVE_VALUE = COVID_HUB_VALIDATOR.error_codes[RULE_NEGATIVE_VALUE]
+ERROR_QUANTILE_FOR_TARGET = COVID_HUB_VALIDATOR.error_codes[RULE_QUANTILE_FOR_TARGET]
+ERROR_DATE_FORMAT = COVID_HUB_VALIDATOR.error_codes[RULE_DATE_FORMAT]
+ERROR_AHEAD_NUMBER = COVID_HUB_VALIDATOR.error_codes[RULE_AHEAD_NUMBER]
+ERROR_DAY_AHEAD_DATE = COVID_HUB_VALIDATOR.error_codes[RULE_DAY_AHEAD_DATE]
+ERROR_NOT_SATURDAY = COVID_HUB_VALIDATOR.error_codes[RULE_NOT_SATURDAY]
+ERROR_WEEK_AHEAD_DATE = COVID_HUB_VALIDATOR.error_codes[RULE_WEEK_AHEAD_DATE]
+
+COVID_ERROR_TEMPLATES = COVID_HUB_VALIDATOR.error_templates
+
 
 #
 # validate_quantile_csv_file()
 #
 
-def validate_quantile_csv_file(csv_fp):
+def validate_quantile_csv_file(csv_fp, max_errors=None, cache=None, engine=ENGINE_ROW):
     """
     A simple wrapper of `json_io_dict_from_quantile_csv_file()` that tosses the json_io_dict and just prints validation
     error_messages.
 
     :param csv_fp: as passed to `json_io_dict_from_quantile_csv_file()`
+    :param max_errors: as passed to `json_io_dict_from_quantile_csv_file()`
+    :param cache: an optional `ValidationCache`. if passed then the result for csv_fp is looked up by its content and
+        `covid_rules_fingerprint()`, and only validated (and then cached) if not found
+    :param engine: one of ENGINES. ENGINE_COLUMNAR is much faster for large files, and returns the same result
     :return: error_messages: a list of strings
     """
-    quantile_csv_file = Path(csv_fp)
-    click.echo(f"* validating quantile_csv_file '{quantile_csv_file}'...")
-    with open(quantile_csv_file) as cdc_csv_fp:
-        # toss json_io_dict:
-        _, error_messages = json_io_dict_from_quantile_csv_file(cdc_csv_fp, COVID_TARGETS, covid19_row_validator,
-                                                                COVID_ADDL_REQ_COLS)
-        if error_messages:
-            return summarized_error_messages(error_messages)  # summarizes and orders, converting 2-tuples to strings
-        else:
-            return "no errors"
+    return COVID_HUB_VALIDATOR.validate_quantile_csv_file(csv_fp, max_errors, cache, engine)
+
+
+def covid_rules_fingerprint(max_errors=None):
+    """
+    :param max_errors: as passed to `validate_quantile_csv_file()`. part of the fingerprint because it affects results
+    :return: a `rules_fingerprint()` of everything that COVID-19 validation results depend on: targets, quantiles,
+        FIPS codes, zoltpy version, the validation source code, and max_errors
+    """
+    return COVID_HUB_VALIDATOR.rules_fingerprint(max_errors)
 
 
 #
 # `json_io_dict_from_quantile_csv_file()` row validator
 #
 
+def clear_date_alignment_cache():
+    """
+    Clears `covid19_row_validator()`'s memoized date validation results, including hit and miss counts. Called by
+    `validate_quantile_csv_file()` before each file so that counts are per-file.
+    """
+    COVID_HUB_VALIDATOR.date_alignment_error.cache_clear()
+
+
+def date_alignment_cache_info():
+    """
+    :return: a `functools.lru_cache` `CacheInfo` named tuple for `covid19_row_validator()`'s memoized date validation
+        results: (hits, misses, maxsize, currsize)
+    """
+    return COVID_HUB_VALIDATOR.date_alignment_error.cache_info()
+
+
 def covid19_row_validator(column_index_dict, row):
     """
-    Does COVID19-specific row validation. Notes:
+    Does COVID19-specific row validation via COVID_HUB_VALIDATOR. Notes:
 
     - expects these `valid_target_names` passed to `json_io_dict_from_quantile_csv_file()`: COVID_TARGETS_NON_CASE
     - expects these `addl_req_cols` passed to `json_io_dict_from_quantile_csv_file()`: COVID_ADDL_REQ_COLS
+    - returns a list of ErrorRecords whose codes are the COVID_ERROR_TEMPLATES keys
+    - date validation results are memoized. see `date_alignment_cache_info()` and `clear_date_alignment_cache()`
     """
-    from zoltpy.cdc_io import _parse_date  # avoid circular imports
-
-
-    error_messages = []  # return value. filled next
-
-    location = row[column_index_dict['location']]
-    target = row[column_index_dict['target']]
-    is_county_location = location in FIPS_CODES_COUNTY
-    is_state_location = location in FIPS_CODES_STATE
-    is_case_target = target in COVID_TARGETS_CASE
-    is_non_case_target = target in COVID_TARGETS_NON_CASE
-
-    # validate location (FIPS code)
-    if not ((is_case_target and is_state_location) or
-            (is_case_target and is_county_location) or
-            (is_non_case_target and is_state_location)):
-        error_messages.append((MESSAGE_FORECAST_CHECKS, f"invalid location for target. location={location!r}, "
-                                                        f"target={target!r}. row={row}"))
-
-    # validate quantiles. recall at this point all row values are strings, but COVID_QUANTILES_NON_CASE is numbers
-    quantile = row[column_index_dict['quantile']]
-    value = row[column_index_dict['value']]
-
-    try:
-        if float(value) < 0:  # value must always be non-negative regardless of row type
-            error_messages.append((MESSAGE_FORECAST_CHECKS, f"entries in the `value` column must be non-negative. "
-                                                            f"value='{value}'. row={row}"))
-    except ValueError:
-        pass  # ignore here - it will be caught by `json_io_dict_from_quantile_csv_file()`
-
-    if row[column_index_dict['type']] == 'quantile':
-        try:
-            quantile_float = float(quantile)
-            is_case_quantile = quantile_float in COVID_QUANTILES_CASE
-            is_non_case_quantile = quantile_float in COVID_QUANTILES_CASE + COVID_QUANTILES_NON_CASE
-            if not ((is_case_target and is_case_quantile) or
-                    (is_non_case_target and is_case_quantile) or
-                    (is_non_case_target and is_non_case_quantile)):
-                error_messages.append((MESSAGE_FORECAST_CHECKS, f"invalid quantile for target. quantile={quantile!r}, "
-                                                                f"target={target!r}. row={row}"))
-        except ValueError:
-            pass  # ignore here - it will be caught by `json_io_dict_from_quantile_csv_file()`
-
-    # validate forecast_date and target_end_date date formats
-    forecast_date = row[column_index_dict['forecast_date']]
-    target_end_date = row[column_index_dict['target_end_date']]
-    forecast_date = _parse_date(forecast_date)  # None if invalid format
-    target_end_date = _parse_date(target_end_date)  # ""
-    if not forecast_date or not target_end_date:
-        error_messages.append((MESSAGE_FORECAST_CHECKS,
-                               f"invalid forecast_date or target_end_date format. forecast_date={forecast_date!r}. "
-                               f"target_end_date={target_end_date}. row={row}"))
-        return error_messages  # terminate - remaining validation depends on valid dates
-
-    # formats are valid. next: validate "__ day ahead" or "__ week ahead" increment - must be an int
-    target_day_ahead_split = target.split('day ahead')
-    target_week_ahead_split = target.split('wk ahead')
-    is_day_or_week_ahead_target = (len(target_day_ahead_split) == 2) or (len(target_week_ahead_split) == 2)
-    try:
-        if is_day_or_week_ahead_target:  # valid day or week ahead target
-            step_ahead_increment = int(target_day_ahead_split[0].strip()) if len(target_day_ahead_split) == 2 \
-                else int(target_week_ahead_split[0].strip())
-        else:  # invalid target. don't add error message b/c caught by caller `_validated_rows_for_quantile_csv()`
-            return error_messages  # terminate - remaining validation depends on valid step_ahead_increment
-    except ValueError:
-        error_messages.append((MESSAGE_FORECAST_CHECKS, f"non-integer 'ahead' number in target: {target!r}. row={row}"))
-        return error_messages  # terminate - remaining validation depends on valid step_ahead_increment
-
-    # validate date alignment
-    # 1/4) for x day ahead targets the target_end_date should be forecast_date + x
-    if 'day ahead' in target:
-        if (target_end_date - forecast_date).days != step_ahead_increment:
-            error_messages.append((MESSAGE_FORECAST_CHECKS,
-                                   f"invalid target_end_date: was not {step_ahead_increment} day(s) after "
-                                   f"forecast_date. diff={(target_end_date - forecast_date).days}, "
-                                   f"forecast_date={forecast_date}, target_end_date={target_end_date}. row={row}"))
-    else:  # 'wk ahead' in target
-        # NB: we convert `weekdays()` (Monday is 0 and Sunday is 6) to a Sunday-based numbering to get the math to work:
-        weekday_to_sun_based = {i: i + 2 if i != 6 else 1 for i in range(7)}  # Sun=1, Mon=2, ..., Sat=7
-        # 2/4) for x week ahead targets, weekday(target_end_date) should be a Sat
-        if weekday_to_sun_based[target_end_date.weekday()] != 7:  # Sat
-            error_messages.append((MESSAGE_DATE_ALIGNMENT, f"target_end_date was not a Saturday: {target_end_date}. "
-                                                           f"row={row}"))
-            return error_messages  # terminate - remaining validation depends on valid target_end_date
-
-        # set exp_target_end_date and then validate it
-        weekday_diff = datetime.timedelta(days=(abs(weekday_to_sun_based[target_end_date.weekday()] -
-                                                    weekday_to_sun_based[forecast_date.weekday()])))
-        if weekday_to_sun_based[forecast_date.weekday()] <= 2:  # Sun or Mon
-            # 3/4) (Sun or Mon) for x week ahead targets, ensure that the 1-week ahead forecast is for the next Sat
-            delta_days = weekday_diff + datetime.timedelta(days=(7 * (step_ahead_increment - 1)))
-            exp_target_end_date = forecast_date + delta_days
-        else:  # Tue through Sat
-            # 4/4) (Tue on) for x week ahead targets, ensures that the 1-week ahead forecast is for the Sat after next
-            delta_days = weekday_diff + datetime.timedelta(days=(7 * step_ahead_increment))
-            exp_target_end_date = forecast_date + delta_days
-        if target_end_date != exp_target_end_date:
-            error_messages.append((MESSAGE_DATE_ALIGNMENT,
-                                   f"target_end_date was not the expected Saturday. forecast_date={forecast_date}, "
-                                   f"target_end_date={target_end_date}. exp_target_end_date={exp_target_end_date}, "
-                                   f"row={row}"))
-
-    # done!
-    return error_messages
+    return COVID_HUB_VALIDATOR.row_validator(column_index_dict, row)
@@ -0,0 +1,419 @@
+import csv
+import datetime
+import io
+import locale
+import math
+
+import numpy as np
+import pandas as pd
+
+from zoltpy.cdc_io import CDC_POINT_ROW_TYPE, _parse_value
+from zoltpy.covid19 import COVID_HUB_VALIDATOR
+from zoltpy.hub_spec import RULE_LOCATION_FOR_TARGET, RULE_NEGATIVE_VALUE, RULE_QUANTILE_FOR_TARGET
+from zoltpy.quantile_io import ERROR_DUPLICATE_PREDICTION_ELEMENTS, ERROR_INVALID_TARGETS, ERROR_POINT_COUNT, \
+    ERROR_QUANTILES_NOT_UNIQUE, ERROR_QUANTILE_NOT_IN_RANGE, ERROR_TEMPLATES, ERROR_VALUES_DECREASING, \
+    ERROR_VALUE_NOT_NUMERIC, ErrorRecord, MESSAGE_FORECAST_CHECKS, MESSAGE_QUANTILES_AND_VALUES, \
+    MESSAGE_QUANTILES_AS_A_GROUP, POINT_PREDICTION_CLASS, QUANTILE_PREDICTION_CLASS, _add_error_messages, \
+    _validate_header, _validate_quantile_prediction_dict, error_record, json_io_dict_from_quantile_csv_file
+
+
+#
+# This file implements the "columnar" validation engine for quantile CSV files, which is selected via
+# `validate_quantile_csv_file(..., engine=ENGINE_COLUMNAR)`. It was written for COVID-19 files but works for any
+# `HubValidator`. Rather than validating one row at a time like `json_io_dict_from_quantile_csv_file()` +
+# `HubValidator.row_validator()` (the "row" engine), it loads the file into pandas
+# columns and does each check over whole columns using NumPy. Most columns have few distinct values (e.g., targets,
+# quantiles, and dates), so they're loaded as categoricals and checked once per distinct value (or combination of
+# values) rather than once per row. The `value` column is loaded as floats.
+#
+# The columnar engine returns the same errors in the same order as the row engine, so the two are interchangeable.
+# Error messages are built lazily, and only for errors whose messages are used, by the same code the row engine uses.
+# Files that the columnar engine can't load exactly like Python's `csv` module does (those with an invalid header,
+# quoted fields, or rows whose length differs from the header's) are passed to the row engine.
+#
+
+def columnar_error_messages(quantile_csv_file, max_errors=None, error_sink=None, validator=None):
+    """
+    Validates quantile_csv_file using the columnar engine (see above).
+
+    :param quantile_csv_file: a str or Path to a quantile CSV file
+    :param max_errors: as passed to `json_io_dict_from_quantile_csv_file()`
+    :param error_sink: ""
+    :param validator: the `HubValidator` whose rules to check. defaults to COVID_HUB_VALIDATOR
+    :return: error_messages: the same as the second item returned by `json_io_dict_from_quantile_csv_file()` when
+        called with validator's `row_validator()`
+    """
+    validator = validator or COVID_HUB_VALIDATOR
+    with open(quantile_csv_file, 'rb') as fp:
+        csv_lines = _CsvLines(fp.read())
+    df = csv_lines.data_frame(validator.addl_req_cols)
+    if df is None:  # the row engine handles files we can't load
+        with open(quantile_csv_file) as quantile_fp:
+            _, error_messages = json_io_dict_from_quantile_csv_file(quantile_fp, validator.targets,
+                                                                    validator.row_validator, validator.addl_req_cols,
+                                                                    max_errors, error_sink)
+        return error_messages
+
+    error_messages = [] if error_sink is None else error_sink  # return value. filled next
+    for error_message in _iter_error_messages(csv_lines, df, validator):
+        if _add_error_messages(error_messages, [error_message], max_errors):
+            break
+    return error_messages
+
+
+class _CsvLines:
+    """
+    The bytes of a CSV file, and the offsets of its lines, which let us get any row's original strs.
+    """
+
+
+    def __init__(self, csv_bytes):
+        self.csv_bytes = csv_bytes
+        self.encoding = locale.getpreferredencoding(False)  # same as `open()`
+        buffer = np.frombuffer(csv_bytes, dtype=np.uint8)
+        self.line_ends = np.flatnonzero(buffer == ord('\n'))  # index of each line's '\n'
+        if (not len(self.line_ends)) or (self.line_ends[-1] != len(buffer) - 1):  # last line has no newline
+            self.line_ends = np.append(self.line_ends, len(buffer))
+        self.header = next(csv.reader(io.TextIOWrapper(io.BytesIO(csv_bytes), encoding=self.encoding)), None)
+
+
+    def line(self, line_idx):
+        """
+        :return: the str of line line_idx, without its line ending
+        """
+        start = self.line_ends[line_idx - 1] + 1 if line_idx else 0
+        line = self.csv_bytes[start:self.line_ends[line_idx]].decode(self.encoding)
+        return line[:-1] if line.endswith('\r') else line
+
+
+    def row(self, row_idx):
+        """
+        :return: the strs in data row row_idx (0-based, i.e., not counting the header), like `csv.reader` returns them.
+            only valid if `data_frame()` returned a DataFrame
+        """
+        return self.line(row_idx + 1).split(',')
+
+
+    def data_frame(self, addl_req_cols):
+        """
+        :param addl_req_cols: as passed to `json_io_dict_from_quantile_csv_file()`
+        :return: a DataFrame of my rows, or None if they cannot be loaded exactly as the row engine would. the `value`
+            column is floats (NaN where not parsed), and the rest are categoricals
+        """
+        if (self.header is None) or (b'"' in self.csv_bytes):  # no header, or maybe quoted fields
+            return None
+
+        try:
+            _validate_header(self.header, addl_req_cols)
+        except RuntimeError:
+            return None
+
+        # check that every line has len(header) fields. we count commas per line b/c pandas silently pads short rows
+        comma_idxs = np.flatnonzero(np.frombuffer(self.csv_bytes, dtype=np.uint8) == ord(','))
+        commas_per_line = np.diff(np.searchsorted(comma_idxs, self.line_ends), prepend=0)
+        if (commas_per_line != len(self.header) - 1).any():
+            return None
+
+        # load the `value` column via a round-trip parser so that its floats are the same as `float()`'s. if any don't
+        # parse, we load strs instead and parse those
+        dtype = {column: (np.float64 if column == 'value' else 'category') for column in self.header}
+        read_csv_kwargs = {'encoding': self.encoding, 'keep_default_na': False, 'na_filter': False,
+                           'skip_blank_lines': False, 'quoting': csv.QUOTE_NONE, 'float_precision': 'round_trip'}
+        try:
+            df = pd.read_csv(io.BytesIO(self.csv_bytes), dtype=dtype, **read_csv_kwargs)
+        except ValueError:
+            df = pd.read_csv(io.BytesIO(self.csv_bytes), dtype=dict(dtype, value=str), **read_csv_kwargs)
+            df['value'] = np.array([_float_or_nan(value) for value in df['value']], dtype=np.float64)
+        if len(df) != len(self.line_ends) - 1:  # e.g., lone '\r' line endings
+            return None
+
+        return df
+
+
+def _iter_error_messages(csv_lines, df, validator):
+    """
+    `columnar_error_messages()` helper that does the actual work.
+
+    :return: a generator that yields ErrorRecords in the order that the row engine finds them
+    """
+    if not len(df):
+        return
+
+    locations, targets, row_types, quantiles = [_Column(df[column]) for column in ['location', 'target', 'type',
+                                                                                  'quantile']]
+    quantile_column_idx, value_column_idx = df.columns.get_loc('quantile'), df.columns.get_loc('value')
+    values = df['value'].to_numpy(dtype=np.float64)
+    nan_row_idxs = np.flatnonzero(np.isnan(values))  # values we couldn't parse, or 'nan'. these are handled by Python
+    nan_value_strs = [csv_lines.row(row_idx)[value_column_idx] for row_idx in nan_row_idxs.tolist()]
+
+    # per-category tables
+    target_rules = [validator.target_rule(target) for target in targets.categories]
+    is_point_type = np.array([row_type.lower() == CDC_POINT_ROW_TYPE.lower() for row_type in row_types.categories],
+                             dtype=bool)
+    is_quantile_type = np.array([row_type == 'quantile' for row_type in row_types.categories], dtype=bool)
+    parsed_quantiles = [_parse_value(quantile) for quantile in quantiles.categories]
+    is_bad_quantile = np.array([_is_bad_number(quantile) or not (0 <= quantile <= 1)
+                                for quantile in parsed_quantiles], dtype=bool)
+
+    # generic checks: quantile range and numeric values
+    is_point_row = is_point_type[row_types.codes]
+    is_bad_value = ~np.isfinite(values)
+    is_bad_value[nan_row_idxs] = [_is_bad_number(_parse_value(value_str)) for value_str in nan_value_strs]
+    is_quantile_range_error = ~is_point_row & is_bad_quantile[quantiles.codes]
+    is_value_error = is_point_row & is_bad_value
+
+    # hub rules 1/4: location. use a (target, location) table
+    location_table = np.array([[location in target_rule.valid_locations for location in locations.categories]
+                               for target_rule in target_rules], dtype=bool)
+    is_location_error = ~location_table[targets.codes, locations.codes]
+
+    # hub rules 2/4: non-negative value
+    if validator.non_negative_values:
+        is_negative_error = values < 0
+        is_negative_error[nan_row_idxs] = [_float_or_nan(value_str) < 0 for value_str in nan_value_strs]
+    else:
+        is_negative_error = np.zeros(len(values), dtype=bool)
+
+    # hub rules 3/4: quantile for target. use a (target, quantile) table
+    quantile_floats = [_float_or_none(quantile) for quantile in quantiles.categories]
+    quantile_table = np.array([[(quantile_float is not None) and (quantile_float not in target_rule.valid_quantiles)
+                                for quantile_float in quantile_floats]
+                               for target_rule in target_rules], dtype=bool)
+    is_quantile_error = is_quantile_type[row_types.codes] & quantile_table[targets.codes, quantiles.codes]
+
+    # hub rules 4/4: date format and alignment, done once per distinct (forecast_date, target, target_end_date)
+    if validator.forecast_date_column:
+        forecast_dates = _Column(df[validator.forecast_date_column])
+        target_end_dates = _Column(df[validator.target_end_date_column])
+        date_keys = (forecast_dates.codes.astype(np.int64) * len(targets.categories) + targets.codes) \
+                    * len(target_end_dates.categories) + target_end_dates.codes
+        unique_date_keys, date_key_idxs = np.unique(date_keys, return_inverse=True)
+        date_errors = []  # index: date_key_idx
+        for date_key in unique_date_keys.tolist():
+            date_key, target_end_date_code = divmod(date_key, len(target_end_dates.categories))
+            forecast_date_code, target_code = divmod(date_key, len(targets.categories))
+            date_errors.append(validator.date_alignment_error(forecast_dates.categories[forecast_date_code],
+                                                              targets.categories[target_code],
+                                                              target_end_dates.categories[target_end_date_code]))
+        is_date_error = np.array([date_error is not None for date_error in date_errors], dtype=bool)[date_key_idxs]
+    else:
+        is_date_error = np.zeros(len(values), dtype=bool)
+
+    # yield row errors in row order, and in the same order within rows as the row engine. each code's fields_fcn is
+    # passed the row's strs
+    error_codes, templates = validator.error_codes, dict(ERROR_TEMPLATES, **validator.error_templates)
+    for row_idx in np.flatnonzero(is_quantile_range_error | is_value_error | is_location_error | is_negative_error |
+                                  is_quantile_error | is_date_error).tolist():
+        row_error_codes = []  # 3-tuples: (code, priority, fields_fcn)
+        if is_quantile_range_error[row_idx]:
+            row_error_codes.append((ERROR_QUANTILE_NOT_IN_RANGE, MESSAGE_FORECAST_CHECKS,
+                                    lambda row: {'quantile': _parse_value(row[quantile_column_idx])}))
+        elif is_value_error[row_idx]:
+            row_error_codes.append((ERROR_VALUE_NOT_NUMERIC, MESSAGE_FORECAST_CHECKS,
+                                    lambda row: {'value': _parse_value(row[value_column_idx])}))
+        if is_location_error[row_idx]:
+            row_error_codes.append((error_codes[RULE_LOCATION_FOR_TARGET], MESSAGE_FORECAST_CHECKS, lambda row: {}))
+        if is_negative_error[row_idx]:
+            row_error_codes.append((error_codes[RULE_NEGATIVE_VALUE], MESSAGE_FORECAST_CHECKS,
+                                    lambda row: {'value': row[value_column_idx]}))
+        if is_quantile_error[row_idx]:
+            row_error_codes.append((error_codes[RULE_QUANTILE_FOR_TARGET], MESSAGE_FORECAST_CHECKS,
+                                    lambda row: {'quantile': row[quantile_column_idx]}))
+        if is_date_error[row_idx]:
+            rule, priority, fields = date_errors[date_key_idxs[row_idx]]
+            row_error_codes.append((error_codes[rule], priority, lambda row, fields=fields: fields))
+        for code, priority, fields_fcn in row_error_codes:
+            yield _DeferredErrorRecord(code, priority, templates[code], locations[row_idx], targets[row_idx],
+                                       row_idx + 1,
+                                       lambda row_idx=row_idx, fields_fcn=fields_fcn:
+                                       _row_error_fields(csv_lines.row(row_idx), fields_fcn))
+
+    # invalid targets. the set is built in the same order as the row engine so that its repr is the same
+    target_first_row_idxs = np.unique(targets.codes, return_index=True)[1]
+    valid_targets = set(validator.targets)
+    error_targets = set()
+    for target_code in targets.codes[np.sort(target_first_row_idxs)].tolist():
+        if targets.categories[target_code] not in valid_targets:
+            error_targets.add(targets.categories[target_code])
+    if error_targets:
+        yield error_record(ERROR_INVALID_TARGETS, MESSAGE_FORECAST_CHECKS, error_targets=error_targets)
+
+    # per-(target, location) checks. these are done in (target, location) order, like the row engine
+    unit_target_keys = targets.codes.astype(np.int64) * len(locations.categories) + locations.codes
+    yield from _iter_quantile_prediction_errors(csv_lines, value_column_idx, unit_target_keys, is_point_row, locations,
+                                                targets, quantiles, parsed_quantiles, values)
+    yield from _iter_prediction_errors(unit_target_keys, is_point_row, locations, targets)
+
+
+def _row_error_fields(row, fields_fcn):
+    return dict(fields_fcn(row), row=row)
+
+
+def _iter_quantile_prediction_errors(csv_lines, value_column_idx, unit_target_keys, is_point_row, locations, targets,
+                                     quantiles, parsed_quantiles, values):
+    """
+    `_iter_error_messages()` helper that yields `_validate_quantile_prediction_dict()` errors, i.e., "quantiles must
+    be unique" and "values must be non-decreasing". Vectorized checks find the (target, location) pairs that have
+    errors, and then their quantile prediction dicts are validated by `_validate_quantile_prediction_dict()` when the
+    messages are needed.
+    """
+    quantile_row_idxs = np.flatnonzero(~is_point_row)  # in file order
+    if not len(quantile_row_idxs):
+        return
+
+    # sort each pair's quantile rows by quantile, keeping file order for ties, like `_validate_quantile_prediction_dict()`
+    parsed_quantile_floats = np.array([quantile if isinstance(quantile, (int, float)) else math.nan
+                                       for quantile in parsed_quantiles], dtype=np.float64)
+    row_keys = unit_target_keys[quantile_row_idxs]
+    row_quantiles = parsed_quantile_floats[quantiles.codes[quantile_row_idxs]]
+    row_values = values[quantile_row_idxs]
+    order = np.lexsort((row_quantiles, row_keys))
+    row_keys, row_quantiles, row_values = row_keys[order], row_quantiles[order], row_values[order]
+
+    # pairs with quantiles or values that aren't finite numbers are validated right away by
+    # `_validate_quantile_prediction_dict()`, which errors (or raises) on them just like the row engine
+    is_same_key = row_keys[1:] == row_keys[:-1]
+    is_dup_quantile = is_same_key & (row_quantiles[1:] == row_quantiles[:-1])
+    a, b = row_values[:-1], row_values[1:]
+    with np.errstate(invalid='ignore'):  # inf - inf is nan. such pairs are in eager_keys
+        is_le_value = (np.abs(a - b) <= 1e-05 * np.maximum(np.abs(a), np.abs(b))) | (a <= b)  # `le_with_tolerance()`
+    is_decreasing = is_same_key & ~is_le_value
+    eager_keys = set(row_keys[~(np.isfinite(row_quantiles) & np.isfinite(row_values))].tolist())
+    dup_keys = set(row_keys[1:][is_dup_quantile].tolist())
+    decreasing_keys = set(row_keys[1:][is_decreasing].tolist())
+    error_keys = eager_keys | dup_keys | decreasing_keys
+    if not error_keys:
+        return
+
+    # a pair's rows are found via a stable sort so that they're in file order, like the row engine's
+    file_order = np.argsort(unit_target_keys[quantile_row_idxs], kind='stable')
+    sorted_keys = unit_target_keys[quantile_row_idxs][file_order]
+
+
+    def prediction_dict_for_key(key, target, location):
+        start, end = np.searchsorted(sorted_keys, [key, key + 1])
+        row_idxs = quantile_row_idxs[file_order[start:end]].tolist()
+        return {'unit': location,
+                'target': target,
+                'class': QUANTILE_PREDICTION_CLASS,
+                'prediction': {
+                    'quantile': [parsed_quantiles[quantiles.codes[row_idx]] for row_idx in row_idxs],
+                    'value': [_parse_value(csv_lines.row(row_idx)[value_column_idx]) for row_idx in row_idxs]}}
+
+
+    def error_fields(key, target, location, code):
+        for error_message in _validate_quantile_prediction_dict(prediction_dict_for_key(key, target, location)):
+            if error_message.code == code:
+                return error_message.fields
+
+
+    num_locations = len(locations.categories)
+    key_to_target_location = {key: (targets.categories[key // num_locations], locations.categories[key % num_locations])
+                              for key in error_keys}
+    for key in sorted(error_keys, key=lambda _: key_to_target_location[_]):
+        target, location = key_to_target_location[key]
+        if key in eager_keys:
+            yield from _validate_quantile_prediction_dict(prediction_dict_for_key(key, target, location))
+            continue
+
+        for code, code_keys in [(ERROR_QUANTILES_NOT_UNIQUE, dup_keys), (ERROR_VALUES_DECREASING, decreasing_keys)]:
+            if key in code_keys:
+                yield _DeferredErrorRecord(code, MESSAGE_QUANTILES_AND_VALUES, ERROR_TEMPLATES[code], location,
+                                           target, None,
+                                           lambda key=key, target=target, location=location, code=code:
+                                           error_fields(key, target, location, code))
+
+
+def _iter_prediction_errors(unit_target_keys, is_point_row, locations, targets):
+    """
+    `_iter_error_messages()` helper that yields the row engine's "prediction"-level errors: duplicate prediction
+    elements and point counts.
+    """
+    unique_keys, key_idxs = np.unique(unit_target_keys, return_inverse=True)
+    point_counts = np.bincount(key_idxs[is_point_row], minlength=len(unique_keys))
+    has_quantiles = np.bincount(key_idxs[~is_point_row], minlength=len(unique_keys)) > 0
+    num_locations = len(locations.categories)
+
+    # this is the row engine's `loc_targ_to_pred_classes`, but only for pairs with errors
+    target_location_pred_classes = []  # 3-tuples: (target, location, pred_classes)
+    for key_idx in np.flatnonzero(point_counts != 1).tolist():
+        target_code, location_code = divmod(int(unique_keys[key_idx]), num_locations)
+        pred_classes = ([QUANTILE_PREDICTION_CLASS] if has_quantiles[key_idx] else []) + \
+                       [POINT_PREDICTION_CLASS] * int(point_counts[key_idx])
+        target_location_pred_classes.append((targets.categories[target_code], locations.categories[location_code],
+                                             pred_classes))
+    target_location_pred_classes.sort(key=lambda _: (_[0], _[1]))
+
+    duplicate_unit_target_tuples = [(unit, target, pred_classes) for target, unit, pred_classes
+                                    in target_location_pred_classes if len(pred_classes) != len(set(pred_classes))]
+    if duplicate_unit_target_tuples:
+        if len(duplicate_unit_target_tuples) > 10:  # pick first 10 tuples to reduce output
+            duplicate_unit_target_tuples = duplicate_unit_target_tuples[:10] + ['...']
+        yield error_record(ERROR_DUPLICATE_PREDICTION_ELEMENTS, MESSAGE_QUANTILES_AND_VALUES,
+                           tuples=duplicate_unit_target_tuples)
+
+    unit_target_point_count = [(unit, target, pred_classes.count('point')) for target, unit, pred_classes
+                               in target_location_pred_classes]
+    if unit_target_point_count:
+        if len(unit_target_point_count) > 10:  # pick first 10 tuples to reduce output
+            unit_target_point_count = unit_target_point_count[:10] + ['...']
+        yield error_record(ERROR_POINT_COUNT, MESSAGE_QUANTILES_AS_A_GROUP, tuples=unit_target_point_count)
+
+
+class _DeferredErrorRecord(ErrorRecord):
+    """
+    An ErrorRecord whose fields are computed by calling `fields_fcn()` the first time its message is needed. This lets
+    us skip building rows and prediction dicts for errors that are only counted.
+    """
+
+    __slots__ = ('fields_fcn',)
+
+
+    def __init__(self, code, priority, template, location, target, row_num, fields_fcn):
+        super().__init__(code, priority, template, location, target, row_num)
+        self.fields_fcn = fields_fcn
+
+
+    @property
+    def message(self):
+        if self.fields_fcn:
+            self.fields = self.fields_fcn()
+            self.fields_fcn = None
+        return super().message
+
+
+class _Column:
+    """
+    A categorical DataFrame column's codes (a NumPy array) and categories (a list of strs). Indexing returns a row's
+    str.
+    """
+
+
+    def __init__(self, series):
+        self.codes = series.cat.codes.to_numpy()
+        self.categories = series.cat.categories.tolist()
+
+
+    def __getitem__(self, row_idx):
+        return self.categories[self.codes[row_idx]]
+
+
+def _is_bad_number(value):
+    """
+    :return: True if value (as returned by `_parse_value()`) is not a finite int or float
+    """
+    return (value is None) or isinstance(value, datetime.date) or (not math.isfinite(value))
+
+
+def _float_or_nan(value_str):
+    try:
+        return float(value_str)
+    except ValueError:
+        return math.nan
+
+
+def _float_or_none(value_str):
+    try:
+        return float(value_str)
+    except ValueError:
+        return None
@@ -1,3 +1,5 @@
+import csv
+
 from zoltpy.quantile_io import BIN_DISTRIBUTION_CLASS, NAMED_DISTRIBUTION_CLASS, POINT_PREDICTION_CLASS, \
     SAMPLE_PREDICTION_CLASS
 
@@ -17,15 +19,22 @@ def csv_rows_from_json_io_dict(json_io_dict):
     variable. Column ordering is CSV_HEADER. Note that the csv is 'sparse': not every row uses all columns, and unused
     ones are empty (''). However, the first four columns are always non-empty, i.e., every prediction has them.
 
-    :param json_io_dict: a "JSON IO dict" to load from. see docs for details. the "meta" section is ignored
+    :param json_io_dict: a "JSON IO dict" or `ForecastFrame` to load from. see docs for details. the "meta" section is
+        ignored
     :return: a list of CSV rows including header - see CSV_HEADER
     """
-    # do some initial validation
-    if 'predictions' not in json_io_dict:
-        raise RuntimeError("no predictions section found in json_io_dict")
+    return list(iter_csv_rows_from_json_io_dict(json_io_dict))
+
+
+def iter_csv_rows_from_json_io_dict(json_io_dict):
+    """
+    A generator version of `csv_rows_from_json_io_dict()` that yields the same rows (including the header) one at a
+    time rather than building them all in memory.
 
-    rows = [CSV_HEADER]  # return value. filled next
-    for prediction_dict in json_io_dict['predictions']:
+    :param json_io_dict: as passed to `csv_rows_from_json_io_dict()`
+    """
+    yield CSV_HEADER
+    for prediction_dict in prediction_dicts_for_json_io_dict(json_io_dict):
         prediction_class = prediction_dict['class']
         if prediction_class not in ['bin', 'named', 'point', 'sample', 'quantile']:
             raise RuntimeError(f"invalid prediction_dict class: {prediction_class}")
@@ -38,23 +47,55 @@ def csv_rows_from_json_io_dict(json_io_dict):
         value, cat, prob, sample, quantile, family, param1, param2, param3 = '', '', '', '', '', '', '', '', ''
         if prediction_class == BIN_DISTRIBUTION_CLASS:  # BinDistribution
             for cat, prob in zip(prediction['cat'], prediction['prob']):
-                rows.append([unit, target, prediction_class, value, cat, prob, sample, quantile,
-                             family, param1, param2, param3])
+                yield [unit, target, prediction_class, value, cat, prob, sample, quantile,
+                       family, param1, param2, param3]
         elif prediction_class == NAMED_DISTRIBUTION_CLASS:  # NamedDistribution
-            rows.append([unit, target, prediction_class, value, cat, prob, sample, quantile,
-                         prediction['family'],
-                         prediction['param1'] if 'param1' in prediction else '',
-                         prediction['param2'] if 'param2' in prediction else '',
-                         prediction['param3'] if 'param3' in prediction else ''])
+            yield [unit, target, prediction_class, value, cat, prob, sample, quantile,
+                   prediction['family'],
+                   prediction['param1'] if 'param1' in prediction else '',
+                   prediction['param2'] if 'param2' in prediction else '',
+                   prediction['param3'] if 'param3' in prediction else '']
         elif prediction_class == POINT_PREDICTION_CLASS:  # PointPrediction
-            rows.append([unit, target, prediction_class, prediction['value'], cat, prob, sample, quantile,
-                         family, param1, param2, param3])
+            yield [unit, target, prediction_class, prediction['value'], cat, prob, sample, quantile,
+                   family, param1, param2, param3]
         elif prediction_class == SAMPLE_PREDICTION_CLASS:  # SamplePrediction
             for sample in prediction['sample']:
-                rows.append([unit, target, prediction_class, value, cat, prob, sample, quantile,
-                             family, param1, param2, param3])
+                yield [unit, target, prediction_class, value, cat, prob, sample, quantile,
+                       family, param1, param2, param3]
         else:  # prediction_class == QUANTILE_PREDICTION_CLASS  # QuantileDistribution
             for quantile, value in zip(prediction['quantile'], prediction['value']):
-                rows.append([unit, target, prediction_class, value, cat, prob, sample, quantile,
-                             family, param1, param2, param3])
-    return rows
+                yield [unit, target, prediction_class, value, cat, prob, sample, quantile,
+                       family, param1, param2, param3]
+
+
+def write_csv(json_io_dict, csv_fp):
+    """
+    Streams the rows of `iter_csv_rows_from_json_io_dict()` to csv_fp, using constant memory.
+
+    :param json_io_dict: as passed to `csv_rows_from_json_io_dict()`
+    :param csv_fp: an open text file-like object to write to. should be opened with `newline=''` per the csv module
+    """
+    csv.writer(csv_fp, delimiter=',').writerows(iter_csv_rows_from_json_io_dict(json_io_dict))
+
+
+def prediction_dicts_for_json_io_dict(json_io_dict, prediction_classes=None):
+    """
+    Helper that returns an iterable over the prediction dicts in a "JSON IO dict" or `ForecastFrame`.
+
+    :param json_io_dict: a "JSON IO dict" or `ForecastFrame`
+    :param prediction_classes: an optional collection of prediction class names to limit the predictions to. None
+        returns all classes. ForecastFrames skip the other classes without creating their prediction dicts
+    :raises RuntimeError: if json_io_dict has no predictions section
+    """
+    from zoltpy.forecast_frame import ForecastFrame  # avoid circular imports
+
+
+    if isinstance(json_io_dict, ForecastFrame):
+        return json_io_dict.iter_prediction_dicts(prediction_classes)  # created on demand
+    elif 'predictions' not in json_io_dict:
+        raise RuntimeError("no predictions section found in json_io_dict")
+    elif prediction_classes is None:
+        return json_io_dict['predictions']
+    else:
+        return (prediction_dict for prediction_dict in json_io_dict['predictions']
+                if prediction_dict['class'] in prediction_classes)
@@ -0,0 +1,275 @@
+import math
+from array import array
+
+import numpy as np
+
+from zoltpy.quantile_io import BIN_DISTRIBUTION_CLASS, NAMED_DISTRIBUTION_CLASS, POINT_PREDICTION_CLASS, \
+    SAMPLE_PREDICTION_CLASS, QUANTILE_PREDICTION_CLASS
+
+
+#
+# This file defines ForecastFrame, a compact columnar ("struct-of-arrays") alternative to "JSON IO dicts". Rather than
+# one Python dict per prediction containing nested lists of Python numbers, a ForecastFrame stores:
+#
+# - per prediction: `unit_codes` and `target_codes` (int32 indexes into the `units` and `targets` category lists),
+#   `class_codes` (int8 indexes into PREDICTION_CLASSES), and `offsets` (int64, length num_predictions + 1), which
+#   delimits each prediction's group of elements
+# - per element: two float64 columns, `value` and `quantile`, plus `flags` (uint8), which records elements that were
+#   not floats in the original JSON IO dict so that conversion is lossless. see below for each class's layout
+#
+# The element layout of each prediction class is:
+#
+# - point:    one element. value column: the point value
+# - quantile: one element per quantile. value column: the value, quantile column: the quantile
+# - bin:      one element per bin. value column: the `cat`, quantile column: the `prob`
+# - sample:   one element per sample. value column: the sample, quantile column: NaN
+# - named:    no elements. the prediction dict is stored as-is in `named` (these are rare)
+#
+# Elements that were ints are stored as floats and flagged as such, and elements that were not numbers at all (e.g.,
+# date or text `cat`s and points, None) are stored as NaN and kept as-is in the `objects` dict.
+#
+
+PREDICTION_CLASSES = (POINT_PREDICTION_CLASS, QUANTILE_PREDICTION_CLASS, BIN_DISTRIBUTION_CLASS,
+                      SAMPLE_PREDICTION_CLASS, NAMED_DISTRIBUTION_CLASS)
+PREDICTION_CLASS_TO_CODE = {prediction_class: code for code, prediction_class in enumerate(PREDICTION_CLASSES)}
+
+# `flags` bits
+VALUE_IS_INT = 1
+QUANTILE_IS_INT = 2
+VALUE_IS_OBJECT = 4
+QUANTILE_IS_OBJECT = 8
+
+# the column index used by `objects` keys
+VALUE_COLUMN = 0
+QUANTILE_COLUMN = 1
+
+MAX_EXACT_INT = 2 ** 53  # ints larger than this are not exactly representable as floats, so are stored as objects
+
+
+class ForecastFrame:
+    """
+    A columnar representation of a "JSON IO dict". See this module's header for the layout. Create instances via
+    `from_json_io_dict()` or `ForecastFrameBuilder`, or directly from the readers via
+    `quantile_io.forecast_frame_from_quantile_csv_file()` and `cdc_io.forecast_frame_from_cdc_csv_file()`. The writers
+    in `csv_io` and `quantile_io` accept a ForecastFrame anywhere they accept a JSON IO dict. See `forecast_store` for
+    storing them compactly on disk.
+    """
+
+
+    def __init__(self, units, targets, unit_codes, target_codes, class_codes, offsets, value, quantile, flags,
+                 objects=None, named=None, meta=None):
+        self.units = units  # list of unit names. index is the unit code
+        self.targets = targets  # "" target names
+        self.unit_codes = unit_codes
+        self.target_codes = target_codes
+        self.class_codes = class_codes
+        self.offsets = offsets
+        self.value = value
+        self.quantile = quantile
+        self.flags = flags
+        self.objects = objects if objects is not None else {}  # (column, element_index) -> original value
+        self.named = named if named is not None else {}  # prediction_index -> 'prediction' dict for named classes
+        self.meta = meta if meta is not None else {}
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, len(self), len(self.value), len(self.units), len(self.targets)))
+
+
+    def __len__(self):
+        return len(self.class_codes)
+
+
+    @property
+    def nbytes(self):
+        """
+        :return: the number of bytes used by my arrays. does not include the (typically small) category lists and
+            side tables
+        """
+        return sum(arr.nbytes for arr in (self.unit_codes, self.target_codes, self.class_codes, self.offsets,
+                                          self.value, self.quantile, self.flags))
+
+
+    @classmethod
+    def from_json_io_dict(cls, json_io_dict):
+        """
+        :param json_io_dict: a "JSON IO dict" to load from. see docs for details
+        :return: a ForecastFrame containing json_io_dict's predictions and meta
+        """
+        if 'predictions' not in json_io_dict:
+            raise RuntimeError("no predictions section found in json_io_dict")
+
+        builder = ForecastFrameBuilder(json_io_dict.get('meta', {}))
+        for prediction_dict in json_io_dict['predictions']:
+            builder.append(prediction_dict)
+        return builder.build()
+
+
+    def to_json_io_dict(self):
+        """
+        :return: a "JSON IO dict" equal to the one I was created from
+        """
+        return {'meta': self.meta, 'predictions': list(self.iter_prediction_dicts())}
+
+
+    def iter_prediction_dicts(self, prediction_classes=None):
+        """
+        A generator that yields my predictions as JSON IO dict prediction dicts, in order, creating them on demand.
+
+        :param prediction_classes: an optional collection of prediction class names (e.g., `POINT_PREDICTION_CLASS`)
+            to limit the yielded predictions to. None yields all classes
+        """
+        class_codes_to_yield = None if prediction_classes is None \
+            else {PREDICTION_CLASS_TO_CODE[prediction_class] for prediction_class in prediction_classes}
+        has_flags = bool(self.flags.any())
+        offsets = self.offsets.tolist()
+        for pred_idx, (unit_code, target_code, class_code) in \
+                enumerate(zip(self.unit_codes.tolist(), self.target_codes.tolist(), self.class_codes.tolist())):
+            if (class_codes_to_yield is not None) and (class_code not in class_codes_to_yield):
+                continue
+
+            prediction_class = PREDICTION_CLASSES[class_code]
+            start, end = offsets[pred_idx], offsets[pred_idx + 1]
+            if prediction_class == NAMED_DISTRIBUTION_CLASS:
+                prediction = self.named[pred_idx]
+            else:
+                values = self._column_list(self.value, VALUE_COLUMN, start, end, has_flags)
+                if prediction_class == POINT_PREDICTION_CLASS:
+                    prediction = {'value': values[0]}
+                elif prediction_class == QUANTILE_PREDICTION_CLASS:
+                    prediction = {'quantile': self._column_list(self.quantile, QUANTILE_COLUMN, start, end, has_flags),
+                                  'value': values}
+                elif prediction_class == BIN_DISTRIBUTION_CLASS:
+                    prediction = {'cat': values,
+                                  'prob': self._column_list(self.quantile, QUANTILE_COLUMN, start, end, has_flags)}
+                else:  # prediction_class == SAMPLE_PREDICTION_CLASS
+                    prediction = {'sample': values}
+            yield {'unit': self.units[unit_code],
+                   'target': self.targets[target_code],
+                   'class': prediction_class,
+                   'prediction': prediction}
+
+
+    def _column_list(self, column_arr, column, start, end, has_flags):
+        """
+        :return: a list of the original (decoded) elements in column_arr[start:end]
+        """
+        elements = column_arr[start:end].tolist()
+        if not has_flags:
+            return elements
+
+        is_int_flag, is_object_flag = (VALUE_IS_INT, VALUE_IS_OBJECT) if column == VALUE_COLUMN \
+            else (QUANTILE_IS_INT, QUANTILE_IS_OBJECT)
+        for idx, flag in enumerate(self.flags[start:end].tolist()):
+            if flag & is_int_flag:
+                elements[idx] = int(elements[idx])
+            elif flag & is_object_flag:
+                elements[idx] = self.objects[(column, start + idx)]
+        return elements
+
+
+class ForecastFrameBuilder:
+    """
+    Incrementally builds a ForecastFrame from prediction dicts. Has an `append()` method so that it can be used in place
+    of a `predictions` list by code that builds JSON IO dicts. Elements are accumulated in compact `array.array`s and
+    only converted to NumPy arrays by `build()`.
+    """
+
+
+    def __init__(self, meta=None):
+        self.meta = meta if meta is not None else {}
+        self.unit_to_code = {}
+        self.target_to_code = {}
+        self.unit_codes = array('i')
+        self.target_codes = array('i')
+        self.class_codes = array('b')
+        self.offsets = array('q', [0])
+        self.value = array('d')
+        self.quantile = array('d')
+        self.flags = array('B')
+        self.objects = {}
+        self.named = {}
+
+
+    def __len__(self):
+        return len(self.class_codes)
+
+
+    def append(self, prediction_dict):
+        """
+        Adds prediction_dict to my predictions.
+
+        :param prediction_dict: a JSON IO dict prediction dict
+        """
+        unit, target, prediction_class = prediction_dict['unit'], prediction_dict['target'], prediction_dict['class']
+        if prediction_class not in PREDICTION_CLASS_TO_CODE:
+            raise RuntimeError(f"invalid prediction_dict class: {prediction_class}")
+
+        prediction = prediction_dict['prediction']
+        if prediction_class == NAMED_DISTRIBUTION_CLASS:
+            self.named[len(self.class_codes)] = prediction
+        elif prediction_class == POINT_PREDICTION_CLASS:
+            self._append_element(prediction['value'], math.nan)
+        elif prediction_class == QUANTILE_PREDICTION_CLASS:
+            self._append_elements(prediction['value'], prediction['quantile'], prediction_dict)
+        elif prediction_class == BIN_DISTRIBUTION_CLASS:
+            self._append_elements(prediction['cat'], prediction['prob'], prediction_dict)
+        else:  # prediction_class == SAMPLE_PREDICTION_CLASS
+            for sample in prediction['sample']:
+                self._append_element(sample, math.nan)
+
+        if unit not in self.unit_to_code:
+            self.unit_to_code[unit] = len(self.unit_to_code)
+        if target not in self.target_to_code:
+            self.target_to_code[target] = len(self.target_to_code)
+        self.unit_codes.append(self.unit_to_code[unit])
+        self.target_codes.append(self.target_to_code[target])
+        self.class_codes.append(PREDICTION_CLASS_TO_CODE[prediction_class])
+        self.offsets.append(len(self.value))
+
+
+    def _append_elements(self, values, quantiles, prediction_dict):
+        if len(values) != len(quantiles):
+            raise RuntimeError(f"paired prediction vectors had different lengths and cannot be stored in a "
+                               f"ForecastFrame. prediction_dict={prediction_dict}")
+
+        for value, quantile in zip(values, quantiles):
+            self._append_element(value, quantile)
+
+
+    def _append_element(self, value, quantile):
+        element_idx = len(self.value)
+        flag = 0
+        value_type, quantile_type = type(value), type(quantile)
+        if value_type is not float:
+            if (value_type is int) and (-MAX_EXACT_INT <= value <= MAX_EXACT_INT):
+                flag |= VALUE_IS_INT
+            else:
+                self.objects[(VALUE_COLUMN, element_idx)] = value
+                flag |= VALUE_IS_OBJECT
+                value = math.nan
+        if quantile_type is not float:
+            if (quantile_type is int) and (-MAX_EXACT_INT <= quantile <= MAX_EXACT_INT):
+                flag |= QUANTILE_IS_INT
+            else:
+                self.objects[(QUANTILE_COLUMN, element_idx)] = quantile
+                flag |= QUANTILE_IS_OBJECT
+                quantile = math.nan
+        self.value.append(value)
+        self.quantile.append(quantile)
+        self.flags.append(flag)
+
+
+    def build(self):
+        """
+        :return: a ForecastFrame containing the predictions appended so far
+        """
+        return ForecastFrame(list(self.unit_to_code), list(self.target_to_code),
+                             np.frombuffer(self.unit_codes, dtype=np.intc).astype(np.int32),
+                             np.frombuffer(self.target_codes, dtype=np.intc).astype(np.int32),
+                             np.frombuffer(self.class_codes, dtype=np.int8).copy(),
+                             np.frombuffer(self.offsets, dtype=np.int64).copy(),
+                             np.frombuffer(self.value, dtype=np.float64).copy(),
+                             np.frombuffer(self.quantile, dtype=np.float64).copy(),
+                             np.frombuffer(self.flags, dtype=np.uint8).copy(),
+                             dict(self.objects), dict(self.named), self.meta)
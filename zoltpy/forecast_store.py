@@ -0,0 +1,133 @@
+import mmap
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from zoltpy import json_backend
+from zoltpy.forecast_frame import ForecastFrame
+from zoltpy.validation_cache import write_file_atomically
+
+
+#
+# This file defines a compact binary file format for storing ForecastFrames, e.g., to cache or archive
+# `Forecast.data()` results. Because a ForecastFrame is already columnar and dictionary-encoded (see forecast_frame.py),
+# a file is just its arrays plus a small header. The layout is:
+#
+# - 16 bytes: MAGIC (8 bytes), then the header's offset (a little-endian uint64)
+# - the arrays in ARRAY_NAMES order, each little-endian and starting on an ALIGNMENT boundary
+# - the header (UTF-8 JSON), which runs to the end of the file: {'version': FORMAT_VERSION, 'compress': bool,
+#   'units': list, 'targets': list, 'meta': dict, 'objects': list of [column, element_index, value],
+#   'named': list of [prediction_index, prediction dict], 'arrays': {name: [dtype str, length, offset, num bytes]}}
+#
+# Uncompressed files are read via mmap so that opening one only parses the header, and the arrays are zero-copy
+# (read-only) views whose pages are loaded on first access. Compressed files store each array byte-shuffled (all the
+# first bytes of its items, then all the second bytes, etc.) and then zlib-compressed, which compresses float64 columns
+# much better than compressing them as-is, but they must be decompressed when read.
+#
+
+MAGIC = b'ZOLTFF\x00\x01'
+FORMAT_VERSION = 1
+ALIGNMENT = 64  # bytes
+ARRAY_NAMES = ('unit_codes', 'target_codes', 'class_codes', 'offsets', 'value', 'quantile', 'flags')
+
+_PREAMBLE_STRUCT = struct.Struct('<8sQ')  # MAGIC, header offset
+
+
+def write_forecast_frame(forecast_frame, path, compress=False):
+    """
+    Writes forecast_frame to path in the format documented above. The file is written atomically so that an
+    interrupted or failed write never leaves a partial (or temporary) file.
+
+    :param forecast_frame: a ForecastFrame or "JSON IO dict" to write
+    :param path: a str or Path to write to
+    :param compress: True if the arrays should be compressed. this makes files smaller, but they cannot be mmap-ed
+    """
+    if not isinstance(forecast_frame, ForecastFrame):
+        forecast_frame = ForecastFrame.from_json_io_dict(forecast_frame)
+
+    path = Path(path)
+
+
+    def write_arrays_and_header(fp):
+        array_entries = {}  # name -> [dtype str, length, offset, num bytes]
+        fp.write(_PREAMBLE_STRUCT.pack(MAGIC, 0))  # the header offset is filled in below
+        for array_name in ARRAY_NAMES:
+            arr = getattr(forecast_frame, array_name)
+            arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder('<'))
+            array_bytes = _shuffled_compressed_bytes(arr) if compress else arr.tobytes()
+            fp.write(b'\0' * (-fp.tell() % ALIGNMENT))
+            array_entries[array_name] = [arr.dtype.str, len(arr), fp.tell(), len(array_bytes)]
+            fp.write(array_bytes)
+
+        header_offset = fp.tell()
+        fp.write(json_backend.dumps({
+            'version': FORMAT_VERSION,
+            'compress': compress,
+            'units': forecast_frame.units,
+            'targets': forecast_frame.targets,
+            'meta': forecast_frame.meta,
+            'objects': [[column, element_idx, value] for (column, element_idx), value
+                        in sorted(forecast_frame.objects.items())],
+            'named': [[pred_idx, prediction] for pred_idx, prediction in sorted(forecast_frame.named.items())],
+            'arrays': array_entries}))
+        fp.seek(0)
+        fp.write(_PREAMBLE_STRUCT.pack(MAGIC, header_offset))
+
+
+    write_file_atomically(path, 'wb', write_arrays_and_header)
+
+
+def read_forecast_frame(path, use_mmap=True):
+    """
+    :param path: a str or Path of a file written by `write_forecast_frame()`
+    :param use_mmap: True if an uncompressed file's arrays should be zero-copy views of the mmap-ed file. they are
+        read-only and only loaded as they're accessed. False reads the arrays into memory. ignored for compressed files
+    :return: a ForecastFrame equal to the one that was written
+    """
+    with open(path, 'rb') as fp:
+        preamble = fp.read(_PREAMBLE_STRUCT.size)
+        if (len(preamble) != _PREAMBLE_STRUCT.size) or (preamble[:len(MAGIC)] != MAGIC):
+            raise RuntimeError(f"not a forecast store file: {path}")
+
+        _, header_offset = _PREAMBLE_STRUCT.unpack(preamble)
+        fp.seek(header_offset)
+        header = json_backend.loads(fp.read())
+        if header['version'] != FORMAT_VERSION:
+            raise RuntimeError(f"unsupported version: {header['version']!r}. expected {FORMAT_VERSION}. path={path}")
+
+        arrays = {}
+        buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) \
+            if use_mmap and not header['compress'] else None  # the mmap stays open until the arrays are freed
+        for array_name in ARRAY_NAMES:
+            dtype_str, length, offset, num_bytes = header['arrays'][array_name]
+            dtype = np.dtype(dtype_str)
+            if buffer is not None:
+                arrays[array_name] = np.frombuffer(buffer, dtype=dtype, count=length, offset=offset)
+            else:
+                fp.seek(offset)
+                array_bytes = fp.read(num_bytes)
+                arrays[array_name] = _unshuffled_decompressed_array(array_bytes, dtype, length) \
+                    if header['compress'] else np.frombuffer(array_bytes, dtype=dtype, count=length)
+
+    return ForecastFrame(header['units'], header['targets'], *[arrays[array_name] for array_name in ARRAY_NAMES],
+                         objects={(column, element_idx): value for column, element_idx, value in header['objects']},
+                         named={pred_idx: prediction for pred_idx, prediction in header['named']},
+                         meta=header['meta'])
+
+
+def _shuffled_compressed_bytes(arr):
+    """
+    :return: arr's bytes, byte-shuffled and then compressed
+    """
+    arr_bytes = np.frombuffer(arr.tobytes(), dtype=np.uint8).reshape(-1, arr.dtype.itemsize)
+    return zlib.compress(arr_bytes.T.tobytes())
+
+
+def _unshuffled_decompressed_array(array_bytes, dtype, length):
+    """
+    The inverse of `_shuffled_compressed_bytes()`.
+    """
+    arr_bytes = np.frombuffer(zlib.decompress(array_bytes), dtype=np.uint8).reshape(dtype.itemsize, length)
+    return np.ascontiguousarray(arr_bytes.T).view(dtype).reshape(length)
@@ -0,0 +1,461 @@
+import datetime
+import functools
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+from zoltpy.quantile_io import json_io_dict_from_quantile_csv_file, summarized_error_messages, MESSAGE_FORECAST_CHECKS, \
+    MESSAGE_DATE_ALIGNMENT, ErrorRecord, ErrorSummarizer
+from zoltpy.validation_cache import file_content_hash, rules_fingerprint
+
+
+#
+# This file implements declarative forecast hub validation specs. A hub spec is a dict (loadable from JSON via
+# `load_hub_spec()`) that describes a hub's rules, and `HubValidator` compiles one into a row validator for
+# `json_io_dict_from_quantile_csv_file()` plus a `validate_quantile_csv_file()` that can use the columnar engine. A spec
+# has these keys:
+#
+# - 'name': a short str that prefixes the hub's error codes, e.g., 'covid' -> 'covid_location_for_target'
+# - 'target_groups': a list of dicts, one per group of targets that share rules:
+#   - 'name': the group's name, e.g., 'case'
+#   - 'targets': a list of target names, or a dict that generates them: {'format': '{} wk ahead inc case',
+#     'steps': [1, 8]}, where 'steps' is an inclusive range of ints passed to `format()`
+#   - 'locations': a list of 'location_sets' names. the group's valid locations are their union
+#   - 'quantiles': a list of the group's valid quantiles (floats)
+# - 'location_sets': a dict that maps a name to a list of locations, or to a no-arg function that returns one, which
+#   is called on first use so that large sets (e.g., loaded from a file) cost nothing until needed
+# - 'non_negative_values' (optional, default False): True if all values must be non-negative
+# - 'date_columns' (optional): a dict with 'forecast_date' and 'target_end_date' keys whose values are the names of the
+#   hub's required date columns. if missing then dates are not validated
+# - 'step_units' (optional): a list of dicts that say how to parse and align "__ <marker>" targets like "1 wk ahead
+#   inc death", checked in order:
+#   - 'unit': the unit's name, e.g., 'wk'
+#   - 'marker': the str that follows a target's step number, e.g., 'wk ahead'
+#   - 'alignment': one of ALIGNMENTS, which says how target_end_date must relate to forecast_date
+#
+
+ALIGNMENT_DAYS_AHEAD = 'days_ahead'  # target_end_date is forecast_date + step days
+ALIGNMENT_SATURDAY_WEEKS_AHEAD = 'saturday_weeks_ahead'  # target_end_date is the step'th Saturday. see below
+ALIGNMENTS = (ALIGNMENT_DAYS_AHEAD, ALIGNMENT_SATURDAY_WEEKS_AHEAD)
+
+# for ALIGNMENT_SATURDAY_WEEKS_AHEAD: the number of days from a forecast_date (indexed by `weekday()`, i.e., Monday is 0
+# and Sunday is 6) to its 1 week ahead target_end_date. this is the next Saturday if forecast_date is a Sunday or
+# Monday, and the Saturday after next o/w. each additional week adds 7 days
+SATURDAY_WEEKDAY = 5
+WEEKDAY_TO_ONE_WK_AHEAD_DAYS = (5, 11, 10, 9, 8, 7, 6)  # Mon, Tue, ..., Sun
+
+#
+# rules, each of which has an error code (the hub's name + '_' + the rule) and message template
+#
+
+RULE_LOCATION_FOR_TARGET = 'location_for_target'
+RULE_NEGATIVE_VALUE = 'negative_value'
+RULE_QUANTILE_FOR_TARGET = 'quantile_for_target'
+RULE_DATE_FORMAT = 'date_format'
+RULE_AHEAD_NUMBER = 'ahead_number'
+RULE_DAY_AHEAD_DATE = 'day_ahead_date'
+RULE_NOT_SATURDAY = 'not_saturday'
+RULE_WEEK_AHEAD_DATE = 'week_ahead_date'
+
+RULE_TEMPLATES = {
+    RULE_LOCATION_FOR_TARGET: "invalid location for target. location={location!r}, target={target!r}. row={row}",
+    RULE_NEGATIVE_VALUE: "entries in the `value` column must be non-negative. value='{value}'. row={row}",
+    RULE_QUANTILE_FOR_TARGET: "invalid quantile for target. quantile={quantile!r}, target={target!r}. row={row}",
+    RULE_DATE_FORMAT: "invalid forecast_date or target_end_date format. forecast_date={forecast_date!r}. "
+                      "target_end_date={target_end_date}. row={row}",
+    RULE_AHEAD_NUMBER: "non-integer 'ahead' number in target: {target!r}. row={row}",
+    RULE_DAY_AHEAD_DATE: "invalid target_end_date: was not {step_ahead_increment} day(s) after forecast_date. "
+                         "diff={diff}, forecast_date={forecast_date}, target_end_date={target_end_date}. row={row}",
+    RULE_NOT_SATURDAY: "target_end_date was not a Saturday: {target_end_date}. row={row}",
+    RULE_WEEK_AHEAD_DATE: "target_end_date was not the expected Saturday. forecast_date={forecast_date}, "
+                          "target_end_date={target_end_date}. exp_target_end_date={exp_target_end_date}, row={row}",
+}
+
+# a target's compiled rules:
+# - group: the name of the target's target group, or None if target is not in the spec
+# - step_unit: a 'step_units' 'unit', or None if target has none of their markers
+# - step_ahead_increment: the "__" int, or None if step_unit is None or "__" is not an int
+# - valid_locations: frozenset of locations allowed for the target
+# - valid_quantiles: frozenset of quantiles (floats) allowed for the target
+TargetRule = namedtuple('TargetRule', ['group', 'step_unit', 'step_ahead_increment', 'valid_locations',
+                                       'valid_quantiles'])
+
+#
+# validation engines
+#
+
+ENGINE_ROW = 'row'  # `json_io_dict_from_quantile_csv_file()` + `HubValidator.row_validator()`
+ENGINE_COLUMNAR = 'columnar'  # `covid19_columnar.columnar_error_messages()`
+ENGINES = (ENGINE_ROW, ENGINE_COLUMNAR)
+
+DATE_ALIGNMENT_CACHE_SIZE = 4096  # max number of distinct (forecast_date, target, target_end_date) verdicts to keep
+
+
+def load_hub_spec(json_file):
+    """
+    :param json_file: a str or Path to a JSON file containing a hub spec. location sets must be lists
+    :return: the hub spec dict
+    """
+    with open(json_file) as fp:
+        return json.load(fp)
+
+
+class HubValidator:
+    """
+    A hub spec (see above) compiled into lookup tables, with a fast row validator and `validate_quantile_csv_file()`.
+    Tables that depend on location sets are built on first use.
+    """
+
+
+    def __init__(self, hub_spec):
+        """
+        :param hub_spec: a hub spec dict as documented above
+        """
+        _validate_hub_spec(hub_spec)
+        self.hub_spec = hub_spec
+        self.name = hub_spec['name']
+        self.error_codes = {rule: f"{self.name}_{rule}" for rule in RULE_TEMPLATES}  # rule -> code
+        self.error_templates = {self.error_codes[rule]: template for rule, template in RULE_TEMPLATES.items()}
+        self.non_negative_values = hub_spec.get('non_negative_values', False)
+        self.step_units = hub_spec.get('step_units', [])
+        self.step_unit_alignments = {step_unit['unit']: step_unit['alignment'] for step_unit in self.step_units}
+
+        date_columns = hub_spec.get('date_columns')
+        self.forecast_date_column = date_columns['forecast_date'] if date_columns else None
+        self.target_end_date_column = date_columns['target_end_date'] if date_columns else None
+        self.addl_req_cols = [self.forecast_date_column, self.target_end_date_column] if date_columns else []
+
+        self.target_groups = [dict(target_group, targets=_expand_targets(target_group['targets']))
+                              for target_group in hub_spec['target_groups']]
+        self.targets = [target for target_group in self.target_groups for target in target_group['targets']]
+        self.target_to_group = {target: target_group for target_group in self.target_groups
+                                for target in target_group['targets']}
+        self.date_alignment_error = functools.lru_cache(maxsize=DATE_ALIGNMENT_CACHE_SIZE)(self._date_alignment_error)
+
+        # tables that are built on first use. see their properties
+        self._location_sets = None
+        self._target_rules = None
+        self._fingerprint_base = None
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, self.name, len(self.targets)))
+
+
+    @property
+    def location_sets(self):
+        """
+        :return: a dict that maps each 'location_sets' name to a frozenset of its locations. loaded on first access
+        """
+        if self._location_sets is None:
+            self._location_sets = {name: frozenset(locations() if callable(locations) else locations)
+                                   for name, locations in self.hub_spec['location_sets'].items()}
+        return self._location_sets
+
+
+    @property
+    def target_rules(self):
+        """
+        :return: a dict that maps each of my targets to its TargetRule. built on first access
+        """
+        if self._target_rules is None:
+            group_locations = {}  # group name -> frozenset. shared by the group's TargetRules
+            for target_group in self.target_groups:
+                group_locations[target_group['name']] = frozenset().union(*[self.location_sets[name] for name
+                                                                            in target_group['locations']])
+            self._target_rules = {target: self._target_rule(target, group_locations) for target in self.targets}
+        return self._target_rules
+
+
+    def target_rule(self, target):
+        """
+        :return: a TargetRule for target, which need not be one of my targets
+        """
+        target_rule = self.target_rules.get(target)
+        return target_rule if target_rule is not None else self._target_rule(target, {})
+
+
+    def _target_rule(self, target, group_locations):
+        target_group = self.target_to_group.get(target)
+        if target_group:
+            group = target_group['name']
+            valid_locations = group_locations[group]
+            valid_quantiles = frozenset(target_group['quantiles'])
+        else:
+            group = None
+            valid_locations = frozenset()
+            valid_quantiles = frozenset()
+
+        # the unit is the first whose marker is in target, and the increment is from the first marker that splits
+        # target in two
+        step_unit, step_ahead_increment = None, None
+        target_splits = [target.split(step_unit_dict['marker']) for step_unit_dict in self.step_units]
+        if any(len(target_split) == 2 for target_split in target_splits):
+            step_unit = next(step_unit_dict['unit'] for step_unit_dict in self.step_units
+                             if step_unit_dict['marker'] in target)
+            try:
+                step_ahead_increment = int(next(target_split for target_split in target_splits
+                                                if len(target_split) == 2)[0].strip())
+            except ValueError:
+                pass
+        return TargetRule(group, step_unit, step_ahead_increment, valid_locations, valid_quantiles)
+
+
+    def error_record(self, rule, priority, location, target, row, **fields):
+        """
+        :return: an ErrorRecord for one of the RULE_TEMPLATES rules
+        """
+        return ErrorRecord(self.error_codes[rule], priority, RULE_TEMPLATES[rule], location, target, row=row,
+                           **fields)
+
+
+    def row_validator(self, column_index_dict, row):
+        """
+        A `json_io_dict_from_quantile_csv_file()` row validator for my spec. Notes:
+
+        - expects these `valid_target_names` passed to `json_io_dict_from_quantile_csv_file()`: `self.targets`
+        - expects these `addl_req_cols` passed to `json_io_dict_from_quantile_csv_file()`: `self.addl_req_cols`
+        - returns a list of ErrorRecords whose codes are the `self.error_templates` keys
+        - date validation results are memoized. see `date_alignment_error()`
+        """
+        error_messages = []  # return value. filled next
+
+        location = row[column_index_dict['location']]
+        target = row[column_index_dict['target']]
+        target_rule = self.target_rules.get(target)
+        if target_rule is None:  # invalid target. caught by caller `_validated_rows_for_quantile_csv()`
+            target_rule = self._target_rule(target, {})
+
+        # validate location
+        if location not in target_rule.valid_locations:
+            error_messages.append(self.error_record(RULE_LOCATION_FOR_TARGET, MESSAGE_FORECAST_CHECKS, location,
+                                                    target, row))
+
+        # validate quantiles. recall at this point all row values are strings, but valid_quantiles is numbers
+        quantile = row[column_index_dict['quantile']]
+        value = row[column_index_dict['value']]
+
+        if self.non_negative_values:
+            try:
+                if float(value) < 0:  # value must always be non-negative regardless of row type
+                    error_messages.append(self.error_record(RULE_NEGATIVE_VALUE, MESSAGE_FORECAST_CHECKS, location,
+                                                            target, row, value=value))
+            except ValueError:
+                pass  # ignore here - it will be caught by `json_io_dict_from_quantile_csv_file()`
+
+        if row[column_index_dict['type']] == 'quantile':
+            try:
+                if float(quantile) not in target_rule.valid_quantiles:
+                    error_messages.append(self.error_record(RULE_QUANTILE_FOR_TARGET, MESSAGE_FORECAST_CHECKS,
+                                                            location, target, row, quantile=quantile))
+            except ValueError:
+                pass  # ignore here - it will be caught by `json_io_dict_from_quantile_csv_file()`
+
+        # validate date formats and alignment. this only depends on the two dates and the target, which are repeated
+        # across rows, so the result is memoized
+        if self.forecast_date_column:
+            date_error = self.date_alignment_error(row[column_index_dict[self.forecast_date_column]], target,
+                                                   row[column_index_dict[self.target_end_date_column]])
+            if date_error:
+                rule, priority, fields = date_error
+                error_messages.append(self.error_record(rule, priority, location, target, row, **fields))
+
+        # done!
+        return error_messages
+
+
+    def _date_alignment_error(self, forecast_date, target, target_end_date):
+        """
+        `row_validator()` helper that validates the formats of forecast_date and target_end_date (strings) and their
+        alignment with target. Memoized as `date_alignment_error()` because every row for a particular location and
+        target has the same args.
+
+        :return: None if valid, or a 3-tuple for the error o/w: (rule, priority, fields), where the first two are as
+            passed to `error_record()` and fields is a dict of its keyword args
+        """
+        from zoltpy.cdc_io import _parse_date  # avoid circular imports
+
+
+        forecast_date = _parse_date(forecast_date)  # None if invalid format
+        target_end_date = _parse_date(target_end_date)  # ""
+        if not forecast_date or not target_end_date:
+            return RULE_DATE_FORMAT, MESSAGE_FORECAST_CHECKS, {'forecast_date': forecast_date,
+                                                               'target_end_date': target_end_date}
+
+        # formats are valid. next: validate "__ <marker>" increment - must be an int
+        target_rule = self.target_rule(target)
+        step_ahead_increment = target_rule.step_ahead_increment
+        if target_rule.step_unit is None:  # invalid target. don't add error message b/c caught by caller
+            return None  # terminate - remaining validation depends on valid step_ahead_increment
+        elif step_ahead_increment is None:
+            return RULE_AHEAD_NUMBER, MESSAGE_FORECAST_CHECKS, {}
+
+        # validate date alignment
+        if self.step_unit_alignments[target_rule.step_unit] == ALIGNMENT_DAYS_AHEAD:
+            # target_end_date should be forecast_date + x
+            if (target_end_date - forecast_date).days != step_ahead_increment:
+                return RULE_DAY_AHEAD_DATE, MESSAGE_FORECAST_CHECKS, {'step_ahead_increment': step_ahead_increment,
+                                                                      'diff': (target_end_date - forecast_date).days,
+                                                                      'forecast_date': forecast_date,
+                                                                      'target_end_date': target_end_date}
+        else:  # ALIGNMENT_SATURDAY_WEEKS_AHEAD
+            # weekday(target_end_date) should be a Sat
+            if target_end_date.weekday() != SATURDAY_WEEKDAY:
+                return RULE_NOT_SATURDAY, MESSAGE_DATE_ALIGNMENT, {'target_end_date': target_end_date}
+
+            # (Sun or Mon) ensure that the 1-week ahead forecast is for the next Sat, and (Tue on) ensure that the
+            # 1-week ahead forecast is for the Sat after next
+            delta_days = WEEKDAY_TO_ONE_WK_AHEAD_DAYS[forecast_date.weekday()] + (7 * (step_ahead_increment - 1))
+            exp_target_end_date = forecast_date + datetime.timedelta(days=delta_days)
+            if target_end_date != exp_target_end_date:
+                return RULE_WEEK_AHEAD_DATE, MESSAGE_DATE_ALIGNMENT, {'forecast_date': forecast_date,
+                                                                      'target_end_date': target_end_date,
+                                                                      'exp_target_end_date': exp_target_end_date}
+        return None
+
+
+    def validate_quantile_csv_file(self, csv_fp, max_errors=None, cache=None, engine=ENGINE_ROW):
+        """
+        A simple wrapper of `json_io_dict_from_quantile_csv_file()` that tosses the json_io_dict and just prints
+        validation error_messages.
+
+        :param csv_fp: as passed to `json_io_dict_from_quantile_csv_file()`
+        :param max_errors: as passed to `json_io_dict_from_quantile_csv_file()`
+        :param cache: an optional `ValidationCache`. if passed then the result for csv_fp is looked up by its content
+            and `rules_fingerprint()`, and only validated (and then cached) if not found
+        :param engine: one of ENGINES. ENGINE_COLUMNAR is much faster for large files, and returns the same result
+        :return: error_messages: a list of strings
+        """
+        import click  # deferred for import speed
+
+
+        if engine not in ENGINES:
+            raise RuntimeError(f"invalid engine: {engine!r}. valid engines: {ENGINES}")
+
+        quantile_csv_file = Path(csv_fp)
+        click.echo(f"* validating quantile_csv_file '{quantile_csv_file}'...")
+        if cache:
+            content_hash, fingerprint = file_content_hash(quantile_csv_file), self.rules_fingerprint(max_errors)
+            cached_result = cache.get(content_hash, fingerprint)
+            if cached_result is not None:
+                click.echo(f"* using cached result")
+                return cached_result
+
+        self.date_alignment_error.cache_clear()
+        if engine == ENGINE_COLUMNAR:
+            from zoltpy.covid19_columnar import columnar_error_messages  # avoid circular imports
+
+
+            error_messages = columnar_error_messages(quantile_csv_file, max_errors, ErrorSummarizer(), self)
+        else:
+            with open(quantile_csv_file) as cdc_csv_fp:
+                # toss json_io_dict. errors are summarized as they're found so that memory is bounded for very broken
+                # files
+                _, error_messages = json_io_dict_from_quantile_csv_file(cdc_csv_fp, self.targets, self.row_validator,
+                                                                        self.addl_req_cols, max_errors,
+                                                                        ErrorSummarizer())
+        if error_messages:
+            result = summarized_error_messages(error_messages)  # summarizes and orders, converting 2-tuples to strings
+        else:
+            result = "no errors"
+        if cache:
+            cache.put(content_hash, fingerprint, result)
+        return result
+
+
+    def date_cache_summary(self):
+        """
+        :return: a str summarizing the `date_alignment_error()` cache's hits and misses since the last validation
+            started, e.g., 'date cache: hits=8190, misses=146, hit rate=98.2%'
+        """
+        cache_info = self.date_alignment_error.cache_info()
+        num_lookups = cache_info.hits + cache_info.misses
+        hit_rate = f"{cache_info.hits / num_lookups:.1%}" if num_lookups else 'n/a'
+        return f"date cache: hits={cache_info.hits}, misses={cache_info.misses}, hit rate={hit_rate}"
+
+
+    def rules_fingerprint(self, max_errors=None):
+        """
+        :param max_errors: as passed to `validate_quantile_csv_file()`. part of the fingerprint because it affects
+            results
+        :return: a `rules_fingerprint()` of everything that my validation results depend on: the spec (with location
+            sets loaded), zoltpy version, the validation source code, and max_errors
+        """
+        return rules_fingerprint(self._rules_fingerprint_base, max_errors)
+
+
+    @property
+    def _rules_fingerprint_base(self):
+        if self._fingerprint_base is None:
+            try:
+                from importlib.metadata import version  # python 3.8+
+
+                zoltpy_version = version('zoltpy')
+            except Exception:  # ImportError, importlib.metadata.PackageNotFoundError
+                zoltpy_version = None
+
+            # hash the modules that do validation so that development changes (which don't change the version) are
+            # caught
+            module_dir = os.path.dirname(__file__)
+            source_hashes = [file_content_hash(os.path.join(module_dir, module_file))
+                             for module_file in ['hub_spec.py', 'covid19_columnar.py', 'quantile_io.py', 'cdc_io.py']]
+            target_groups = [(target_group['name'], target_group['targets'], sorted(target_group['locations']),
+                              target_group['quantiles']) for target_group in self.target_groups]
+            location_sets = {name: sorted(locations) for name, locations in self.location_sets.items()}
+            self._fingerprint_base = rules_fingerprint(self.name, target_groups, location_sets,
+                                                       self.non_negative_values, self.addl_req_cols, self.step_units,
+                                                       zoltpy_version, source_hashes)
+        return self._fingerprint_base
+
+
+def _expand_targets(targets):
+    """
+    :param targets: a target group's 'targets': a list or a 'format'/'steps' dict
+    :return: a list of target names
+    """
+    if isinstance(targets, dict):
+        first_step, last_step = targets['steps']
+        return [targets['format'].format(step) for step in range(first_step, last_step + 1)]
+
+    return list(targets)
+
+
+def _validate_hub_spec(hub_spec):
+    """
+    :raises RuntimeError: if hub_spec is invalid
+    """
+    for key in ['name', 'target_groups', 'location_sets']:
+        if key not in hub_spec:
+            raise RuntimeError(f"hub spec is missing a required key: {key!r}")
+
+    seen_targets = set()
+    for target_group in hub_spec['target_groups']:
+        for key in ['name', 'targets', 'locations', 'quantiles']:
+            if key not in target_group:
+                raise RuntimeError(f"target group is missing a required key: {key!r}. target_group={target_group}")
+
+        bad_location_sets = [name for name in target_group['locations'] if name not in hub_spec['location_sets']]
+        if bad_location_sets:
+            raise RuntimeError(f"target group references unknown location sets: {bad_location_sets}. "
+                               f"target_group={target_group['name']!r}")
+
+        targets = _expand_targets(target_group['targets'])
+        if seen_targets & set(targets):
+            raise RuntimeError(f"targets are in more than one target group: {sorted(seen_targets & set(targets))}")
+
+        seen_targets.update(targets)
+
+    date_columns = hub_spec.get('date_columns')
+    if date_columns and (set(date_columns) != {'forecast_date', 'target_end_date'}):
+        raise RuntimeError(f"date_columns must have exactly the keys 'forecast_date' and 'target_end_date'. "
+                           f"date_columns={date_columns}")
+
+    for step_unit in hub_spec.get('step_units', []):
+        for key in ['unit', 'marker', 'alignment']:
+            if key not in step_unit:
+                raise RuntimeError(f"step unit is missing a required key: {key!r}. step_unit={step_unit}")
+
+        if step_unit['alignment'] not in ALIGNMENTS:
+            raise RuntimeError(f"invalid step unit alignment: {step_unit['alignment']!r}. valid alignments: "
+                               f"{ALIGNMENTS}")
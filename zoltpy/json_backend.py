@@ -0,0 +1,176 @@
+import bisect
+import json
+import logging
+import os
+import re
+
+
+logger = logging.getLogger(__name__)
+
+#
+# This file defines a small serializer abstraction used wherever zoltpy encodes or decodes potentially large JSON (e.g.,
+# forecast uploads and downloads). It uses orjson (https://github.com/ijl/orjson) if it's installed, and o/w the
+# standard library's `json`. The $ZOLTPY_JSON_BACKEND environment variable (or `set_backend()`) forces one of BACKENDS.
+#
+# The orjson backend is a drop-in replacement:
+#
+# - decoding: orjson and `json` parse numbers to identical Python values. input that orjson rejects but `json`
+#   accepts (e.g., NaN and Infinity literals, or ints beyond 64 bits) is decoded by `json`
+# - encoding: numbers are byte-compatible with `json.dumps()`: orjson formats some floats differently (e.g., '1e16' and
+#   '0.00001' vs. '1e+16' and '1e-05'), so those are rewritten using `float.__repr__()`, which is what `json` uses.
+#   objects that orjson can't encode exactly (NaN and Infinity, which it writes as null, ints beyond 64 bits, and
+#   non-str keys), and ones with so many such floats that rewriting them would be slower, are encoded by `json`. note
+#   that non-numeric output differs: it's compact (no spaces after ',' and ':') and non-ASCII characters aren't escaped
+#
+
+BACKEND_STDLIB = 'json'
+BACKEND_ORJSON = 'orjson'
+BACKENDS = (BACKEND_STDLIB, BACKEND_ORJSON)
+
+BACKEND_ENV_VAR = 'ZOLTPY_JSON_BACKEND'
+
+# orjson floats whose format differs from `float.__repr__()`: those with exponents, and positional ones < 1e-4 (which
+# repr writes with an exponent). each regex starts with a literal so that scanning for candidates is fast. candidates
+# are checked to be whole numbers outside of strings
+_ORJSON_EXPONENT_RE = re.compile(rb'e-?\d+')
+_ORJSON_SMALL_FLOAT_RE = re.compile(rb'0\.0000\d*')
+_ORJSON_FLOAT_TO_REWRITE_RE = re.compile(rb'-?(?:\d+(?:\.\d+)?e-?\d+|0\.0000\d*)')
+_STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_NUMBER_BYTES = b'0123456789.-'
+# rewriting a float takes a few microseconds, so with more than this many candidates per byte it's faster to encode
+# with `json` instead (e.g., bin probabilities that are mostly tiny)
+_MAX_CANDIDATES_PER_BYTE = 1 / 500
+
+_backend_name = None  # set on first use
+
+
+def backend_name():
+    """
+    :return: the name of the backend in use, one of BACKENDS
+    """
+    global _backend_name
+    if _backend_name is None:
+        env_backend_name = os.environ.get(BACKEND_ENV_VAR)
+        if env_backend_name:
+            set_backend(env_backend_name)
+        else:
+            try:
+                import orjson  # deferred for import speed
+
+
+                _backend_name = BACKEND_ORJSON
+            except ImportError:
+                _backend_name = BACKEND_STDLIB
+        logger.debug(f"backend_name(): using {_backend_name!r}")
+    return _backend_name
+
+
+def set_backend(name):
+    """
+    Forces the backend, e.g., for benchmarks and tests.
+
+    :param name: one of BACKENDS, or None to auto-select the next time one is needed
+    """
+    global _backend_name
+    if name not in BACKENDS + (None,):
+        raise RuntimeError(f"invalid backend: {name!r}. must be one of {BACKENDS}")
+    elif name == BACKEND_ORJSON:
+        import orjson  # raises ImportError if not installed
+
+
+    _backend_name = name
+
+
+def dumps(obj):
+    """
+    :param obj: a JSON-serializable object
+    :return: obj encoded as UTF-8 JSON bytes
+    """
+    if backend_name() == BACKEND_ORJSON:
+        import orjson  # deferred for import speed
+
+
+        try:
+            json_bytes = orjson.dumps(obj)
+        except TypeError:  # e.g., ints beyond 64 bits or non-str keys
+            json_bytes = None
+        if (json_bytes is not None) and (b'null' not in json_bytes):  # null might be from NaN or Infinity
+            json_bytes = _rewrite_orjson_floats(json_bytes)
+            if json_bytes is not None:
+                return json_bytes
+
+    return json.dumps(obj).encode('utf-8')
+
+
+def _rewrite_orjson_floats(json_bytes):
+    """
+    :return: json_bytes with the floats that orjson formats differently from `float.__repr__()` rewritten, or
+        json_bytes itself if there are none (the usual case). returns None if there are too many to rewrite quickly
+    """
+    max_candidates = 64 + int(len(json_bytes) * _MAX_CANDIDATES_PER_BYTE)
+    float_spans = set()  # (start, end)
+    for float_re in [_ORJSON_EXPONENT_RE, _ORJSON_SMALL_FLOAT_RE]:
+        for match_idx, match in enumerate(float_re.finditer(json_bytes)):
+            if match_idx == max_candidates:
+                return None
+
+            start = match.start()
+            while start and (json_bytes[start - 1] in _NUMBER_BYTES):
+                start -= 1
+            if (start and (json_bytes[start - 1] not in b':,[')) \
+                    or not _ORJSON_FLOAT_TO_REWRITE_RE.fullmatch(json_bytes, start, match.end()):
+                continue  # not a whole number, e.g., part of a string or of a longer positional float
+
+            float_spans.add((start, match.end()))
+    if not float_spans:
+        return json_bytes
+
+    # skip candidates in strings, e.g., '["a,1e16"]'
+    string_spans = [match.span() for match in _STRING_RE.finditer(json_bytes)]
+    string_starts = [string_start for string_start, _ in string_spans]
+    pieces = []
+    prev_end = 0
+    for start, end in sorted(float_spans):
+        string_idx = bisect.bisect_right(string_starts, start) - 1
+        if (string_idx >= 0) and (start < string_spans[string_idx][1]):
+            continue
+
+        pieces.append(json_bytes[prev_end:start])
+        pieces.append(repr(float(json_bytes[start:end])).encode('ascii'))
+        prev_end = end
+    pieces.append(json_bytes[prev_end:])
+    return b''.join(pieces)
+
+
+def loads(json_bytes):
+    """
+    :param json_bytes: JSON to decode, as bytes (UTF-8) or a str
+    :return: the decoded object
+    """
+    if backend_name() == BACKEND_ORJSON:
+        import orjson  # deferred for import speed
+
+
+        try:
+            return orjson.loads(json_bytes)
+        except orjson.JSONDecodeError:  # e.g., NaN or big ints. `json` either decodes it or raises its own error
+            pass
+
+    return json.loads(json_bytes)
+
+
+def dump(obj, fp):
+    """
+    Writes `dumps(obj)` to fp.
+
+    :param fp: a file-like object opened in binary mode
+    """
+    fp.write(dumps(obj))
+
+
+def load(fp):
+    """
+    :param fp: a file-like object opened in binary or text mode
+    :return: `loads()` of fp's contents
+    """
+    return loads(fp.read())
@@ -0,0 +1,143 @@
+import codecs
+import json
+
+
+#
+# This file defines an incremental parser for "JSON IO dicts" that arrive as a stream of chunks, e.g., a
+# `Forecast.data()` download. Rather than holding the raw bytes, the decoded string, and the parsed dict all at once,
+# `iter_prediction_dicts_from_json_chunks()` yields each element of the "predictions" array as soon as it has been
+# read, so peak memory is proportional to one prediction (plus a chunk) rather than the whole forecast. It uses the
+# standard library's `json.JSONDecoder.raw_decode()` to decode one value at a time from a rolling buffer.
+#
+
+DEFAULT_CHUNK_SIZE = 1 << 16  # bytes
+
+
+def iter_prediction_dicts_from_json_chunks(chunks, meta=None):
+    """
+    A generator that parses a "JSON IO dict" from chunks, yielding its prediction dicts one at a time.
+
+    :param chunks: an iterable of bytes (UTF-8) or str chunks that together make up a JSON object, e.g.,
+        `requests.Response.iter_content()`. chunks may split the JSON anywhere, including within multi-byte characters
+    :param meta: an optional dict that's updated with the object's "meta" section when it's read. other top-level keys
+        are parsed and ignored
+    :return: a generator of prediction dicts. raises RuntimeError if the JSON is invalid or has no "predictions"
+    """
+    reader = _JsonChunkReader(chunks)
+    reader.expect('{')
+    is_found_predictions = False
+    while not reader.consume_if('}'):
+        key = reader.decode_value()
+        reader.expect(':')
+        if key == 'predictions':
+            is_found_predictions = True
+            reader.expect('[')
+            if not reader.consume_if(']'):
+                while True:
+                    yield reader.decode_value()
+                    if reader.consume_if(']'):
+                        break
+
+                    reader.expect(',')
+        else:
+            value = reader.decode_value()
+            if (key == 'meta') and (meta is not None):
+                meta.update(value)
+        reader.consume_if(',')
+    if not is_found_predictions:
+        raise RuntimeError("no predictions section found in json_io_dict")
+
+
+class _JsonChunkReader:
+    """
+    A rolling buffer of decoded text that's refilled from chunks as values are consumed from its front.
+    """
+
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0  # index of the next unconsumed character in buffer
+        self.is_exhausted = False
+
+
+    def _fill(self):
+        """
+        Appends the next chunk to buffer, first dropping consumed characters. Sets is_exhausted if there are no more.
+
+        :return: True if there was a chunk
+        """
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.is_exhausted = True
+            self.buffer = self.buffer[self.pos:] + self.utf8_decoder.decode(b'', final=True)
+            self.pos = 0
+            return False
+
+        self.buffer = self.buffer[self.pos:] + (chunk if isinstance(chunk, str) else self.utf8_decoder.decode(chunk))
+        self.pos = 0
+        return True
+
+
+    def _skip_whitespace(self):
+        """
+        :return: the next non-whitespace character, which is not consumed, or '' if there are none
+        """
+        while True:
+            while (self.pos < len(self.buffer)) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            elif not self._fill():
+                return ''
+
+
+    def consume_if(self, char):
+        """
+        :return: True if the next non-whitespace character is char, in which case it's consumed
+        """
+        if self._skip_whitespace() == char:
+            self.pos += 1
+            return True
+
+        return False
+
+
+    def expect(self, char):
+        if not self.consume_if(char):
+            raise RuntimeError(f"invalid JSON: expected {char!r} but found {self._skip_whitespace()!r}")
+
+
+    def decode_value(self):
+        """
+        :return: the next JSON value, which is consumed. reads more chunks until the value is complete
+        """
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as jde:
+                if self.is_exhausted:
+                    raise RuntimeError(f"invalid JSON: {jde}")
+
+                self._fill_more()
+                continue
+
+            if (end < len(self.buffer)) or self.is_exhausted:
+                self.pos = end
+                return value
+
+            self._fill_more()  # a number at the end of the buffer might continue in the next chunk. decode again
+
+
+    def _fill_more(self):
+        """
+        Called when the value at pos is incomplete. Reads chunks until the unconsumed part of buffer has at least doubled
+        (or there are no more) so that decoding a value that spans many chunks takes linear rather than quadratic time.
+        """
+        target_len = 2 * (len(self.buffer) - self.pos)
+        while self._fill() and (len(self.buffer) < target_len):
+            pass
@@ -0,0 +1,268 @@
+import contextlib
+import threading
+import time
+
+
+#
+# This file implements optional stage-level profiling of the quantile and CDC CSV readers, i.e.,
+# `json_io_dict_from_quantile_csv_file()` and `json_io_dict_from_cdc_csv_file()` (and their ForecastFrame and
+# streaming variants). Use `profile_readers()` as a context manager around reader calls:
+#
+#   with profile_readers() as reader_stats:
+#       json_io_dict_from_quantile_csv_file(...)
+#   print('\n'.join(reader_stats.format_lines()))
+#
+# The readers check for an active ReaderStats once per call, and only if there is one do they wrap their CSV reader,
+# `_parse_value()`, row validator, etc. in timing code. Thus profiling costs nothing per row when it's disabled. Stages
+# can be nested (e.g., `_validate_quantile_prediction_dict()` runs during the sort/groupby loop), so each stage's time
+# is its self time, i.e., excluding the stages nested in it. Time not in any stage is reported as STAGE_OTHER.
+#
+
+# stages. not all readers have all of them
+STAGE_CSV_READ = 'csv_read'  # reading and splitting rows via `csv.reader()`. count: rows
+STAGE_PARSE_VALUE = 'parse_value'  # `cdc_io._parse_value()`. count: calls
+STAGE_ROW_VALIDATOR = 'row_validator'  # the optional row_validator. count: rows
+STAGE_ROW_CHECKS = 'row_checks'  # the reader's own per-row checks, i.e., excluding the above. count: rows
+STAGE_SORT_GROUPBY = 'sort_groupby'  # sorting rows and grouping them into prediction dicts. count: rows
+STAGE_VALIDATE_PREDICTION = 'validate_prediction'  # `_validate_quantile_prediction_dict()`. count: prediction dicts
+STAGE_PREDICTION_CHECKS = 'prediction_checks'  # duplicate and point count checks. count: (location, target) pairs
+STAGE_PROCESS_ROW = 'process_row'  # CDC point and bin row conversions, e.g., EWs to dates. count: rows
+STAGE_SORT = 'sort'  # sorting the CDC prediction dicts. count: prediction dicts
+STAGE_OTHER = 'other'  # time that's not in any of the above
+
+_ACTIVE_READER_STATS = threading.local()  # `reader_stats` attribute: the active ReaderStats, if any, per thread
+
+
+class StageStats:
+    """
+    The stats for one stage: its number of calls, count (e.g., rows - see the STAGE_* comments), inclusive and self
+    seconds, and net allocated bytes (None unless allocations are traced).
+    """
+
+    __slots__ = ('name', 'calls', 'count', 'seconds', 'child_seconds', 'alloc_bytes')
+
+
+    def __init__(self, name):
+        self.name = name
+        self.calls, self.count, self.seconds, self.child_seconds, self.alloc_bytes = 0, 0, 0.0, 0.0, None
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, self.name, self.calls, self.count, self.self_seconds, self.alloc_bytes))
+
+
+    @property
+    def self_seconds(self):
+        return self.seconds - self.child_seconds
+
+
+class ReaderStats:
+    """
+    The stats object returned by `profile_readers()`. `stages` maps each stage name to its StageStats, in the order
+    they were first used. `total_seconds` is the wall time of the `profile_readers()` block, which is set when it
+    exits.
+    """
+
+
+    def __init__(self, trace_allocations=False):
+        """
+        :param trace_allocations: True if each stage's net allocations should be measured via `tracemalloc`. this
+            slows reading down considerably
+        """
+        self.trace_allocations = trace_allocations
+        self.stages = {}  # name -> StageStats
+        self.total_seconds = None
+        self._open_stages = []  # stack of StageStats that are being timed, for nesting
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, list(self.stages), self.total_seconds))
+
+
+    def _stage_stats(self, name):
+        stage_stats = self.stages.get(name)
+        if stage_stats is None:
+            stage_stats = self.stages[name] = StageStats(name)
+            if self.trace_allocations:
+                stage_stats.alloc_bytes = 0
+        return stage_stats
+
+
+    @contextlib.contextmanager
+    def stage(self, name, count=0):
+        """
+        A context manager that times its block as one call of the stage name.
+
+        :param name: a STAGE_* name
+        :param count: added to the stage's count
+        """
+        stage_stats = self._stage_stats(name)
+        start = self._start(stage_stats)
+        try:
+            yield stage_stats
+        finally:
+            self._stop(stage_stats, start, count)
+
+
+    def timed(self, name, fcn):
+        """
+        :return: a wrapper of fcn that times each call as a call of the stage name, counting one per call
+        """
+        stage_stats = self._stage_stats(name)
+
+
+        def timed_fcn(*args, **kwargs):
+            start = self._start(stage_stats)
+            try:
+                return fcn(*args, **kwargs)
+            finally:
+                self._stop(stage_stats, start, 1)
+
+
+        return timed_fcn
+
+
+    def timed_iter(self, name, iterable):
+        """
+        :return: a generator that yields iterable's items, timing each `next()` as a call of the stage name, counting
+            one per item
+        """
+        stage_stats = self._stage_stats(name)
+        iterator = iter(iterable)
+        while True:
+            start = self._start(stage_stats)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._stop(stage_stats, start, 0)
+                return
+
+            self._stop(stage_stats, start, 1)
+            yield item
+
+
+    def _start(self, stage_stats):
+        """
+        `stage()`, `timed()`, and `timed_iter()` helper that starts timing a call of stage_stats.
+
+        :return: the start, to pass to `_stop()`
+        """
+        self._open_stages.append(stage_stats)
+        return (time.perf_counter(), _traced_bytes() if self.trace_allocations else 0)
+
+
+    def _stop(self, stage_stats, start, count):
+        """
+        Finishes timing the call of stage_stats that `_start()` returned start for, adding count to its count.
+        """
+        elapsed = time.perf_counter() - start[0]
+        self._open_stages.pop()
+        stage_stats.calls += 1
+        stage_stats.count += count
+        stage_stats.seconds += elapsed
+        if self._open_stages:
+            self._open_stages[-1].child_seconds += elapsed
+        if self.trace_allocations:
+            stage_stats.alloc_bytes += _traced_bytes() - start[1]
+
+
+    def as_dict(self):
+        """
+        :return: a JSON-able dict of my stats: {'total_seconds': ..., 'stages': [{'name', 'calls', 'count',
+            'seconds', 'alloc_bytes'}, ...]}, where 'seconds' is self seconds. includes STAGE_OTHER if total_seconds
+            is set
+        """
+        stage_dicts = [{'name': stage_stats.name, 'calls': stage_stats.calls, 'count': stage_stats.count,
+                        'seconds': stage_stats.self_seconds, 'alloc_bytes': stage_stats.alloc_bytes}
+                       for stage_stats in self.stages.values()]
+        if self.total_seconds is not None:
+            other_seconds = self.total_seconds - sum(stage_dict['seconds'] for stage_dict in stage_dicts)
+            stage_dicts.append({'name': STAGE_OTHER, 'calls': None, 'count': None, 'seconds': max(other_seconds, 0.0),
+                                'alloc_bytes': None})
+        return {'total_seconds': self.total_seconds, 'stages': stage_dicts}
+
+
+    def format_lines(self):
+        """
+        :return: a list of strs that's a per-stage breakdown table of `as_dict()`, slowest stages first
+        """
+        stats_dict = self.as_dict()
+        total_seconds = stats_dict['total_seconds'] or sum(stage_dict['seconds'] for stage_dict in stats_dict['stages'])
+        lines = [f"{'stage':<20} {'seconds':>9} {'%':>6} {'count':>10} {'alloc KB':>10}"]
+        for stage_dict in sorted(stats_dict['stages'], key=lambda _: _['seconds'], reverse=True):
+            percent = (100 * stage_dict['seconds'] / total_seconds) if total_seconds else 0.0
+            count_str = '' if stage_dict['count'] is None else str(stage_dict['count'])
+            alloc_str = '' if stage_dict['alloc_bytes'] is None else f"{stage_dict['alloc_bytes'] / 1024:.0f}"
+            lines.append(f"{stage_dict['name']:<20} {stage_dict['seconds']:>9.3f} {percent:>5.1f}% {count_str:>10} "
+                         f"{alloc_str:>10}")
+        lines.append(f"{'total':<20} {total_seconds:>9.3f}")
+        return lines
+
+
+@contextlib.contextmanager
+def profile_readers(trace_allocations=False):
+    """
+    A context manager that profiles the reader calls in its block (in the current thread), yielding a ReaderStats
+    that's filled as they run. Stats accumulate over all calls in the block.
+
+    :param trace_allocations: passed to `ReaderStats()`. `tracemalloc` is started if it's not already tracing, and
+        stopped on exit
+    """
+    reader_stats = ReaderStats(trace_allocations)
+    is_tracemalloc_started = False
+    if trace_allocations:
+        import tracemalloc  # deferred for import speed
+
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            is_tracemalloc_started = True
+    outer_reader_stats = active_reader_stats()
+    _ACTIVE_READER_STATS.reader_stats = reader_stats
+    start_time = time.perf_counter()
+    try:
+        yield reader_stats
+    finally:
+        reader_stats.total_seconds = time.perf_counter() - start_time
+        _ACTIVE_READER_STATS.reader_stats = outer_reader_stats
+        if is_tracemalloc_started:
+            tracemalloc.stop()
+
+
+def active_reader_stats():
+    """
+    :return: the ReaderStats of the enclosing `profile_readers()` block, or None if there isn't one
+    """
+    return getattr(_ACTIVE_READER_STATS, 'reader_stats', None)
+
+
+def reader_stage(reader_stats, name, count=0):
+    """
+    A helper for readers that returns `reader_stats.stage(name, count)`, or a no-op context manager if reader_stats is
+    None, i.e., if profiling is disabled.
+    """
+    return _NO_STAGE if reader_stats is None else reader_stats.stage(name, count)
+
+
+class _NoStage:
+    """
+    The no-op context manager returned by `reader_stage()` when profiling is disabled. it yields None.
+    """
+
+
+    def __enter__(self):
+        return None
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def _traced_bytes():
+    import tracemalloc  # deferred for import speed
+
+
+    return tracemalloc.get_traced_memory()[0]
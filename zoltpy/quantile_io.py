@@ -4,6 +4,9 @@ import math
 from collections import defaultdict
 from itertools import groupby
 
+from zoltpy.profiling import STAGE_CSV_READ, STAGE_PARSE_VALUE, STAGE_PREDICTION_CHECKS, STAGE_ROW_CHECKS, \
+    STAGE_ROW_VALIDATOR, STAGE_SORT_GROUPBY, STAGE_VALIDATE_PREDICTION, active_reader_stats, reader_stage
+
 
 #
 # project-independent variables
@@ -23,8 +26,9 @@ REQUIRED_COLUMNS = ('location', 'target', 'type', 'quantile', 'value')
 #
 # Note: The following code is a somewhat temporary solution to validation during COVID-19 crunch time. As such, we
 # hard-code target information: all targets are: "type": "discrete", "is_step_ahead": true. Also, all validation
-# functions return lists of error messages, formatted for output during processing. Processing continues as long as
-# possible (ideally the entire file) so that all errors can be reported to the user.
+# functions return lists of ErrorRecords, which are only formatted into messages when they are output. Processing
+# continues as long as possible (ideally the entire file, unless `max_errors` is passed) so that all errors can be
+# reported to the user.
 #
 
 
@@ -39,8 +43,134 @@ MESSAGE_DATE_ALIGNMENT = 1  # 3. validates date alignment as documented in the i
 MESSAGE_QUANTILES_AND_VALUES = 2  # 4. validates quantiles and values (i.e,. at the prediction level)
 MESSAGE_QUANTILES_AS_A_GROUP = 3  # 5. validates quantiles as a group
 
+# error codes identifying each kind of ErrorRecord. each has a corresponding message template in ERROR_TEMPLATES
+ERROR_INVALID_HEADER = 'invalid_header'
+ERROR_ROW_LENGTH = 'row_length'
+ERROR_QUANTILE_NOT_IN_RANGE = 'quantile_not_in_range'
+ERROR_VALUE_NOT_NUMERIC = 'value_not_numeric'
+ERROR_INVALID_TARGETS = 'invalid_targets'
+ERROR_QUANTILE_VALUE_LENGTHS = 'quantile_value_lengths'
+ERROR_QUANTILES_NOT_UNIQUE = 'quantiles_not_unique'
+ERROR_VALUES_DECREASING = 'values_decreasing'
+ERROR_DUPLICATE_PREDICTION_ELEMENTS = 'duplicate_prediction_elements'
+ERROR_POINT_COUNT = 'point_count'
+ERROR_MAX_ERRORS = 'max_errors'
+
+ERROR_TEMPLATES = {
+    ERROR_INVALID_HEADER: "{message}",
+    ERROR_ROW_LENGTH: "invalid number of items in row. len(header)={header_len} but len(row)={row_len}. row={row}",
+    ERROR_QUANTILE_NOT_IN_RANGE: "entries in the `quantile` column must be an int or float in [0, 1]: {quantile}. "
+                                 "row={row}",
+    ERROR_VALUE_NOT_NUMERIC: "entries in the `value` column must be an int or float: {value}. row={row}",
+    ERROR_INVALID_TARGETS: "invalid target name(s): {error_targets!r}",
+    ERROR_QUANTILE_VALUE_LENGTHS: "The number of elements in the `quantile` and `value` vectors should be identical. "
+                                  "|quantile|={num_quantiles}, |value|={num_values}, prediction_dict={prediction_dict}",
+    ERROR_QUANTILES_NOT_UNIQUE: "`quantile`s must be unique. quantile column={quantiles}, "
+                                "prediction_dict={prediction_dict}",
+    ERROR_VALUES_DECREASING: "Entries in `value` must be non-decreasing as quantiles increase. value column={values}, "
+                             "is_le_values={is_le_values}, prediction_dict={prediction_dict}",
+    ERROR_DUPLICATE_PREDICTION_ELEMENTS: "Within a Prediction, there cannot be more than 1 Prediction Element of the "
+                                         "same class. Found these duplicate unit/target/classes tuples: {tuples}",
+    ERROR_POINT_COUNT: "There must be exactly one point prediction for each location/target pair. Found these unit, "
+                       "target, point counts tuples did not have exactly one point: {tuples}",
+    ERROR_MAX_ERRORS: "stopped processing after reaching max_errors={max_errors}. remaining rows were not validated",
+}
+
+
+class ErrorRecord:
+    """
+    A structured validation error. Stores the raw pieces of an error (a code, its priority, and where it occurred)
+    rather than a formatted string, which is only built on demand via `message`. This keeps validation of badly broken
+    files cheap because most messages are never shown to the user (see `summarized_error_messages()`).
+
+    For backwards compatibility an ErrorRecord acts like the 2-tuple (priority, error_message) that validation
+    functions have always returned: it can be unpacked, indexed, sorted, and compared to such tuples.
+    """
+
+    __slots__ = ('code', 'priority', 'template', 'location', 'target', 'row_num', 'fields')
+
+
+    def __init__(self, code, priority, template, location=None, target=None, row_num=None, **fields):
+        """
+        :param code: a short string identifying the kind of error, e.g., ERROR_ROW_LENGTH
+        :param priority: one of the MESSAGE_* ints. used by callers to sort the messages
+        :param template: a `str.format()` template that's filled from `fields` (plus `location` and `target`) to
+            create `message`
+        :param location: optional location (unit) the error is about
+        :param target: optional target the error is about
+        :param row_num: optional 1-based row number (header is row 0) of the csv row the error is about
+        :param fields: the remaining values referenced by template
+        """
+        self.code = code
+        self.priority = priority
+        self.template = template
+        self.location = location
+        self.target = target
+        self.row_num = row_num
+        self.fields = fields
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, self.code, self.priority, self.location, self.target, self.row_num))
+
+
+    @property
+    def message(self):
+        return self.template.format(location=self.location, target=self.target, **self.fields)
+
+
+    def as_tuple(self):
+        return self.priority, self.message
+
+
+    def __len__(self):
+        return 2
+
+
+    def __iter__(self):
+        return iter(self.as_tuple())
+
+
+    def __getitem__(self, index):
+        return self.as_tuple()[index]
+
 
-def json_io_dict_from_quantile_csv_file(csv_fp, valid_target_names, row_validator=None, addl_req_cols=()):
+    def __eq__(self, other):
+        if isinstance(other, (ErrorRecord, tuple)):
+            return self.as_tuple() == tuple(other)
+
+        return NotImplemented
+
+
+    def __lt__(self, other):
+        return self.as_tuple() < tuple(other)
+
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+
+def error_record(code, priority, location=None, target=None, row_num=None, **fields):
+    """
+    :return: an ErrorRecord for one of the ERROR_* codes defined in this module, using its ERROR_TEMPLATES template
+    """
+    return ErrorRecord(code, priority, ERROR_TEMPLATES[code], location, target, row_num, **fields)
+
+
+def error_code_counts(error_messages):
+    """
+    :param error_messages: list of ErrorRecords or 2-tuples as returned by `json_io_dict_from_quantile_csv_file()`
+    :return: a dict that maps each error code to the number of errors with that code. errors that are plain 2-tuples
+        (e.g., from custom row validators) are counted under None
+    """
+    code_counts = defaultdict(int)
+    for error_message in error_messages:
+        code_counts[error_message.code if isinstance(error_message, ErrorRecord) else None] += 1
+    return dict(code_counts)
+
+
+def json_io_dict_from_quantile_csv_file(csv_fp, valid_target_names, row_validator=None, addl_req_cols=(),
+                                        max_errors=None, error_sink=None):
     """
     Utility that validates and extracts the two types of predictions found in quantile CSV files (PointPredictions and
     QuantileDistributions), returning them as a "JSON IO dict" suitable for loading into the database (see
@@ -65,155 +195,240 @@ def json_io_dict_from_quantile_csv_file(csv_fp, valid_target_names, row_validato
         - row: the raw row being validated. NB: the order of columns is variable, but callers can use column_index_dict
             to index into row
     :param addl_req_cols: an optional list of strings naming columns in addition to REQUIRED_COLUMNS that are required
+    :param max_errors: an optional int that enables fail-fast: processing stops as soon as this many errors have been
+        found, and a final ERROR_MAX_ERRORS error is added. None (the default) processes the entire file
+    :param error_sink: an optional object with `append()` and `__len__()` methods, typically an ErrorSummarizer, that
+        errors are added to as they are produced. it is returned as error_messages. a new list is used if None
     :return 2-tuple: (json_io_dict, error_messages) where the former is a "JSON IO dict" (aka 'json_io_dict' by callers)
         that contains the two types of predictions. see https://docs.zoltardata.com/ for details. json_io_dict is None
-        if there were errors. the second arg is a list of 2-tuples: (priority, error_message). priority is an int that's
-        used by callers to sort the messages
+        if there were errors. the second arg is a list of ErrorRecords, which act like 2-tuples:
+        (priority, error_message). priority is an int that's used by callers to sort the messages
     """
-    # load and validate the rows (validation step 1/4). error_messages is one of the the return values (filled next)
-    rows, error_messages = _validated_rows_for_quantile_csv(csv_fp, valid_target_names, row_validator, addl_req_cols)
-
-    # step 2/4: process rows, collecting point and quantile values for each row. then add the actual prediction dicts.
-    # each point row has its own dict, but quantile rows are grouped into one dict.
     prediction_dicts = []  # the 'predictions' section of the returned value. filled next
-    rows.sort(key=lambda _: (_[0], _[1], _[2]))  # sorted for groupby()
-    for (target, location, is_point_row), quantile_val_grouper in groupby(rows, key=lambda _: (_[0], _[1], _[2])):
-        # fill values for points and bins
-        point_values = []
-        quant_quantiles, quant_values = [], []
-        for _, _, _, quantile, value in quantile_val_grouper:
-            if is_point_row:
-                point_values.append(value)  # quantile is NA
-            else:
-                quant_quantiles.append(quantile)
-                quant_values.append(value)
-
-        # add the actual prediction dicts
-        for point_value in point_values:
-            prediction_dicts.append({'unit': location,
-                                     'target': target,
-                                     'class': POINT_PREDICTION_CLASS,  # PointPrediction
-                                     'prediction': {
-                                         'value': point_value}})
-        if quant_quantiles:
-            prediction_dicts.append({'unit': location,
-                                     'target': target,
-                                     'class': QUANTILE_PREDICTION_CLASS,  # QuantileDistribution
-                                     'prediction': {
-                                         'quantile': quant_quantiles,
-                                         'value': quant_values}})
-
-    # step 3/4: validate individual prediction_dicts. along the way fill loc_targ_to_pred_classes, which helps to do
-    # "prediction"-level validations at the end of this function. it maps 2-tuples to a list of prediction classes
-    # (strs):
+    error_messages = _predictions_from_quantile_csv_file(csv_fp, valid_target_names, row_validator, addl_req_cols,
+                                                         max_errors, error_sink, prediction_dicts)
+    return {'meta': {}, 'predictions': prediction_dicts}, error_messages
+
+
+def forecast_frame_from_quantile_csv_file(csv_fp, valid_target_names, row_validator=None, addl_req_cols=(),
+                                          max_errors=None, error_sink=None):
+    """
+    The same as `json_io_dict_from_quantile_csv_file()`, but returns the predictions as a `ForecastFrame` rather than a
+    "JSON IO dict". No intermediate prediction dicts are kept, which makes this much more memory-efficient for large
+    (e.g., county-level) files.
+
+    :return 2-tuple: (forecast_frame, error_messages). the latter is the same as
+        `json_io_dict_from_quantile_csv_file()`
+    """
+    from zoltpy.forecast_frame import ForecastFrameBuilder  # avoid circular imports
+
+
+    builder = ForecastFrameBuilder()
+    error_messages = _predictions_from_quantile_csv_file(csv_fp, valid_target_names, row_validator, addl_req_cols,
+                                                         max_errors, error_sink, builder)
+    return builder.build(), error_messages
+
+
+def _predictions_from_quantile_csv_file(csv_fp, valid_target_names, row_validator, addl_req_cols, max_errors,
+                                        error_sink, predictions):
+    """
+    `json_io_dict_from_quantile_csv_file()` and `forecast_frame_from_quantile_csv_file()` helper that does the actual
+    work.
+
+    :param predictions: a list or `ForecastFrameBuilder` that the prediction dicts are appended to
+    :return: error_messages, as documented in `json_io_dict_from_quantile_csv_file()`
+    """
+    # load and validate the rows (validation step 1/3). error_messages is one of the the return values (filled next)
+    rows, error_messages = _validated_rows_for_quantile_csv(csv_fp, valid_target_names, row_validator, addl_req_cols,
+                                                            max_errors, error_sink)
+
+    # profiling is checked once here rather than per row so that it costs nothing when disabled
+    reader_stats = active_reader_stats()
+    validate_quantile_prediction_dict = _validate_quantile_prediction_dict if reader_stats is None \
+        else reader_stats.timed(STAGE_VALIDATE_PREDICTION, _validate_quantile_prediction_dict)
+
+    # step 2/3: process rows, collecting point and quantile values for each row. then add the actual prediction dicts.
+    # each point row has its own dict, but quantile rows are grouped into one dict. along the way validate individual
+    # quantile prediction dicts, and fill loc_targ_to_pred_classes, which helps to do "prediction"-level validations at
+    # the end of this function. it maps 2-tuples to a list of prediction classes (strs):
     loc_targ_to_pred_classes = defaultdict(list)  # (unit, target) -> [prediction_class1, ...]
-    for prediction_dict in prediction_dicts:
-        unit = prediction_dict['unit']
-        target = prediction_dict['target']
-        prediction_class = prediction_dict['class']
-        loc_targ_to_pred_classes[(unit, target)].append(prediction_class)
-        if prediction_dict['class'] == QUANTILE_PREDICTION_CLASS:
-            pred_dict_error_messages = _validate_quantile_prediction_dict(prediction_dict)
-            error_messages.extend(pred_dict_error_messages)
-
-    # step 4/4: do "prediction"-level validations
-    # validate: "Within a Prediction, there cannot be more than 1 Prediction Element of the same type".
-    duplicate_unit_target_tuples = [(unit, target, pred_classes) for (unit, target), pred_classes
-                                    in loc_targ_to_pred_classes.items()
-                                    if len(pred_classes) != len(set(pred_classes))]
-    if duplicate_unit_target_tuples:
-        if len(duplicate_unit_target_tuples) > 10:  # pick first 10 tuples to reduce output
-            duplicate_unit_target_tuples = duplicate_unit_target_tuples[:10] + ['...']
-        error_messages.append((MESSAGE_QUANTILES_AND_VALUES,
-                               f"Within a Prediction, there cannot be more than 1 Prediction Element of the same "
-                               f"class. Found these duplicate unit/target/classes tuples: "
-                               f"{duplicate_unit_target_tuples}"))
-
-    # validate: "There must be exactly one point prediction for each location/target pair"
-    unit_target_point_count = [(unit, target, pred_classes.count('point')) for (unit, target), pred_classes
-                               in loc_targ_to_pred_classes.items()
-                               if pred_classes.count('point') != 1]
-    if unit_target_point_count:
-        if len(unit_target_point_count) > 10:  # pick first 10 tuples to reduce output
-            unit_target_point_count = unit_target_point_count[:10] + ['...']
-        error_messages.append((MESSAGE_QUANTILES_AS_A_GROUP,
-                               f"There must be exactly one point prediction for each location/target pair. Found these "
-                               f"unit, target, point counts tuples did not have exactly one point: "
-                               f"{unit_target_point_count}"))
+    with reader_stage(reader_stats, STAGE_SORT_GROUPBY, len(rows)):
+        rows.sort(key=lambda _: (_[0], _[1], _[2]))  # sorted for groupby()
+        for (target, location, is_point_row), quantile_val_grouper in groupby(rows, key=lambda _: (_[0], _[1], _[2])):
+            # fill values for points and bins
+            point_values = []
+            quant_quantiles, quant_values = [], []
+            for _, _, _, quantile, value in quantile_val_grouper:
+                if is_point_row:
+                    point_values.append(value)  # quantile is NA
+                else:
+                    quant_quantiles.append(quantile)
+                    quant_values.append(value)
+
+            # add the actual prediction dicts
+            for point_value in point_values:
+                loc_targ_to_pred_classes[(location, target)].append(POINT_PREDICTION_CLASS)
+                predictions.append({'unit': location,
+                                    'target': target,
+                                    'class': POINT_PREDICTION_CLASS,  # PointPrediction
+                                    'prediction': {
+                                        'value': point_value}})
+            if quant_quantiles:
+                prediction_dict = {'unit': location,
+                                   'target': target,
+                                   'class': QUANTILE_PREDICTION_CLASS,  # QuantileDistribution
+                                   'prediction': {
+                                       'quantile': quant_quantiles,
+                                       'value': quant_values}}
+                loc_targ_to_pred_classes[(location, target)].append(QUANTILE_PREDICTION_CLASS)
+                predictions.append(prediction_dict)
+                pred_dict_error_messages = validate_quantile_prediction_dict(prediction_dict)
+                if pred_dict_error_messages and _add_error_messages(error_messages, pred_dict_error_messages,
+                                                                    max_errors):
+                    return error_messages
+
+    # step 3/3: do "prediction"-level validations
+    with reader_stage(reader_stats, STAGE_PREDICTION_CHECKS, len(loc_targ_to_pred_classes)):
+        # validate: "Within a Prediction, there cannot be more than 1 Prediction Element of the same type".
+        duplicate_unit_target_tuples = [(unit, target, pred_classes) for (unit, target), pred_classes
+                                        in loc_targ_to_pred_classes.items()
+                                        if len(pred_classes) != len(set(pred_classes))]
+        if duplicate_unit_target_tuples:
+            if len(duplicate_unit_target_tuples) > 10:  # pick first 10 tuples to reduce output
+                duplicate_unit_target_tuples = duplicate_unit_target_tuples[:10] + ['...']
+            if _add_error_messages(error_messages, [error_record(ERROR_DUPLICATE_PREDICTION_ELEMENTS,
+                                                                 MESSAGE_QUANTILES_AND_VALUES,
+                                                                 tuples=duplicate_unit_target_tuples)], max_errors):
+                return error_messages
+
+        # validate: "There must be exactly one point prediction for each location/target pair"
+        unit_target_point_count = [(unit, target, pred_classes.count('point')) for (unit, target), pred_classes
+                                   in loc_targ_to_pred_classes.items()
+                                   if pred_classes.count('point') != 1]
+        if unit_target_point_count:
+            if len(unit_target_point_count) > 10:  # pick first 10 tuples to reduce output
+                unit_target_point_count = unit_target_point_count[:10] + ['...']
+            _add_error_messages(error_messages, [error_record(ERROR_POINT_COUNT, MESSAGE_QUANTILES_AS_A_GROUP,
+                                                              tuples=unit_target_point_count)], max_errors)
 
     # done
-    return {'meta': {}, 'predictions': prediction_dicts}, error_messages
+    return error_messages
 
 
-def _validated_rows_for_quantile_csv(csv_fp, valid_target_names, row_validator, addl_req_cols):
+def _validated_rows_for_quantile_csv(csv_fp, valid_target_names, row_validator, addl_req_cols, max_errors=None,
+                                     error_sink=None):
     """
     `json_io_dict_from_quantile_csv_file()` helper function
 
     :return: 2-tuple: (validated_rows, error_messages). the latter is the same as
-        `json_io_dict_from_quantile_csv_file()`
+        `json_io_dict_from_quantile_csv_file()`. validated_rows is [] if processing was terminated early
     """
     from zoltpy.cdc_io import CDC_POINT_ROW_TYPE, _parse_value  # avoid circular imports
 
 
-    error_messages = []  # return value. set below if any issues
+    error_messages = [] if error_sink is None else error_sink  # return value. set below if any issues
 
     csv_reader = csv.reader(csv_fp, delimiter=',')
     header = next(csv_reader)
     try:
         column_index_dict = _validate_header(header, addl_req_cols)
     except RuntimeError as re:
-        error_messages.append((MESSAGE_FORECAST_CHECKS, re.args[0]))
+        error_messages.append(error_record(ERROR_INVALID_HEADER, MESSAGE_FORECAST_CHECKS, message=re.args[0]))
         return [], error_messages  # terminate processing b/c column_index_dict is required to get columns
 
     error_targets = set()  # output set of invalid target names
 
-    rows = []  # list of parsed and validated rows. filled next
-    for row in csv_reader:
-        if len(row) != len(header):
-            error_messages.append((MESSAGE_FORECAST_CHECKS, f"invalid number of items in row. len(header)="
-                                                            f"{len(header)} but len(row)={len(row)}. row={row}"))
-            return [], error_messages  # terminate processing b/c column_index_dict requires correct number of rows
-
-        location, target, row_type, quantile, value = [row[column_index_dict[column]] for column in REQUIRED_COLUMNS]
-
-        # validate target
-        if target not in valid_target_names:
-            error_targets.add(target)
-
-        # validate quantile and value
-        row_type = row_type.lower()
-        is_point_row = (row_type == CDC_POINT_ROW_TYPE.lower())
-        quantile = _parse_value(quantile)  # None if not an int, float, or Date. float might be inf or nan
-        value = _parse_value(value)  # ""
-        if (not is_point_row) and ((quantile is None) or
-                                   (isinstance(quantile, datetime.date)) or
-                                   (not math.isfinite(quantile)) or  # inf, nan
-                                   not (0 <= quantile <= 1)):
-            error_messages.append((MESSAGE_FORECAST_CHECKS, f"entries in the `quantile` column must be an int or "
-                                                            f"float in [0, 1]: {quantile}. row={row}"))
-        elif is_point_row and ((value is None) or
-                               (isinstance(value, datetime.date)) or
-                               (not math.isfinite(value))):  # inf, nan
-            error_messages.append((MESSAGE_FORECAST_CHECKS, f"entries in the `value` column must be an int or float: "
-                                                            f"{value}. row={row}"))
-
-        # do optional application-specific row validation. NB: error_messages is modified in-place as a side-effect
+    # profiling is checked once here rather than per row so that it costs nothing when disabled
+    reader_stats = active_reader_stats()
+    if reader_stats is not None:
+        csv_reader = reader_stats.timed_iter(STAGE_CSV_READ, csv_reader)
+        _parse_value = reader_stats.timed(STAGE_PARSE_VALUE, _parse_value)
         if row_validator:
-            error_messages.extend(row_validator(column_index_dict, row))
+            row_validator = reader_stats.timed(STAGE_ROW_VALIDATOR, row_validator)
 
-        # convert parsed date back into string suitable for JSON.
-        # NB: recall all targets are "type": "discrete", so we only accept ints and floats
-        # if isinstance(value, datetime.date):
-        #     value = value.strftime(YYYY_MM_DD_DATE_FORMAT)
-        rows.append([target, location, is_point_row, quantile, value])
+    rows = []  # list of parsed and validated rows. filled next
+    with reader_stage(reader_stats, STAGE_ROW_CHECKS) as row_checks_stats:
+        for row_num, row in enumerate(csv_reader, start=1):
+            if len(row) != len(header):
+                error_messages.append(error_record(ERROR_ROW_LENGTH, MESSAGE_FORECAST_CHECKS, row_num=row_num,
+                                                   header_len=len(header), row_len=len(row), row=row))
+                # terminate processing b/c column_index_dict requires correct number of rows
+                return [], error_messages
+
+            location, target, row_type, quantile, value = [row[column_index_dict[column]]
+                                                           for column in REQUIRED_COLUMNS]
+
+            # validate target
+            if target not in valid_target_names:
+                error_targets.add(target)
+
+            # validate quantile and value
+            row_type = row_type.lower()
+            is_point_row = (row_type == CDC_POINT_ROW_TYPE.lower())
+            quantile = _parse_value(quantile)  # None if not an int, float, or Date. float might be inf or nan
+            value = _parse_value(value)  # ""
+            row_error_messages = []
+            if (not is_point_row) and ((quantile is None) or
+                                       (isinstance(quantile, datetime.date)) or
+                                       (not math.isfinite(quantile)) or  # inf, nan
+                                       not (0 <= quantile <= 1)):
+                row_error_messages.append(error_record(ERROR_QUANTILE_NOT_IN_RANGE, MESSAGE_FORECAST_CHECKS,
+                                                       location, target, row_num, quantile=quantile, row=row))
+            elif is_point_row and ((value is None) or
+                                   (isinstance(value, datetime.date)) or
+                                   (not math.isfinite(value))):  # inf, nan
+                row_error_messages.append(error_record(ERROR_VALUE_NOT_NUMERIC, MESSAGE_FORECAST_CHECKS, location,
+                                                       target, row_num, value=value, row=row))
+
+            # do optional application-specific row validation
+            if row_validator:
+                for error_message in row_validator(column_index_dict, row):
+                    if isinstance(error_message, ErrorRecord) and (error_message.row_num is None):
+                        error_message.row_num = row_num  # row validators don't know the row number
+                    row_error_messages.append(error_message)
+
+            if row_error_messages and _add_error_messages(error_messages, row_error_messages, max_errors):
+                return [], error_messages
+
+            # convert parsed date back into string suitable for JSON.
+            # NB: recall all targets are "type": "discrete", so we only accept ints and floats
+            # if isinstance(value, datetime.date):
+            #     value = value.strftime(YYYY_MM_DD_DATE_FORMAT)
+            rows.append([target, location, is_point_row, quantile, value])
+        if row_checks_stats is not None:
+            row_checks_stats.count += len(rows)
 
     # Add invalid targets to errors
     if len(error_targets) > 0:
-        error_messages.append((MESSAGE_FORECAST_CHECKS, f"invalid target name(s): {error_targets!r}"))
+        if _add_error_messages(error_messages, [error_record(ERROR_INVALID_TARGETS, MESSAGE_FORECAST_CHECKS,
+                                                             error_targets=error_targets)], max_errors):
+            return [], error_messages
 
     return rows, error_messages
 
 
+def _add_error_messages(error_messages, new_error_messages, max_errors):
+    """
+    `json_io_dict_from_quantile_csv_file()` helper function that adds new_error_messages to error_messages, and
+    implements fail-fast: no more than max_errors are added, after which a final ERROR_MAX_ERRORS error is added.
+
+    :param error_messages: a list or other object with `append()` and `__len__()` methods, e.g., an ErrorSummarizer
+    :param new_error_messages: a list of ErrorRecords or 2-tuples to add
+    :param max_errors: as passed to `json_io_dict_from_quantile_csv_file()`
+    :return: True if max_errors was reached and processing should stop, and False o/w
+    """
+    for error_message in new_error_messages:
+        if (max_errors is not None) and (len(error_messages) >= max_errors):
+            break
+
+        error_messages.append(error_message)
+    if (max_errors is None) or (len(error_messages) < max_errors):
+        return False
+
+    error_messages.append(error_record(ERROR_MAX_ERRORS, MESSAGE_FORECAST_CHECKS, max_errors=max_errors))
+    return True
+
+
 def _validate_header(header, addl_req_cols):
     """
     `json_io_dict_from_quantile_csv_file()` helper function.
@@ -239,9 +454,10 @@ def _validate_quantile_prediction_dict(prediction_dict):
     simplifications) of Zoltar's `utils.forecast._validate_quantile_prediction_dict()`
 
     :param prediction_dict: as documented at https://docs.zoltardata.com/
-    :return list of strings, one per error. [] if prediction_dict is valid
+    :return list of ErrorRecords, one per error. [] if prediction_dict is valid
     """
-    error_messages = []  # list of strings. return value. set below if any issues
+    error_messages = []  # list of ErrorRecords. return value. set below if any issues
+    unit, target = prediction_dict['unit'], prediction_dict['target']
 
     # validate: "The number of elements in the `quantile` and `value` vectors should be identical."
     prediction_data = prediction_dict['prediction']
@@ -250,16 +466,14 @@ def _validate_quantile_prediction_dict(prediction_dict):
     if len(pred_data_quantiles) != len(pred_data_values):
         # note that this error must stop processing b/c subsequent steps rely on their being the same lengths
         # (e.g., `zip()`)
-        error_messages.append((MESSAGE_QUANTILES_AND_VALUES,
-                               f"The number of elements in the `quantile` and `value` vectors should be identical. "
-                               f"|quantile|={len(pred_data_quantiles)}, |value|={len(pred_data_values)}, "
-                               f"prediction_dict={prediction_dict}"))
+        error_messages.append(error_record(ERROR_QUANTILE_VALUE_LENGTHS, MESSAGE_QUANTILES_AND_VALUES, unit, target,
+                                           num_quantiles=len(pred_data_quantiles), num_values=len(pred_data_values),
+                                           prediction_dict=prediction_dict))
 
     # validate: `quantile`s must be unique."
     if len(set(pred_data_quantiles)) != len(pred_data_quantiles):
-        error_messages.append((MESSAGE_QUANTILES_AND_VALUES,
-                               f"`quantile`s must be unique. quantile column={pred_data_quantiles}, "
-                               f"prediction_dict={prediction_dict}"))
+        error_messages.append(error_record(ERROR_QUANTILES_NOT_UNIQUE, MESSAGE_QUANTILES_AND_VALUES, unit, target,
+                                           quantiles=pred_data_quantiles, prediction_dict=prediction_dict))
 
     # validate: "Entries in `value` must be non-decreasing as quantiles increase." (i.e., are monotonic).
     # note: there are no date targets, so we format as strings for the comparison (incoming are strings).
@@ -275,10 +489,9 @@ def _validate_quantile_prediction_dict(prediction_dict):
 
     is_le_values = [le_with_tolerance(a, b) for a, b in zip(pred_data_values, pred_data_values[1:])]
     if not all(is_le_values):
-        error_messages.append((MESSAGE_QUANTILES_AND_VALUES,
-                               f"Entries in `value` must be non-decreasing as quantiles increase. "
-                               f"value column={pred_data_values}, is_le_values={is_le_values}, "
-                               f"prediction_dict={prediction_dict}"))
+        error_messages.append(error_record(ERROR_VALUES_DECREASING, MESSAGE_QUANTILES_AND_VALUES, unit, target,
+                                           values=pred_data_values, is_le_values=is_le_values,
+                                           prediction_dict=prediction_dict))
 
     # validate: "Entries in `value` must obey existing ranges for targets." recall: "The range is assumed to be
     # inclusive on the lower bound and open on the upper bound, # e.g. [a, b)."
@@ -297,22 +510,43 @@ def quantile_csv_rows_from_json_io_dict(json_io_dict):
     The same as `csv_rows_from_json_io_dict()`, but only returns data in REQUIRED_COLUMNS ('location', 'target', 'type',
     'quantile', 'value').
 
-    :param json_io_dict: a "JSON IO dict" to load from. see docs for details. the "meta" section is ignored
+    :param json_io_dict: a "JSON IO dict" or `ForecastFrame` to load from. see docs for details. the "meta" section is
+        ignored
     :return: a list of CSV rows including header - see CSV_HEADER
     """
-    from zoltpy.csv_io import csv_rows_from_json_io_dict  # avoid circular imports
+    return list(iter_quantile_csv_rows_from_json_io_dict(json_io_dict))
+
+
+def iter_quantile_csv_rows_from_json_io_dict(json_io_dict):
+    """
+    A generator version of `quantile_csv_rows_from_json_io_dict()` that yields the same rows (including the header) one
+    at a time. Only 'point' and 'quantile' predictions are visited, and rows are created directly in REQUIRED_COLUMNS
+    format, i.e., without going through `csv_rows_from_json_io_dict()`'s 12-column rows.
+
+    :param json_io_dict: as passed to `quantile_csv_rows_from_json_io_dict()`
+    """
+    from zoltpy.csv_io import prediction_dicts_for_json_io_dict  # avoid circular imports
+
+
+    yield list(REQUIRED_COLUMNS)  # header. rename the 'class' column to 'type'
+    for prediction_dict in prediction_dicts_for_json_io_dict(json_io_dict,
+                                                             [POINT_PREDICTION_CLASS, QUANTILE_PREDICTION_CLASS]):
+        location, target, prediction = prediction_dict['unit'], prediction_dict['target'], prediction_dict['prediction']
+        if prediction_dict['class'] == POINT_PREDICTION_CLASS:
+            yield [location, target, POINT_PREDICTION_CLASS, '', prediction['value']]
+        else:
+            for quantile, value in zip(prediction['quantile'], prediction['value']):
+                yield [location, target, QUANTILE_PREDICTION_CLASS, quantile, value]
 
 
-    # since we've already implemented `csv_rows_from_json_io_dict()`, our approach is to use it, transforming as needed
-    csv_rows = csv_rows_from_json_io_dict(json_io_dict)
-    csv_rows.pop(0)  # skip header
-    rows = [list(REQUIRED_COLUMNS)]  # add header. rename the 'class' column to 'type'
-    for location, target, pred_class, value, cat, prob, sample, quantile, family, param1, param2, param3 in csv_rows:
-        if pred_class not in ['point', 'quantile']:  # keep only rows whose 'type' is 'point' or 'quantile'
-            continue
+def write_quantile_csv(json_io_dict, csv_fp):
+    """
+    Streams the rows of `iter_quantile_csv_rows_from_json_io_dict()` to csv_fp, using constant memory.
 
-        rows.append([location, target, pred_class, quantile, value])  # keep only quantile-related columns
-    return rows
+    :param json_io_dict: as passed to `quantile_csv_rows_from_json_io_dict()`
+    :param csv_fp: an open text file-like object to write to. should be opened with `newline=''` per the csv module
+    """
+    csv.writer(csv_fp, delimiter=',').writerows(iter_quantile_csv_rows_from_json_io_dict(json_io_dict))
 
 
 #
@@ -322,27 +556,104 @@ def quantile_csv_rows_from_json_io_dict(json_io_dict):
 def summarized_error_messages(error_messages, max_num_dups=10):
     """
     Utility function that does two things: 1) shortens error_messages list by removing all but a small number of similar
-    messages. "similar" is determined by simply looking at the first 20 characters being equal. adds '...' if any were
-     omitted, and 2) orders the messages according to the first item in each 2-tuple.
+    messages. "similar" is determined by the error code for ErrorRecords, and by simply looking at the first 20
+    characters being equal for plain 2-tuples. adds a "... N more like this" line if any were omitted, and 2) orders
+    the messages according to the first item in each 2-tuple (the priority), keeping input order within each priority.
+    Only the messages that are kept are formatted. See `ErrorSummarizer` for details.
 
-    :param error_messages: list of 2-tuples as returned by `json_io_dict_from_quantile_csv_file()`
+    :param error_messages: iterable of ErrorRecords or 2-tuples as returned by `json_io_dict_from_quantile_csv_file()`,
+        or an ErrorSummarizer that they were already added to
     :param max_num_dups: integer maximum number of duplicated lines to return
     :return: shortened and sorted copy of the second tuple item in error_messages
     """
-    error_messages = [_[1] for _ in sorted(error_messages)]
-    error_key_to_max_messages = defaultdict(list)  # key: first N chars of any unique message
+    if isinstance(error_messages, ErrorSummarizer):
+        return error_messages.summary()
+
+    error_summarizer = ErrorSummarizer(max_num_dups)
     for error_message in error_messages:
-        error_key = error_message[:20]
-        if (error_key not in error_key_to_max_messages) or (len(error_key_to_max_messages[error_key]) < max_num_dups):
-            error_key_to_max_messages[error_key].append(error_message)
-
-    # per https://stackoverflow.com/questions/952914/how-to-make-a-flat-list-out-of-list-of-lists :
-    # return [item for sublist in error_key_to_max_messages.values() for item in sublist]
-
-    error_messages = []  # return value
-    for error_key, max_messages in error_key_to_max_messages.items():
-        error_messages.extend(max_messages)
-        # note that this adds '...' in the case of exactly max_num_dups, which may be misleading b/c it's max + 1 total
-        if len(max_messages) == max_num_dups:
-            error_messages.append(error_key + '...')
-    return error_messages
+        error_summarizer.append(error_message)
+    return error_summarizer.summary()
+
+
+class ErrorSummarizer:
+    """
+    Incrementally summarizes error messages as they are produced, using bounded memory regardless of how many there
+    are. Errors are grouped into categories (by code for ErrorRecords, and by the first 20 characters of the message for
+    plain 2-tuples). For each category it keeps an exact count and the first `max_num_dups` errors, which are the only
+    ones ever formatted. The number of categories is also bounded: once `max_num_categories` is reached, errors in new
+    categories are only counted. Pass an instance as `json_io_dict_from_quantile_csv_file()`'s `error_sink` to avoid
+    ever holding all errors in memory.
+    """
+
+
+    def __init__(self, max_num_dups=10, max_num_categories=100):
+        self.max_num_dups = max_num_dups
+        self.max_num_categories = max_num_categories
+        self.category_to_errors = {}  # category key -> [priority, count, [kept_error1, ...]]. insertion-ordered
+        self.num_errors = 0
+        self.num_uncategorized = 0  # errors in categories beyond max_num_categories
+        self.min_uncategorized_priority = None
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, self.num_errors, len(self.category_to_errors)))
+
+
+    def __len__(self):
+        """
+        :return: the total number of errors added, including ones that were not kept
+        """
+        return self.num_errors
+
+
+    def append(self, error_message):
+        """
+        Adds error_message to my categories.
+
+        :param error_message: an ErrorRecord or (priority, error_message) 2-tuple
+        """
+        self.num_errors += 1
+        if isinstance(error_message, ErrorRecord):
+            priority, category_key = error_message.priority, error_message.code
+        else:
+            priority, category_key = error_message[0], error_message[1][:20]
+        category = self.category_to_errors.get(category_key)
+        if category is None:
+            if len(self.category_to_errors) >= self.max_num_categories:
+                self.num_uncategorized += 1
+                if (self.min_uncategorized_priority is None) or (priority < self.min_uncategorized_priority):
+                    self.min_uncategorized_priority = priority
+                return
+
+            category = self.category_to_errors[category_key] = [priority, 0, []]
+        category[0] = min(category[0], priority)
+        category[1] += 1
+        if len(category[2]) < self.max_num_dups:
+            category[2].append(error_message)
+
+
+    def category_counts(self):
+        """
+        :return: a dict that maps each category key (error code or message prefix) to its exact error count
+        """
+        return {category_key: count for category_key, (_, count, _) in self.category_to_errors.items()}
+
+
+    def summary(self):
+        """
+        :return: a list of strings: the kept messages of each category, ordered by priority (and by first occurrence
+            within a priority), each category followed by a "... N more like this" line if any of its errors were not
+            kept
+        """
+        # stable sort, so categories with the same priority stay in the order they were first seen
+        categories = sorted(self.category_to_errors.items(), key=lambda _: _[1][0])
+        summary = []  # return value
+        for category_key, (_, count, kept_errors) in categories:
+            kept_messages = [_.message if isinstance(_, ErrorRecord) else _[1] for _ in kept_errors]
+            summary.extend(kept_messages)
+            if count > len(kept_messages):
+                prefix = kept_messages[0][:20] if kept_messages else category_key
+                summary.append(f"{prefix}... ({count - len(kept_messages)} more like this)")
+        if self.num_uncategorized:
+            summary.append(f"... ({self.num_uncategorized} more errors of other kinds)")
+        return summary
@@ -0,0 +1,413 @@
+import csv
+import datetime
+import math
+import os
+import random
+from pathlib import Path
+
+from zoltpy.cdc_io import CDC_BIN_ROW_TYPE, CDC_CSV_HEADER, CDC_LAST_BIN_END_NOTINCL, CDC_POINT_ROW_TYPE, \
+    CDC_TARGET_NAME_TO_UNIT, YYYY_MM_DD_DATE_FORMAT
+from zoltpy.covid19 import COVID_QUANTILES_CASE, COVID_QUANTILES_NON_CASE, COVID_TARGETS, COVID_TARGETS_CASE, \
+    _fips_codes
+from zoltpy.hub_spec import WEEKDAY_TO_ONE_WK_AHEAD_DAYS
+from zoltpy.quantile_io import POINT_PREDICTION_CLASS, QUANTILE_PREDICTION_CLASS, SAMPLE_PREDICTION_CLASS
+
+
+#
+# This file generates synthetic forecast data for benchmarks and tests: quantile CSV files, CDC CSV files, JSON IO
+# dicts, and directory trees of quantile CSV files ("hubs"). Output is deterministic for a given seed, and is valid per
+# the COVID-19 hub's rules (see covid19.py) unless errors are injected. Scale is set by the number of locations,
+# targets, quantiles, and samples, e.g., for one quantile CSV file:
+#
+# - all 58 states x all COVID_TARGETS: ~250K rows
+# - all 58 states + 3,142 counties x all COVID_TARGETS: ~450K rows (counties only have COVID_TARGETS_CASE)
+#
+# Larger inputs are either hubs (models x forecast dates files) or CDC CSV files with more than the 11 real locations.
+# Error injection replaces a random fraction (`error_rate`) of (location, target) predictions with an invalid one, of a
+# kind picked randomly from `error_kinds`. Each kind causes one particular validation error.
+#
+
+#
+# quantile CSV files
+#
+
+QUANTILE_CSV_HEADER = ['forecast_date', 'target', 'target_end_date', 'location', 'type', 'quantile', 'value']
+
+LOCATION_SCOPE_STATE = 'state'  # FIPS_CODES_STATE
+LOCATION_SCOPE_COUNTY = 'county'  # FIPS_CODES_COUNTY
+LOCATION_SCOPE_ALL = 'all'  # FIPS_CODES_STATE + FIPS_CODES_COUNTY
+LOCATION_SCOPES = (LOCATION_SCOPE_STATE, LOCATION_SCOPE_COUNTY, LOCATION_SCOPE_ALL)
+
+DEFAULT_FORECAST_DATE = datetime.date(2020, 4, 13)  # a Monday
+
+# error kinds. the comments are the validation error codes that they cause
+QUANTILE_ERROR_NEGATIVE_VALUE = 'negative_value'  # ERROR_NEGATIVE_VALUE
+QUANTILE_ERROR_VALUES_DECREASING = 'values_decreasing'  # ERROR_VALUES_DECREASING
+QUANTILE_ERROR_QUANTILE_NOT_IN_RANGE = 'quantile_not_in_range'  # ERROR_QUANTILE_NOT_IN_RANGE
+QUANTILE_ERROR_VALUE_NOT_NUMERIC = 'value_not_numeric'  # ERROR_VALUE_NOT_NUMERIC
+QUANTILE_ERROR_DUPLICATE_POINT = 'duplicate_point'  # ERROR_POINT_COUNT
+QUANTILE_ERROR_LOCATION = 'location'  # ERROR_LOCATION_FOR_TARGET
+QUANTILE_ERROR_TARGET_END_DATE = 'target_end_date'  # ERROR_DAY_AHEAD_DATE or ERROR_NOT_SATURDAY
+QUANTILE_ERROR_KINDS = (QUANTILE_ERROR_NEGATIVE_VALUE, QUANTILE_ERROR_VALUES_DECREASING,
+                        QUANTILE_ERROR_QUANTILE_NOT_IN_RANGE, QUANTILE_ERROR_VALUE_NOT_NUMERIC,
+                        QUANTILE_ERROR_DUPLICATE_POINT, QUANTILE_ERROR_LOCATION, QUANTILE_ERROR_TARGET_END_DATE)
+
+#
+# CDC CSV files
+#
+
+CDC_LOCATIONS = ['US National'] + [f'HHS Region {_}' for _ in range(1, 11)]
+CDC_TARGETS = ['Season onset', 'Season peak week', 'Season peak percentage', '1 wk ahead', '2 wk ahead', '3 wk ahead',
+               '4 wk ahead']
+CDC_EW_BINS = list(range(40, 53)) + list(range(1, 21))  # 'Season onset' and 'Season peak week' bin starts: EW40-EW20
+CDC_PERCENT_BIN_COUNT = 130  # 0, 0.1, ..., 12.9, plus the open-ended "13,100" bin
+
+# error kinds. each causes `json_io_dict_from_cdc_csv_file()` to raise a RuntimeError at the first one
+CDC_ERROR_ROW_TYPE = 'row_type'  # "row_type was neither ..."
+CDC_ERROR_ROW_LENGTH = 'row_length'  # "Invalid row (wasn't 7 columns)"
+CDC_ERROR_NONE_BIN = 'none_bin'  # "None bins are only valid ..." or "... not both start and end were None"
+CDC_ERROR_NONE_POINT = 'none_point'  # "None point values are only valid ...". CDC_ERROR_NONE_BIN for 'Season onset'
+CDC_ERROR_KINDS = (CDC_ERROR_ROW_TYPE, CDC_ERROR_ROW_LENGTH, CDC_ERROR_NONE_BIN, CDC_ERROR_NONE_POINT)
+
+
+#
+# quantile CSV files and JSON IO dicts
+#
+
+def synthetic_locations(location_scope=LOCATION_SCOPE_STATE, num_locations=None):
+    """
+    :param location_scope: one of LOCATION_SCOPES
+    :param num_locations: the number of locations to return, which are the first ones in the scope. None means all
+    :return: a list of FIPS codes
+    """
+    if location_scope not in LOCATION_SCOPES:
+        raise RuntimeError(f"invalid location_scope: {location_scope!r}. must be one of {LOCATION_SCOPES}")
+
+    fips_codes_state, fips_codes_county = _fips_codes()
+    locations = {LOCATION_SCOPE_STATE: fips_codes_state,
+                 LOCATION_SCOPE_COUNTY: fips_codes_county,
+                 LOCATION_SCOPE_ALL: fips_codes_state + fips_codes_county}[location_scope]
+    if num_locations is None:
+        return list(locations)
+    elif not 0 < num_locations <= len(locations):
+        raise RuntimeError(f"num_locations must be between 1 and {len(locations)} for location_scope="
+                           f"{location_scope!r}: {num_locations}")
+
+    return list(locations[:num_locations])
+
+
+def target_end_date(forecast_date, target):
+    """
+    :param forecast_date: a datetime.date
+    :param target: one of COVID_TARGETS
+    :return: the datetime.date that target's predictions are for, i.e., the valid target_end_date for forecast_date
+    """
+    step, unit = target.split(' ')[:2]  # e.g., '1 day ahead inc hosp' -> '1', 'day'
+    if unit == 'day':
+        return forecast_date + datetime.timedelta(days=int(step))
+    else:  # 'wk'
+        return forecast_date + datetime.timedelta(days=WEEKDAY_TO_ONE_WK_AHEAD_DAYS[forecast_date.weekday()]
+                                                       + 7 * (int(step) - 1))
+
+
+def iter_synthetic_quantile_csv_rows(location_scope=LOCATION_SCOPE_STATE, num_locations=None, targets=None,
+                                     quantiles=None, forecast_date=DEFAULT_FORECAST_DATE, error_rate=0.0,
+                                     error_kinds=QUANTILE_ERROR_KINDS, seed=0, error_counts=None):
+    """
+    A generator that yields the rows of a synthetic quantile CSV file, starting with QUANTILE_CSV_HEADER. Each
+    (location, target) has one point row followed by one row per quantile. Values are strs, as if read from a file.
+
+    :param location_scope: as passed to `synthetic_locations()`
+    :param num_locations: as passed to `synthetic_locations()`
+    :param targets: a list of COVID_TARGETS. None means all of them. county locations only get COVID_TARGETS_CASE ones
+    :param quantiles: a list of quantiles used for every target. None means each target's valid ones
+    :param forecast_date: a datetime.date or 'YYYY-MM-DD' str
+    :param error_rate: the fraction (0 to 1) of (location, target) predictions to make invalid. see QUANTILE_ERROR_KINDS
+    :param error_kinds: a list of QUANTILE_ERROR_KINDS to pick from when injecting an error
+    :param seed: the random seed. the same args and seed always produce the same rows
+    :param error_counts: an optional dict that's incremented by error kind as errors are injected
+    :return: a generator of rows as lists of strs
+    """
+    _validate_error_args(error_rate, error_kinds, QUANTILE_ERROR_KINDS)
+    rng = random.Random(seed)
+    forecast_date_str = str(forecast_date)
+    yield list(QUANTILE_CSV_HEADER)
+    for location, target, end_date, quantile_strs, point_value, values \
+            in _iter_prediction_groups(rng, location_scope, num_locations, targets, quantiles, forecast_date):
+        rows = [[forecast_date_str, target, end_date, location, POINT_PREDICTION_CLASS, 'NA', point_value]]
+        rows.extend([forecast_date_str, target, end_date, location, QUANTILE_PREDICTION_CLASS, quantile_str, value]
+                    for quantile_str, value in zip(quantile_strs, values))
+        if error_rate and (rng.random() < error_rate):
+            error_kind = rng.choice(error_kinds)
+            _inject_quantile_error(rows, error_kind)
+            if error_counts is not None:
+                error_counts[error_kind] = error_counts.get(error_kind, 0) + 1
+        yield from rows
+
+
+def write_synthetic_quantile_csv(csv_fp, **kwargs):
+    """
+    Streams the rows of `iter_synthetic_quantile_csv_rows()` to csv_fp, using constant memory.
+
+    :param csv_fp: an open text file-like object to write to. should be opened with `newline=''` per the csv module
+    :param kwargs: passed to `iter_synthetic_quantile_csv_rows()`
+    :return: the number of rows written, excluding the header
+    """
+    csv_writer = csv.writer(csv_fp, delimiter=',')
+    num_rows = -1  # the header is not counted
+    for row in iter_synthetic_quantile_csv_rows(**kwargs):
+        csv_writer.writerow(row)
+        num_rows += 1
+    return num_rows
+
+
+def synthetic_json_io_dict(location_scope=LOCATION_SCOPE_STATE, num_locations=None, targets=None, quantiles=None,
+                           num_samples=0, forecast_date=DEFAULT_FORECAST_DATE, seed=0):
+    """
+    :param location_scope: as passed to `iter_synthetic_quantile_csv_rows()`
+    :param num_locations: ""
+    :param targets: ""
+    :param quantiles: ""
+    :param num_samples: the number of samples in each (location, target)'s sample prediction. 0 means none are added
+    :param forecast_date: as passed to `iter_synthetic_quantile_csv_rows()`
+    :param seed: ""
+    :return: a "JSON IO dict" with a point and quantile prediction (and optionally a sample one) for each
+        (location, target), with numeric values. it has the same point and quantile predictions as the
+        `iter_synthetic_quantile_csv_rows()` rows for the same args
+    """
+    rng = random.Random(seed)
+    sample_rng = random.Random(f'{seed}-samples')  # a separate one so that samples don't change the other predictions
+    predictions = []
+    for location, target, _, quantile_strs, point_value, values \
+            in _iter_prediction_groups(rng, location_scope, num_locations, targets, quantiles, forecast_date):
+        point_value = float(point_value)
+        predictions.append({'unit': location, 'target': target, 'class': POINT_PREDICTION_CLASS,
+                            'prediction': {'value': point_value}})
+        predictions.append({'unit': location, 'target': target, 'class': QUANTILE_PREDICTION_CLASS,
+                            'prediction': {'quantile': [float(_) for _ in quantile_strs],
+                                           'value': [float(_) for _ in values]}})
+        if num_samples:
+            samples = [round(sample_rng.lognormvariate(math.log(point_value), 0.5), 3) for _ in range(num_samples)]
+            predictions.append({'unit': location, 'target': target, 'class': SAMPLE_PREDICTION_CLASS,
+                                'prediction': {'sample': samples}})
+    return {'meta': {}, 'predictions': predictions}
+
+
+def write_synthetic_hub(hub_dir, num_models=1, num_forecast_dates=1, first_forecast_date=DEFAULT_FORECAST_DATE,
+                        seed=0, **kwargs):
+    """
+    Writes a directory tree of synthetic quantile CSV files laid out like a COVID-19 forecast hub's data-processed
+    directory: one directory per model, each with one file per forecast date, e.g.,
+    hub_dir/team1-model/2020-04-13-team1-model.csv . Forecast dates are weekly. Each file has its own seed, derived
+    from seed and its name, so that files differ but are reproducible.
+
+    :param hub_dir: a str or Path of the directory to write to. it's created if necessary
+    :param num_models: the number of model directories
+    :param num_forecast_dates: the number of files per model
+    :param first_forecast_date: a datetime.date or 'YYYY-MM-DD' str
+    :param seed: the base random seed
+    :param kwargs: passed to `iter_synthetic_quantile_csv_rows()`, except for `forecast_date` and `seed`
+    :return: a dict with 'files' (a list of the Paths written) and 'rows' (the total number of rows written, excluding
+        headers)
+    """
+    if isinstance(first_forecast_date, str):
+        first_forecast_date = datetime.datetime.strptime(first_forecast_date, YYYY_MM_DD_DATE_FORMAT).date()
+    hub_dir = Path(hub_dir)
+    files, num_rows = [], 0
+    for model_idx in range(num_models):
+        model_name = f'team{model_idx + 1}-model'
+        os.makedirs(hub_dir / model_name, exist_ok=True)
+        for date_idx in range(num_forecast_dates):
+            forecast_date = first_forecast_date + datetime.timedelta(weeks=date_idx)
+            csv_file = hub_dir / model_name / f'{forecast_date}-{model_name}.csv'
+            with open(csv_file, 'w', newline='') as csv_fp:
+                num_rows += write_synthetic_quantile_csv(csv_fp, forecast_date=forecast_date,
+                                                         seed=f'{seed}-{csv_file.name}', **kwargs)
+            files.append(csv_file)
+    return {'files': files, 'rows': num_rows}
+
+
+def _iter_prediction_groups(rng, location_scope, num_locations, targets, quantiles, forecast_date):
+    """
+    A helper that yields the contents of each synthetic (location, target) prediction, in location and then target
+    order.
+
+    :return: a generator of 6-tuples: (location, target, target_end_date_str, quantile_strs, point_value_str,
+        value_strs), where value_strs are non-negative and increasing, with the point value as their median
+    """
+    if isinstance(forecast_date, str):
+        forecast_date = datetime.datetime.strptime(forecast_date, YYYY_MM_DD_DATE_FORMAT).date()
+    targets = COVID_TARGETS if targets is None else targets
+    invalid_targets = sorted(set(targets) - set(COVID_TARGETS))
+    if invalid_targets:
+        raise RuntimeError(f"targets must be COVID_TARGETS. invalid_targets={invalid_targets}")
+
+    # precompute each target's strs and value multipliers. quantile q's value is the point value times exp(z / 2),
+    # where z is the standard normal deviate for q, i.e., a log-normal distribution whose median is the point value
+    case_targets = set(COVID_TARGETS_CASE)
+    target_to_end_date = {target: str(target_end_date(forecast_date, target)) for target in targets}
+    target_to_quantiles = {target: sorted(quantiles if quantiles is not None
+                                          else COVID_QUANTILES_CASE if target in case_targets
+                                          else COVID_QUANTILES_CASE + COVID_QUANTILES_NON_CASE)
+                           for target in targets}
+    quantile_to_multiplier = {quantile: math.exp(_normal_inv_cdf(quantile) / 2)
+                              for quantiles in target_to_quantiles.values() for quantile in quantiles}
+    county_locations = set(_fips_codes()[1])
+    for location in synthetic_locations(location_scope, num_locations):
+        for target in targets:
+            if (location in county_locations) and (target not in case_targets):
+                continue
+
+            median = rng.lognormvariate(3, 1.5) + 1  # >= 1 so that rounded values stay increasing
+            quantiles = target_to_quantiles[target]
+            yield location, target, target_to_end_date[target], \
+                  [str(quantile) for quantile in quantiles], f'{median:.3f}', \
+                  [f'{median * quantile_to_multiplier[quantile]:.3f}' for quantile in quantiles]
+
+
+def _normal_inv_cdf(p):
+    """
+    :return: the standard normal deviate z whose CDF is p, i.e., `statistics.NormalDist().inv_cdf(p)`, which is
+        python 3.8+. found by bisecting on the CDF until the interval stops shrinking, so it's exact to float precision
+    """
+    if not 0 < p < 1:
+        raise RuntimeError(f"p must be between 0 and 1 (exclusive): {p}")
+
+    low, high = -40.0, 40.0
+    while True:
+        mid = (low + high) / 2
+        if mid in (low, high):
+            return mid
+
+        if (1 + math.erf(mid / math.sqrt(2))) / 2 < p:
+            low = mid
+        else:
+            high = mid
+
+
+def _inject_quantile_error(rows, error_kind):
+    """
+    Makes one (location, target)'s rows invalid in place, per error_kind.
+
+    :param rows: the point row followed by the quantile rows, as lists. there must be at least two quantile rows
+    :param error_kind: one of QUANTILE_ERROR_KINDS
+    """
+    location_idx, quantile_idx, value_idx, end_date_idx = 3, 5, 6, 2  # QUANTILE_CSV_HEADER indexes
+    if error_kind == QUANTILE_ERROR_NEGATIVE_VALUE:  # the lowest value, so values are still increasing
+        rows[1][value_idx] = f'-{rows[1][value_idx]}'
+    elif error_kind == QUANTILE_ERROR_VALUES_DECREASING:
+        rows[1][value_idx], rows[-1][value_idx] = rows[-1][value_idx], rows[1][value_idx]
+    elif error_kind == QUANTILE_ERROR_QUANTILE_NOT_IN_RANGE:
+        rows[-1][quantile_idx] = '1.5'
+    elif error_kind == QUANTILE_ERROR_VALUE_NOT_NUMERIC:
+        rows[0][value_idx] = 'not a number'
+    elif error_kind == QUANTILE_ERROR_DUPLICATE_POINT:
+        rows.insert(1, list(rows[0]))
+    elif error_kind == QUANTILE_ERROR_LOCATION:  # too many digits to be a FIPS code, but still unique
+        for row in rows:
+            row[location_idx] = f'{row[location_idx]}9'
+    elif error_kind == QUANTILE_ERROR_TARGET_END_DATE:
+        end_date = str(datetime.datetime.strptime(rows[0][end_date_idx], YYYY_MM_DD_DATE_FORMAT).date()
+                       + datetime.timedelta(days=1))
+        for row in rows:
+            row[end_date_idx] = end_date
+
+
+def _validate_error_args(error_rate, error_kinds, valid_error_kinds):
+    if not 0 <= error_rate <= 1:
+        raise RuntimeError(f"error_rate must be between 0 and 1: {error_rate}")
+
+    invalid_error_kinds = sorted(set(error_kinds) - set(valid_error_kinds))
+    if (not error_kinds) or invalid_error_kinds:
+        raise RuntimeError(f"error_kinds must be a non-empty list of {valid_error_kinds}. "
+                           f"invalid_error_kinds={invalid_error_kinds}")
+
+
+#
+# CDC CSV files
+#
+
+def iter_synthetic_cdc_csv_rows(num_locations=len(CDC_LOCATIONS), targets=CDC_TARGETS, error_rate=0.0,
+                                error_kinds=CDC_ERROR_KINDS, seed=0, error_counts=None):
+    """
+    A generator that yields the rows of a synthetic CDC CSV file, starting with the header in the capitalization used
+    by CDC files. Each (location, target) has one point row followed by its bin rows: 34 for 'Season onset' (including
+    the 'none' bin), 33 for 'Season peak week', and 131 for the percent targets. Bin probabilities sum to 1.
+
+    :param num_locations: the number of locations. the first ones are CDC_LOCATIONS, and the rest are synthetic
+    :param targets: a list of CDC_TARGETS
+    :param error_rate: the fraction (0 to 1) of (location, target) predictions to make invalid. see CDC_ERROR_KINDS
+    :param error_kinds: a list of CDC_ERROR_KINDS to pick from when injecting an error
+    :param seed: the random seed. the same args and seed always produce the same rows
+    :param error_counts: an optional dict that's incremented by error kind as errors are injected
+    :return: a generator of rows as lists of strs
+    """
+    _validate_error_args(error_rate, error_kinds, CDC_ERROR_KINDS)
+    invalid_targets = sorted(set(targets) - set(CDC_TARGETS))
+    if invalid_targets:
+        raise RuntimeError(f"targets must be CDC_TARGETS. invalid_targets={invalid_targets}")
+
+    rng = random.Random(seed)
+    percent_bins = [(f'{bin_idx / 10:g}', f'{(bin_idx + 1) / 10:g}') for bin_idx in range(CDC_PERCENT_BIN_COUNT)] + \
+                   [(f'{CDC_PERCENT_BIN_COUNT / 10:g}', str(CDC_LAST_BIN_END_NOTINCL))]  # ..., '12.9,13', '13,100'
+    ew_bins = [(str(ew_week), str(ew_week + 1)) for ew_week in CDC_EW_BINS]
+    yield [column.capitalize() for column in CDC_CSV_HEADER]  # e.g., 'Bin_start_incl'
+    for location_idx in range(num_locations):
+        location = CDC_LOCATIONS[location_idx] if location_idx < len(CDC_LOCATIONS) \
+            else f'Synthetic Region {location_idx - len(CDC_LOCATIONS) + 1}'
+        for target in targets:
+            unit = CDC_TARGET_NAME_TO_UNIT[target]
+            if target == 'Season onset':
+                bins = ew_bins + [('none', 'none')]
+                point_value = str(rng.choice(CDC_EW_BINS))
+            elif target == 'Season peak week':
+                bins = ew_bins
+                point_value = str(rng.choice(CDC_EW_BINS))
+            else:
+                bins = percent_bins
+                point_value = f'{rng.uniform(0.5, 8):.3f}'
+            weights = [rng.random() for _ in bins]
+            total_weight = sum(weights)
+            rows = [[location, target, CDC_POINT_ROW_TYPE, unit, 'NA', 'NA', point_value]]
+            rows.extend([location, target, CDC_BIN_ROW_TYPE, unit, bin_start, bin_end, repr(weight / total_weight)]
+                        for (bin_start, bin_end), weight in zip(bins, weights))
+            if error_rate and (rng.random() < error_rate):
+                error_kind = rng.choice(error_kinds)
+                _inject_cdc_error(rows, error_kind)
+                if error_counts is not None:
+                    error_counts[error_kind] = error_counts.get(error_kind, 0) + 1
+            yield from rows
+
+
+def write_synthetic_cdc_csv(cdc_csv_fp, **kwargs):
+    """
+    Streams the rows of `iter_synthetic_cdc_csv_rows()` to cdc_csv_fp, using constant memory.
+
+    :param cdc_csv_fp: an open text file-like object to write to. should be opened with `newline=''` per the csv module
+    :param kwargs: passed to `iter_synthetic_cdc_csv_rows()`
+    :return: the number of rows written, excluding the header
+    """
+    csv_writer = csv.writer(cdc_csv_fp, delimiter=',')
+    num_rows = -1  # the header is not counted
+    for row in iter_synthetic_cdc_csv_rows(**kwargs):
+        csv_writer.writerow(row)
+        num_rows += 1
+    return num_rows
+
+
+def _inject_cdc_error(rows, error_kind):
+    """
+    Makes one (location, target)'s rows invalid in place, per error_kind.
+
+    :param rows: the point row followed by the bin rows, as lists
+    :param error_kind: one of CDC_ERROR_KINDS
+    """
+    target_idx, type_idx, bin_start_idx, bin_end_idx, value_idx = 1, 2, 4, 5, 6  # CDC_CSV_HEADER indexes
+    if error_kind == CDC_ERROR_ROW_TYPE:
+        rows[0][type_idx] = 'Quantile'
+    elif error_kind == CDC_ERROR_ROW_LENGTH:
+        del rows[0][-1]
+    elif (error_kind == CDC_ERROR_NONE_BIN) or (rows[0][target_idx] == 'Season onset'):  # onset points may be 'none'
+        rows[1][bin_start_idx] = 'none'  # an onset 'none' bin needs both to be 'none'
+    elif error_kind == CDC_ERROR_NONE_POINT:
+        rows[0][value_idx] = 'NA'
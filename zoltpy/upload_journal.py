@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+#
+# This file defines a checkpoint journal for batch uploads, which lets `util.upload_forecast_batch_journaled()` resume
+# an interrupted batch. The journal is a local file of JSON lines, one per item state change, each appended and synced
+# before the next network call, so that it's accurate up to the moment a batch died. A partly-written last line (e.g.,
+# from a crash mid-write) is ignored. Each item has one of ITEM_STATES:
+#
+# - ITEM_PENDING:   not uploaded yet (or not known to be)
+# - ITEM_UPLOADED:  uploaded, with the upload Job's URI in 'job_uri'. its job has not finished yet, so it's re-polled
+#   rather than re-uploaded on restart
+# - ITEM_SUCCEEDED: the upload job succeeded, with the new forecast's id in 'forecast_id'. done
+# - ITEM_FAILED:    the upload or its job failed, with the reason in 'reason'
+#
+
+ITEM_PENDING = 'pending'
+ITEM_UPLOADED = 'uploaded'
+ITEM_SUCCEEDED = 'succeeded'
+ITEM_FAILED = 'failed'
+ITEM_STATES = (ITEM_PENDING, ITEM_UPLOADED, ITEM_SUCCEEDED, ITEM_FAILED)
+
+
+def upload_item_key(timezero_date, forecast_filename):
+    """
+    :return: the journal key of an upload item, which identifies it across runs
+    """
+    return f"{timezero_date}/{forecast_filename}"
+
+
+class UploadJournal:
+    """
+    An append-only journal of upload item states, as documented above. Holds each item's latest entry in `items`.
+    """
+
+
+    def __init__(self, journal_file):
+        """
+        :param journal_file: a str or Path of the journal. its contents are loaded if it exists, o/w it's created on the
+            first `record()`
+        """
+        self.journal_file = Path(journal_file)
+        self.items = {}  # item key -> its latest entry: a dict with 'state' plus that state's fields
+        try:
+            with open(self.journal_file) as fp:
+                journal_str = fp.read()
+        except FileNotFoundError:
+            journal_str = ''
+        for line in journal_str.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning(f"UploadJournal(): skipping unreadable line: {line!r}")
+                continue
+
+            self.items[entry.pop('key')] = entry
+        # a partial last line must be terminated before appending, o/w the next entry would be unreadable too
+        self._is_partial_last_line = bool(journal_str) and not journal_str.endswith('\n')
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, str(self.journal_file), len(self.items)))
+
+
+    def state(self, key):
+        """
+        :return: key's state, one of ITEM_STATES. ITEM_PENDING if key is not in the journal
+        """
+        return self.items[key]['state'] if key in self.items else ITEM_PENDING
+
+
+    def record(self, key, state, **fields):
+        """
+        Appends key's new state to the journal file, syncing it to disk.
+
+        :param key: an item key as returned by `upload_item_key()`
+        :param state: one of ITEM_STATES
+        :param fields: the state's fields, e.g., job_uri=... for ITEM_UPLOADED
+        """
+        if state not in ITEM_STATES:
+            raise RuntimeError(f"invalid state: {state!r}. must be one of {ITEM_STATES}")
+
+        entry = {'state': state, **fields}
+        with open(self.journal_file, 'a') as fp:
+            if self._is_partial_last_line:
+                fp.write('\n')
+                self._is_partial_last_line = False
+            fp.write(json.dumps({'key': key, **entry}) + '\n')
+            fp.flush()
+            os.fsync(fp.fileno())
+        self.items[key] = entry
+
+
+    def counts(self):
+        """
+        :return: a dict that maps each of ITEM_STATES to the number of items in it
+        """
+        state_counts = {state: 0 for state in ITEM_STATES}
+        for entry in self.items.values():
+            state_counts[entry['state']] += 1
+        return state_counts
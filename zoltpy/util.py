@@ -1,18 +1,19 @@
 import csv
 import io
-import json
 import logging
 import os
 import sys
 import time
 from pathlib import Path
 
-import pandas as pd
-import requests
-
+from zoltpy import json_backend
 from zoltpy.cdc_io import json_io_dict_from_cdc_csv_file
 from zoltpy.connection import ZoltarConnection, Project, Job
-from zoltpy.csv_io import csv_rows_from_json_io_dict
+from zoltpy.csv_io import csv_rows_from_json_io_dict, CSV_HEADER
+from zoltpy.quantile_io import BIN_DISTRIBUTION_CLASS, NAMED_DISTRIBUTION_CLASS, POINT_PREDICTION_CLASS, \
+    QUANTILE_PREDICTION_CLASS, SAMPLE_PREDICTION_CLASS
+from zoltpy.upload_journal import ITEM_FAILED, ITEM_PENDING, ITEM_SUCCEEDED, ITEM_UPLOADED, UploadJournal, \
+    upload_item_key
 
 
 logger = logging.getLogger(__name__)
@@ -30,9 +31,12 @@ def create_project(conn, project_json):
     :param conn: a ZoltarConnection
     :param project_json: configuration json file for the project of interest. see zoltar documentation for details
     """
+    import requests  # deferred for import speed
+
+
     conn.re_authenticate_if_necessary()
-    with open(project_json) as fp:
-        project_dict = json.load(fp)
+    with open(project_json, 'rb') as fp:
+        project_dict = json_backend.load(fp)
 
     # delete existing project if found
     existing_project = [project for project in conn.projects if project.name == project_dict["name"]]
@@ -69,10 +73,31 @@ def delete_forecast(conn, project_name, model_name, timezero_date):
     conn.re_authenticate_if_necessary()
     project = [project for project in conn.projects if project.name == project_name][0]
     model = [model for model in project.models if model.name == model_name][0]
-    forecast_for_tz_date = [forecast for forecast in model.forecasts
-                            if forecast.timezero.timezero_date == timezero_date]
-    if forecast_for_tz_date:
-        existing_forecast = forecast_for_tz_date[0]
+    return _delete_model_forecast(model, timezero_date, _timezero_date_to_forecast(model))
+
+
+def _timezero_date_to_forecast(model):
+    """
+    Helper that gets all of model's forecasts in one request so that callers deleting more than one forecast don't
+    re-fetch them for each.
+
+    :return: a dict that maps timezero dates (YYYY-MM-DD strs) to model's first Forecast for that date
+    """
+    timezero_date_to_forecast = {}
+    for forecast in model.forecasts:
+        timezero_date_to_forecast.setdefault(forecast.timezero.timezero_date, forecast)
+    return timezero_date_to_forecast
+
+
+def _delete_model_forecast(model, timezero_date, timezero_date_to_forecast):
+    """
+    `delete_forecast()` helper that deletes model's forecast for timezero_date, if any.
+
+    :param timezero_date_to_forecast: as returned by `_timezero_date_to_forecast()`. the deleted forecast is removed
+    :return: as documented in `delete_forecast()`
+    """
+    existing_forecast = timezero_date_to_forecast.pop(timezero_date, None)
+    if existing_forecast:
         logger.info(
             f"delete_forecast(): deleting existing forecast. model={model.id}, timezero_date={timezero_date}, "
             f"existing_forecast={existing_forecast.id}")
@@ -125,9 +150,6 @@ def upload_forecast(conn, json_io_dict, forecast_filename, project_name, model_a
     """
     conn.re_authenticate_if_necessary()
 
-    if overwrite:
-        delete_forecast(conn, project_name, model_name, timezero_date)
-
     # get projects
     projects = conn.projects
     project = [project for project in projects if project.name == project_name][0]
@@ -136,12 +158,15 @@ def upload_forecast(conn, json_io_dict, forecast_filename, project_name, model_a
     models = project.models
     model = [model for model in models if model.abbreviation == model_abbr][0]
 
+    if overwrite:
+        _delete_model_forecast(model, timezero_date, _timezero_date_to_forecast(model))
+
     # check json formatting before upload
     # accepts either string or dictionary
     if isinstance(json_io_dict, str):
         try:
-            with open(json_io_dict) as jsonfile:
-                json_io_dict = json.load(jsonfile)
+            with open(json_io_dict, 'rb') as jsonfile:
+                json_io_dict = json_backend.load(jsonfile)
         except:
             print("""\nERROR - cannot read JSON Format. 
             Uploading a CSV? Consider converting to json Predx style with:
@@ -179,6 +204,7 @@ def upload_forecast_batch(conn, json_io_dict_batch, forecast_filename_batch, pro
     project = [project for project in conn.projects if project.name == project_name][0]
     models = project.models
     model = [model for model in models if model.name == model_name][0]
+    timezero_date_to_forecast = _timezero_date_to_forecast(model) if overwrite else None
 
     print(f"uploading {len(json_io_dict_batch)} forecasts...")
     jobs = []
@@ -186,13 +212,109 @@ def upload_forecast_batch(conn, json_io_dict_batch, forecast_filename_batch, pro
             zip(json_io_dict_batch, forecast_filename_batch, timezero_date_batch):
         print(f"uploading {project_name!r} project, {model_name!r} model, {timezero_date !r} timezero...")
         if overwrite:
-            delete_forecast(conn, project_name, model_name, timezero_date)
+            _delete_model_forecast(model, timezero_date, timezero_date_to_forecast)
         job = model.upload_forecast(json_io_dict, forecast_filename, timezero_date)
         jobs.append(job)
         print("upload complete")
     return jobs[-1] if jobs else None
 
 
+def upload_forecast_batch_journaled(conn, journal_file, json_io_dict_batch, forecast_filename_batch, project_name,
+                                    model_name, timezero_date_batch, overwrite=False, retry_failed=True,
+                                    poll_interval=1):
+    """
+    A resumable version of `upload_forecast_batch()` that records each item's progress in an `UploadJournal` at
+    journal_file, and that waits for the upload jobs to finish. Re-running it with the same journal_file after an
+    interruption skips items that succeeded, re-polls the jobs of items that were uploaded but had not finished, and
+    only uploads the rest. Items are identified by their timezero date and forecast filename. No requests are made
+    for items that are already done.
+
+    :param conn: a ZoltarConnection
+    :param journal_file: a str or Path of the journal file. created if necessary
+    :param json_io_dict_batch: a list of JSON IO dicts or JSON file paths. files are only loaded when they're uploaded
+    :param forecast_filename_batch: a list of filenames of original forecast, paired with json_io_dict_batch
+    :param project_name: name of the Project that contains model_name
+    :param model_name: name of the Model to upload to
+    :param timezero_date_batch: a list of YYYY-MM-DD DATE FORMAT, e.g., '2018-12-03', paired with json_io_dict_batch
+    :param overwrite: True if you would like to overwrite the existing forecast for an item's timezero_date before
+        uploading it. Default is False
+    :param retry_failed: True if items that failed in a previous run should be uploaded again. o/w they are skipped
+    :param poll_interval: seconds to wait between polls of the unfinished jobs
+    :return: a summary dict: {'uploaded': number of uploads done by this run, 'skipped': number of items that were
+        already done, 'succeeded': total number of items that succeeded, 'failed': list of (item key, reason)}
+    """
+    if not (len(json_io_dict_batch) == len(forecast_filename_batch) == len(timezero_date_batch)):
+        raise RuntimeError(f"batch args had different lengths: json_io_dict_batch, forecast_filename_batch, "
+                           f"timezero_date_batch: {len(json_io_dict_batch)}, {len(forecast_filename_batch)}, "
+                           f"{len(timezero_date_batch)}")
+    elif not json_io_dict_batch:
+        raise RuntimeError(f"no forecasts to upload")
+
+    # sort items by their journal state
+    journal = UploadJournal(journal_file)
+    keys = [upload_item_key(timezero_date, forecast_filename)
+            for forecast_filename, timezero_date in zip(forecast_filename_batch, timezero_date_batch)]
+    items_to_upload = []  # (key, json_io_dict, forecast_filename, timezero_date)
+    keys_to_poll = []
+    num_skipped = 0
+    for key, json_io_dict, forecast_filename, timezero_date in \
+            zip(keys, json_io_dict_batch, forecast_filename_batch, timezero_date_batch):
+        state = journal.state(key)
+        if (state == ITEM_SUCCEEDED) or ((state == ITEM_FAILED) and not retry_failed):
+            num_skipped += 1
+        elif state == ITEM_UPLOADED:
+            keys_to_poll.append(key)
+        else:
+            if (key not in journal.items) or (state == ITEM_FAILED):
+                journal.record(key, ITEM_PENDING)
+            items_to_upload.append((key, json_io_dict, forecast_filename, timezero_date))
+    logger.info(f"upload_forecast_batch_journaled(): {len(items_to_upload)} to upload, {len(keys_to_poll)} to poll, "
+                f"{num_skipped} skipped. journal={journal}")
+
+    # upload
+    if items_to_upload or keys_to_poll:
+        conn.re_authenticate_if_necessary()
+    if items_to_upload:
+        project = [project for project in conn.projects if project.name == project_name][0]
+        model = [model for model in project.models if model.name == model_name][0]
+        timezero_date_to_forecast = _timezero_date_to_forecast(model) if overwrite else None
+    num_uploaded = 0
+    for key, json_io_dict, forecast_filename, timezero_date in items_to_upload:
+        try:
+            if isinstance(json_io_dict, (str, Path)):
+                with open(json_io_dict, 'rb') as fp:
+                    json_io_dict = json_backend.load(fp)
+            if overwrite:
+                _delete_model_forecast(model, timezero_date, timezero_date_to_forecast)
+            job = model.upload_forecast(json_io_dict, forecast_filename, timezero_date)
+        except Exception as ex:
+            journal.record(key, ITEM_FAILED, reason=f"{ex.__class__.__name__}: {ex}")
+            continue
+
+        journal.record(key, ITEM_UPLOADED, job_uri=job.uri)
+        keys_to_poll.append(key)
+        num_uploaded += 1
+
+    # poll the uploaded items' jobs until they finish
+    key_to_job = {key: Job(conn, journal.items[key]['job_uri']) for key in keys_to_poll}
+    while key_to_job:
+        for key, job in list(key_to_job.items()):
+            job.refresh()
+            if job.status_as_str == 'SUCCESS':
+                journal.record(key, ITEM_SUCCEEDED, forecast_id=job.output_json.get('forecast_pk'))
+                del key_to_job[key]
+            elif job.status_as_str == 'FAILED':
+                journal.record(key, ITEM_FAILED, reason=job.json['failure_message'])
+                del key_to_job[key]
+        if key_to_job:
+            time.sleep(poll_interval)
+
+    return {'uploaded': num_uploaded,
+            'skipped': num_skipped,
+            'succeeded': sum(1 for key in keys if journal.state(key) == ITEM_SUCCEEDED),
+            'failed': [(key, journal.items[key]['reason']) for key in keys if journal.state(key) == ITEM_FAILED]}
+
+
 def download_forecast(conn, project_name, model_name, timezero_date):
     """
     Downloads the data for the forecast corresponding to the args, in Zoltar's native json format, AKA a "json_io_dict".
@@ -209,7 +331,8 @@ def download_forecast(conn, project_name, model_name, timezero_date):
     conn.re_authenticate_if_necessary()
     project = [project for project in conn.projects if project.name == project_name][0]
     model = [model for model in project.models if model.name == model_name][0]
-    forecast_for_tz_date = [forecast for forecast in model.forecasts if forecast.timezero_date == timezero_date]
+    forecast_for_tz_date = [forecast for forecast in model.forecasts
+                            if forecast.timezero.timezero_date == timezero_date]
     if not forecast_for_tz_date:
         raise RuntimeError(f"forecast not found. project_name={project_name}, model_name={model_name}, "
                            f"timezero_date={timezero_date}")
@@ -219,6 +342,9 @@ def download_forecast(conn, project_name, model_name, timezero_date):
 
 
 def dataframe_from_rows(rows):
+    import pandas as pd  # deferred for import speed
+
+
     string_io = io.StringIO()
     csv_writer = csv.writer(string_io, delimiter=",")
     for row in rows:
@@ -239,6 +365,101 @@ def dataframe_from_json_io_dict(json_io_dict):
     return dataframe_from_rows(csv_rows_from_json_io_dict(json_io_dict))
 
 
+# how `typed_dataframe_from_json_io_dict()` casts value, cat, and sample columns, by Zoltar target type
+TARGET_TYPE_TO_DTYPE = {'continuous': 'float64', 'discrete': 'Int64', 'nominal': 'category', 'binary': 'boolean',
+                        'date': 'datetime64[ns]'}
+
+
+def typed_dataframe_from_json_io_dict(json_io_dict, target_types=None):
+    """
+    A typed alternative to `dataframe_from_json_io_dict()` that builds the DataFrame directly from a `ForecastFrame`'s
+    column arrays rather than writing and then re-parsing CSV. It has the same rows and CSV_HEADER columns, but:
+
+    - unit, target, and class are categorical
+    - quantile, prob, and the named distribution params are float64
+    - value, cat, and sample are float64 if all their cells are numbers (ints included), o/w object (e.g., date or text
+      cats), holding the original values. they can be cast further via target_types
+    - empty cells are NaN (rather than '')
+
+    :param json_io_dict: a "JSON IO dict" or `ForecastFrame`
+    :param target_types: an optional dict that maps target names to Zoltar target types (TARGET_TYPE_TO_DTYPE keys),
+        e.g., `{target.name: target.type for target in project.targets}`. each of the value, cat, and sample columns
+        whose (non-empty) cells' targets all have the same type is cast to TARGET_TYPE_TO_DTYPE's dtype for it.
+        columns with mixed target types are left as-is
+    :return: a Pandas DataFrame
+    """
+    import numpy as np  # deferred for import speed
+    import pandas as pd  # ""
+    from zoltpy.forecast_frame import ForecastFrame, PREDICTION_CLASSES, PREDICTION_CLASS_TO_CODE, VALUE_COLUMN, \
+        QUANTILE_COLUMN, VALUE_IS_OBJECT, QUANTILE_IS_OBJECT  # ""
+
+
+    forecast_frame = json_io_dict if isinstance(json_io_dict, ForecastFrame) \
+        else ForecastFrame.from_json_io_dict(json_io_dict)
+
+    # one row per element, plus one per named prediction (which have none)
+    class_codes = forecast_frame.class_codes
+    is_named_pred = class_codes == PREDICTION_CLASS_TO_CODE[NAMED_DISTRIBUTION_CLASS]
+    rows_per_pred = np.diff(forecast_frame.offsets)
+    rows_per_pred[is_named_pred] = 1
+    pred_idxs = np.repeat(np.arange(len(class_codes)), rows_per_pred)
+    row_starts = np.concatenate(([0], np.cumsum(rows_per_pred)[:-1])).astype(np.int64)
+    elem_idxs = forecast_frame.offsets[:-1][pred_idxs] + (np.arange(len(pred_idxs)) - row_starts[pred_idxs])
+    is_named_row = is_named_pred[pred_idxs]
+    elem_idxs[is_named_row] = 0  # a placeholder that's masked out below
+    row_class_codes = class_codes[pred_idxs]
+    row_flags = forecast_frame.flags[elem_idxs] if len(forecast_frame.flags) else np.zeros(len(elem_idxs), np.uint8)
+
+
+    def element_column(column_arr, column, is_object_flag, prediction_classes):
+        is_element_row = np.isin(row_class_codes, [PREDICTION_CLASS_TO_CODE[prediction_class]
+                                                   for prediction_class in prediction_classes]) & ~is_named_row
+        values = np.where(is_element_row, column_arr[elem_idxs] if len(column_arr) else np.nan, np.nan)
+        object_row_idxs = np.flatnonzero(is_element_row & ((row_flags & is_object_flag) != 0))
+        if len(object_row_idxs):  # o/w all numbers. only the flagged rows are overridden
+            values = values.astype(object)
+            for row_idx, elem_idx in zip(object_row_idxs.tolist(), elem_idxs[object_row_idxs].tolist()):
+                values[row_idx] = forecast_frame.objects[(column, elem_idx)]
+        return values, is_element_row
+
+
+    value, is_value_row = element_column(forecast_frame.value, VALUE_COLUMN, VALUE_IS_OBJECT,
+                                         [POINT_PREDICTION_CLASS, QUANTILE_PREDICTION_CLASS])
+    cat, is_cat_row = element_column(forecast_frame.value, VALUE_COLUMN, VALUE_IS_OBJECT, [BIN_DISTRIBUTION_CLASS])
+    prob, _ = element_column(forecast_frame.quantile, QUANTILE_COLUMN, QUANTILE_IS_OBJECT, [BIN_DISTRIBUTION_CLASS])
+    sample, is_sample_row = element_column(forecast_frame.value, VALUE_COLUMN, VALUE_IS_OBJECT,
+                                           [SAMPLE_PREDICTION_CLASS])
+    quantile, _ = element_column(forecast_frame.quantile, QUANTILE_COLUMN, QUANTILE_IS_OBJECT,
+                                 [QUANTILE_PREDICTION_CLASS])
+
+    # named distribution columns
+    family = np.full(len(pred_idxs), np.nan, dtype=object)
+    params = np.full((3, len(pred_idxs)), np.nan)
+    for row_idx in np.flatnonzero(is_named_row).tolist():
+        prediction = forecast_frame.named[pred_idxs[row_idx]]
+        family[row_idx] = prediction['family']
+        for param_idx, param in enumerate(['param1', 'param2', 'param3']):
+            if param in prediction:
+                params[param_idx, row_idx] = prediction[param]
+
+    dataframe = pd.DataFrame({
+        'unit': pd.Categorical.from_codes(forecast_frame.unit_codes[pred_idxs], forecast_frame.units),
+        'target': pd.Categorical.from_codes(forecast_frame.target_codes[pred_idxs], forecast_frame.targets),
+        'class': pd.Categorical.from_codes(row_class_codes, PREDICTION_CLASSES),
+        'value': value, 'cat': cat, 'prob': prob, 'sample': sample, 'quantile': quantile, 'family': family,
+        'param1': params[0], 'param2': params[1], 'param3': params[2]},
+        columns=CSV_HEADER)
+
+    # cast by target type
+    if target_types:
+        row_target_types = dataframe['target'].map(target_types)
+        for column, is_column_row in [('value', is_value_row), ('cat', is_cat_row), ('sample', is_sample_row)]:
+            column_target_types = set(row_target_types[is_column_row & ~is_named_row])
+            if (len(column_target_types) == 1) and (next(iter(column_target_types)) in TARGET_TYPE_TO_DTYPE):
+                dataframe[column] = dataframe[column].astype(TARGET_TYPE_TO_DTYPE[column_target_types.pop()])
+    return dataframe
+
+
 def busy_poll_job(job):
     """
     A simple utility that polls job's status every second until either success or failure.
@@ -302,7 +523,8 @@ def print_models(conn, project_name):
 
 
 def convert_cdc_csv_to_json_io_dict(season_start_year, filepath):
-    """Converts the passed cdc forecast file to native Zoltar json_io_dict.
+    """Converts the passed cdc forecast file to native Zoltar json_io_dict. To convert a directory tree of files in
+    parallel, see `cdc_bulk.bulk_convert_cdc_csv_files()`.
 
     :param season_start_year: the start year of the season (as an integer)
     :param filepath: a file path to the forecast file that needs to be convereted
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+#
+# This file defines a simple persistent cache of validation results, which lets callers like hub CI jobs skip
+# re-validating files that haven't changed. Entries are keyed by a hash of the file's content plus a "rules
+# fingerprint" - a hash of everything the validation depends on (e.g., valid targets, quantiles, and locations, and the
+# validation code itself). Changing either one results in a cache miss.
+#
+
+DEFAULT_CACHE_DIR_ENV_VAR = 'ZOLTPY_CACHE_DIR'
+
+
+def default_cache_dir():
+    """
+    :return: the directory used by ValidationCache when none is passed: $ZOLTPY_CACHE_DIR if set, o/w
+        ~/.cache/zoltpy/validation
+    """
+    return Path(os.environ.get(DEFAULT_CACHE_DIR_ENV_VAR, Path.home() / '.cache' / 'zoltpy')) / 'validation'
+
+
+def file_content_hash(file_path, chunk_size=1 << 20):
+    """
+    :param file_path: a str or Path
+    :param chunk_size: number of bytes to read at a time
+    :return: the hex sha256 digest of file_path's bytes, read incrementally
+    """
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def write_file_atomically(output_file, mode, write_fcn):
+    """
+    Writes output_file by calling write_fcn on a temporary file in the same directory, which then replaces output_file.
+    Thus readers never see a partial file. The temporary file is deleted if write_fcn (or the replace) fails, so that
+    failures don't leave stray '.tmp' files.
+
+    :param output_file: a Path
+    :param mode: the temporary file's mode: 'w' or 'wb'
+    :param write_fcn: a function of one arg - the open temporary file - that writes the output
+    """
+    fp = tempfile.NamedTemporaryFile(mode, dir=output_file.parent, suffix='.tmp', delete=False)
+    try:
+        with fp:
+            write_fcn(fp)
+        os.replace(fp.name, output_file)
+    except BaseException:
+        try:
+            os.unlink(fp.name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def rules_fingerprint(*rules):
+    """
+    :param rules: any number of JSON-serializable objects (lists, dicts, strs, numbers) that validation depends on
+    :return: a hex sha256 digest identifying rules. equal rules always produce the same fingerprint
+    """
+    return hashlib.sha256(json.dumps(rules, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ValidationCache:
+    """
+    A directory of JSON files, one per (content hash, rules fingerprint) pair, each containing a validation result.
+    Writes are atomic so that concurrent validators (e.g., CI workers) can share a cache directory.
+    """
+
+
+    def __init__(self, cache_dir=None):
+        """
+        :param cache_dir: directory to store entries in. created if necessary. uses `default_cache_dir()` if None
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, str(self.cache_dir)))
+
+
+    def _entry_path(self, content_hash, fingerprint):
+        return self.cache_dir / f"{content_hash}-{fingerprint[:16]}.json"
+
+
+    def get(self, content_hash, fingerprint):
+        """
+        :return: the result passed to `put()` for the args, or None if not cached (or if the entry is unreadable)
+        """
+        entry_path = self._entry_path(content_hash, fingerprint)
+        try:
+            with open(entry_path) as fp:
+                entry = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        # guard against (very unlikely) truncated-fingerprint collisions
+        return entry['result'] if entry.get('fingerprint') == fingerprint else None
+
+
+    def put(self, content_hash, fingerprint, result):
+        """
+        Saves result for the args, replacing any existing entry.
+
+        :param result: a JSON-serializable validation result, e.g., a list of error message strings
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry_path = self._entry_path(content_hash, fingerprint)
+        write_file_atomically(entry_path, 'w', lambda fp: json.dump({'fingerprint': fingerprint, 'result': result}, fp))
+        logger.debug(f"put(): cached result. entry_path={entry_path}")
+
+
+    def clear(self):
+        """
+        Deletes all of my entries.
+        """
+        if self.cache_dir.is_dir():
+            for entry_path in self.cache_dir.glob('*.json'):
+                entry_path.unlink()
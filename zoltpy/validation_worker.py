@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+from zoltpy.hub_spec import ENGINE_COLUMNAR, ENGINE_ROW
+
+
+logger = logging.getLogger(__name__)
+
+#
+# This file defines a long-running validation worker for contributors who re-validate a forecast file over and over.
+# The worker pays interpreter startup, imports, and rule setup (e.g., loading FIPS codes) once, and then re-validates
+# only files that changed, either by polling files and directories (`ValidationWorker.watch()`), or on request over a
+# local Unix socket (`ValidationWorker.serve()`), e.g., from an editor integration. The socket protocol is one JSON
+# object per line: the client sends {"path": "<csv file>"} and the worker replies with `ValidationWorker.validate()`'s
+# dict, or {"error": "<message>"}. See `request_validation()`.
+#
+
+DEFAULT_WATCH_INTERVAL = 0.5  # seconds between polls
+
+
+class ValidationWorker:
+    """
+    Validates quantile CSV files using a warm `HubValidator`, remembering each file's last result so that unchanged
+    files are not re-validated.
+    """
+
+
+    def __init__(self, validator=None, max_errors=None, cache=None, engine=ENGINE_ROW):
+        """
+        :param validator: the `HubValidator` to use. defaults to COVID_HUB_VALIDATOR
+        :param max_errors: as passed to `HubValidator.validate_quantile_csv_file()`
+        :param cache: ""
+        :param engine: ""
+        """
+        if validator is None:
+            from zoltpy.covid19 import COVID_HUB_VALIDATOR  # avoid circular imports
+
+
+            validator = COVID_HUB_VALIDATOR
+        self.validator = validator
+        self.max_errors = max_errors
+        self.cache = cache
+        self.engine = engine
+        self.file_states = {}  # Path -> (stat signature, result dict) as of the last validation
+        self.lock = threading.Lock()  # serializes validations b/c the socket server's requests run in threads
+
+
+    def __repr__(self):
+        return str((self.__class__.__name__, self.validator, self.max_errors, self.cache, self.engine))
+
+
+    def warm_up(self):
+        """
+        Does the one-time work that the first validation would o/w pay for: building the validator's tables (which
+        loads its location sets) and importing the selected engine.
+        """
+        self.validator.target_rules  # built on first access
+        if self.engine == ENGINE_COLUMNAR:
+            import zoltpy.covid19_columnar  # imports numpy and pandas
+
+
+    def validate(self, csv_file, force=False):
+        """
+        Validates csv_file unless it's unchanged since the last call.
+
+        :param csv_file: a str or Path
+        :param force: True if csv_file should be re-validated even if unchanged
+        :return: a dict: {'path': str, 'result': `validate_quantile_csv_file()`'s result, 'elapsed': seconds it took to
+            validate (0 if unchanged), 'date_cache': the validator's `date_cache_summary()` after validating, 'changed':
+            True if csv_file was validated}
+        """
+        csv_file = Path(csv_file).absolute()
+        signature = _stat_signature(csv_file)
+        with self.lock:
+            file_state = self.file_states.get(csv_file)
+            if (not force) and file_state and (file_state[0] == signature):
+                return dict(file_state[1], elapsed=0, changed=False)
+
+            start_time = time.perf_counter()
+            result = self.validator.validate_quantile_csv_file(csv_file, self.max_errors, self.cache, self.engine)
+            result_dict = {'path': str(csv_file), 'result': result, 'elapsed': time.perf_counter() - start_time,
+                           'date_cache': self.validator.date_cache_summary(), 'changed': True}
+            self.file_states[csv_file] = (signature, result_dict)
+            return result_dict
+
+
+    def changed_files(self, paths):
+        """
+        :param paths: a list of file and directory paths (strs or Paths). directories are searched (not recursively)
+            for '*.csv' files
+        :return: a sorted list of the absolute Paths of csv files that are new or have changed since they were last
+            validated. also forgets files that no longer exist
+        """
+        csv_files = set()
+        for path in [Path(path).absolute() for path in paths]:
+            csv_files.update(path.glob('*.csv') if path.is_dir() else [path] if path.exists() else [])
+        with self.lock:
+            for csv_file in set(self.file_states) - csv_files:
+                del self.file_states[csv_file]
+            return sorted(csv_file for csv_file in csv_files if (csv_file not in self.file_states)
+                          or (self.file_states[csv_file][0] != _stat_signature(csv_file)))
+
+
+    def watch(self, paths, callback, interval=DEFAULT_WATCH_INTERVAL, max_polls=None):
+        """
+        Polls paths for changed csv files, validating each one and passing the result to callback. Runs until
+        interrupted (e.g., by KeyboardInterrupt) or max_polls is reached.
+
+        :param paths: as passed to `changed_files()`
+        :param callback: a function of one arg - a `validate()` result dict - called for each validated file
+        :param interval: seconds to sleep between polls
+        :param max_polls: optional number of polls to do before returning. intended for tests
+        """
+        num_polls = 0
+        while (max_polls is None) or (num_polls < max_polls):
+            for csv_file in self.changed_files(paths):
+                try:
+                    callback(self.validate(csv_file))
+                except FileNotFoundError:  # deleted after `changed_files()`
+                    logger.debug(f"watch(): file was deleted. csv_file={csv_file}")
+            num_polls += 1
+            if (max_polls is None) or (num_polls < max_polls):
+                time.sleep(interval)
+
+
+    def serve(self, socket_path):
+        """
+        Starts serving validation requests on the Unix socket socket_path in a background thread. See the protocol
+        above.
+
+        :param socket_path: a str or Path to a socket file to create. an existing (stale) one is replaced
+        :return: the started `socketserver.ThreadingUnixStreamServer`. call its `shutdown()` and `server_close()` to
+            stop it
+        """
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = socketserver.ThreadingUnixStreamServer(str(socket_path), _ValidationRequestHandler)
+        server.daemon_threads = True
+        server.worker = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.debug(f"serve(): listening. socket_path={socket_path}")
+        return server
+
+
+class _ValidationRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one connection, which may send any number of requests, one per line.
+    """
+
+
+    def handle(self):
+        for request_line in self.rfile:
+            try:
+                request = json.loads(request_line)
+                response = self.server.worker.validate(request['path'], request.get('force', False))
+            except Exception as ex:  # bad request or file. report it and keep serving
+                response = {'error': f"{ex.__class__.__name__}: {ex}"}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+def request_validation(socket_path, csv_file, force=False, timeout=None):
+    """
+    A client for `ValidationWorker.serve()`.
+
+    :param socket_path: the worker's socket path
+    :param csv_file: a str or Path to validate. relative paths are made absolute b/c the worker's cwd may differ
+    :param force: as passed to `ValidationWorker.validate()`
+    :param timeout: optional socket timeout in seconds
+    :return: the worker's response dict: either a `ValidationWorker.validate()` result or {'error': str}
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.settimeout(timeout)
+        client_socket.connect(str(socket_path))
+        request = {'path': str(Path(csv_file).absolute()), 'force': force}
+        client_socket.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with client_socket.makefile('rb') as fp:
+            return json.loads(fp.readline())
+
+
+def _stat_signature(csv_file):
+    """
+    :return: a tuple that changes when csv_file's content likely changed: (modification time in ns, size)
+    """
+    stat_result = os.stat(csv_file)
+    return stat_result.st_mtime_ns, stat_result.st_size